@@ -0,0 +1,373 @@
+# =================================================================
+# GÜVENLİK SİSTEMİ TOPLAYICISI (FEDERASYON)
+#
+# ÖZELLİKLER:
+# - Her depodaki kontrolcü (main.py, DUGUM_ID ayarlı) bölge durumlarını ve bildirimlerini ortak MQTT broker'a yayınlar.
+# - Toplayıcı joker karakterli (+) tek bir abonelikle tüm düğümleri dinler; retained durumlar bağlanınca bir kez
+#   gelir, sonra sadece değişiklikler gelir. Yüzlerce bölgenin görünümü düğümler tek tek sorgulanmadan bellekte tutulur.
+# - Tüm düğümlerin bildirimleri tek bir Telegram botundan, düğüm kimliğiyle gönderilir; kritik alarmlar önce gider,
+#   "ALARM DEVAM EDİYOR" güncellemeleri aynı mesajda yerinde düzenlenir.
+# - Düğüm bağlantısı koparsa (son arzu mesajı) ve geri gelirse bildirilir.
+# - Site genelinde komutlar önbellekten yanıtlanır: /durum, /aciklar, /alarmlar, /hepsinikur, /hepsinikapat,
+#   /kur <düğüm> [no], /kapat <düğüm> [no].
+# =================================================================
+
+import paho.mqtt.client as mqtt
+import asyncio
+import json
+import threading
+import time
+from telegram import Update
+from telegram.error import RetryAfter, TelegramError
+from telegram.ext import Application, CommandHandler, ContextTypes, filters
+
+# --- AYARLAR ---
+MQTT_BROKER_IP = "localhost"
+MQTT_PORT = 1883
+MQTT_KULLANICI = None
+MQTT_SIFRE = None
+MQTT_KONU_ONEKI = "guvenlik"  # Kontrolcülerdeki MQTT_KONU_ONEKI ile aynı olmalı
+MQTT_KOMUT_QOS = 1
+
+TELEGRAM_BOT_TOKEN = "YOUR_TELEGRAM_BOT_TOKEN"  # Toplayıcının tek botu
+TELEGRAM_CHAT_ID = "YOUR_TELEGRAM_CHAT_ID"      # Bildirimlerin gideceği ve komutların kabul edileceği sohbet
+TELEGRAM_API_URL = "https://api.telegram.org"
+TELEGRAM_GONDERIM_ARALIGI = 1.0  # Aynı sohbete iki mesaj arası en az süre (Telegram sınırı ~1/sn)
+TELEGRAM_MESAJ_SINIRI = 4000     # Uzun listeler bu uzunlukta parçalara bölünür (Telegram sınırı 4096)
+
+ONCELIK_KRITIK = 0  # main.py ile aynı öncelik değerleri
+ONCELIK_SESSIZ = 2
+
+
+class BolgeKaydi:
+    """Bir düğümdeki bir bölgenin retained topic'lerden derlenen son durumu."""
+    __slots__ = ("dugum", "no", "ad", "kamera", "durum", "kapi", "degisim")
+
+    def __init__(self, dugum, no):
+        self.dugum = dugum
+        self.no = no
+        self.ad = f"Bölge {no}"
+        self.kamera = None
+        self.durum = None    # KURULU / DEVRE_DISI / ALARM
+        self.kapi = None     # ACIK / KAPALI
+        self.degisim = 0.0   # Son güncelleme zamanı
+
+
+class DurumOnbellegi:
+    """Tüm düğümlerin bölge ve bağlantı durumları.
+
+    paho thread'i günceller, Telegram komutları okur; ikisi de kısa süreli bir kilitle korunur. Her güncelleme
+    sözlükte O(1)'dir, komutlar sadece önbelleği dolaşır ve hiçbir düğüme istek göndermez.
+    """
+
+    def __init__(self):
+        self._kilit = threading.Lock()
+        self.bolgeler = {}    # (düğüm, no) -> BolgeKaydi
+        self.baglanti = {}    # düğüm -> CEVRIMICI / CEVRIMDISI
+        self.mesaj_sayisi = 0
+
+    def bolge_guncelle(self, dugum, no, alan, deger):
+        """Bölgenin `alan`ını günceller; boş değer (silinen retained mesaj) bölgeyi önbellekten çıkarır."""
+        with self._kilit:
+            self.mesaj_sayisi += 1
+            if not deger:
+                self.bolgeler.pop((dugum, no), None)
+                return
+            kayit = self.bolgeler.get((dugum, no))
+            if kayit is None:
+                kayit = self.bolgeler[(dugum, no)] = BolgeKaydi(dugum, no)
+            if alan == "bilgi":
+                bilgi = json.loads(deger)
+                kayit.ad = bilgi.get("ad", kayit.ad)
+                kayit.kamera = bilgi.get("kamera")
+            else:
+                setattr(kayit, alan, deger)
+            kayit.degisim = time.time()
+
+    def baglanti_guncelle(self, dugum, deger):
+        """Düğümün bağlantı durumunu günceller ve önceki değeri döndürür."""
+        with self._kilit:
+            self.mesaj_sayisi += 1
+            onceki = self.baglanti.get(dugum)
+            self.baglanti[dugum] = deger
+            return onceki
+
+    def baglanti_durumu(self, dugum):
+        """Düğümün son bilinen bağlantı durumu (CEVRIMICI / CEVRIMDISI); hiç gelmediyse None."""
+        with self._kilit:
+            return self.baglanti.get(dugum)
+
+    def kayitlar(self, dugum=None, no=None):
+        """(düğüm, no) sırasıyla bölge kayıtları; düğüm ve numara verilirse sadece onlar."""
+        with self._kilit:
+            secilen = [k for k in self.bolgeler.values()
+                       if (dugum is None or k.dugum == dugum) and (no is None or k.no == no)]
+        return sorted(secilen, key=lambda k: (k.dugum, k.no))
+
+    def dugumler(self):
+        with self._kilit:
+            return sorted(set(self.baglanti) | {dugum for dugum, _ in self.bolgeler})
+
+
+onbellek = DurumOnbellegi()
+mqtt_client = None
+gonderici = None  # Telegram gönderim kuyruğu (TelegramGonderici), post_init içinde oluşturulur
+
+
+# --- TELEGRAM GÖNDERİMİ ---
+class TelegramGonderici:
+    """Düğümlerden gelen olayları tek sohbete sırayla gönderir.
+
+    Kritik alarmlar öncelik kuyruğunda öne geçer; iki gönderim arasında en az TELEGRAM_GONDERIM_ARALIGI beklenir,
+    429 yanıtında retry_after kadar beklenip olay tekrar denenir. Aynı (düğüm, anahtar) ile gelen olay, daha önce
+    gönderilen mesajı yerinde düzenler.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._kuyruk = asyncio.PriorityQueue()
+        self._sira = 0
+        self._duzenlenecek = {}   # (düğüm, anahtar) -> message_id
+        self._gorev = None
+        self.metrikler = {"gonderilen": 0, "duzenlenen": 0, "hiz_siniri": 0, "hata": 0}
+
+    def ekle(self, oncelik, metin, sessiz=False, anahtar=None):
+        """Olay döngüsü thread'inde çağrılmalıdır (paho thread'inden call_soon_threadsafe ile)."""
+        self._sira += 1
+        self._kuyruk.put_nowait((oncelik, self._sira, metin, sessiz, anahtar))
+
+    def baslat(self):
+        self._gorev = asyncio.create_task(self._dongu(), name="telegram-gonderici")
+
+    async def durdur(self):
+        if self._gorev:
+            self._gorev.cancel()
+            await asyncio.gather(self._gorev, return_exceptions=True)
+
+    async def _dongu(self):
+        while True:
+            oncelik, sira, metin, sessiz, anahtar = await self._kuyruk.get()
+            try:
+                await self._gonder(metin, sessiz, anahtar)
+            except RetryAfter as e:
+                self.metrikler["hiz_siniri"] += 1
+                self._kuyruk.put_nowait((oncelik, sira, metin, sessiz, anahtar))
+                await asyncio.sleep(e.retry_after if isinstance(e.retry_after, (int, float)) else e.retry_after.total_seconds())
+                continue
+            except TelegramError as e:
+                self.metrikler["hata"] += 1
+                print(f"Telegram gönderim hatası: {e}")
+            await asyncio.sleep(TELEGRAM_GONDERIM_ARALIGI)
+
+    async def _gonder(self, metin, sessiz, anahtar):
+        mesaj_id = self._duzenlenecek.get(anahtar) if anahtar else None
+        if mesaj_id is not None:
+            await self.bot.edit_message_text(metin, chat_id=TELEGRAM_CHAT_ID, message_id=mesaj_id)
+            self.metrikler["duzenlenen"] += 1
+            return
+        mesaj = await self.bot.send_message(TELEGRAM_CHAT_ID, metin, disable_notification=sessiz)
+        self.metrikler["gonderilen"] += 1
+        if anahtar:
+            self._duzenlenecek[anahtar] = mesaj.message_id
+
+    def ozet(self):
+        m = self.metrikler
+        return (f"Telegram gönderici | Gönderilen: {m['gonderilen']} | Düzenlenen: {m['duzenlenen']} | "
+                f"429: {m['hiz_siniri']} | Hata: {m['hata']} | Kuyruk: {self._kuyruk.qsize()}")
+
+
+# --- MQTT ---
+def abonelikler():
+    """Tüm düğümler için joker karakterli abonelikler (düğüm sayısından bağımsız olarak sabit)."""
+    onek = f"{MQTT_KONU_ONEKI}/+"
+    return [(f"{onek}/bolge/+/durum", 1), (f"{onek}/bolge/+/kapi", 1), (f"{onek}/bolge/+/bilgi", 1),
+            (f"{onek}/sistem/baglanti", 1), (f"{onek}/olay", 1)]
+
+def topic_coz(topic):
+    """'<önek>/<düğüm>/bolge/<no>/<alan>' ya da '<önek>/<düğüm>/<alt...>' topic'ini (düğüm, parçalar) olarak çözer."""
+    onek = MQTT_KONU_ONEKI.split("/")
+    parcalar = topic.split("/")
+    if parcalar[:len(onek)] != onek or len(parcalar) < len(onek) + 2:
+        return None, []
+    return parcalar[len(onek)], parcalar[len(onek) + 1:]
+
+def komut_topic(kayit):
+    return f"{MQTT_KONU_ONEKI}/{kayit.dugum}/bolge/{kayit.no}/komut"
+
+def on_connect(client, userdata, flags, rc):
+    if rc != 0:
+        print(f"MQTT bağlantı hatası! Kod: {rc}")
+        return
+    client.subscribe(abonelikler())
+    print("MQTT Broker'a bağlanıldı; tüm düğümlerin retained durumları alınıyor.")
+
+def on_message(client, userdata, msg):
+    """Durum topic'lerini önbelleğe yazar, olayları ve bağlantı değişimlerini Telegram kuyruğuna aktarır."""
+    dugum, parcalar = topic_coz(msg.topic)
+    if dugum is None:
+        return
+    deger = msg.payload.decode("utf-8", "replace")
+    try:
+        if len(parcalar) == 3 and parcalar[0] == "bolge":
+            onbellek.bolge_guncelle(dugum, int(parcalar[1]), parcalar[2], deger)
+        elif parcalar == ["sistem", "baglanti"]:
+            onceki = onbellek.baglanti_guncelle(dugum, deger)
+            # Retained ilk değerler bildirilmez; sadece çalışırken gelen geçişler
+            if not msg.retain and onceki != deger:
+                if deger == "CEVRIMDISI":
+                    olay_aktar(ONCELIK_KRITIK, f"⚠️ [{dugum}] kontrolcü bağlantısı koptu!")
+                elif onceki == "CEVRIMDISI":
+                    olay_aktar(1, f"✅ [{dugum}] kontrolcü yeniden bağlandı.")
+        elif parcalar == ["olay"]:
+            olay = json.loads(deger)
+            anahtar = (dugum, olay["anahtar"]) if olay.get("anahtar") else None
+            olay_aktar(olay.get("oncelik", 1), f"[{dugum}] {olay['mesaj']}", olay.get("sessiz", False), anahtar)
+    except (ValueError, KeyError) as e:
+        print(f"Geçersiz MQTT mesajı ({msg.topic}): {e}")
+
+def olay_aktar(oncelik, metin, sessiz=False, anahtar=None):
+    """paho thread'inden olay döngüsündeki gönderim kuyruğuna aktarır."""
+    if gonderici is not None:
+        olay_dongusu.call_soon_threadsafe(gonderici.ekle, oncelik, metin, sessiz, anahtar)
+
+def komut_yayinla(kayitlar, komut):
+    for kayit in kayitlar:
+        mqtt_client.publish(komut_topic(kayit), komut, qos=MQTT_KOMUT_QOS)
+
+def mqtt_istemcisini_baslat():
+    global mqtt_client
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, "GuvenlikToplayici")
+    client.on_connect = on_connect
+    client.on_message = on_message
+    if MQTT_KULLANICI:
+        client.username_pw_set(MQTT_KULLANICI, MQTT_SIFRE)
+    client.connect_async(MQTT_BROKER_IP, MQTT_PORT, 60)
+    client.loop_start()
+    mqtt_client = client
+
+
+# --- TELEGRAM KOMUTLARI ---
+def parcalara_bol(satirlar):
+    """Satırları Telegram mesaj sınırını aşmayacak metinlere böler."""
+    parcalar, parca = [], ""
+    for satir in satirlar:
+        if parca and len(parca) + len(satir) + 1 > TELEGRAM_MESAJ_SINIRI:
+            parcalar.append(parca)
+            parca = ""
+        parca += ("\n" if parca else "") + satir
+    return parcalar + [parca] if parca else parcalar
+
+async def yanitla(update, satirlar):
+    for parca in parcalara_bol(satirlar):
+        await update.message.reply_text(parca)
+
+def bolge_satiri(kayit):
+    return f"{kayit.dugum} / {kayit.ad}: {kayit.durum or '?'}, kapı {kayit.kapi or '?'}"
+
+async def durum_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Düğüm başına bağlantı ve bölge özetini verir."""
+    satirlar = []
+    for dugum in onbellek.dugumler():
+        kayitlar = onbellek.kayitlar(dugum)
+        isaret = "🔴" if onbellek.baglanti_durumu(dugum) == "CEVRIMDISI" else "🟢"
+        kurulu = sum(k.durum == "KURULU" for k in kayitlar)
+        alarm = sum(k.durum == "ALARM" for k in kayitlar)
+        acik = sum(k.kapi == "ACIK" for k in kayitlar)
+        satirlar.append(f"{isaret} {dugum}: {len(kayitlar)} bölge, {kurulu} kurulu, {alarm} alarm, {acik} açık kapı")
+    await yanitla(update, satirlar or ["Henüz hiçbir düğümden durum alınmadı."])
+
+async def aciklar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Tüm sitelerdeki açık kapıları listeler."""
+    kayitlar = [k for k in onbellek.kayitlar() if k.kapi == "ACIK"]
+    await yanitla(update, [f"🚪 {bolge_satiri(k)}" for k in kayitlar] or ["✅ Açık kapı yok."])
+
+async def alarmlar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    kayitlar = [k for k in onbellek.kayitlar() if k.durum == "ALARM"]
+    await yanitla(update, [f"🚨 {bolge_satiri(k)}" for k in kayitlar] or ["✅ Çalan alarm yok."])
+
+def komut_hedefleri(context):
+    """/kur ve /kapat argümanları: <düğüm> [no]; geçersizse None."""
+    if not context.args or len(context.args) > 2:
+        return None
+    no = None
+    if len(context.args) == 2:
+        if not context.args[1].isdigit():
+            return None
+        no = int(context.args[1])
+    return onbellek.kayitlar(context.args[0], no)
+
+async def kurma_komutunu_gonder(update, kayitlar):
+    """Devre dışı ve kapısı kapalı bölgelere KUR gönderir; kapısı açık olanlar (hemen alarm verir) atlanır."""
+    hedefler = [k for k in kayitlar if k.durum == "DEVRE_DISI" and k.kapi != "ACIK"]
+    atlanan = [k for k in kayitlar if k.durum == "DEVRE_DISI" and k.kapi == "ACIK"]
+    komut_yayinla(hedefler, "KUR")
+    satirlar = [f"🔒 {len(hedefler)} bölgeye kurma komutu gönderildi; sonuçlar /durum ile izlenebilir."]
+    satirlar += [f"⚠️ Kapı açık, kurulmadı: {k.dugum} / {k.ad}" for k in atlanan]
+    await yanitla(update, satirlar)
+
+async def kapatma_komutunu_gonder(update, kayitlar):
+    hedefler = [k for k in kayitlar if k.durum in ("KURULU", "ALARM")]
+    komut_yayinla(hedefler, "DEVRE_DISI")
+    user = update.message.from_user
+    print(f"{len(hedefler)} bölgeye devre dışı bırakma komutu gönderildi ({user.full_name}, ID: {user.id}).")
+    await yanitla(update, [f"❌ {len(hedefler)} bölgeye devre dışı bırakma komutu gönderildi ({user.full_name})."])
+
+async def hepsinikur_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await kurma_komutunu_gonder(update, onbellek.kayitlar())
+
+async def hepsinikapat_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await kapatma_komutunu_gonder(update, onbellek.kayitlar())
+
+async def kur_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    kayitlar = komut_hedefleri(context)
+    if not kayitlar:
+        await update.message.reply_text("Kullanım: /kur <düğüm> [bölge no] (düğümler: /durum)")
+        return
+    await kurma_komutunu_gonder(update, kayitlar)
+
+async def kapat_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    kayitlar = komut_hedefleri(context)
+    if not kayitlar:
+        await update.message.reply_text("Kullanım: /kapat <düğüm> [bölge no] (düğümler: /durum)")
+        return
+    await kapatma_komutunu_gonder(update, kayitlar)
+
+
+# --- ANA PROGRAM ---
+olay_dongusu = None
+
+async def baslarken(application):
+    """Application.post_init: gönderim kuyruğunu olay döngüsünde başlatır, ardından MQTT'ye bağlanır."""
+    global gonderici, olay_dongusu
+    olay_dongusu = asyncio.get_running_loop()
+    gonderici = TelegramGonderici(application.bot)
+    gonderici.baslat()
+    mqtt_istemcisini_baslat()
+
+async def kapanirken(application):
+    if mqtt_client:
+        mqtt_client.loop_stop()
+        mqtt_client.disconnect()
+    if gonderici:
+        await gonderici.durdur()
+        print(gonderici.ozet())
+    print(f"Önbellek | Düğüm: {len(onbellek.dugumler())} | Bölge: {len(onbellek.bolgeler)} | "
+          f"İşlenen MQTT mesajı: {onbellek.mesaj_sayisi}")
+
+def application_olustur():
+    application = (Application.builder().token(TELEGRAM_BOT_TOKEN).base_url(f"{TELEGRAM_API_URL}/bot")
+                   .post_init(baslarken).post_shutdown(kapanirken).build())
+    # Site genelinde kurma/kapatma yapılabildiği için komutlar sadece bildirim sohbetinden kabul edilir
+    sohbet = filters.Chat(chat_id=int(TELEGRAM_CHAT_ID))
+    for ad, isleyici in (("durum", durum_command), ("aciklar", aciklar_command), ("alarmlar", alarmlar_command),
+                         ("hepsinikur", hepsinikur_command), ("hepsinikapat", hepsinikapat_command),
+                         ("kur", kur_command), ("kapat", kapat_command)):
+        application.add_handler(CommandHandler(ad, isleyici, filters=sohbet))
+    return application
+
+def main():
+    print("Güvenlik sistemi toplayıcısı başlatılıyor...")
+    application_olustur().run_polling(allowed_updates=[Update.MESSAGE])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+# =================================================================
+# GÜVENLİK SİSTEMİ - UÇTAN UCA GECİKME ÖLÇÜMÜ
+#
+# main.py'yi donanım olmadan, simüle GPIO çipi ve yerel Telegram/Frigate/MQTT taklitleriyle çalıştırır;
+# kurulu bölgelerde kapıyı tekrar tekrar açıp şu gecikmelerin yüzdeliklerini raporlar:
+#   - kapı kenarı -> alarm rölesi
+#   - kapı kenarı -> MQTT ALARM yayınının broker'a ulaşması
+#   - kapı kenarı -> alarm mesajının Telegram Bot API'ye ulaşması
+# --telegram-modu ile bunun yerine Telegram komut alma modları (polling / webhook) karşılaştırılır:
+#   - /aktifetN, /deaktifetN gönderimi -> bölge durumunun MQTT'ye yayınlanması
+#   - /aktifetN, /deaktifetN gönderimi -> bot yanıtının Telegram Bot API'ye ulaşması
+#
+# Kullanım:
+#   python benchmark.py                         # kesme ve polling modlarını ayrı süreçlerde ölçer
+#   python benchmark.py --mod kesme --olay 50 --ag-gecikmesi-ms 40
+#   python benchmark.py --esik role=5 --esik telegram=500   # p95 eşiği aşılırsa çıkış kodu 1
+#   python benchmark.py --parazit 5             # olaylar arasında kısa sıçramalar ekler, yanlış alarmları sayar
+#   python benchmark.py --telegram-modu hepsi --ag-gecikmesi-ms 40 --mesgul-ms 500
+# =================================================================
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import simulasyon
+
+OLCUMLER = (("role", "kapı -> röle"), ("mqtt", "kapı -> MQTT"), ("telegram", "kapı -> Telegram"),
+            ("filtre", "filtre kararı"))
+KOMUT_OLCUMLERI = (("durum", "komut -> durum"), ("yanit", "komut -> yanıt"))
+WEBHOOK_YOLU = "guvenlik-bot"
+PARAZIT_SURESI = 0.002  # Enjekte edilen sıçramanın süresi (sn)
+YUZDELIKLER = (50, 95, 99)
+
+
+def yuzdelik(degerler, p):
+    """En yakın sıra yöntemiyle p. yüzdelik (değerler sıralı olmalı)."""
+    if not degerler:
+        return None
+    sira = max(int(round(p / 100 * len(degerler) + 0.5)) - 1, 0)
+    return degerler[min(sira, len(degerler) - 1)]
+
+
+def parazit_enjekte_et(cip, pin, adet):
+    """Kapalı kapının pinine kısa sıçramalar gönderir (uzun kablodaki parazit benzeri)."""
+    for _ in range(adet):
+        cip.seviye_ayarla(pin, 1)
+        time.sleep(PARAZIT_SURESI)
+        cip.seviye_ayarla(pin, 0)
+        time.sleep(0.02)
+
+
+def sistemi_taklitlerle_baslat(sistem, gecikme):
+    """main.py'yi simüle çip ve yerel taklitlere bağlayıp GPIO, bildirim dağıtıcı ve MQTT'yi başlatır."""
+    cip = simulasyon.SimuleGpio()
+    telegram = simulasyon.TelegramTaklidi(gecikme=gecikme).baslat()
+    frigate = simulasyon.FrigateTaklidi(gecikme=gecikme).baslat()
+    broker = simulasyon.MqttBrokerTaklidi().baslat()
+    gecici = tempfile.TemporaryDirectory()
+
+    sistem.TELEGRAM_API_URL = telegram.adres
+    sistem.TELEGRAM_BOT_TOKEN = "123456:BENCHMARK"
+    sistem.TELEGRAM_CHAT_ID = "1000"
+    sistem.FRIGATE_IP, sistem.FRIGATE_PORT = "127.0.0.1", frigate.port
+    sistem.MQTT_BROKER_IP, sistem.MQTT_PORT = broker.host, broker.port
+    sistem.olay_gunlugu = sistem.OlayGunlugu(os.path.join(gecici.name, "gunluk"), os.path.join(gecici.name, "anlik.json"))
+
+    sistem.load_system_state()
+    sistem.bildirim_dagitici.baslat()
+    sistem.gpio_arkaucunu_yukle(cip)
+    sistem.aktif_sensor_modu = sistem.gpio_kur()
+    sistem.role_denetleyici.baslat()
+    sistem.mqtt_istemcisini_baslat()
+    if broker.bekle(lambda y: y["istemci"] == "SecurityControllerPi5", 5) is None:
+        raise RuntimeError("MQTT istemcisi broker taklidine bağlanamadı.")
+    return cip, telegram, frigate, broker, gecici
+
+
+def sistemi_kapat(sistem, telegram, frigate, broker, gecici):
+    sistem.bildirim_dagitici.durdur()
+    sistem.role_denetleyici.durdur()
+    if sistem.mqtt_client:
+        sistem.mqtt_client.loop_stop()
+        sistem.mqtt_client.disconnect()
+    sistem.lgpio.gpiochip_close(sistem.gpio_handle)
+    sistem.olay_gunlugu.kapat()
+    for taklit in (telegram, frigate, broker):
+        taklit.kapat()
+    gecici.cleanup()
+
+
+def senaryoyu_calistir(mod, olay_sayisi, aralik, ag_gecikmesi_ms, parazit=0):
+    """Tek bir sensör modunu ölçer ve {ölçüm: [ms, ...]} ile özet metinlerini döndürür."""
+    import main as sistem
+
+    sistem.SENSOR_MODU = mod
+    cip, telegram, frigate, broker, gecici = sistemi_taklitlerle_baslat(sistem, ag_gecikmesi_ms / 1000)
+    stop_event = threading.Event()
+    sensor_hedefi = sistem.sensor_kesme_dongusu if sistem.aktif_sensor_modu == "kesme" else sistem.sensor_polling_loop
+    threadler = [threading.Thread(target=sensor_hedefi, args=(stop_event,)),
+                 threading.Thread(target=sistem.goruntu_yenileme_dongusu, args=(stop_event,))]
+    for thread in threadler:
+        thread.start()
+
+    sonuclar = {ad: [] for ad, _ in OLCUMLER}
+    zaman_asimi = 0
+    yanlis_alarm = 0
+    try:
+        for bolge in sistem.bolgeler:
+            sistem.bolge_kur(bolge, kaynak="benchmark")
+        time.sleep(max(sistem.GORUNTU_YENILEME_ARALIGI, 0.5))  # Görüntü önbelleği ısınsın
+
+        for i in range(olay_sayisi):
+            bolge = sistem.bolgeler[i % len(sistem.bolgeler)]
+            role_sirasi, mqtt_sirasi, telegram_sirasi = cip.kayit_sayisi(), broker.kayit_sayisi(), telegram.kayit_sayisi()
+
+            kenar = cip.seviye_ayarla(bolge.pin, 1)
+            role = cip.bekle(lambda y: y[1] == sistem.ALARM_ROLE_PIN and y[2] == sistem.ROLE_ACIK, 5, role_sirasi)
+            yayin = broker.bekle(lambda y: y["topic"] == bolge.mqtt_topic and y["payload"] == f"ALARM{bolge.no}_CALIYOR".encode(),
+                                 5, mqtt_sirasi)
+            mesaj = telegram.bekle(lambda m: f"ALARM{bolge.no}!" in m["metin"], 10, telegram_sirasi)
+            for ad, kayit in (("role", role and role[0]), ("mqtt", yayin and yayin["zaman_ns"]),
+                              ("telegram", mesaj and mesaj["zaman_ns"])):
+                if kayit:
+                    sonuclar[ad].append((kayit - kenar) / 1e6)
+                else:
+                    zaman_asimi += 1
+
+            # Kapıyı kapat, bölgeyi devre dışı bırakıp yeniden kur (sessiz kapı mesajı üretmeden)
+            cip.seviye_ayarla(bolge.pin, 0)
+            time.sleep(0.05 + (sistem.POLLING_ARALIGI if mod == "polling" else 0))
+            sistem.bolge_devre_disi_birak(bolge, kaynak="benchmark")
+            sistem.bolge_kur(bolge, kaynak="benchmark")
+            time.sleep(aralik)
+
+            if parazit:
+                yayin_sirasi = broker.kayit_sayisi()
+                parazit_enjekte_et(cip, bolge.pin, parazit)
+                time.sleep(0.1)
+                if broker.bekle(lambda y: y["payload"] == f"ALARM{bolge.no}_CALIYOR".encode(), 0, yayin_sirasi):
+                    yanlis_alarm += 1
+                    sistem.bolge_devre_disi_birak(bolge, kaynak="benchmark")
+                    sistem.bolge_kur(bolge, kaynak="benchmark")
+                    time.sleep(aralik)
+    finally:
+        stop_event.set()
+        for thread in threadler:
+            thread.join()
+        sistemi_kapat(sistem, telegram, frigate, broker, gecici)
+
+    sonuclar["filtre"] = list(sistem.sensor_istatistik["filtre_gecikme_ms"])
+    ozetler = [sistem.bildirim_dagitici.ozet(), sistem.goruntu_onbellegi.ozet(), sistem.role_denetleyici.ozet(),
+               f"Filtre karar süresi üst sınırı: {sistem.filtre_karar_siniri() * 1000:.0f} ms | "
+               f"Bastırılan parazit: {sistem.sensor_istatistik['bastirilan']}"]
+    return {
+        "mod": sistem.aktif_sensor_modu,
+        "olay": olay_sayisi,
+        "ag_gecikmesi_ms": ag_gecikmesi_ms,
+        "zaman_asimi": zaman_asimi,
+        "parazit": parazit * olay_sayisi,
+        "yanlis_alarm": yanlis_alarm,
+        "gpio_okuma": cip.okuma_sayisi,
+        "olcumler": {ad: sorted(degerler) for ad, degerler in sonuclar.items()},
+        "ozetler": ozetler,
+    }
+
+
+def bos_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def sahte_webhook_istekleri(url):
+    """Webhook'a gizli anahtarsız ve yanlış anahtarlı birer güncelleme gönderir; reddedilmeyen istek sayısını döndürür."""
+    kabul_edilen = 0
+    for basliklar in ({}, {"X-Telegram-Bot-Api-Secret-Token": "yanlis-anahtar"}):
+        govde = json.dumps({"update_id": 999999, "message": {
+            "message_id": 1, "date": int(time.time()), "chat": {"id": 1, "type": "private"},
+            "from": {"id": 666, "is_bot": False, "first_name": "Sahte"}, "text": "/deaktifet1",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 11}]}}).encode("utf-8")
+        istek = Request(url, data=govde, method="POST", headers={"Content-Type": "application/json", **basliklar})
+        try:
+            with urlopen(istek, timeout=5):
+                kabul_edilen += 1
+        except HTTPError as e:
+            if e.code != 403:
+                kabul_edilen += 1
+    return kabul_edilen
+
+
+def komutlari_gonder(sistem, telegram, broker, komut_sayisi, aralik, mesgul_ms):
+    """Bölgeleri sırayla devre dışı bırakıp kuran komutlar gönderir ve {ölçüm: [ms, ...]} döndürür."""
+    sonuclar = {ad: [] for ad, _ in KOMUT_OLCUMLERI}
+    zaman_asimi = 0
+    for i in range(komut_sayisi):
+        bolge = sistem.bolgeler[i % len(sistem.bolgeler)]
+        if bolge.kurulu:
+            komut, durum, yanit = f"/deaktifet{bolge.no}", "DEVRE_DISI", "devre dışı bırakıldı"
+        else:
+            komut, durum, yanit = f"/aktifet{bolge.no}", "KURULU", "kuruldu"
+        if mesgul_ms:
+            telegram.guncelleme_ekle("/mesgul")  # Önde bekleyen yavaş bir komut
+        topic = sistem.mqtt_topic(bolge, "durum")
+        mqtt_sirasi, telegram_sirasi = broker.kayit_sayisi(), telegram.kayit_sayisi()
+
+        gonderim = time.monotonic_ns()
+        telegram.guncelleme_ekle(komut)
+        yayin = broker.bekle(lambda y: y["topic"] == topic and y["payload"] == durum.encode(), 10, mqtt_sirasi)
+        mesaj = telegram.bekle(lambda m: m["metot"] == "sendMessage" and yanit in m["metin"], 10, telegram_sirasi)
+        for ad, kayit in (("durum", yayin), ("yanit", mesaj)):
+            if kayit:
+                sonuclar[ad].append((kayit["zaman_ns"] - gonderim) / 1e6)
+            else:
+                zaman_asimi += 1
+        # Gönderim anı uzun sorgu turunun farklı noktalarına denk gelsin
+        time.sleep(aralik * random.uniform(0.5, 1.0) + mesgul_ms / 1000)
+    return sonuclar, zaman_asimi
+
+
+async def komutlari_olc(sistem, telegram, broker, alma_modu, komut_sayisi, aralik, mesgul_ms):
+    """Botu istenen alma modunda başlatır, komutları ölçer ve botu durdurur."""
+    from telegram.ext import CommandHandler
+
+    application = sistem.application_olustur()
+    if mesgul_ms:
+        async def mesgul_command(update, context):
+            await asyncio.sleep(mesgul_ms / 1000)
+        application.add_handler(CommandHandler("mesgul", mesgul_command))
+
+    await application.initialize()
+    reddedilmeyen = 0
+    if alma_modu == "webhook":
+        port = bos_port()
+        url = f"http://127.0.0.1:{port}/{WEBHOOK_YOLU}"
+        await application.updater.start_webhook(listen="127.0.0.1", port=port, url_path=WEBHOOK_YOLU,
+                                                webhook_url=url, secret_token=sistem.webhook_gizli_anahtari())
+    else:
+        await application.updater.start_polling(timeout=10)
+    await application.start()
+    try:
+        if alma_modu == "webhook":
+            reddedilmeyen = await asyncio.to_thread(sahte_webhook_istekleri, url)
+        sonuclar, zaman_asimi = await asyncio.to_thread(
+            komutlari_gonder, sistem, telegram, broker, komut_sayisi, aralik, mesgul_ms)
+    finally:
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+    return sonuclar, zaman_asimi, reddedilmeyen
+
+
+def komut_senaryosunu_calistir(alma_modu, komut_sayisi, aralik, ag_gecikmesi_ms, mesgul_ms=0, hizli=True):
+    """Tek bir Telegram alma modunda komut gecikmelerini ölçer."""
+    import main as sistem
+
+    sistem.TELEGRAM_HIZLI_KOMUTLAR = hizli
+    sistem.SENSOR_MODU = "polling"  # Sensör döngüsü çalıştırılmaz; kesme geri çağrısı kurmaya gerek yok
+    cip, telegram, frigate, broker, gecici = sistemi_taklitlerle_baslat(sistem, ag_gecikmesi_ms / 1000)
+    try:
+        for bolge in sistem.bolgeler:
+            sistem.bolge_kur(bolge, kaynak="benchmark")
+        sonuclar, zaman_asimi, reddedilmeyen = asyncio.run(
+            komutlari_olc(sistem, telegram, broker, alma_modu, komut_sayisi, aralik, mesgul_ms))
+    finally:
+        sistemi_kapat(sistem, telegram, frigate, broker, gecici)
+
+    ozetler = [f"Bot API istekleri: " + ", ".join(f"{k}={v}" for k, v in sorted(telegram.istek_sayisi.items()))]
+    if alma_modu == "webhook":
+        ozetler.append(f"Gizli anahtar denetimi: {2 - reddedilmeyen}/2 sahte istek reddedildi.")
+    return {
+        "mod": f"telegram-{alma_modu}",
+        "olay": komut_sayisi,
+        "ag_gecikmesi_ms": ag_gecikmesi_ms,
+        "mesgul_ms": mesgul_ms,
+        "hizli_komutlar": hizli,
+        "zaman_asimi": zaman_asimi,
+        "yanlis_alarm": 0,
+        "sahte_kabul": reddedilmeyen,
+        "olcumler": {ad: sorted(degerler) for ad, degerler in sonuclar.items()},
+        "ozetler": ozetler,
+    }
+
+
+def raporu_yazdir(sonuc):
+    if "gpio_okuma" in sonuc:
+        olcumler = OLCUMLER
+        print(f"\nSensör modu: {sonuc['mod']} | Olay: {sonuc['olay']} | Ağ gecikmesi: {sonuc['ag_gecikmesi_ms']} ms | "
+              f"Zaman aşımı: {sonuc['zaman_asimi']} | GPIO okuma: {sonuc['gpio_okuma']}")
+        if sonuc["parazit"]:
+            print(f"Enjekte edilen parazit: {sonuc['parazit']} | Yanlış alarm: {sonuc['yanlis_alarm']}")
+    else:
+        olcumler = KOMUT_OLCUMLERI
+        print(f"\nTelegram alma modu: {sonuc['mod']} | Komut: {sonuc['olay']} | Ağ gecikmesi: {sonuc['ag_gecikmesi_ms']} ms | "
+              f"Önde yavaş komut: {sonuc['mesgul_ms']} ms | Hızlı komutlar: {'açık' if sonuc['hizli_komutlar'] else 'kapalı'} | "
+              f"Zaman aşımı: {sonuc['zaman_asimi']}")
+    print(f"{'Ölçüm (ms)':<20}" + "".join(f"{'p' + str(p):>10}" for p in YUZDELIKLER) + f"{'maks':>10}")
+    for ad, baslik in olcumler:
+        degerler = sonuc["olcumler"][ad]
+        hucreler = [yuzdelik(degerler, p) for p in YUZDELIKLER] + [degerler[-1] if degerler else None]
+        print(f"{baslik:<20}" + "".join(f"{h:>10.2f}" if h is not None else f"{'-':>10}" for h in hucreler))
+    for ozet in sonuc["ozetler"]:
+        print(ozet)
+
+
+def esikleri_denetle(sonuclar, esikler):
+    """Her moddaki p95 değerlerini eşiklerle karşılaştırır; aşılan eşik varsa False döndürür."""
+    basarili = True
+    for sonuc in sonuclar:
+        if sonuc["zaman_asimi"]:
+            print(f"HATA: {sonuc['mod']} modunda {sonuc['zaman_asimi']} ölçüm zaman aşımına uğradı.")
+            basarili = False
+        if sonuc["yanlis_alarm"]:
+            print(f"HATA: {sonuc['mod']} modunda {sonuc['yanlis_alarm']} parazit alarmı tetikledi.")
+            basarili = False
+        if sonuc.get("sahte_kabul"):
+            print(f"HATA: {sonuc['mod']} modunda gizli anahtarı tutmayan {sonuc['sahte_kabul']} istek kabul edildi.")
+            basarili = False
+        for ad, esik in esikler.items():
+            p95 = yuzdelik(sonuc["olcumler"].get(ad, []), 95)
+            if p95 is not None and p95 > esik:
+                print(f"HATA: {sonuc['mod']} modunda {ad} p95 = {p95:.2f} ms, eşik {esik} ms.")
+                basarili = False
+    return basarili
+
+
+def main():
+    ayrist = argparse.ArgumentParser(description="Donanımsız uçtan uca alarm gecikmesi ölçümü.")
+    ayrist.add_argument("--mod", choices=("kesme", "polling", "hepsi"), default="hepsi")
+    ayrist.add_argument("--telegram-modu", choices=("polling", "webhook", "hepsi"),
+                        help="Kapı yerine Telegram komut gecikmesini bu alma modunda ölç")
+    ayrist.add_argument("--olay", type=int, default=20, help="Ölçülecek kapı açılışı ya da komut sayısı")
+    ayrist.add_argument("--aralik", type=float, default=1.2,
+                        help="Olaylar arası bekleme (sn); Telegram sohbet hız sınırına takılmamak için ~1 sn üstü")
+    ayrist.add_argument("--ag-gecikmesi-ms", type=float, default=0.0,
+                        help="Telegram ve Frigate taklitlerinin her yanıta eklediği gecikme")
+    ayrist.add_argument("--mesgul-ms", type=float, default=0.0,
+                        help="Her komuttan hemen önce bu kadar süren yavaş bir komut gönder (--telegram-modu ile)")
+    ayrist.add_argument("--hizli-komutlar-kapali", action="store_true",
+                        help="TELEGRAM_HIZLI_KOMUTLAR = False ile ölç (karşılaştırma için)")
+    ayrist.add_argument("--esik", action="append", default=[], metavar="OLCUM=MS",
+                        help="p95 eşiği (role, mqtt, telegram, filtre, durum, yanit); aşılırsa çıkış kodu 1")
+    ayrist.add_argument("--parazit", type=int, default=0,
+                        help=f"Her olaydan sonra kapalı kapıya gönderilecek {PARAZIT_SURESI * 1000:.0f} ms'lik sıçrama sayısı")
+    ayrist.add_argument("--json", metavar="DOSYA", help="Sonuçları JSON olarak yaz ('-' = standart çıktı)")
+    ayrist.add_argument("--ayrintili", action="store_true", help="main.py çıktılarını gizleme")
+    args = ayrist.parse_args()
+
+    esikler = {}
+    for esik in args.esik:
+        ad, _, deger = esik.partition("=")
+        if ad not in dict(OLCUMLER + KOMUT_OLCUMLERI):
+            ayrist.error(f"bilinmeyen ölçüm: {ad}")
+        esikler[ad] = float(deger)
+
+    hepsi = args.telegram_modu == "hepsi" if args.telegram_modu else args.mod == "hepsi"
+    if hepsi:
+        # main.py modül düzeyinde durum tuttuğu için her mod ayrı bir süreçte ölçülür
+        sonuclar = []
+        for mod in ("kesme", "polling") if not args.telegram_modu else ("polling", "webhook"):
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+                yol = f.name
+            komut = [sys.executable, os.path.abspath(__file__), "--olay", str(args.olay),
+                     "--aralik", str(args.aralik), "--ag-gecikmesi-ms", str(args.ag_gecikmesi_ms), "--json", yol]
+            if args.telegram_modu:
+                komut += ["--telegram-modu", mod, "--mesgul-ms", str(args.mesgul_ms)]
+                if args.hizli_komutlar_kapali:
+                    komut.append("--hizli-komutlar-kapali")
+            else:
+                komut += ["--mod", mod, "--parazit", str(args.parazit)]
+            if args.ayrintili:
+                komut.append("--ayrintili")
+            subprocess.run(komut, check=True)
+            with open(yol) as f:
+                sonuclar.append(json.load(f))
+            os.remove(yol)
+    else:
+        cikti = contextlib.nullcontext() if args.ayrintili else contextlib.redirect_stdout(io.StringIO())
+        with cikti:
+            if args.telegram_modu:
+                sonuclar = [komut_senaryosunu_calistir(args.telegram_modu, args.olay, args.aralik, args.ag_gecikmesi_ms,
+                                                       args.mesgul_ms, not args.hizli_komutlar_kapali)]
+            else:
+                sonuclar = [senaryoyu_calistir(args.mod, args.olay, args.aralik, args.ag_gecikmesi_ms, args.parazit)]
+        for sonuc in sonuclar:
+            raporu_yazdir(sonuc)
+
+    if args.json == "-":
+        json.dump(sonuclar if hepsi else sonuclar[0], sys.stdout, ensure_ascii=False, indent=2)
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(sonuclar if hepsi else sonuclar[0], f, ensure_ascii=False)
+
+    if not esikleri_denetle(sonuclar, esikler):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
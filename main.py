@@ -3,581 +3,4659 @@
 #
 # ÖZELLİKLER:
 # - Raspberry Pi 5 ve lgpio kütüphanesi ile tam uyumlu.
-# - Telegram komutları ile sistemi AÇMA/KAPATMA (/aktifet1, /deaktifet1, /aktifet2, /deaktifet2).
+# - Bölge (zone) tablosu ile istenen sayıda kapı; her kapı için tek bir ortak değerlendirme döngüsü.
+# - Telegram komutları ile bölgeleri AÇMA/KAPATMA (/aktifet1, /deaktifet1, /aktifet2, /deaktifet2 ...).
 # - Alarm anında Frigate'den anlık görüntü alıp Telegram'a YÜKLEME.
-# - Sürekli okuma (Polling) ile daha sağlam sensör takibi.
+# - Kenar tetiklemeli (lgpio alert/callback) sensör takibi, yedek olarak sürekli okuma (Polling).
 # - Healthchecks.io entegrasyonu ile sistemin çökmesini takip etme (Heartbeat).
 # - Sistemin normal mi yoksa çökme sonrası mı başladığını anlayan bildirim.
-# - Tüm işlemlerin ana programı bloklamaması için Threading.
+# - Durum değişiklikleri, kapı hareketleri ve alarmlar için ekleme-yalnız olay günlüğü.
+# - Tüm işlemlerin ana programı bloklamaması için Threading ya da tek bir asyncio olay döngüsü (CALISMA_MODU).
+# - Frigate görüntüleri kurulu bölgeler için arka planda önbellekte sıcak tutulur.
+# - Bildirimler sınırlı kuyruklu, sabit işçili ve keep-alive bağlantılı bir dağıtıcı ile gönderilir.
+# - Kritik alarmlar öncelikli gönderilir; Telegram hız sınırlarına (429 retry_after) uyulur,
+#   "ALARM DEVAM EDİYOR" güncellemeleri tek mesajda yerinde düzenlenir.
+# - Donanımsız çalışma için simüle GPIO arka ucu (simulasyon.py) ve uçtan uca gecikme ölçümü (benchmark.py).
+# - Prometheus uyumlu /metrics uç noktası (sensör döngüsü, GPIO, Telegram, Frigate gecikme histogramları).
+# - Uzun kablolardaki parazitlere karşı pin başına N-of-M çoğunluk / en kısa kararlı süre filtresi.
+# - MQTT üzerinden bölge kurma/devre dışı bırakma komutları, bölge başına retained durum ve kapı topic'leri,
+#   bağlantı yokken yapılan yayınlar için sınırlı çevrimdışı kuyruk.
+# - Otomatik kurulum için yığın (heap) tabanlı kesin son tarihli zamanlayıcı; kapı açılınca iptal edilir,
+#   bölge ve gün bazında cron benzeri takvim (sabit 18:30 yerine).
+# - Alarm rölesi kendi yüksek öncelikli thread'inde sürülür: bölge istekleri VEYA'lanır, siren desenleri,
+#   en uzun çalma süresi ve ayrı ölçülen röle son tarihi.
+# - Uzun sorgu yerine isteğe bağlı Telegram webhook modu (gizli anahtar denetimli, ters vekil arkasında);
+#   kurma/devre dışı bırakma komutları diğer komutları beklemeden işlenir.
+# - Doğrulanan harici ayar dosyası (inotify ile izlenir); değişiklikler yeniden başlatmadan, GPIO hatları ve
+#   kurulu durum korunarak bölge, bildirim ve zamanlayıcı nesnelerine uygulanır.
+# - Çok depolu federasyon: DUGUM_ID ile topic'ler düğüm kimliğiyle yayınlanır; aggregator.py tüm düğümleri tek
+#   MQTT aboneliğiyle izler, bildirimleri tek bottan gönderir ve site genelinde komutları önbellekten yanıtlar.
+# - Hızlı açılış: önce GPIO ve alarm denetimi başlar; ağ istemcileri (MQTT, Telegram, heartbeat) ardından paralel
+#   ve ağır kütüphaneler ilk kullanımda yüklenir. Açılış adımlarının süre dökümü günlüğe ve /metrics'e yazılır.
+# - Bölge başına dizi tabanlı kapı açık kalma zaman serisi; saatlik/günlük özetlerden yanıt veren /rapor komutu.
+# - Birden fazla Telegram alıcısı (öncelik süzgeçli); fotoğraf bir kez yüklenir, diğerlerine file_id ile eşzamanlı gider.
+# - Kesintide gönderilemeyen bildirimler fotoğraflarıyla diskteki sınırlı giden kutusunda saklanır; bağlantı dönünce
+#   sırayla, üstel beklemeyle ve tekrarlar birleştirilerek gönderilir.
+# - Alarmda Frigate olay klibi Frigate'ten Telegram'a belleğe alınmadan akışla yüklenir (boyut/süre sınırlı,
+#   olmazsa olayın küçük resmi).
+# - Kurulu bölgelerin kameralarından son kareler halka tamponda tutulur; alarmda öncesi/sonrası kareler
+#   tek medya grubu olarak gönderilir.
+# - Bekçi: sensör, zamanlayıcı, MQTT ve bildirim işçileri ilerlemelerini bildirir; biri takılırsa heartbeat
+#   yerine sebebiyle /fail gönderilir, systemd watchdog (sd_notify) beslenmez.
 # =================================================================
 
-import lgpio
-import paho.mqtt.client as mqtt
+from __future__ import annotations
+
+try:
+    import lgpio
+except ImportError:  # Raspberry Pi dışında; GPIO_ARKAUCU = "simulasyon" ile çalıştırılabilir
+    lgpio = None
 import time
-import requests
 import threading
-from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes
+import queue
+import heapq
+from collections import deque, OrderedDict
 import os
+import json
+import struct
+import zlib
+import asyncio
+import array
+import bisect
+import concurrent.futures
+import contextlib
+import importlib
+import io
+import sys
+import math
+import socket
+import re
+import secrets
+import ctypes
+import select
+import signal
+try:
+    import tomllib
+except ImportError:  # Python 3.11 öncesi; ayar dosyası .json olarak verilebilir
+    tomllib = None
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# --- AÇILIŞ SÜRESİ VE GECİKMELİ İÇE AKTARMA ---
+def surec_yasi():
+    """Sürecin başlamasından bu yana geçen süre (sn) ve o an sistemin açılışından geçen süre; /proc yoksa (None, None)."""
+    try:
+        with open("/proc/self/stat") as f:
+            alanlar = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        baslangic = int(alanlar[19]) / os.sysconf("SC_CLK_TCK")  # 22. alan: starttime (açılıştan itibaren tık)
+        return uptime - baslangic, baslangic
+    except (OSError, ValueError, IndexError):
+        return None, None
+
+class AcilisOlcumu:
+    """Açılış adımlarının süre dökümü.
+
+    Sıfır noktası sürecin başlangıcıdır (/proc okunamazsa main.py'nin yüklenmesi); böylece yorumlayıcının
+    açılması ve içe aktarmalar da ölçüme girer. `adim` bir işin süresini, `isaretle` bir aşamaya (koruma,
+    mqtt, telegram) ulaşılan anı kaydeder; ikisi de farklı thread'lerden çağrılabilir.
+    """
+
+    def __init__(self):
+        yas, self.sistem_acilisi = surec_yasi()
+        self.sifir = time.monotonic() - (yas or 0.0)
+        self._kilit = threading.Lock()
+        self.adimlar = {}     # ad -> süre (sn)
+        self.isaretler = {}   # ad -> sıfır noktasından geçen süre (sn)
+
+    @contextlib.contextmanager
+    def adim(self, ad):
+        baslangic = time.monotonic()
+        try:
+            yield
+        finally:
+            sure = time.monotonic() - baslangic
+            with self._kilit:
+                self.adimlar[ad] = sure
+            print(f"⏱ Açılış adımı {ad}: {sure * 1000:.1f} ms (t={(time.monotonic() - self.sifir) * 1000:.0f} ms)")
+
+    def isaretle(self, ad):
+        """Aşamaya ilk ulaşıldığı anı kaydeder; sonraki çağrılar (örn. MQTT yeniden bağlantısı) yok sayılır."""
+        with self._kilit:
+            if ad in self.isaretler:
+                return
+            self.isaretler[ad] = gecen = time.monotonic() - self.sifir
+        ek = f", sistem açılışından {self.sistem_acilisi + gecen:.1f} s" if self.sistem_acilisi is not None else ""
+        print(f"⏱ Açılış aşaması {ad}: süreç başlangıcından {gecen * 1000:.0f} ms{ek}")
+
+    def ozet(self):
+        with self._kilit:
+            adimlar = ", ".join(f"{ad}={sure * 1000:.0f}" for ad, sure in self.adimlar.items())
+            isaretler = ", ".join(f"{ad}={gecen * 1000:.0f}" for ad, gecen in self.isaretler.items())
+        return f"Açılış (ms) | Adımlar: {adimlar or '-'} | Aşamalar: {isaretler or '-'}"
+
+acilis_olcumu = AcilisOlcumu()
+
+class GecikmeliModul:
+    """İlk özniteliğine erişildiğinde içe aktarılan modül.
+
+    telegram (~0.35 s), requests, httpx ve paho açılışta yüklenmez; GPIO ve alarm denetimi onları beklemeden
+    başlar, ilk kullanan thread (MQTT, bildirim işçisi, bot) yükler. `except requests.RequestException` gibi
+    kullanımlar da olduğu gibi çalışır.
+    """
+
+    def __init__(self, ad):
+        self._ad = ad
+        self._modul = None
+        self._kilit = threading.Lock()
+
+    def yukle(self):
+        if self._modul is None:
+            with self._kilit:
+                if self._modul is None and self._ad in sys.modules:
+                    self._modul = sys.modules[self._ad]  # Başka bir modülün içe aktarmasıyla zaten yüklendi
+                elif self._modul is None:
+                    with acilis_olcumu.adim(f"import:{self._ad}"):
+                        self._modul = importlib.import_module(self._ad)
+        return self._modul
+
+    def __getattr__(self, ad):
+        return getattr(self.yukle(), ad)
+
+mqtt = GecikmeliModul("paho.mqtt.client")
+requests = GecikmeliModul("requests")
+httpx = GecikmeliModul("httpx")
+telegram = GecikmeliModul("telegram")
+telegram_ext = GecikmeliModul("telegram.ext")
 
 # --- AYARLAR: LÜTFEN BU BÖLÜMÜ KENDİ BİLGİLERİNİZLE DOLDURUN ---
 
-# GPIO Pin Numaraları (BCM Modunda)
-KAPI1_SENSOR_PIN = 23  # Mazot Tankı 1
-KAPI2_SENSOR_PIN = 17  # Mazot Tankı 2
+# GPIO Pin Numaraları (BCM Modunda) - Kapı sensör pinleri aşağıdaki BOLGE_TABLOSU'ndadır.
 ALARM_ROLE_PIN = 24
 GPIO_CHIP = 0  # Raspberry Pi 5 için bu değeri değiştirmeyin.
 
+# GPIO ARKA UCU
+# "lgpio"     : Raspberry Pi'nin gerçek GPIO çipi.
+# "simulasyon": Donanım olmadan çalışan simüle çip (simulasyon.py). Kapı hareketleri GPIO_SIMULASYON_IZI
+#               dosyasından oynatılır; Telegram/Frigate/MQTT adresleri yerel taklitlere yönlendirilebilir.
+GPIO_ARKAUCU = "lgpio"
+GPIO_SIMULASYON_IZI = None  # Örn: "ornek_kapi_izi.txt" (satır başına '<saniye> <pin> <seviye>')
+
+# ÇALIŞMA MODU
+# "thread" : Sensör, heartbeat, otomatik kurulum, görüntü önbelleği ve MQTT ayrı thread'lerde çalışır.
+# "asyncio": Bunların hepsi Telegram botunun olay döngüsünde görev (task) olarak çalışır; daha az thread.
+CALISMA_MODU = "thread"
+
+# SENSÖR OKUMA MODU
+# "kesme"  : lgpio alert/callback ile sadece gerçek kapı hareketlerinde uyanır (çekirdek zaman damgalı).
+# "polling": Pinleri POLLING_ARALIGI saniyede bir okur (eski yöntem).
+# Kesme modu kurulamazsa sistem otomatik olarak polling moduna geçer.
+SENSOR_MODU = "kesme"
+POLLING_ARALIGI = 0.1
+KESME_KONTROL_ARALIGI = 1.0  # Kapı hareketi olmasa da zaman tabanlı kontroller (alarm tekrarı) için uyanma aralığı
+
+# KAPI SENSÖRÜ PARAZİT FİLTRESİ
+# Pinler FILTRE_ORNEKLEME_ARALIGI ile örneklenir (kesme modunda sadece kenardan sonra, karar verilene kadar).
+# Yeni seviye son FILTRE_PENCERE örneğin en az FILTRE_ESIK tanesinde görülür ve en az FILTRE_MIN_KARARLI_SURE
+# boyunca sürerse kapı durumu değişir; daha kısa sıçramalar parazit sayılıp bastırılır.
+# Karar süresinin üst sınırı açılışta yazdırılır ve POLLING_ARALIGI'ndan (100 ms) kısa olmalıdır.
+FILTRE_AKTIF = True
+FILTRE_ORNEKLEME_ARALIGI = 0.01   # 100 Hz
+FILTRE_PENCERE = 5                # M
+FILTRE_ESIK = 4                   # N
+FILTRE_MIN_KARARLI_SURE = 0.03    # sn
+
 # MQTT Broker Ayarları
 MQTT_BROKER_IP = "localhost"
 MQTT_PORT = 1883
-MQTT_DURUM_TOPIC = "guvenlik/sistem/durum"
+MQTT_DURUM_TOPIC = "guvenlik/sistem/durum"  # Eski tek topic (KURULU1, ALARM1_CALIYOR ...), uyumluluk için korunur
+MQTT_KULLANICI = None  # Broker kimlik doğrulaması istiyorsa kullanıcı adı ve şifre
+MQTT_SIFRE = None
+# Bölge başına topic'ler: <önek>/bolge/<no>/durum (KURULU / DEVRE_DISI / ALARM, retained),
+# <önek>/bolge/<no>/kapi (ACIK / KAPALI, retained), <önek>/bolge/<no>/komut (KUR / DEVRE_DISI, abone olunur).
+# <önek>/sistem/baglanti topic'i CEVRIMICI / CEVRIMDISI (son arzu mesajı) yayınlar.
+MQTT_KONU_ONEKI = "guvenlik"
+MQTT_KOMUTLARI_AKTIF = True    # False ise komut topic'lerine abone olunmaz
+MQTT_DURUM_QOS = 1
+MQTT_KAPI_QOS = 0
+MQTT_KOMUT_QOS = 1
+MQTT_CEVRIMDISI_KUYRUK = 100   # Bağlantı yokken bekletilen en fazla yayın (retained topic başına sadece en sonuncusu tutulur)
+
+# FEDERASYON (birden fazla depo, tek Telegram botu)
+# Kontrolcüler ortak bir broker'ı paylaşıyorsa her birine benzersiz bir düğüm kimliği verin. Topic'ler
+# <önek>/<düğüm>/bolge/<no>/... ve <önek>/<düğüm>/sistem/baglanti olur; bölge adları <önek>/<düğüm>/bolge/<no>/bilgi
+# (retained) ile, tüm bildirimler <önek>/<düğüm>/olay topic'ine de yayınlanır. aggregator.py bunları tek botta toplar;
+# kontrolcüde TELEGRAM_BOT_TOKEN = None (ya da "") bırakılırsa kendi botu hiç çalışmaz.
+DUGUM_ID = None  # Örn: "depo1" (harf, rakam, '-', '_'); None ise tek kontrolcü düzeni
+
+# BÖLGE (ZONE) TABLOSU
+# Her satır bir kapıyı tanımlar; yeni kapı eklemek için listeye satır eklemek yeterlidir.
+#   no                      : Telegram komut numarası (/aktifet<no>, /deaktifet<no>) ve MQTT mesaj eki
+#   pin                     : Kapı sensörünün bağlı olduğu GPIO (BCM)
+#   kamera                  : Frigate kamera adı
+#   mqtt_topic              : Bölgenin durumunun yayınlanacağı MQTT topic'i
+#   otomatik_kurulum_suresi : Kapı bu kadar saniye kapalı kalırsa alarm otomatik kurulur
+#   siren_deseni            : (İsteğe bağlı) SIREN_DESENLERI'nden biri; verilmezse SIREN_VARSAYILAN_DESEN
+#   takvim                  : (İsteğe bağlı) Bölgeye özel otomatik kurulum takvimi; verilmezse OTOMATIK_KURULUM_TAKVIMI
+BOLGE_TABLOSU = [
+    {"no": 1, "ad": "Mazot Tankı 1", "pin": 23, "kamera": "tapo", "mqtt_topic": MQTT_DURUM_TOPIC, "otomatik_kurulum_suresi": 3600},
+    {"no": 2, "ad": "Mazot Tankı 2", "pin": 17, "kamera": "tapo2", "mqtt_topic": MQTT_DURUM_TOPIC, "otomatik_kurulum_suresi": 3600},
+]
+OTOMATIK_KURULUM_UYARI_SURESI = 300  # Otomatik kurulumdan kaç saniye önce uyarı gönderileceği
+OTOMATIK_KURULUM_GECIKMESI = 300     # Takvim saatinde otomatik kurulum açıldıktan kaç saniye sonra kapalı kapıların kurulacağı
+# OTOMATİK KURULUM TAKVİMİ (cron benzeri)
+# /otomatikalarmkapat ile askıya alınan otomatik kurulum, her bölge için takvimdeki bir sonraki saatte tekrar açılır.
+# Satır biçimi: "<günler> <SS:DD>"; günler "*" (her gün), "pzt-cum", "cmt,paz" ya da tek gün
+# (pzt, sal, car, per, cum, cmt, paz). Örn: ["pzt-cum 18:30", "cmt,paz 13:00"]
+OTOMATIK_KURULUM_TAKVIMI = ["* 18:30"]
+ZAMANLAYICI_SAAT_KONTROLU = 60       # Duvar saati kayması (NTP, elle ayar) bu aralıkla denetlenir, takvim işleri düzeltilir (sn)
+ALARM_TEKRAR_SURESI = 10             # Alarm devam ederken tekrar bildirimi aralığı (saniye)
+GPIO_GRUP_BOYUTU = 64                # Tek grup okumasında okunabilecek en fazla pin sayısı
+
+# KAPI AKTİVİTE RAPORU (/rapor)
+# Her bölgenin kapı açık kalma aralıkları sabit boyutlu dizilerde tutulur ve saatlik/günlük özetlere işlenir;
+# bellek bölge başına sabittir, /rapor ham olayları taramadan özetlerden yanıtlanır.
+KAPI_SERISI_HAM_KAPASITE = 256  # Bölge başına saklanan en son açık kalma aralığı sayısı
+KAPI_SERISI_SAAT = 48           # Saatlik özetlerin tutulduğu saat sayısı
+KAPI_SERISI_GUN = 35            # Günlük özetlerin tutulduğu gün sayısı
+GECE_BASLANGIC_SAATI = 22       # Bu saatle GECE_BITIS_SAATI arasında başlayan açılışlar "gece" sayılır
+GECE_BITIS_SAATI = 6
 
 # TELEGRAM AYARLARI
 TELEGRAM_BOT_TOKEN = "YOUR_TELEGRAM_BOT_TOKEN" # BotFather'dan alınan token
 TELEGRAM_CHAT_ID = "YOUR_TELEGRAM_CHAT_ID"     # Bildirimlerin gönderileceği sohbet ID'si
+TELEGRAM_API_URL = "https://api.telegram.org"  # Test için yerel bir Bot API taklidi adresi verilebilir
+TELEGRAM_SOHBET_HIZI = 1.0       # Sohbet başına saniyede en fazla mesaj (Telegram sınırı ~1/sn)
+TELEGRAM_SOHBET_KAPASITESI = 3   # Sohbet başına izin verilen kısa ani mesaj sayısı
+TELEGRAM_GENEL_HIZ = 30          # Tüm sohbetler için saniyede en fazla istek (Telegram sınırı ~30/sn)
+# Ek alıcılar (bekçiler, yöneticiler). TELEGRAM_CHAT_ID her bildirimi alır; listedekiler "en_dusuk" önceliğe kadar:
+# "kritik" sadece alarmlar, "bilgi" alarmlar ve durum mesajları (varsayılan), "sessiz" kapı hareketi fotoğrafları dahil.
+# Fotoğraf ilk alıcıya bir kez yüklenir, diğerlerine Telegram'ın döndürdüğü file_id ile (yeniden yüklemeden) gönderilir.
+# Örn: [{"chat_id": "111111", "en_dusuk": "kritik"}, {"chat_id": "222222", "en_dusuk": "sessiz"}]
+TELEGRAM_ALICILAR = []
+TELEGRAM_PARALEL_GONDERIM = 4    # Bir bildirimin alıcılarına aynı anda gönderilen en fazla istek (hız sınırları ayrıca uygulanır)
+
+# TELEGRAM KOMUT ALMA MODU
+# "polling": Bot, getUpdates ile Telegram'a sürekli açık uzun sorgu yapar (eski yöntem).
+# "webhook": Telegram komutları yerel bir HTTP dinleyicisine POST eder. Dinleyici bir ters vekilin (nginx, Caddy ...)
+#            arkasında durmalıdır: vekil TELEGRAM_WEBHOOK_URL'ye gelen HTTPS isteklerini
+#            http://TELEGRAM_WEBHOOK_ADRESI:TELEGRAM_WEBHOOK_PORTU/TELEGRAM_WEBHOOK_YOLU adresine iletir.
+#            X-Telegram-Bot-Api-Secret-Token başlığı tutmayan istekler 403 ile reddedilir.
+TELEGRAM_ALMA_MODU = "polling"
+TELEGRAM_WEBHOOK_URL = "YOUR_WEBHOOK_URL"     # Telegram'ın erişeceği genel adres, örn: "https://alan.adi/guvenlik-bot"
+TELEGRAM_WEBHOOK_ADRESI = "127.0.0.1"         # Ters vekil aynı makinedeyse dışarıya açmayın
+TELEGRAM_WEBHOOK_PORTU = 8443
+TELEGRAM_WEBHOOK_YOLU = "guvenlik-bot"
+TELEGRAM_WEBHOOK_GIZLI_ANAHTAR = None         # 1-256 karakter [A-Za-z0-9_-]; None ise her açılışta rastgele üretilir
+TELEGRAM_HIZLI_KOMUTLAR = True   # /aktifetN ve /deaktifetN diğer komutların bitmesini beklemeden hemen işlenir
+
+# FRIGATE AYARLARI
+FRIGATE_IP = "YOUR_FRIGATE_IP" # Frigate sunucunuzun yerel IP adresi
+FRIGATE_PORT = 5000
+
+# FRIGATE GÖRÜNTÜ ÖNBELLEĞİ
+GORUNTU_YENILEME_ARALIGI = 1.0  # Bölge kurulu ya da kapı hareketliyken kamera görüntüsünün yenilenme aralığı (sn)
+GORUNTU_MAKS_YAS_MS = 1500      # Bildirimde kullanılacak görüntünün en fazla yaşı (ms); daha eskiyse yeniden indirilir
+GORUNTU_SAKLAMA_SURESI = 30     # Bu kadar saniyedir yenilenmeyen görüntü önbellekten silinir
+KAPI_HAREKET_SURESI = 60        # Kapı hareketinden sonra kaç saniye boyunca görüntü sıcak tutulur
+
+# ALARM KLİBİ (Frigate'in kaydettiği olay videosu alarm fotoğrafından sonra ayrıca gönderilir)
+ALARM_KLIBI_AKTIF = False                 # Frigate'te kayıt (record) açık olmalı
+ALARM_KLIBI_ON_SURE = 5                   # Uzun olaylarda kesilen pencerenin alarmdan kaç sn önce başlayacağı
+ALARM_KLIBI_MAKS_SURE = 30                # Gönderilen klibin en uzun süresi (sn)
+ALARM_KLIBI_MAKS_BOYUT = 20 * 1024 * 1024 # Bundan büyük klip yerine olayın küçük resmi gönderilir (Bot API sınırı 50 MB)
+ALARM_KLIBI_EN_GEC = 120                  # Olayın bitmesi/kaydın yazılması için en fazla beklenen süre (sn)
+ALARM_KLIBI_YOKLAMA_ARALIGI = 5           # Frigate olaylarının sorgulanma aralığı (sn)
+ALARM_KLIBI_PARCA_BOYUTU = 64 * 1024      # Klip Frigate'ten Telegram'a bu büyüklükte parçalarla aktarılır (bayt)
+
+# ALARM ÖNCESİ KARE TAMPONU (Bölge kuruluyken son kareler tutulur; alarmda öncesi/sonrası medya grubu olarak gider)
+KARE_TAMPONU_AKTIF = False  # Kurulu bölgelerin kameralarından sürekli kare çeker (Frigate'e ek yük)
+KARE_TAMPONU_ARALIGI = 0.4  # Kare çekme aralığı (sn)
+KARE_TAMPONU_BOYUTU = 12    # Kamera başına tutulan kare sayısı (ARALIK x BOYUT, KARE_ONCESI'nden uzun olmalı)
+KARE_ONCESI = 2.0           # Alarmdan kaç sn önceki kareler gönderilir
+KARE_SONRASI = 2.0          # Alarmdan kaç sn sonraki kareler gönderilir (grup bu kadar beklenip gönderilir)
+KARE_YUKSEKLIGI = 360       # Karelerin küçültüleceği yükseklik (piksel)
+KARE_JPEG_KALITESI = 70     # Pillow ile yeniden kodlamada JPEG kalitesi (1-95)
+KARE_ISCI_SAYISI = 2        # Kare indirme/küçültme işçi sayısı (sensör döngüsü bunları hiç beklemez)
+
+# BİLDİRİM DAĞITICI AYARLARI
+BILDIRIM_KUYRUK_BOYUTU = 100  # Bekleyen en fazla bildirim sayısı (dolunca en eskisi düşürülür)
+BILDIRIM_ISCI_SAYISI = 2      # Gönderim işçisi sayısı (birden fazlaysa ilki yalnızca kritik alarmlara ayrılır)
 
 # RÖLE ÇALIŞMA MANTIĞI (Ters çalışan röle için bu şekilde kalmalı)
 ROLE_ACIK = 0    # Röleyi AÇAN sinyal (0 = LOW)
 ROLE_KAPALI = 1  # Röleyi KAPATAN sinyal (1 = HIGH)
 
+# ALARM RÖLESİ (SİREN) DENETLEYİCİSİ
+# Röleye sadece kendi yüksek öncelikli thread'i yazar. Her bölge sadece sirenin çalmasını ister ya da isteğini geri
+# çeker; herhangi bir bölgenin deseni o an "açık" adımındaysa röle açıktır (bölgeler VEYA'lanır). Böylece bir
+# bölgeyi devre dışı bırakmak, alarmı süren diğer bölgenin sirenini susturmaz.
+# Desen: tekrar eden (röle açık mı, süre sn) adımları; None = sürekli açık.
+SIREN_DESENLERI = {
+    "surekli": None,
+    "kesikli": [(True, 1.0), (False, 0.5)],
+    "nabiz": [(True, 0.2), (False, 0.2), (True, 0.2), (False, 1.4)],
+}
+SIREN_VARSAYILAN_DESEN = "surekli"
+SIREN_MAKS_ACIK_SURE = 600   # Bir bölgenin sireni en fazla bu kadar sn çalar (alarm durumu sürer); None = sınırsız
+ROLE_THREAD_ONCELIGI = 50    # Röle thread'inin SCHED_FIFO önceliği (1-99, root gerekir); None = değiştirme
+ROLE_SON_TARIH_MS = 5        # İstekten ya da desen adımından röle yazmasına kadar izin verilen süre; aşımlar sayılır
+
+# METRİK SUNUCUSU (Prometheus metin biçimi: http://<adres>:<port>/metrics)
+METRIK_ADRESI = "127.0.0.1"  # Ağdaki bir Prometheus'un okuması için "0.0.0.0" yapılabilir
+METRIK_PORTU = 9108          # None ise metrik sunucusu başlatılmaz
+
 # HEARTBEAT AYARLARI (Sistem Çökme Takibi)
 # Healthchecks.io sitesinden aldığınız özel Ping URL'nizi yapıştırın.
 HEALTHCHECKS_PING_URL = "YOUR_HEALTHCHECKS_PING_URL" # Örn: "https://hc-ping.com/..."
 
+# BEKÇİ (İşçi canlılık takibi; heartbeat ve systemd watchdog sadece tüm işçiler ilerliyorsa "sağlıklı" der)
+BEKCI_KONTROL_ARALIGI = 5  # İşçilerin denetlenme aralığı (sn); systemd WatchdogSec'in yarısı daha kısaysa o kullanılır
+BEKCI_ESIKLERI = {         # İşçi bu kadar sn ilerlemezse takılmış sayılır (0 = izleme)
+    "sensor": 10,          # Sensör döngüsü (kesme modunda en geç KESME_KONTROL_ARALIGI'nda bir tur döner)
+    "zamanlayici": 150,    # Otomatik kurulum/takvim zamanlayıcısı (en geç ZAMANLAYICI_SAAT_KONTROLU'nda bir uyanır)
+    "mqtt": 150,           # MQTT ağ döngüsü (bağlıyken en geç keepalive süresinde paket alışverişi olur)
+    "bildirim": 180,       # Bildirim dağıtıcı (kuyrukta iş varken; boş kuyruk ve 429 beklemesi sayılmaz)
+}
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CLEAN_SHUTDOWN_FLAG = os.path.join(BASE_DIR, "security_system_shutdown.flag")
-SYSTEM_STATE_FILE = os.path.join(BASE_DIR, "security_system_state.flag")
+SYSTEM_STATE_FILE = os.path.join(BASE_DIR, "security_system_state.flag")  # Eski sürümün durum dosyası (sadece geçiş için okunur)
+
+# OLAY GÜNLÜĞÜ (Durum değişiklikleri, kapı hareketleri, alarmlar)
+GUNLUK_DOSYA_ONEKI = os.path.join(BASE_DIR, "security_system_journal")
+GUNLUK_ANLIK_DOSYASI = os.path.join(BASE_DIR, "security_system_snapshot.json")
+GUNLUK_GRUP_SURESI = 0.2                 # Kayıtların tek fsync ile yazılmak üzere toplandığı süre (sn)
+GUNLUK_ANLIK_ARALIGI = 500               # Kaç kayıtta bir durum anlık görüntüsü alınacağı
+GUNLUK_SEGMENT_BOYUTU = 4 * 1024 * 1024  # Günlük segmentinin en fazla boyutu (bayt)
+GUNLUK_SAKLANAN_SEGMENT = 4              # Saklanan eski segment sayısı
+
+# GİDEN KUTUSU (Bağlantı kesintisinde gönderilemeyen bildirimler ve fotoğrafları)
+GIDEN_KUTUSU_DIZINI = os.path.join(BASE_DIR, "security_system_outbox")  # None ise kesintide bildirimler kaybolur
+GIDEN_KUTUSU_MAKS_BOYUT = 50 * 1024 * 1024  # Diskte en fazla kaplayacağı alan (bayt); aşılınca önce en önemsizler silinir
+GIDEN_KUTUSU_MAKS_ADET = 500                # En fazla bekleyen bildirim (bellekte sadece bunların kısa özeti tutulur)
+GIDEN_KUTUSU_ILK_BEKLEME = 5                # Başarısız yeniden göndermeden sonraki ilk bekleme (sn); her seferinde ikiye katlanır
+GIDEN_KUTUSU_MAKS_BEKLEME = 300             # Yeniden gönderme beklemesinin üst sınırı (sn)
+
+# AYAR DOSYASI
+# Yukarıdaki ayarlar (pinler, bölgeler, kameralar, Frigate adresi, süreler, sohbet ID'si ...) bu dosyadan okunur;
+# dosyada olmayanlar buradaki değerleri kullanır. Örnek: ornek_ayarlar.toml. Program çalışırken dosya değişirse
+# doğrulanıp yeniden başlatmadan uygulanır (SIGHUP ile de tetiklenebilir); geçersiz dosya tümüyle reddedilir.
+AYAR_DOSYASI = os.path.join(BASE_DIR, "guvenlik_ayarlari.toml")  # .toml ya da .json; None ise dosya kullanılmaz
+AYAR_KONTROL_ARALIGI = 2.0     # inotify kullanılamazsa dosyanın değişiklik zamanının yoklanma aralığı (sn)
+AYAR_BIRLESTIRME_SURESI = 0.2  # Art arda gelen dosya olaylarının tek yüklemede birleştirildiği süre (sn)
+
+
+class Bolge:
+    """Bir kapının ayarları ve çalışma durumu (tablodaki her satır için bir nesne)."""
+    __slots__ = ("no", "ad", "pin", "kamera", "mqtt_topic", "otomatik_kurulum_suresi",
+                 "kurulu", "alarm", "otomatik_isler", "otomatik_baslangic", "otomatik_askida", "takvim_isi",
+                 "takvim_kaydi", "son_deger", "alarm_son_gonderim", "son_hareket", "siren_deseni", "takvim")
+
+    def __init__(self, no, ad, pin, kamera, mqtt_topic, otomatik_kurulum_suresi, siren_deseni=None, takvim=None):
+        self.no = no
+        self.ad = ad
+        self.pin = pin
+        self.kamera = kamera
+        self.mqtt_topic = mqtt_topic
+        self.otomatik_kurulum_suresi = otomatik_kurulum_suresi
+        self.siren_deseni = siren_deseni or SIREN_VARSAYILAN_DESEN
+        self.takvim = takvim or OTOMATIK_KURULUM_TAKVIMI
+        self.kurulu = False               # Alarm kurulu mu (ARMED)
+        self.alarm = False                # Alarm tetiklendi mi
+        self.otomatik_isler = []          # Kapı kapalıyken kurulan uyarı ve otomatik kurulum zamanlayıcıları
+        self.otomatik_baslangic = None    # Bu zamanlayıcıların saymaya başladığı an (monotonic)
+        self.otomatik_askida = False      # /otomatikalarmkapat ile takvimdeki bir sonraki saate kadar askıda mı
+        self.takvim_isi = None            # Takvim saatinden OTOMATIK_KURULUM_GECIKMESI sonra yapılacak kurulum
+        self.takvim_kaydi = None          # Takvimdeki bir sonraki saatin zamanlayıcı kaydı
+        self.son_deger = None             # Son değerlendirilen kapı değeri (0 = kapalı, 1 = açık)
+        self.alarm_son_gonderim = 0       # Son alarm bildiriminin zamanı
+        self.son_hareket = 0              # Kapının son açılma/kapanma zamanı
+
+    def otomatik_kurulumu_iptal_et(self):
+        """Kapı kapalı kaldığı için kurulmuş uyarı ve otomatik kurulum zamanlayıcılarını iptal eder."""
+        for is_ in self.otomatik_isler:
+            zamanlayici.iptal(is_)
+        self.otomatik_isler = []
+
 
 # --- GLOBAL DEĞİŞKENLER ---
-sistem_kurulu1 = False
-sistem_kurulu2 = False
-alarm1_tetiklendi_mi = False
-alarm2_tetiklendi_mi = False
+bolgeler = [Bolge(**satir) for satir in BOLGE_TABLOSU]
+bolge_pin_indeksi = {bolge.pin: i for i, bolge in enumerate(bolgeler)}
+sensor_gruplari = []  # Polling modunda grup halinde okunan pin listeleri (ilk pin grup lideri)
+polling_son_tur = 0.0  # Polling modunda son değerlendirme turunun zamanı (monotonic)
+# Ayar yeniden yüklemesinin sensör döngüsüne bıraktığı değişiklikler (ayar_kilidi altında okunur/yazılır)
+yeni_pinler = {}              # Bölge -> yeni pin
+filtre_ayari_degisti = False  # Filtre ayarları değişti mi
+heartbeat_son_basari = 0.0  # Son başarılı heartbeat zamanı (epoch)
 gpio_handle = None
 mqtt_client = None
 otomatik_alarm_kapali = False  # /otomatikalarmkapat komutu ile kontrol edilir
+# Bölge geçişlerini (kurma, devre dışı bırakma, alarm) ve durumun günlüğe yazılmasını sıraya koyar: sensör döngüsü,
+# zamanlayıcı ve Telegram komutları aynı bölgeyi farklı thread'lerden değiştirir. MQTT komutları paho thread'inde
+# kilide girmez, zamanlayıcıya aktarılır (paho yayın sırasında kendi callback kilidini alabilir).
+bolge_kilidi = threading.RLock()
+aktif_sensor_modu = "polling"  # GPIO kurulumunda gerçekten devreye giren mod
+asyncio_gorevleri = []          # Asyncio modunda olay döngüsünde çalışan arka plan görevleri
+
+# Polling ve kesme modlarını gecikme ve boşta CPU kullanımı açısından karşılaştırmak için
+sensor_istatistik = {
+    "uyanma": 0,                               # Sensör döngüsünün uyanma sayısı
+    "kenar": 0,                                # Callback ile gelen kapı hareketi sayısı
+    "baslangic": None,
+    "cpu_saniye": 0.0,                         # Sensör thread'inin harcadığı CPU süresi
+    "role_gecikme_ms": deque(maxlen=1000),     # Kapı kenarı -> alarm rölesi gecikmeleri
+    "filtre_gecikme_ms": deque(maxlen=1000),   # Yeni seviyenin ilk görülmesinden filtre kararına kadar geçen süreler
+    "bastirilan": 0,                           # Filtrenin bastırdığı parazit (kısa sıçrama) sayısı
+}
 
 
 # =================================================================
 # FONKSİYONLAR
 # =================================================================
 
+# --- METRİKLER (Prometheus) ---
+# Ölçümler sadece birkaç sayaç artırır; metin çıktısı yalnızca /metrics okunurken, metrik sunucusunun
+# kendi thread'inde üretilir. Böylece sürekli açık kalabilir ve alarm yolunu yavaşlatmaz.
+GECIKME_KOVALARI = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+GPIO_KOVALARI = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005)
+
+
+def _etiket_metni(etiket_adi, deger):
+    return f'{{{etiket_adi}="{deger}"}}' if etiket_adi else ""
+
+
+class Histogram:
+    """Sabit kovalı süre histogramı; etiket verilirse her etiket değeri için ayrı seri tutar."""
+
+    def __init__(self, ad, aciklama, kovalar, etiket_adi=None):
+        self.ad = ad
+        self.aciklama = aciklama
+        self.kovalar = kovalar
+        self.etiket_adi = etiket_adi
+        self._kilit = threading.Lock()
+        self._seriler = {}  # etiket -> [kova sayıları (+Inf dahil), toplam]
+
+    def gozlemle(self, saniye, etiket=None):
+        with self._kilit:
+            seri = self._seriler.get(etiket)
+            if seri is None:
+                seri = self._seriler[etiket] = [[0] * (len(self.kovalar) + 1), 0.0]
+            seri[0][bisect.bisect_left(self.kovalar, saniye)] += 1
+            seri[1] += saniye
+
+    def satirlar(self):
+        with self._kilit:
+            seriler = [(etiket, list(sayilar), toplam) for etiket, (sayilar, toplam) in self._seriler.items()]
+        yield f"# HELP {self.ad} {self.aciklama}"
+        yield f"# TYPE {self.ad} histogram"
+        for etiket, sayilar, toplam in seriler:
+            on_ek = f'{self.etiket_adi}="{etiket}",' if self.etiket_adi else ""
+            birikimli = 0
+            for sinir, sayi in zip(self.kovalar + (float("inf"),), sayilar):
+                birikimli += sayi
+                le = "+Inf" if sinir == float("inf") else repr(sinir)
+                yield f'{self.ad}_bucket{{{on_ek}le="{le}"}} {birikimli}'
+            yield f"{self.ad}_sum{_etiket_metni(self.etiket_adi, etiket)} {toplam}"
+            yield f"{self.ad}_count{_etiket_metni(self.etiket_adi, etiket)} {birikimli}"
+
+
+class Sayac:
+    """Sadece artan sayaç; etiket verilirse her etiket değeri için ayrı seri tutar."""
+
+    def __init__(self, ad, aciklama, etiket_adi=None):
+        self.ad = ad
+        self.aciklama = aciklama
+        self.etiket_adi = etiket_adi
+        self._kilit = threading.Lock()
+        self._degerler = {}
+
+    def artir(self, etiket=None, miktar=1):
+        with self._kilit:
+            self._degerler[etiket] = self._degerler.get(etiket, 0) + miktar
+
+    def satirlar(self):
+        with self._kilit:
+            degerler = list(self._degerler.items())
+        yield f"# HELP {self.ad} {self.aciklama}"
+        yield f"# TYPE {self.ad} counter"
+        for etiket, deger in degerler:
+            yield f"{self.ad}{_etiket_metni(self.etiket_adi, etiket)} {deger}"
+
+
+class Gosterge:
+    """Değeri okunma anında fonksiyondan alınan metrik; fonksiyon {etiket: değer} de döndürebilir."""
+
+    def __init__(self, ad, aciklama, fonksiyon, etiket_adi=None, tip="gauge"):
+        self.ad = ad
+        self.aciklama = aciklama
+        self.fonksiyon = fonksiyon
+        self.etiket_adi = etiket_adi
+        self.tip = tip
+
+    def satirlar(self):
+        yield f"# HELP {self.ad} {self.aciklama}"
+        yield f"# TYPE {self.ad} {self.tip}"
+        deger = self.fonksiyon()
+        if isinstance(deger, dict):
+            for etiket, alt_deger in deger.items():
+                yield f"{self.ad}{_etiket_metni(self.etiket_adi, etiket)} {alt_deger}"
+        else:
+            yield f"{self.ad} {deger}"
+
+
+class MetrikKaydi:
+    """Metrikleri kısa anahtarlarla tutar ve Prometheus metin biçiminde dışa verir."""
+
+    def __init__(self):
+        self._metrikler = {}
+
+    def ekle(self, anahtar, metrik):
+        self._metrikler[anahtar] = metrik
+        return metrik
+
+    def __getitem__(self, anahtar):
+        return self._metrikler[anahtar]
+
+    def metin(self):
+        satirlar = []
+        for metrik in list(self._metrikler.values()):
+            try:
+                satirlar.extend(metrik.satirlar())
+            except Exception as e:
+                satirlar.append(f"# {metrik.ad} okunamadı: {e}")
+        return "\n".join(satirlar) + "\n"
+
+
+metrik_kaydi = MetrikKaydi()
+metrik_kaydi.ekle("sensor_dongu", Histogram(
+    "guvenlik_sensor_dongu_suresi_saniye", "Sensör döngüsünün bir değerlendirme turu.", GECIKME_KOVALARI))
+metrik_kaydi.ekle("gpio_okuma", Histogram(
+    "guvenlik_gpio_okuma_suresi_saniye", "Kapı pinlerinin okunma süresi.", GPIO_KOVALARI))
+metrik_kaydi.ekle("filtre_karar", Histogram(
+    "guvenlik_filtre_karar_gecikmesi_saniye", "Yeni kapı seviyesinin ilk görülmesinden filtre kararına kadar geçen süre.",
+    GECIKME_KOVALARI))
+metrik_kaydi.ekle("filtre_bastirilan", Gosterge(
+    "guvenlik_filtre_bastirilan_toplam", "Filtrenin bastırdığı parazit sayısı.", lambda: sensor_istatistik["bastirilan"],
+    tip="counter"))
+metrik_kaydi.ekle("kenar_role", Histogram(
+    "guvenlik_kenar_role_gecikmesi_saniye", "Kapı kenarından alarm rölesinin açılmasına kadar geçen süre.", GECIKME_KOVALARI))
+metrik_kaydi.ekle("role_son_tarih", Histogram(
+    "guvenlik_role_son_tarih_gecikmesi_saniye",
+    "Röle isteğinden ya da siren desen adımından röleye yazılmasına kadar geçen süre.", GPIO_KOVALARI))
+metrik_kaydi.ekle("zamanlayici", Histogram(
+    "guvenlik_zamanlayici_gecikmesi_saniye", "Zamanlayıcı işinin son tarihinden çalışmasına kadar geçen süre.",
+    GECIKME_KOVALARI))
+metrik_kaydi.ekle("ayar", Sayac(
+    "guvenlik_ayar_yukleme_toplam", "Ayar dosyasının yeniden yüklenme denemeleri.", "sonuc"))
+metrik_kaydi.ekle("frigate", Histogram(
+    "guvenlik_frigate_indirme_suresi_saniye", "Frigate görüntü indirme süresi.", GECIKME_KOVALARI, "kod"))
+metrik_kaydi.ekle("telegram", Histogram(
+    "guvenlik_telegram_istek_suresi_saniye", "Telegram Bot API istek süresi.", GECIKME_KOVALARI, "metot"))
+metrik_kaydi.ekle("telegram_kod", Sayac(
+    "guvenlik_telegram_yanit_toplam", "Telegram Bot API yanıtları (HTTP durum kodu ya da 'hata').", "kod"))
+metrik_kaydi.ekle("heartbeat", Sayac(
+    "guvenlik_heartbeat_toplam", "Healthchecks heartbeat denemeleri.", "sonuc"))
+metrik_kaydi.ekle("heartbeat_son", Gosterge(
+    "guvenlik_heartbeat_son_basari_zamani", "Son başarılı heartbeat zamanı (Unix saniye).",
+    lambda: heartbeat_son_basari))
+metrik_kaydi.ekle("thread", Gosterge(
+    "guvenlik_thread_sayisi", "Canlı thread sayısı.", threading.active_count))
+metrik_kaydi.ekle("kurulu", Gosterge(
+    "guvenlik_bolge_kurulu", "Bölgenin alarmı kurulu mu (1/0).", lambda: {b.no: int(b.kurulu) for b in bolgeler}, "bolge"))
+metrik_kaydi.ekle("alarm", Gosterge(
+    "guvenlik_bolge_alarm", "Bölgede alarm çalıyor mu (1/0).", lambda: {b.no: int(b.alarm) for b in bolgeler}, "bolge"))
+metrik_kaydi.ekle("acilis_adim", Gosterge(
+    "guvenlik_acilis_adim_suresi_saniye", "Açılış adımlarının (ayar, gpio, içe aktarmalar ...) süresi.",
+    lambda: dict(acilis_olcumu.adimlar), "adim"))
+metrik_kaydi.ekle("acilis_asama", Gosterge(
+    "guvenlik_acilis_asama_saniye", "Süreç başlangıcından açılış aşamalarına (koruma, mqtt, telegram) kadar geçen süre.",
+    lambda: dict(acilis_olcumu.isaretler), "asama"))
+
+
+def metrik_sunucusunu_baslat():
+    """/metrics uç noktasını ayrı bir daemon thread'de sunar; METRIK_PORTU None ise hiçbir şey yapmaz."""
+    if METRIK_PORTU is None:
+        return None
+
+    class MetrikIsleyici(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            govde = metrik_kaydi.metin().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(govde)))
+            self.end_headers()
+            self.wfile.write(govde)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        sunucu = ThreadingHTTPServer((METRIK_ADRESI, METRIK_PORTU), MetrikIsleyici)
+    except OSError as e:
+        print(f"Metrik sunucusu başlatılamadı: {e}")
+        return None
+    sunucu.daemon_threads = True
+    threading.Thread(target=sunucu.serve_forever, name="metrik", daemon=True).start()
+    print(f"Metrik sunucusu başlatıldı: http://{METRIK_ADRESI}:{sunucu.server_address[1]}/metrics")
+    return sunucu
+
+# --- BEKÇİ (İŞÇİ CANLILIK TAKİBİ, SYSTEMD WATCHDOG) ---
+def systemd_bildir(mesaj):
+    """systemd altında çalışılıyorsa NOTIFY_SOCKET'e durum yazar (sd_notify); değilse hiçbir şey yapmaz."""
+    adres = os.environ.get("NOTIFY_SOCKET")
+    if not adres:
+        return False
+    if adres.startswith("@"):
+        adres = "\0" + adres[1:]  # Soyut (abstract) soket adı
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC) as sock:
+            sock.connect(adres)
+            sock.sendall(mesaj.encode("utf-8"))
+        return True
+    except OSError as e:
+        print(f"systemd'ye bildirilemedi ({mesaj.split('=', 1)[0]}): {e}")
+        return False
+
+def systemd_bekci_suresi():
+    """Servis dosyasında WatchdogSec= verilmişse systemd'nin beklediği süre (sn), yoksa None."""
+    pid = os.environ.get("WATCHDOG_PID")
+    sure = os.environ.get("WATCHDOG_USEC", "")
+    if (pid and pid != str(os.getpid())) or not sure.isdigit() or int(sure) == 0:
+        return None
+    return int(sure) / 1e6
+
+
+class Bekci:
+    """İşçilerin (sensör, zamanlayıcı, MQTT, bildirim) en son ne zaman ilerlediğini izler.
+
+    Her işçi işinin bir turunu bitirdikçe `ilerledi(ad)` çağırır; bu sadece bir monotonic zaman yazar.
+    BEKCI_ESIKLERI'ndeki süreden uzun ilerlemeyen işçi "takılmış" sayılır (0 = izlenmez). Boşta beklemesi
+    normal olan işçi (örn. kuyruğu boş bildirim dağıtıcı) `bosta` fonksiyonuyla kaydedilir. Her işçi
+    güncelken systemd'ye WATCHDOG=1 gönderilir; heartbeat de yalnız o zaman başarılı ping atar, aksi halde
+    sebebiyle birlikte /fail pingi gönderilir. Durum değişince heartbeat beklemeden hemen uyandırılır.
+    """
+
+    def __init__(self):
+        self._kilit = threading.Lock()
+        self._son = {}       # işçi adı -> son ilerleme (monotonic)
+        self._bosta = {}     # işçi adı -> boşta mı fonksiyonu
+        self._uyandir = None  # Asyncio heartbeat görevi beklerken onu uyandıran fonksiyon
+        self._sebep = ""     # Son kontroldeki takılma sebebi ("" = hepsi güncel)
+        self._hazir = False  # READY=1 gönderildi mi
+        self.degisti = threading.Event()  # Sağlıklı/takılmış geçişinde heartbeat'i uyandırır
+        self.metrikler = {"kontrol": 0, "takilma": 0, "systemd": 0}
+
+    def kaydet(self, ad, bosta=None):
+        with self._kilit:
+            if bosta is not None:
+                self._bosta[ad] = bosta
+            self._son[ad] = time.monotonic()
+
+    def ilerledi(self, ad):
+        with self._kilit:
+            self._son[ad] = time.monotonic()
+
+    def gecikmeler(self):
+        """İşçi başına son ilerlemeden beri geçen süre (sn)."""
+        with self._kilit:
+            simdi = time.monotonic()
+            return {ad: round(simdi - son, 3) for ad, son in self._son.items()}
+
+    def sebep(self):
+        """Takılmış işçileri anlatan metin; hepsi güncelse boş metin."""
+        with self._kilit:
+            bosta = dict(self._bosta)
+        takilanlar = []
+        for ad, gecen in self.gecikmeler().items():
+            esik = BEKCI_ESIKLERI.get(ad, 0)
+            # bosta() işçinin kendi kilidini alır; bekçi kilidi tutulurken çağrılmaz
+            if esik and gecen > esik and not (ad in bosta and bosta[ad]()):
+                takilanlar.append(f"{ad}: {gecen:.0f} sn ilerleme yok (eşik {esik} sn)")
+        return "; ".join(takilanlar)
+
+    def kontrol(self):
+        """Durumu değerlendirir, systemd'yi besler; geçişlerde heartbeat'i uyandırır."""
+        sebep = self.sebep()
+        self.metrikler["kontrol"] += 1
+        if sebep != self._sebep:
+            if sebep and not self._sebep:
+                self.metrikler["takilma"] += 1
+                print(f"BEKÇİ: işçi takıldı -> {sebep}")
+            elif not sebep:
+                print("BEKÇİ: tüm işçiler yeniden ilerliyor.")
+            self._sebep = sebep
+            self.degisti.set()
+            if self._uyandir:
+                self._uyandir()
+            systemd_bildir(f"STATUS={sebep or 'Tüm işçiler çalışıyor.'}")
+        if not sebep:
+            mesaj = "WATCHDOG=1" if self._hazir else "READY=1\nWATCHDOG=1\nSTATUS=Tüm işçiler çalışıyor."
+            if systemd_bildir(mesaj):
+                self.metrikler["systemd"] += 1
+            self._hazir = True
+        return sebep
+
+    async def adegisim_bekle(self, zaman_asimi):
+        """Asyncio heartbeat görevi için `degisti.wait(zaman_asimi)` karşılığı; olay döngüsünü bloklamaz."""
+        loop = asyncio.get_running_loop()
+        olay = asyncio.Event()
+        self._uyandir = lambda: loop.call_soon_threadsafe(olay.set)
+        try:
+            if not self.degisti.is_set():
+                await asyncio.wait_for(olay.wait(), zaman_asimi)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._uyandir = None
+        self.degisti.clear()
+
+    def kontrol_araligi(self):
+        """BEKCI_KONTROL_ARALIGI; systemd watchdog süresinin yarısı daha kısaysa o."""
+        sure = systemd_bekci_suresi()
+        return min(BEKCI_KONTROL_ARALIGI, sure / 2) if sure else BEKCI_KONTROL_ARALIGI
+
+    def calistir(self, stop_event):
+        """Thread sürücüsü."""
+        print(f"Bekçi başlatıldı ({self.kontrol_araligi():g} sn aralıkla"
+              f"{', systemd watchdog açık' if systemd_bekci_suresi() else ''}).")
+        while not stop_event.wait(self.kontrol_araligi()):
+            self.kontrol()
+
+    async def acalistir(self):
+        """Asyncio sürücüsü: olay döngüsü takılırsa bu görev de çalışmaz ve systemd beslenmez."""
+        print(f"Bekçi başlatıldı ({self.kontrol_araligi():g} sn aralıkla"
+              f"{', systemd watchdog açık' if systemd_bekci_suresi() else ''}).")
+        while True:
+            await asyncio.sleep(self.kontrol_araligi())
+            self.kontrol()
+
+
+bekci = Bekci()
+metrik_kaydi.ekle("bekci", Gosterge(
+    "guvenlik_isci_son_ilerleme_saniye", "İşçinin son ilerlemesinden beri geçen süre.", lambda: bekci.gecikmeler(), "isci"))
+metrik_kaydi.ekle("bekci_sayac", Gosterge(
+    "guvenlik_bekci_toplam", "Bekçi sayaçları.", lambda: dict(bekci.metrikler), "olay", "counter"))
+
 def send_heartbeat():
-    """Healthchecks.io'ya 'hayattayım' sinyali gönderir."""
+    """Healthchecks.io'ya 'hayattayım' sinyali gönderir; takılmış işçi varsa sebebiyle /fail gönderir."""
     if not HEALTHCHECKS_PING_URL or "hc-ping.com" not in HEALTHCHECKS_PING_URL:
         return
+    sebep = bekci.sebep()
     try:
+        if sebep:
+            requests.post(f"{HEALTHCHECKS_PING_URL.rstrip('/')}/fail", data=sebep.encode("utf-8"), timeout=10)
+            heartbeat_sonucunu_kaydet(False, sebep)
+            print(f"Heartbeat yerine hata sinyali gönderildi: {sebep}")
+            return
         requests.get(HEALTHCHECKS_PING_URL, timeout=10)
+        heartbeat_sonucunu_kaydet(True)
         print("Heartbeat sinyali başarıyla gönderildi.")
     except requests.RequestException as e:
+        heartbeat_sonucunu_kaydet(False)
         print(f"Heartbeat sinyali gönderilemedi: {e}")
 
+def heartbeat_sonucunu_kaydet(basarili, sebep=""):
+    global heartbeat_son_basari
+    metrik_kaydi["heartbeat"].artir("basarili" if basarili else "takilma" if sebep else "basarisiz")
+    if basarili:
+        heartbeat_son_basari = time.time()
+
 def heartbeat_loop(stop_event):
-    """Her 1 dakikada bir heartbeat sinyali gönderir."""
+    """Her 1 dakikada (bekçi durum değiştirirse hemen) heartbeat sinyali gönderir."""
     print("Heartbeat döngüsü başlatıldı (1 dakikada bir).")
     while not stop_event.is_set():
         send_heartbeat()
-        # 1 dakika (60 saniye) boyunca bekle.
-        for _ in range(60):
-            if stop_event.is_set():
+        # 1 dakika bekle; bekçi durum değiştirirse ya da program kapanırsa (main degisti'yi kurar) hemen uyan
+        bekci.degisti.wait(60)
+        bekci.degisti.clear()
+
+# --- BİLDİRİM DAĞITICI ---
+# Öncelik şeritleri: küçük sayı önce gönderilir.
+ONCELIK_KRITIK = 0  # Alarm ve alarm devam mesajları
+ONCELIK_BILGI = 1   # Otomatik kurulum uyarıları, başlangıç ve durum mesajları
+ONCELIK_SESSIZ = 2  # Kapı hareketi (sessiz) fotoğrafları
+ONCELIK_ADLARI = {"kritik": ONCELIK_KRITIK, "bilgi": ONCELIK_BILGI, "sessiz": ONCELIK_SESSIZ}  # TELEGRAM_ALICILAR için
+
+
+class TelegramHizSiniri(Exception):
+    """Telegram 429 (Too Many Requests) döndürdüğünde, retry_after süresiyle birlikte yükseltilir."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Telegram hız sınırı, {retry_after} sn sonra tekrar denenecek")
+        self.retry_after = retry_after
+
+
+class BildirimGonderilemedi(Exception):
+    """Telegram'a ağ hatası ya da 5xx nedeniyle ulaşılamadığında yükseltilir; bildirim giden kutusuna alınır."""
+
+
+class HizSinirlayici:
+    """Anahtar başına token bucket: saniyede `oran` istek, en fazla `kapasite` ani istek."""
+
+    def __init__(self, oran, kapasite):
+        self.oran = oran
+        self.kapasite = kapasite
+        self._kilit = threading.Lock()
+        self._kovalar = {}  # anahtar -> [token, son güncelleme]
+
+    def bekleme_suresi(self, anahtar=None):
+        """Bir token ayırır ve gönderimden önce beklenmesi gereken süreyi döndürür."""
+        with self._kilit:
+            simdi = time.monotonic()
+            kova = self._kovalar.setdefault(anahtar, [self.kapasite, simdi])
+            kova[0] = min(self.kapasite, kova[0] + (simdi - kova[1]) * self.oran)
+            kova[1] = simdi
+            kova[0] -= 1
+            return -kova[0] / self.oran if kova[0] < 0 else 0.0
+
+
+class BildirimDagitici:
+    """Telegram/Frigate işlerini öncelik şeritli, sınırlı bir kuyruk ve sabit sayıda işçi ile yürütür.
+
+    - Kritik alarmlar her zaman bilgi ve sessiz mesajlardan önce gönderilir; ilk işçi yalnızca
+      kritik şeride ayrılmıştır, böylece yavaş bir fotoğraf yüklemesi alarmı bekletmez.
+    - Aynı `anahtar` ile kuyrukta bekleyen bir iş varsa yeni iş onun yerine geçer (birleştirme).
+    - Telegram 429 döndürürse tüm gönderimler retry_after kadar durdurulur ve iş kuyruğa geri konur.
+    - Her işçi kendi keep-alive requests.Session nesnelerini kullanır.
+    - Birden fazla alıcısı olan iş, alıcılarına küçük bir thread havuzuyla eşzamanlı gönderir (alicilara_gonder).
+    Kuyruk dolarsa en düşük öncelikli en eski iş düşürülür ve sayılır (geri basınç metrikleri).
+    """
+
+    def __init__(self, kuyruk_boyutu, isci_sayisi):
+        self.kuyruk_boyutu = kuyruk_boyutu
+        self.isci_sayisi = isci_sayisi
+        self._yigin = []          # [oncelik, sira, is] (heapq); düşürülen/birleştirilen işlerde is = None
+        self._bekleyen = {}       # anahtar -> yığındaki kayıt (birleştirme için)
+        self._boyut = 0
+        self._sira = 0
+        self._durdu = False
+        self._duraklat_kadar = 0.0  # 429 sonrası gönderimlerin devam edeceği an (monotonic)
+        self._calisan = 0           # O an işçilerde çalışan iş sayısı (bekçi için)
+        self._kosul = threading.Condition()
+        self._yerel = threading.local()
+        self._isciler = []
+        self._havuz = None          # Alıcılara eşzamanlı gönderim havuzu (ilk çok alıcılı işte oluşturulur)
+        self._duzenlenecekler = {}  # anahtar -> {chat_id: (message_id, tip)} yerinde düzenlenecek mesajlar
+        self.sohbet_siniri = HizSinirlayici(TELEGRAM_SOHBET_HIZI, TELEGRAM_SOHBET_KAPASITESI)
+        self.genel_sinir = HizSinirlayici(TELEGRAM_GENEL_HIZ, TELEGRAM_GENEL_HIZ)
+        self.metrikler = {
+            "eklenen": 0,
+            "islenen": 0,
+            "dusurulen": 0,          # Kuyruk dolu olduğu için atılan işler
+            "birlestirilen": 0,      # Kuyrukta bekleyen aynı anahtarlı işle birleştirilenler
+            "duzenlenen": 0,         # Yeni mesaj yerine yerinde düzenlenen mesajlar
+            "hiz_siniri": 0,         # Telegram'dan gelen 429 yanıtları
+            "hata": 0,
+            "foto_yukleme": 0,       # Telegram'a yüklenen fotoğraflar
+            "foto_yeniden": 0,       # Yükleme yerine file_id ile gönderilen fotoğraflar
+            "klip": 0,               # Frigate'ten akışla yüklenen alarm klipleri
+            "en_yuksek_derinlik": 0,
+            "bekleme_ms_toplam": 0.0,  # Kuyrukta bekleme süreleri
+            "bekleme_ms_maks": 0.0,
+        }
+
+    def baslat(self):
+        bekci.kaydet("bildirim", bosta=self.bosta)
+        for i in range(self.isci_sayisi):
+            sadece_kritik = i == 0 and self.isci_sayisi > 1
+            isci = threading.Thread(target=self._isci_dongusu, args=(sadece_kritik,),
+                                    name="bildirim-kritik" if sadece_kritik else f"bildirim-{i}", daemon=True)
+            isci.start()
+            self._isciler.append(isci)
+        print(f"Bildirim dağıtıcı başlatıldı ({self.isci_sayisi} işçi, kuyruk: {self.kuyruk_boyutu}).")
+
+    def durdur(self, zaman_asimi=10):
+        """Kuyruktaki işler bittikten (ya da zaman aşımı dolduktan) sonra işçileri durdurur."""
+        bitis = time.time() + zaman_asimi
+        with self._kosul:
+            while self._boyut and time.time() < bitis:
+                self._kosul.wait(0.1)
+            self._durdu = True
+            self._kosul.notify_all()
+        for isci in self._isciler:
+            isci.join(max(bitis - time.time(), 0))
+        self._isciler = []
+        if self._havuz is not None:
+            self._havuz.shutdown(wait=False)
+            self._havuz = None
+
+    def ekle(self, gorev, *args, oncelik=ONCELIK_BILGI, anahtar=None, **kwargs):
+        """İşi kuyruğa ekler; çağıran thread'i (örn. sensör döngüsü) asla bekletmez."""
+        is_ = (time.time(), gorev, args, kwargs)
+        with self._kosul:
+            self.metrikler["eklenen"] += 1
+            kayit = self._bekleyen.get(anahtar) if anahtar is not None else None
+            if kayit is not None and kayit[2] is not None:
+                # Aynı güncelleme zaten sırada: sırasını koru, içeriği yenisiyle değiştir
+                kayit[2] = (kayit[2][0],) + is_[1:]
+                self.metrikler["birlestirilen"] += 1
+                return
+            if self._boyut >= self.kuyruk_boyutu and not self._yer_ac(oncelik):
+                self.metrikler["dusurulen"] += 1
+                print("Bildirim kuyruğu dolu, yeni bildirim düşürüldü.")
+                return
+            self._sira += 1
+            kayit = [oncelik, self._sira, is_, anahtar]
+            heapq.heappush(self._yigin, kayit)
+            if anahtar is not None:
+                self._bekleyen[anahtar] = kayit
+            self._boyut += 1
+            self.metrikler["en_yuksek_derinlik"] = max(self.metrikler["en_yuksek_derinlik"], self._boyut)
+            self._kosul.notify_all()
+
+    def _yer_ac(self, oncelik):
+        """Kuyruk doluyken yeni işten daha düşük ya da eşit öncelikli en eski işi düşürür."""
+        aday = None
+        for kayit in self._yigin:
+            if kayit[2] is None:
+                continue
+            if aday is None or kayit[0] > aday[0] or (kayit[0] == aday[0] and kayit[1] < aday[1]):
+                aday = kayit
+        if aday is None or aday[0] < oncelik:
+            return False
+        self._kaydi_cikar(aday)
+        self.metrikler["dusurulen"] += 1
+        print("Bildirim kuyruğu dolu, en düşük öncelikli en eski bildirim düşürüldü.")
+        return True
+
+    def _kaydi_cikar(self, kayit):
+        kayit[2] = None
+        if kayit[3] is not None and self._bekleyen.get(kayit[3]) is kayit:
+            del self._bekleyen[kayit[3]]
+        self._boyut -= 1
+
+    def _geri_koy(self, kayit):
+        """429 alan işi aynı öncelik ve sırayla kuyruğa geri koyar."""
+        with self._kosul:
+            if kayit[3] is not None and kayit[3] in self._bekleyen:
+                return  # Aynı anahtarlı daha yeni bir güncelleme zaten sırada
+            heapq.heappush(self._yigin, kayit)
+            if kayit[3] is not None:
+                self._bekleyen[kayit[3]] = kayit
+            self._boyut += 1
+            self._kosul.notify_all()
+
+    def _sonraki_is(self, sadece_kritik):
+        with self._kosul:
+            while True:
+                while self._yigin and self._yigin[0][2] is None:
+                    heapq.heappop(self._yigin)
+                if self._durdu:
+                    return None
+                bekle = self._duraklat_kadar - time.monotonic()
+                if bekle > 0:
+                    self._kosul.wait(bekle)
+                    continue
+                if self._yigin and (not sadece_kritik or self._yigin[0][0] == ONCELIK_KRITIK):
+                    kayit = heapq.heappop(self._yigin)
+                    kopya = list(kayit)
+                    self._kaydi_cikar(kayit)
+                    self._calisan += 1
+                    self._kosul.notify_all()
+                    return kopya
+                self._kosul.wait()
+
+    def _isci_dongusu(self, sadece_kritik):
+        while True:
+            kayit = self._sonraki_is(sadece_kritik)
+            if kayit is None:
                 break
-            time.sleep(1)
+            eklenme, gorev, args, kwargs = kayit[2]
+            bekleme_ms = (time.time() - eklenme) * 1000
+            try:
+                gorev(*args, **kwargs)
+            except TelegramHizSiniri as e:
+                print(f"Telegram hız sınırına takıldı, gönderimler {e.retry_after} sn duraklatılıyor.")
+                with self._kosul:
+                    self.metrikler["hiz_siniri"] += 1
+                    self._duraklat_kadar = max(self._duraklat_kadar, time.monotonic() + e.retry_after)
+                    self._calisan -= 1
+                self._geri_koy(kayit)
+                bekci.ilerledi("bildirim")
+                continue
+            except Exception as e:
+                with self._kosul:
+                    self.metrikler["hata"] += 1
+                print(f"Bildirim işi başarısız: {e}")
+            with self._kosul:
+                self._calisan -= 1
+                self.metrikler["islenen"] += 1
+                self.metrikler["bekleme_ms_toplam"] += bekleme_ms
+                self.metrikler["bekleme_ms_maks"] = max(self.metrikler["bekleme_ms_maks"], bekleme_ms)
+            bekci.ilerledi("bildirim")
+
+    def hiz_siniri_bekle(self, chat_id):
+        """Sohbet başına ve genel Telegram hız sınırlarına uymak için gerekirse bekler."""
+        bekle = max(self.sohbet_siniri.bekleme_suresi(chat_id), self.genel_sinir.bekleme_suresi())
+        if bekle > 0:
+            time.sleep(bekle)
+
+    def alicilara_gonder(self, alicilar, gonder):
+        """`gonder(chat_id)`yi alıcılara en fazla TELEGRAM_PARALEL_GONDERIM eşzamanlı istekle uygular.
+
+        Biten alıcılar listeden çıkarılır ve {chat_id: sonuç} döndürülür. Ulaşılamayan (BildirimGonderilemedi)
+        ve 429 alan alıcılar listede kalır; 429 varsa hepsi bittikten sonra TelegramHizSiniri yükseltilir ve iş
+        kuyruğa geri konduğunda sadece onlar denenir.
+        """
+        hedefler = list(alicilar)
+
+        def dene(chat_id):
+            try:
+                return gonder(chat_id)
+            except (TelegramHizSiniri, BildirimGonderilemedi) as e:
+                return e
+            except Exception as e:
+                print(f"Bildirim {chat_id} sohbetine gönderilemedi: {e}")
+                return None
+
+        if len(hedefler) <= 1:
+            sonuclar = [dene(chat_id) for chat_id in hedefler]
+        else:
+            with self._kosul:
+                if self._havuz is None:
+                    self._havuz = concurrent.futures.ThreadPoolExecutor(TELEGRAM_PARALEL_GONDERIM, "bildirim-alici")
+                havuz = self._havuz
+            sonuclar = list(havuz.map(dene, hedefler))
+        biten, hiz_siniri = {}, None
+        for chat_id, sonuc in zip(hedefler, sonuclar):
+            if isinstance(sonuc, TelegramHizSiniri):
+                if hiz_siniri is None or sonuc.retry_after > hiz_siniri.retry_after:
+                    hiz_siniri = sonuc
+                continue
+            if isinstance(sonuc, BildirimGonderilemedi):
+                continue
+            alicilar.remove(chat_id)
+            biten[chat_id] = sonuc
+        if hiz_siniri is not None:
+            raise hiz_siniri
+        return biten
+
+    def metrik_artir(self, ad, adet=1):
+        with self._kosul:
+            self.metrikler[ad] += adet
+
+    def duzenleme_kaydi(self, anahtar):
+        """Anahtarın düzenlenecek mesajları: {chat_id: (message_id, tip)}."""
+        with self._kosul:
+            return dict(self._duzenlenecekler.get(anahtar, {}))
+
+    def duzenleme_kaydet(self, anahtar, chat_id, message_id, tip):
+        with self._kosul:
+            self._duzenlenecekler.setdefault(anahtar, {})[chat_id] = (message_id, tip)
+
+    def duzenlemeyi_birak(self, anahtar, chat_id=None):
+        """Anahtarın bir sonraki bildirimi (chat_id verilirse sadece o sohbette) yeni mesaj olarak gönderilir."""
+        with self._kosul:
+            if chat_id is None:
+                self._duzenlenecekler.pop(anahtar, None)
+            else:
+                self._duzenlenecekler.get(anahtar, {}).pop(chat_id, None)
+
+    def derinlik(self):
+        with self._kosul:
+            return self._boyut
+
+    def bosta(self):
+        """Bekleyen ve çalışan iş yoksa ya da 429 beklemesindeyse True (ilerlememesi takılma sayılmaz)."""
+        with self._kosul:
+            return (self._boyut == 0 and self._calisan == 0) or self._duraklat_kadar > time.monotonic()
 
-def send_telegram_notification(message, camera_name="tapo", max_retry=3):
-    """Bildirim gönderir. Frigate'den fotoğrafı önce indirir, sonra Telegram'a yükler."""
-    def task():
-        FRIGATE_IP = "YOUR_FRIGATE_IP" # Frigate sunucunuzun yerel IP adresi
-        FRIGATE_PORT = 5000
-        photo_url = f"http://{FRIGATE_IP}:{FRIGATE_PORT}/api/{camera_name}/latest.jpg?h=480"
-        
-        image_content = None
+    def _oturum(self, ad):
+        oturum = getattr(self._yerel, ad, None)
+        if oturum is None:
+            oturum = requests.Session()
+            setattr(self._yerel, ad, oturum)
+        return oturum
+
+    def telegram_oturumu(self):
+        """Çağıran işçiye ait kalıcı (keep-alive) Telegram oturumu."""
+        return self._oturum("telegram")
+
+    def frigate_oturumu(self):
+        """Çağıran işçiye ait kalıcı (keep-alive) Frigate oturumu."""
+        return self._oturum("frigate")
+
+    def ozet(self):
+        m = self.metrikler
+        ortalama = m["bekleme_ms_toplam"] / m["islenen"] if m["islenen"] else 0.0
+        return (f"Bildirim dağıtıcı | Eklenen: {m['eklenen']} | İşlenen: {m['islenen']} | "
+                f"Düşürülen: {m['dusurulen']} | Birleştirilen: {m['birlestirilen']} | "
+                f"Düzenlenen: {m['duzenlenen']} | 429: {m['hiz_siniri']} | Hata: {m['hata']} | "
+                f"Fotoğraf (yüklenen/file_id): {m['foto_yukleme']}/{m['foto_yeniden']} | Klip: {m['klip']} | "
+                f"Kuyruk (şu an/en yüksek): {self.derinlik()}/{m['en_yuksek_derinlik']} | "
+                f"Bekleme ms (ort/maks): {ortalama:.1f}/{m['bekleme_ms_maks']:.1f}")
+
+
+bildirim_dagitici = BildirimDagitici(BILDIRIM_KUYRUK_BOYUTU, BILDIRIM_ISCI_SAYISI)
+metrik_kaydi.ekle("kuyruk", Gosterge(
+    "guvenlik_bildirim_kuyruk_derinligi", "Bildirim dağıtıcıda bekleyen iş sayısı.", lambda: bildirim_dagitici.derinlik()))
+metrik_kaydi.ekle("bildirim", Gosterge(
+    "guvenlik_bildirim_toplam", "Bildirim dağıtıcı sayaçları.",
+    lambda: {k: v for k, v in bildirim_dagitici.metrikler.items() if isinstance(v, int) and k != "en_yuksek_derinlik"}, "durum", "counter"))
+
+def telegram_istegi(metot, data, files=None, timeout=15, govde=None):
+    """Telegram Bot API çağrısı yapar; hız sınırlarına uyar, 429'da TelegramHizSiniri yükseltir.
+
+    `govde` (AkisliCokParcali) verilirse istek gövdesi olarak akışla gönderilir; `data` sadece hız sınırı içindir.
+    """
+    bildirim_dagitici.hiz_siniri_bekle(data.get("chat_id"))
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/{metot}"
+    baslangic = time.perf_counter()
+    try:
+        if govde is not None:
+            yanit = bildirim_dagitici.telegram_oturumu().post(
+                url, data=govde, headers={"Content-Type": govde.icerik_turu}, timeout=timeout)
+        else:
+            yanit = bildirim_dagitici.telegram_oturumu().post(url, data=data, files=files, timeout=timeout)
+    except requests.exceptions.RequestException:
+        metrik_kaydi["telegram_kod"].artir("hata")
+        raise
+    finally:
+        metrik_kaydi["telegram"].gozlemle(time.perf_counter() - baslangic, metot)
+    metrik_kaydi["telegram_kod"].artir(yanit.status_code)
+    if yanit.status_code < 500:
+        giden_kutusu.baglanti_geldi()
+    if yanit.status_code == 429:
         try:
+            retry_after = float(yanit.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            retry_after = 5.0
+        raise TelegramHizSiniri(retry_after)
+    return yanit
+
+def bildirim_alicilari(oncelik):
+    """Bu öncelikteki bildirimi alacak sohbetler; ilki (fotoğrafı yükleyen) her zaman TELEGRAM_CHAT_ID'dir."""
+    alicilar = [TELEGRAM_CHAT_ID]
+    for alici in TELEGRAM_ALICILAR:
+        if oncelik <= ONCELIK_ADLARI[alici.get("en_dusuk", "bilgi")] and alici["chat_id"] not in alicilar:
+            alicilar.append(alici["chat_id"])
+    return alicilar
+
+def dosya_kimligi(yanit):
+    """sendPhoto yanıtından en büyük boyutun file_id değerini okur (diğer sohbetlere yeniden yüklemeden gönderilir)."""
+    try:
+        return yanit.json()["result"]["photo"][-1]["file_id"]
+    except (ValueError, KeyError, TypeError, IndexError):
+        return None
+
+def mesaj_kimligi(yanit):
+    """Başarılı Telegram yanıtından message_id değerini okur."""
+    try:
+        return yanit.json()["result"]["message_id"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def frigate_goruntu_adresi(kamera):
+    """Kameranın son görüntüsünün adresi; FRIGATE_IP/PORT her çağrıda okunur (ayar yeniden yüklemesi)."""
+    return f"http://{FRIGATE_IP}:{FRIGATE_PORT}/api/{kamera}/latest.jpg?h=480"
+
+def frigate_goruntusu_al(camera_name, sessiz=False):
+    """Frigate'den kameranın son görüntüsünü indirir; alınamazsa None döndürür."""
+    photo_url = frigate_goruntu_adresi(camera_name)
+    try:
+        if not sessiz:
             print(f"Frigate'den görüntü indiriliyor: {photo_url}")
-            frigate_response = requests.get(photo_url, timeout=5)
-            if frigate_response.status_code == 200:
-                image_content = frigate_response.content
+        baslangic = time.perf_counter()
+        frigate_response = bildirim_dagitici.frigate_oturumu().get(photo_url, timeout=5)
+        metrik_kaydi["frigate"].gozlemle(time.perf_counter() - baslangic, frigate_response.status_code)
+        if frigate_response.status_code == 200:
+            if not sessiz:
                 print("Görüntü başarıyla indirildi.")
-            else:
-                print(f"Frigate'den görüntü alınamadı. HTTP Kodu: {frigate_response.status_code}")
-        except requests.exceptions.RequestException as e:
+            return frigate_response.content
+        if not sessiz:
+            print(f"Frigate'den görüntü alınamadı. HTTP Kodu: {frigate_response.status_code}")
+    except requests.exceptions.RequestException as e:
+        if not sessiz:
             print(f"Frigate sunucusuna bağlanırken hata oluştu: {e}")
+    return None
 
-        telegram_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-        for attempt in range(max_retry):
-            try:
-                if image_content:
-                    files = {'photo': image_content}
-                    data = {'chat_id': TELEGRAM_CHAT_ID, 'caption': message}
-                    telegram_response = requests.post(telegram_url, data=data, files=files, timeout=15)
-                    if telegram_response.status_code == 200:
-                        print("Fotoğraflı Telegram bildirimi başarıyla gönderildi.")
-                        break
-                    else:
-                        raise ValueError(f"Telegram fotoğraf yüklemesini reddetti: {telegram_response.status_code}")
+# --- FRIGATE GÖRÜNTÜ ÖNBELLEĞİ ---
+class GoruntuOnbellegi:
+    """Kamera başına son Frigate görüntüsünü tutar.
+
+    Bölge kuruluyken ya da kapı yakın zamanda hareket ettiyse ilgili kameranın görüntüsü arka planda
+    yenilenir; alarm bildirimi böylece ek bir Frigate isteği beklemeden gönderilir. Aynı kamera için
+    eş zamanlı istekler tek bir indirmede birleştirilir, eski kayıtlar yaşlarına göre silinir.
+    """
+
+    def __init__(self):
+        self._kilit = threading.Lock()
+        self._kayitlar = {}   # kamera -> (indirilme zamanı, jpeg baytları)
+        self._suren = {}      # kamera -> devam eden indirmenin bitişini bildiren Event
+        self.metrikler = {"isabet": 0, "indirme": 0, "birlestirilen": 0, "basarisiz": 0}
+
+    def al(self, kamera, maks_yas_ms=None):
+        """Yeterince taze görüntüyü döndürür; yoksa indirir (ya da süren indirmeyi bekler)."""
+        if maks_yas_ms is None:
+            maks_yas_ms = GORUNTU_MAKS_YAS_MS
+        with self._kilit:
+            kayit = self._kayitlar.get(kamera)
+            if kayit and (time.time() - kayit[0]) * 1000 <= maks_yas_ms:
+                self.metrikler["isabet"] += 1
+                return kayit[1]
+        return self.yenile(kamera)
+
+    def yenile(self, kamera):
+        """Kameranın görüntüsünü indirir; aynı kamera için süren bir indirme varsa onun sonucunu kullanır."""
+        with self._kilit:
+            bitti = self._suren.get(kamera)
+            lider = bitti is None
+            if lider:
+                bitti = self._suren[kamera] = threading.Event()
+            else:
+                self.metrikler["birlestirilen"] += 1
+
+        if not lider:
+            bitti.wait(timeout=10)
+            with self._kilit:
+                kayit = self._kayitlar.get(kamera)
+            return kayit[1] if kayit else None
+
+        try:
+            goruntu = frigate_goruntusu_al(kamera, sessiz=True)
+            with self._kilit:
+                self.metrikler["indirme"] += 1
+                if goruntu:
+                    self._kayitlar[kamera] = (time.time(), goruntu)
                 else:
-                    raise ValueError("Frigate görüntüsü mevcut değil.")
-            except (ValueError, requests.exceptions.RequestException) as e:
-                print(f"Hata nedeniyle sadece metin gönderiliyor (deneme {attempt+1}/{max_retry}): {e}")
-                try:
-                    url_text = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-                    error_note = "\n\n(Frigate'den kamera görüntüsü alınamadı.)" if attempt == max_retry - 1 else ""
-                    data_text = {'chat_id': TELEGRAM_CHAT_ID, 'text': message + error_note}
-                    response = requests.post(url_text, data=data_text, timeout=10)
-                    if response.status_code == 200:
-                        print("Metin bildirimi başarıyla gönderildi.")
-                        break
-                except Exception as text_error:
-                    print(f"Metin bildirimi de gönderilemedi: {text_error}")
-                    if attempt == max_retry - 1:
-                        print("Tüm Telegram gönderim denemeleri başarısız!")
-
-    threading.Thread(target=task).start()
-
-def send_telegram_silent_photo(message, camera_name="tapo"):
-    """Kapı hareketlerinde sessiz bildirim ve fotoğraf gönderir."""
-    def task():
-        FRIGATE_IP = "YOUR_FRIGATE_IP" # Frigate sunucunuzun yerel IP adresi
-        FRIGATE_PORT = 5000
-        photo_url = f"http://{FRIGATE_IP}:{FRIGATE_PORT}/api/{camera_name}/latest.jpg?h=480"
-        image_content = None
+                    self.metrikler["basarisiz"] += 1
+            return goruntu
+        finally:
+            with self._kilit:
+                del self._suren[kamera]
+            bitti.set()
+
+    async def ayenile(self, kamera, istemci):
+        """Asyncio modunda arka plan yenilemesi; aynı kamera için süren bir indirme varsa atlanır."""
+        with self._kilit:
+            if kamera in self._suren:
+                return
+            bitti = self._suren[kamera] = threading.Event()
         try:
-            frigate_response = requests.get(photo_url, timeout=5)
-            if frigate_response.status_code == 200:
-                image_content = frigate_response.content
-        except requests.exceptions.RequestException:
-            pass
+            url = frigate_goruntu_adresi(kamera)
+            baslangic = time.perf_counter()
+            try:
+                yanit = await istemci.get(url)
+                goruntu = yanit.content if yanit.status_code == 200 else None
+                metrik_kaydi["frigate"].gozlemle(time.perf_counter() - baslangic, yanit.status_code)
+            except httpx.HTTPError:
+                goruntu = None
+            with self._kilit:
+                self.metrikler["indirme"] += 1
+                if goruntu:
+                    self._kayitlar[kamera] = (time.time(), goruntu)
+                else:
+                    self.metrikler["basarisiz"] += 1
+        finally:
+            with self._kilit:
+                del self._suren[kamera]
+            bitti.set()
+
+    def eskileri_sil(self):
+        sinir = time.time() - GORUNTU_SAKLAMA_SURESI
+        with self._kilit:
+            for kamera in [k for k, (zaman, _) in self._kayitlar.items() if zaman < sinir]:
+                del self._kayitlar[kamera]
+
+    def ozet(self):
+        m = self.metrikler
+        return (f"Görüntü önbelleği | İsabet: {m['isabet']} | İndirme: {m['indirme']} | "
+                f"Birleştirilen: {m['birlestirilen']} | Başarısız: {m['basarisiz']}")
+
+
+goruntu_onbellegi = GoruntuOnbellegi()
 
-        telegram_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
+def sicak_kameralar(now):
+    """Görüntüsü sıcak tutulması gereken kameralar: bölgesi kurulu olan ya da kapısı yeni hareket edenler."""
+    kameralar = []
+    for bolge in bolgeler:
+        if bolge.kurulu or now - bolge.son_hareket < KAPI_HAREKET_SURESI:
+            if bolge.kamera not in kameralar:
+                kameralar.append(bolge.kamera)
+    return kameralar
+
+def goruntu_yenileme_dongusu(stop_event):
+    """Sadece gerektiğinde (kurulu bölge / hareketli kapı) kamera görüntülerini arka planda yeniler."""
+    print("Görüntü önbelleği yenileme döngüsü başlatıldı.")
+    while not stop_event.is_set():
+        for kamera in sicak_kameralar(time.time()):
+            goruntu_onbellegi.yenile(kamera)
+        goruntu_onbellegi.eskileri_sil()
+        stop_event.wait(GORUNTU_YENILEME_ARALIGI)
+
+def _yerinde_duzenle(message, anahtar, alicilar):
+    """Anahtarın daha önce gönderilmiş mesajlarını yerinde günceller; güncellenen sohbetler `alicilar`dan çıkarılır."""
+    kayitlar = bildirim_dagitici.duzenleme_kaydi(anahtar)
+    hedefler = [chat_id for chat_id in alicilar if chat_id in kayitlar]
+    if not hedefler:
+        return
+    metin = f"{message}\n\n🕒 Son güncelleme: {time.strftime('%H:%M:%S')}"
+
+    def duzenle(chat_id):
+        message_id, tip = kayitlar[chat_id]
         try:
-            if image_content:
-                files = {'photo': image_content}
-                data = {
-                    'chat_id': TELEGRAM_CHAT_ID,
-                    'caption': message,
-                    'disable_notification': True
-                }
-                requests.post(telegram_url, data=data, files=files, timeout=15)
+            if tip == "photo":
+                yanit = telegram_istegi("editMessageCaption", {'chat_id': chat_id, 'message_id': message_id, 'caption': metin}, timeout=10)
             else:
-                url_text = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-                data_text = {
-                    'chat_id': TELEGRAM_CHAT_ID,
-                    'text': message + "\n\n(Kamera görüntüsü alınamadı.)",
-                    'disable_notification': True
-                }
-                requests.post(url_text, data=data_text, timeout=10)
-        except Exception as e:
-            print(f"Sessiz bildirim gönderilemedi: {e}")
+                yanit = telegram_istegi("editMessageText", {'chat_id': chat_id, 'message_id': message_id, 'text': metin}, timeout=10)
+        except requests.exceptions.RequestException as e:
+            print(f"Mesaj yerinde güncellenemedi, yeni mesaj gönderilecek: {e}")
+            return False
+        if yanit.status_code == 200:
+            bildirim_dagitici.metrik_artir("duzenlenen")
+            alicilar.remove(chat_id)
+            return True
+        bildirim_dagitici.duzenlemeyi_birak(anahtar, chat_id)
+        return False
 
-    threading.Thread(target=task).start()
+    if any(bildirim_dagitici.alicilara_gonder(hedefler, duzenle).values()):
+        print("Alarm mesajı yerinde güncellendi.")
 
-# --- DURUMU DOSYADA SAKLAMA ---
-def save_system_state():
-    with open(SYSTEM_STATE_FILE, "w") as f:
-        state = []
-        state.append("AKTIF1" if sistem_kurulu1 else "DEAKTIF1")
-        state.append("AKTIF2" if sistem_kurulu2 else "DEAKTIF2")
-        state.append("OTOMATIK_KAPALI" if otomatik_alarm_kapali else "OTOMATIK_ACIK")
-        f.write(",".join(state))
-        f.flush()
-        os.fsync(f.fileno())
+def fotografi_dagit(gonderim, camera_name, gonder, goruntu=None):
+    """Fotoğrafı ilk alıcıya yükler, diğerlerine dönen file_id ile eşzamanlı gönderir; kullanılan baytları döndürür.
 
-def load_system_state():
-    global sistem_kurulu1, sistem_kurulu2, otomatik_alarm_kapali
-    if os.path.exists(SYSTEM_STATE_FILE):
-        with open(SYSTEM_STATE_FILE, "r") as f:
-            state = f.read().strip().split(",")
-            sistem_kurulu1 = "AKTIF1" in state
-            sistem_kurulu2 = "AKTIF2" in state
-            otomatik_alarm_kapali = "OTOMATIK_KAPALI" in state
-    else:
-        sistem_kurulu1 = False
-        sistem_kurulu2 = False
-        otomatik_alarm_kapali = False
+    `gonder(chat_id, foto)` foto olarak bayt (yükleme), file_id veya None (sadece metin) alır ve
+    gönderilen fotoğrafın file_id'sini döndürür. `gonderim` 429 sonrası kuyruğa geri konan işte de
+    aynı nesnedir; böylece tekrar denemede sadece kalan alıcılara, yeniden yüklemeden gönderilir.
+    Ulaşılamayan alıcılar `gonderim["alicilar"]` içinde kalır. `goruntu` verilmezse önbellekten alınır;
+    kamerası olmayan (bölgeye bağlı olmayan) bildirimde Frigate'e hiç gidilmez.
+    """
+    alicilar = gonderim["alicilar"]
+    if gonderim["file_id"] is None and alicilar:
+        if not goruntu and camera_name:
+            goruntu = goruntu_onbellegi.al(camera_name)
+        if goruntu:
+            ilk = alicilar[0]
+            sonuc = bildirim_dagitici.alicilara_gonder([ilk], lambda chat_id: gonder(chat_id, goruntu))
+            if ilk in sonuc:
+                alicilar.remove(ilk)
+                gonderim["file_id"] = sonuc[ilk] or ""
+        else:
+            gonderim["file_id"] = ""  # Görüntü yok; tüm alıcılara metin gider
+    if alicilar and gonderim["file_id"] is not None:
+        foto = gonderim["file_id"] or goruntu
+        bildirim_dagitici.alicilara_gonder(alicilar, lambda chat_id: gonder(chat_id, foto))
+    return goruntu
 
-def sensor_polling_loop(stop_event):
-    """Her iki kapı sensörünü ayrı ayrı okur ve alarmı tetikler."""
-    global alarm1_tetiklendi_mi, alarm2_tetiklendi_mi, sistem_kurulu1, sistem_kurulu2
-    sensor_polling_loop.kapali_baslangic1 = None
-    sensor_polling_loop.kapali_baslangic2 = None
-    sensor_polling_loop.alarm_warning_sent1 = False
-    sensor_polling_loop.alarm_warning_sent2 = False
-    print("Sensör okuma döngüsü başlatıldı.")
-
-    # İlk değerleri başlat
-    last_pin_degeri1 = lgpio.gpio_read(gpio_handle, KAPI1_SENSOR_PIN)
-    last_pin_degeri2 = lgpio.gpio_read(gpio_handle, KAPI2_SENSOR_PIN)
-    alarm_repeat_time = 10
-    alarm1_last_sent = 0
-    alarm2_last_sent = 0
+def _foto_istegi(data, foto):
+    """Bayt ise dosya olarak yükler, değilse önceden yüklenmiş fotoğrafın file_id'si ile sendPhoto çağırır."""
+    if isinstance(foto, bytes):
+        yanit = telegram_istegi("sendPhoto", data, files={'photo': foto}, timeout=15)
+        sayac = "foto_yukleme"
+    else:
+        yanit = telegram_istegi("sendPhoto", dict(data, photo=foto), timeout=15)
+        sayac = "foto_yeniden"
+    if yanit.status_code == 200:
+        bildirim_dagitici.metrik_artir(sayac)
+    return yanit
 
-    while not stop_event.is_set():
+def _fotografli_gonder(chat_id, message, foto, max_retry, anahtar, kamerali=True):
+    """`kamerali` False ise (bildirimin kamerası yok) fotoğraf beklenmez; metin hata notu olmadan gider."""
+    gecici = False  # Son başarısızlık ağ hatası/5xx mi (giden kutusuna alınır), yoksa kalıcı bir ret mi
+    for attempt in range(max_retry):
         try:
-            pin_degeri1 = lgpio.gpio_read(gpio_handle, KAPI1_SENSOR_PIN)
-            pin_degeri2 = lgpio.gpio_read(gpio_handle, KAPI2_SENSOR_PIN)
-            now = time.time()
-
-            # Mazot Tankı 1 için otomatik kurulum ve uyarı
-            if not sistem_kurulu1 and not otomatik_alarm_kapali:
-                # Mazot Tankı 1 için sayaçlar ve otomatik kurulum
-                # Kapı 1 kapalıysa
-                if pin_degeri1 == 0:
-                    if sensor_polling_loop.kapali_baslangic1 is None:
-                        sensor_polling_loop.kapali_baslangic1 = now
-                        sensor_polling_loop.alarm_warning_sent1 = False
-                    elapsed1 = now - sensor_polling_loop.kapali_baslangic1 if sensor_polling_loop.kapali_baslangic1 else 0
-                    if elapsed1 > 3300 and not sensor_polling_loop.alarm_warning_sent1:
-                        send_telegram_notification("⏰ Mazot Tankı 1 kapısı 55 dakikadır kapalı. 5 dakika sonra alarm otomatik olarak kurulacak!", camera_name="tapo")
-                        sensor_polling_loop.alarm_warning_sent1 = True
-                    if elapsed1 > 3600:
-                        sistem_kurulu1 = True
-                        alarm1_tetiklendi_mi = False
-                        save_system_state()
-                        if mqtt_client:
-                            mqtt_client.publish(MQTT_DURUM_TOPIC, "KURULU1", retain=True)
-                        send_telegram_notification("ℹ️ Mazot Tankı 1 kapısı 1 saatten fazla kapalı kaldı. Alarm otomatik olarak KURULDU.", camera_name="tapo")
-                        print("Mazot Tankı 1 kapısı 1 saat kapalı kaldı, alarm otomatik kuruldu.")
-                        sensor_polling_loop.kapali_baslangic1 = None
-                        sensor_polling_loop.alarm_warning_sent1 = False
-                else:
-                    sensor_polling_loop.kapali_baslangic1 = None
-                    sensor_polling_loop.alarm_warning_sent1 = False
-
-            # Mazot Tankı 2 için otomatik kurulum ve uyarı
-            if not sistem_kurulu2 and not otomatik_alarm_kapali:
-                # Mazot Tankı 2 için sayaçlar ve otomatik kurulum
-                # Kapı 2 kapalıysa
-                if pin_degeri2 == 0:
-                    if sensor_polling_loop.kapali_baslangic2 is None:
-                        sensor_polling_loop.kapali_baslangic2 = now
-                        sensor_polling_loop.alarm_warning_sent2 = False
-                    elapsed2 = now - sensor_polling_loop.kapali_baslangic2 if sensor_polling_loop.kapali_baslangic2 else 0
-                    if elapsed2 > 3300 and not sensor_polling_loop.alarm_warning_sent2:
-                        send_telegram_notification("⏰ Mazot Tankı 2 kapısı 55 dakikadır kapalı. 5 dakika sonra alarm otomatik olarak kurulacak!", camera_name="tapo2")
-                        sensor_polling_loop.alarm_warning_sent2 = True
-                    if elapsed2 > 3600:
-                        sistem_kurulu2 = True
-                        alarm2_tetiklendi_mi = False
-                        save_system_state()
-                        if mqtt_client:
-                            mqtt_client.publish(MQTT_DURUM_TOPIC, "KURULU2", retain=True)
-                        send_telegram_notification("ℹ️ Mazot Tankı 2 kapısı 1 saatten fazla kapalı kaldı. Alarm otomatik olarak KURULDU.", camera_name="tapo2")
-                        print("Mazot Tankı 2 kapısı 1 saat kapalı kaldı, alarm otomatik kuruldu.")
-                        sensor_polling_loop.kapali_baslangic2 = None
-                        sensor_polling_loop.alarm_warning_sent2 = False
+            if foto:
+                data = {'chat_id': chat_id, 'caption': message}
+                telegram_response = _foto_istegi(data, foto)
+                if telegram_response.status_code == 200:
+                    print(f"Fotoğraflı Telegram bildirimi başarıyla gönderildi ({chat_id}).")
+                    if anahtar:
+                        bildirim_dagitici.duzenleme_kaydet(anahtar, chat_id, mesaj_kimligi(telegram_response), "photo")
+                    return dosya_kimligi(telegram_response) or (foto if isinstance(foto, str) else None)
                 else:
-                    sensor_polling_loop.kapali_baslangic2 = None
-                    sensor_polling_loop.alarm_warning_sent2 = False
-
-            # Kapı durumu değişimini algıla (sessiz bildirim)
-            if pin_degeri1 != last_pin_degeri1:
-                if not sistem_kurulu1:
-                    if pin_degeri1 == 1:
-                        send_telegram_silent_photo("🚪 Mazot Tankı 1 kapısı açıldı (alarm devre dışı).", camera_name="tapo")
-                    else:
-                        send_telegram_silent_photo("🚪 Mazot Tankı 1 kapısı kapandı (alarm devre dışı).", camera_name="tapo")
-                last_pin_degeri1 = pin_degeri1
-
-            if pin_degeri2 != last_pin_degeri2:
-                if not sistem_kurulu2:
-                    if pin_degeri2 == 1:
-                        send_telegram_silent_photo("🚪 Mazot Tankı 2 kapısı açıldı (alarm devre dışı).", camera_name="tapo2")
-                    else:
-                        send_telegram_silent_photo("🚪 Mazot Tankı 2 kapısı kapandı (alarm devre dışı).", camera_name="tapo2")
-                last_pin_degeri2 = pin_degeri2
-
-            # --- Alarm tetikleme ve tekrar bildirimi ---
-            if sistem_kurulu1:
-                # Mazot Tankı 1 alarmı
-                if pin_degeri1 == 1 or alarm1_tetiklendi_mi:
-                    if not alarm1_tetiklendi_mi:
-                        alarm1_tetiklendi_mi = True
-                        alarm1_last_sent = now
-                        print("ALARM1! Sistem kurulu iken Mazot Tankı 1 kapısı açıldı!")
-                        lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_ACIK)
-                        if mqtt_client:
-                            mqtt_client.publish(MQTT_DURUM_TOPIC, "ALARM1_CALIYOR", retain=True)
-                        send_telegram_notification("🚨🚨🚨 ALARM1! 🚨🚨🚨\nMAZOT TANKI 1 KAPISI ZORLA AÇILDI!\nLütfen hemen müdahale edin!", camera_name="tapo")
-                    elif now - alarm1_last_sent > alarm_repeat_time:
-                        alarm1_last_sent = now
-                        if pin_degeri1 == 1:
-                            send_telegram_notification("🚨🚨🚨 ALARM1 DEVAM EDİYOR! 🚨🚨🚨\nMazot Tankı 1 kapısı HALA AÇIK! Lütfen hemen müdahale edin!", camera_name="tapo")
-                        else:
-                            send_telegram_notification("🚨🚨🚨 ALARM1 DEVAM EDİYOR! 🚨🚨🚨\nKapı kapandı ancak alarm durumu siz devre dışı bırakana kadar devam edecek!", camera_name="tapo")
-                        lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_ACIK)
-
-            if sistem_kurulu2:
-                # Mazot Tankı 2 alarmı
-                if pin_degeri2 == 1 or alarm2_tetiklendi_mi:
-                    if not alarm2_tetiklendi_mi:
-                        alarm2_tetiklendi_mi = True
-                        alarm2_last_sent = now
-                        print("ALARM2! Sistem kurulu iken Mazot Tankı 2 kapısı açıldı!")
-                        lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_ACIK)
-                        if mqtt_client:
-                            mqtt_client.publish(MQTT_DURUM_TOPIC, "ALARM2_CALIYOR", retain=True)
-                        send_telegram_notification("🚨🚨🚨 ALARM2! 🚨🚨🚨\nMAZOT TANKI 2 KAPISI ZORLA AÇILDI!\nLütfen hemen müdahale edin!", camera_name="tapo2")
-                    elif now - alarm2_last_sent > alarm_repeat_time:
-                        alarm2_last_sent = now
-                        if pin_degeri2 == 1:
-                            send_telegram_notification("🚨🚨🚨 ALARM2 DEVAM EDİYOR! 🚨🚨🚨\nMazot Tankı 2 kapısı HALA AÇIK! Lütfen hemen müdahale edin!", camera_name="tapo2")
-                        else:
-                            send_telegram_notification("🚨🚨🚨 ALARM2 DEVAM EDİYOR! 🚨🚨🚨\nKapı kapandı ancak alarm durumu siz devre dışı bırakana kadar devam edecek!", camera_name="tapo2")
-                        lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_ACIK)
-
-            # Sistem devre dışı bırakıldıysa alarmı ve röleyi kapat
-            if not sistem_kurulu1 and not sistem_kurulu2:
-                if alarm1_tetiklendi_mi or alarm2_tetiklendi_mi:
-                    alarm1_tetiklendi_mi = False
-                    alarm2_tetiklendi_mi = False
-                    lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_KAPALI)
-                    if mqtt_client:
-                        mqtt_client.publish(MQTT_DURUM_TOPIC, "DEVRE_DISI", retain=True)
-                    send_telegram_notification("✅ Alarm devre dışı bırakıldı, sistem kapandı.")
-            time.sleep(0.1)
-        except Exception as e:
-            print(f"Sensör okuma döngüsünde hata: {e}")
-            time.sleep(1)
+                    raise ValueError(f"Telegram fotoğraf yüklemesini reddetti: {telegram_response.status_code}")
+            else:
+                raise ValueError("Frigate görüntüsü mevcut değil.")
+        except (ValueError, requests.exceptions.RequestException) as e:
+            if kamerali:
+                print(f"Hata nedeniyle sadece metin gönderiliyor (deneme {attempt+1}/{max_retry}): {e}")
+            try:
+                error_note = "\n\n(Frigate'den kamera görüntüsü alınamadı.)" if kamerali and attempt == max_retry - 1 else ""
+                data_text = {'chat_id': chat_id, 'text': message + error_note}
+                response = telegram_istegi("sendMessage", data_text, timeout=10)
+                if response.status_code == 200:
+                    print(f"Metin bildirimi başarıyla gönderildi ({chat_id}).")
+                    if anahtar:
+                        bildirim_dagitici.duzenleme_kaydet(anahtar, chat_id, mesaj_kimligi(response), "text")
+                    return None
+                gecici = response.status_code >= 500
+            except TelegramHizSiniri:
+                raise
+            except Exception as text_error:
+                print(f"Metin bildirimi de gönderilemedi: {text_error}")
+                gecici = isinstance(text_error, requests.exceptions.RequestException)
+                if attempt == max_retry - 1:
+                    print("Tüm Telegram gönderim denemeleri başarısız!")
+    if gecici:
+        raise BildirimGonderilemedi(f"{chat_id} sohbetine {max_retry} denemede ulaşılamadı")
+    return None
 
-def on_connect(client, userdata, flags, rc):
-    """MQTT broker'a bağlanınca çalışır."""
-    if rc == 0:
-        print("MQTT Broker'a başarıyla bağlanıldı.")
-        client.publish(MQTT_DURUM_TOPIC, "DEVRE_DISI", retain=True)
-    else:
-        print(f"MQTT bağlantı hatası! Kod: {rc}")
+def _fotografli_bildirim_gorevi(message, camera_name, max_retry, anahtar, gonderim):
+    if giden_kutusu.kesintide():
+        max_retry = 1  # Bağlantı zaten yok; denemeler işçiyi bekletmesin, bildirim sırasıyla giden kutusuna girsin
+    if anahtar:
+        _yerinde_duzenle(message, anahtar, gonderim["alicilar"])
+    goruntu = fotografi_dagit(gonderim, camera_name, lambda chat_id, foto: _fotografli_gonder(
+        chat_id, message, foto, max_retry, anahtar, kamerali=camera_name is not None))
+    if gonderim["alicilar"]:
+        giden_kutusu.ekle(message, camera_name, gonderim, goruntu, anahtar=anahtar)
 
-# --- TELEGRAM KOMUTLARI ---
-async def aktifet1_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """/aktifet1 komutunu işler."""
-    global sistem_kurulu1, alarm1_tetiklendi_mi
-    sensor_polling_loop.kapali_baslangic1 = None
-    sensor_polling_loop.alarm_warning_sent1 = False
-
-    if not sistem_kurulu1:
-        sistem_kurulu1 = True
-        alarm1_tetiklendi_mi = False
-        save_system_state()
-        print("Mazot Tankı 1 '/aktifet1' komutu ile kuruldu (ARMED).")
-        if mqtt_client:
-            mqtt_client.publish(MQTT_DURUM_TOPIC, "KURULU1", retain=True)
-        await update.message.reply_text("✅ Mazot Tankı 1 için sistem kuruldu.")
-    else:
-        await update.message.reply_text("ℹ️ Mazot Tankı 1 zaten kurulu.")
+def _sessiz_gonder(chat_id, message, foto, kamerali=True):
+    try:
+        if foto:
+            data = {
+                'chat_id': chat_id,
+                'caption': message,
+                'disable_notification': True
+            }
+            yanit = _foto_istegi(data, foto)
+        else:
+            data_text = {
+                'chat_id': chat_id,
+                'text': message + ("\n\n(Kamera görüntüsü alınamadı.)" if kamerali else ""),
+                'disable_notification': True
+            }
+            yanit = telegram_istegi("sendMessage", data_text, timeout=10)
+        if yanit.status_code >= 500:
+            raise requests.exceptions.HTTPError(f"Telegram {yanit.status_code} döndürdü", response=yanit)
+        return dosya_kimligi(yanit)
+    except TelegramHizSiniri:
+        raise
+    except requests.exceptions.RequestException as e:
+        raise BildirimGonderilemedi(f"Sessiz bildirim {chat_id} sohbetine gönderilemedi: {e}") from e
+    except Exception as e:
+        print(f"Sessiz bildirim gönderilemedi: {e}")
+    return None
 
-async def deaktifet1_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """/deaktifet1 komutunu işler ve kimin yaptığını bildirir."""
-    global sistem_kurulu1, alarm1_tetiklendi_mi
-    sensor_polling_loop.kapali_baslangic1 = None
-    sensor_polling_loop.alarm_warning_sent1 = False
+def _sessiz_fotograf_gorevi(message, camera_name, gonderim):
+    goruntu = fotografi_dagit(gonderim, camera_name, lambda chat_id, foto: _sessiz_gonder(
+        chat_id, message, foto, kamerali=camera_name is not None))
+    if gonderim["alicilar"]:
+        giden_kutusu.ekle(message, camera_name, gonderim, goruntu, sessiz=True)
 
-    user = update.message.from_user
-    user_info = user.first_name
-    if user.last_name:
-        user_info += f" {user.last_name}"
+def send_telegram_notification(message, camera_name=None, max_retry=3, oncelik=ONCELIK_BILGI, anahtar=None):
+    """Bildirim gönderir. Frigate'den fotoğrafı önce indirir, sonra Telegram'a yükler; kamera yoksa sadece metin.
 
-    if sistem_kurulu1:
-        sistem_kurulu1 = False
-        alarm1_tetiklendi_mi = False
-        save_system_state()
-        lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_KAPALI)
-        message = f"❌ Mazot Tankı 1 için sistem, **{user_info}** tarafından devre dışı bırakıldı."
-        print(f"Mazot Tankı 1, kullanıcı '{user_info}' (ID: {user.id}) tarafından devre dışı bırakıldı.")
-        await update.message.reply_text(message, parse_mode='Markdown')
-        if mqtt_client:
-            mqtt_client.publish(MQTT_DURUM_TOPIC, "DEVRE_DISI1", retain=True)
-    else:
-        await update.message.reply_text("ℹ️ Mazot Tankı 1 zaten devre dışı.")
+    Fotoğraf bir kez yüklenir; önceliği süzgecinden geçen diğer alıcılara (TELEGRAM_ALICILAR) file_id ile gider.
+    `anahtar` verilirse kuyrukta bekleyen aynı anahtarlı bildirimle birleştirilir ve daha önce
+    gönderilmiş mesaj varsa yeni mesaj yerine o mesaj yerinde güncellenir.
+    """
+    federasyon_olayini_yayinla(message, camera_name, oncelik, anahtar)
+    if not TELEGRAM_BOT_TOKEN:
+        return
+    gonderim = {"alicilar": bildirim_alicilari(oncelik), "file_id": None, "oncelik": oncelik, "t": time.time()}
+    bildirim_dagitici.ekle(_fotografli_bildirim_gorevi, message, camera_name, max_retry, anahtar, gonderim,
+                           oncelik=oncelik, anahtar=anahtar)
 
-async def aktifet2_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """/aktifet2 komutunu işler."""
-    global sistem_kurulu2, alarm2_tetiklendi_mi
-    sensor_polling_loop.kapali_baslangic2 = None
-    sensor_polling_loop.alarm_warning_sent2 = False
+def send_telegram_silent_photo(message, camera_name=None):
+    """Kapı hareketlerinde sessiz bildirim ve fotoğraf gönderir (kamera verilmezse sadece metin)."""
+    federasyon_olayini_yayinla(message, camera_name, ONCELIK_SESSIZ, sessiz=True)
+    if not TELEGRAM_BOT_TOKEN:
+        return
+    gonderim = {"alicilar": bildirim_alicilari(ONCELIK_SESSIZ), "file_id": None, "oncelik": ONCELIK_SESSIZ,
+                "t": time.time()}
+    bildirim_dagitici.ekle(_sessiz_fotograf_gorevi, message, camera_name, gonderim, oncelik=ONCELIK_SESSIZ)
 
-    if not sistem_kurulu2:
-        sistem_kurulu2 = True
-        alarm2_tetiklendi_mi = False
-        save_system_state()
-        print("Mazot Tankı 2 '/aktifet2' komutu ile kuruldu (ARMED).")
-        if mqtt_client:
-            mqtt_client.publish(MQTT_DURUM_TOPIC, "KURULU2", retain=True)
-        await update.message.reply_text("✅ Mazot Tankı 2 için sistem kuruldu.")
-    else:
-        await update.message.reply_text("ℹ️ Mazot Tankı 2 zaten kurulu.")
 
-async def deaktifet2_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """/deaktifet2 komutunu işler ve kimin yaptığını bildirir."""
-    global sistem_kurulu2, alarm2_tetiklendi_mi
-    sensor_polling_loop.kapali_baslangic2 = None
-    sensor_polling_loop.alarm_warning_sent2 = False
+# --- GİDEN KUTUSU (KESİNTİDE BİLDİRİM SAKLAMA) ---
+class GidenKutusu:
+    """Telegram'a ulaşılamadığında gönderilemeyen bildirimleri fotoğraflarıyla diskte saklar ve sırayla yeniden gönderir.
 
-    user = update.message.from_user
-    user_info = user.first_name
-    if user.last_name:
-        user_info += f" {user.last_name}"
+    Her bildirim ayrı bir dosyadır: 12 bayt başlık (JSON uzunluğu, JSON CRC32, fotoğraf CRC32) + JSON + fotoğraf.
+    Dosya .tmp olarak yazılıp fsync edildikten sonra yerine taşınır; elektrik kesintisinde yarım dosya kalmaz.
+    Bellekte sadece kısa özetler tutulur, fotoğraf baytları gönderim sırasında diskten okunur. Aynı anahtarlı
+    (ya da aynı metinli) bekleyen bildirim tekrar gelirse eskisi silinir ve yenisi tekrar sayısıyla saklanır.
+    GIDEN_KUTUSU_MAKS_BOYUT / GIDEN_KUTUSU_MAKS_ADET aşılırsa önce en düşük öncelikli en eski bildirim silinir.
+    Yeniden gönderme olay zamanı en eski olandan başlar; başarısızlıkta bekleme GIDEN_KUTUSU_ILK_BEKLEME'den başlayıp ikiye
+    katlanır, başka bir Telegram isteği başarılı olunca (bağlantı geri geldi) beklemeden denenir.
+    """
 
-    if sistem_kurulu2:
-        sistem_kurulu2 = False
-        alarm2_tetiklendi_mi = False
-        save_system_state()
-        lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_KAPALI)
-        message = f"❌ Mazot Tankı 2 için sistem, **{user_info}** tarafından devre dışı bırakıldı."
-        print(f"Mazot Tankı 2, kullanıcı '{user_info}' (ID: {user.id}) tarafından devre dışı bırakıldı.")
-        await update.message.reply_text(message, parse_mode='Markdown')
-        if mqtt_client:
-            mqtt_client.publish(MQTT_DURUM_TOPIC, "DEVRE_DISI2", retain=True)
-    else:
-        await update.message.reply_text("ℹ️ Mazot Tankı 2 zaten devre dışı.")
+    BASLIK = struct.Struct("<III")  # JSON uzunluğu, JSON crc32, fotoğraf crc32
+    UZANTI = ".bildirim"
 
-async def otomatikalarmkapat_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    global otomatik_alarm_kapali
-    otomatik_alarm_kapali = True
-    save_system_state()
-    await update.message.reply_text("✅ Otomatik alarm kurulumları saat 18:30'a kadar devre dışı bırakıldı.")
-
-def otomatik_alarm_reset_gorevi():
-    global otomatik_alarm_kapali, sistem_kurulu1, sistem_kurulu2, gpio_handle, mqtt_client
-    otomatik_kurulum_baslangic = None
-    
-    while True:
-        now = time.localtime()
-        current_time = time.time()
-        
-        # 18:30'da otomatik alarmları tekrar aktif et
-        if otomatik_alarm_kapali and (now.tm_hour > 18 or (now.tm_hour == 18 and now.tm_min >= 30)):
-            otomatik_alarm_kapali = False
-            save_system_state()
-            otomatik_kurulum_baslangic = current_time
-            send_telegram_notification("ℹ️ Otomatik alarm kurulumları tekrar aktif edildi. 5 dakika sonra kapalı kapılar varsa alarmlar otomatik kurulacak!")
-        
-        # 5 dakika sonra alarmları kur (30 saniye uyarısı kaldırıldı)
-        if (otomatik_kurulum_baslangic is not None and 
-            not otomatik_alarm_kapali and 
-            current_time - otomatik_kurulum_baslangic >= 300):  # 5 dakika = 300 saniye
-            
-            kurulum_yapildi = False
-            
-            # Tank 1 kontrolü
-            if not sistem_kurulu1 and gpio_handle is not None:
-                try:
-                    pin_degeri1 = lgpio.gpio_read(gpio_handle, KAPI1_SENSOR_PIN)
-                    if pin_degeri1 == 0:  # Kapı kapalıysa
-                        sistem_kurulu1 = True
-                        kurulum_yapildi = True
-                        if mqtt_client:
-                            mqtt_client.publish(MQTT_DURUM_TOPIC, "KURULU1", retain=True)
-                        send_telegram_notification("🔒 Mazot Tankı 1 otomatik alarm süresi doldu - Alarm KURULDU!", camera_name="tapo")
-                        print("Mazot Tankı 1 otomatik alarm süresi sonunda kuruldu.")
-                    else:
-                        send_telegram_notification("⚠️ Mazot Tankı 1 kapısı açık olduğu için alarm kurulamadı.", camera_name="tapo")
-                except Exception as e:
-                    print(f"Tank 1 otomatik kurulum hatası: {e}")
-            
-            # Tank 2 kontrolü
-            if not sistem_kurulu2 and gpio_handle is not None:
-                try:
-                    pin_degeri2 = lgpio.gpio_read(gpio_handle, KAPI2_SENSOR_PIN)
-                    if pin_degeri2 == 0:  # Kapı kapalıysa
-                        sistem_kurulu2 = True
-                        kurulum_yapildi = True
-                        if mqtt_client:
-                            mqtt_client.publish(MQTT_DURUM_TOPIC, "KURULU2", retain=True)
-                        send_telegram_notification("🔒 Mazot Tankı 2 otomatik alarm süresi doldu - Alarm KURULDU!", camera_name="tapo2")
-                        print("Mazot Tankı 2 otomatik alarm süresi sonunda kuruldu.")
-                    else:
-                        send_telegram_notification("⚠️ Mazot Tankı 2 kapısı açık olduğu için alarm kurulamadı.", camera_name="tapo2")
-                except Exception as e:
-                    print(f"Tank 2 otomatik kurulum hatası: {e}")
-            
-            # State kaydet ve süreç bitir
-            if kurulum_yapildi:
-                save_system_state()
-            
-            otomatik_kurulum_baslangic = None
-        
-        time.sleep(60)
+    def __init__(self, dizin):
+        self.dizin = dizin
+        self._kosul = threading.Condition()
+        self._ozetler = {}  # sira -> {"oncelik", "birlesim", "boyut", "tekrar", "ilk"}
+        self._sira = 0
+        self._boyut = 0
+        self._kesinti = False
+        self._uyandir = threading.Event()
+        self._durdu = threading.Event()
+        self._thread = None
+        self.metrikler = {"eklenen": 0, "birlestirilen": 0, "gonderilen": 0, "dusurulen": 0, "deneme": 0}
 
-# --- ANA PROGRAM ---
-def main():
-    global gpio_handle, mqtt_client, sistem_kurulu1, sistem_kurulu2
-    stop_event = threading.Event()
-    sensor_thread = None
-    heartbeat_thread = None
+    def _yol(self, sira):
+        return os.path.join(self.dizin, f"{sira:010d}{self.UZANTI}")
 
-    try:
-        load_system_state()
+    def ac(self):
+        """Dizindeki bekleyen bildirimlerin özetlerini yükler ve yeniden gönderme thread'ini başlatır."""
+        if not self.dizin:
+            return
+        os.makedirs(self.dizin, exist_ok=True)
+        for ad in sorted(os.listdir(self.dizin)):
+            yol = os.path.join(self.dizin, ad)
+            if ad.endswith(".tmp"):
+                os.remove(yol)  # Yazılırken kesilmiş
+                continue
+            if not ad.endswith(self.UZANTI):
+                continue
+            try:
+                sira = int(ad[:-len(self.UZANTI)])
+                kayit, _ = self._oku(sira, foto_oku=False)
+            except (OSError, ValueError) as e:
+                print(f"Giden kutusunda bozuk dosya siliniyor ({ad}): {e}")
+                os.remove(yol)
+                continue
+            self._ozetler[sira] = self._ozet(kayit, os.path.getsize(yol))
+            self._boyut += os.path.getsize(yol)
+            self._sira = max(self._sira, sira)
+        self._kesinti = bool(self._ozetler)
+        self._thread = threading.Thread(target=self._dongu, name="giden-kutusu", daemon=True)
+        self._thread.start()
+        print(f"Giden kutusu açıldı ({len(self._ozetler)} bekleyen bildirim, {self._boyut // 1024} KB).")
 
-        # GPIO Kurulumu
-        gpio_handle = lgpio.gpiochip_open(GPIO_CHIP)
-        lgpio.gpio_claim_output(gpio_handle, ALARM_ROLE_PIN)
-        lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_KAPALI)
-        flags = lgpio.SET_PULL_UP
-        lgpio.gpio_claim_input(gpio_handle, KAPI1_SENSOR_PIN, flags)
-        lgpio.gpio_claim_input(gpio_handle, KAPI2_SENSOR_PIN, flags)
-        print("GPIO kurulumu tamamlandı.")
+    def kapat(self):
+        if self._thread is None:
+            return
+        self._durdu.set()
+        self._uyandir.set()
+        with self._kosul:
+            self._kosul.notify_all()
+        self._thread.join(timeout=5)
+        self._thread = None
 
-        # Kapıların anlık durumu
+    @staticmethod
+    def _ozet(kayit, boyut):
+        return {"oncelik": kayit["oncelik"], "birlesim": kayit["birlesim"], "boyut": boyut,
+                "tekrar": kayit["tekrar"], "ilk": kayit["ilk"]}
+
+    def _oku(self, sira, foto_oku=True):
+        with open(self._yol(sira), "rb") as f:
+            uzunluk, json_crc, foto_crc = self.BASLIK.unpack(f.read(self.BASLIK.size))
+            govde = f.read(uzunluk)
+            if len(govde) < uzunluk or zlib.crc32(govde) != json_crc:
+                raise ValueError("başlık ya da CRC uyuşmuyor")
+            kayit = json.loads(govde)
+            foto = f.read() if foto_oku else None
+        if foto is not None and (not foto or zlib.crc32(foto) != foto_crc):
+            foto = None  # Fotoğraf bozuksa bildirim metin olarak gider
+        return kayit, foto
+
+    def _yaz(self, sira, kayit, foto):
+        """Kaydı atomik olarak diske yazar; dosya boyutunu döndürür."""
+        govde = json.dumps(kayit, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        foto = foto or b""
+        yol = self._yol(sira)
+        with open(yol + ".tmp", "wb") as f:
+            f.write(self.BASLIK.pack(len(govde), zlib.crc32(govde), zlib.crc32(foto)) + govde + foto)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(yol + ".tmp", yol)
+        return self.BASLIK.size + len(govde) + len(foto)
+
+    def _cikar(self, sira):
+        """Özeti ve dosyayı siler (kilit tutulurken çağrılır)."""
+        ozet = self._ozetler.pop(sira, None)
+        if ozet is None:
+            return
+        self._boyut -= ozet["boyut"]
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._yol(sira))
+
+    def kesintide(self):
+        """Telegram'a son denemede ulaşılamadı ve giden kutusunda bekleyen bildirim var mı."""
+        with self._kosul:
+            return self._kesinti and bool(self._ozetler)
+
+    def baglanti_geldi(self):
+        """Başarılı bir Telegram yanıtından sonra çağrılır; bekleyenler beklemeden yeniden gönderilir."""
+        with self._kosul:
+            if not self._ozetler:
+                return
+            self._kesinti = False
+        if threading.current_thread() is not self._thread:
+            self._uyandir.set()
+
+    def ekle(self, message, camera_name, gonderim, goruntu, anahtar=None, sessiz=False):
+        """`gonderim["alicilar"]`de kalan (ulaşılamayan) alıcılar için bildirimi saklar."""
+        if self._thread is None:
+            print(f"Bildirim {len(gonderim['alicilar'])} alıcıya gönderilemedi ve saklanamadı (giden kutusu kapalı).")
+            return
+        olay = gonderim.get("t", time.time())
+        kayit = {
+            "t": olay, "ilk": olay, "tekrar": 0, "mesaj": message, "kamera": camera_name,
+            "oncelik": gonderim.get("oncelik", ONCELIK_BILGI), "sessiz": sessiz, "anahtar": anahtar,
+            "birlesim": f"anahtar:{anahtar}" if anahtar else f"metin:{message}",
+            "alicilar": list(gonderim["alicilar"]), "file_id": gonderim["file_id"] or None,
+        }
+        if kayit["file_id"]:
+            goruntu = None  # Fotoğraf Telegram'da; yeniden göndermede file_id yeter
+        with self._kosul:
+            self._sira += 1
+            sira = self._sira
+            eski = next((s for s, o in self._ozetler.items() if o["birlesim"] == kayit["birlesim"]), None)
+            if eski is not None:
+                kayit["ilk"] = self._ozetler[eski]["ilk"]
+                kayit["tekrar"] = self._ozetler[eski]["tekrar"] + 1
+            self._kesinti = True
+        if eski is not None:
+            with contextlib.suppress(OSError, ValueError):
+                eski_alicilar = self._oku(eski, foto_oku=False)[0]["alicilar"]
+                kayit["alicilar"] += [a for a in eski_alicilar if a not in kayit["alicilar"]]
         try:
-            pin_degeri1 = lgpio.gpio_read(gpio_handle, KAPI1_SENSOR_PIN)
-            pin_degeri2 = lgpio.gpio_read(gpio_handle, KAPI2_SENSOR_PIN)
-            kapi_durum1 = "Kapalı" if pin_degeri1 == 0 else "Açık"
-            kapi_durum2 = "Kapalı" if pin_degeri2 == 0 else "Açık"
-        except Exception:
-            kapi_durum1 = "Bilinmiyor"
-            kapi_durum2 = "Bilinmiyor"
+            boyut = self._yaz(sira, kayit, goruntu)
+        except OSError as e:
+            print(f"Bildirim giden kutusuna yazılamadı, kayboldu: {e}")
+            return
+        with self._kosul:
+            if eski is not None and eski in self._ozetler:
+                self._cikar(eski)
+                self.metrikler["birlestirilen"] += 1
+            self._ozetler[sira] = self._ozet(kayit, boyut)
+            self._boyut += boyut
+            self.metrikler["eklenen"] += 1
+            self._sinirla()
+            self._kosul.notify_all()
+        print(f"Bildirim giden kutusuna alındı, bağlantı gelince gönderilecek ({len(self._ozetler)} bekliyor).")
 
-        alarm_durum1 = "KURULU" if sistem_kurulu1 else "DEVRE DIŞI"
-        alarm_durum2 = "KURULU" if sistem_kurulu2 else "DEVRE DIŞI"
+    def _sinirla(self):
+        """Boyut/adet sınırı aşıldıysa en düşük öncelikli en eski bildirimleri siler (kilit tutulurken çağrılır)."""
+        while self._ozetler and (len(self._ozetler) > GIDEN_KUTUSU_MAKS_ADET or self._boyut > GIDEN_KUTUSU_MAKS_BOYUT):
+            kurban = min(self._ozetler, key=lambda s: (-self._ozetler[s]["oncelik"], s))
+            self._cikar(kurban)
+            self.metrikler["dusurulen"] += 1
+            print("Giden kutusu dolu, en eski düşük öncelikli bildirim silindi.")
 
-        mesaj = ""
-        if os.path.exists(CLEAN_SHUTDOWN_FLAG):
-            mesaj = f"✅ Sistem normal şekilde başlatıldı.\n\n🔒 Mazot Tankı 1 alarm durumu: {alarm_durum1}\n🚪 Mazot Tankı 1 kapı durumu: {kapi_durum1}\n🔒 Mazot Tankı 2 alarm durumu: {alarm_durum2}\n🚪 Mazot Tankı 2 kapı durumu: {kapi_durum2}"
-            send_telegram_notification(mesaj)
-            os.remove(CLEAN_SHUTDOWN_FLAG)
+    def _tekrar_gonder(self, kayit, foto):
+        """Kaydı kalan alıcılarına gönderir; (gönderim, 429 bekleme süresi ya da None) döndürür."""
+        olay = time.strftime("%d.%m %H:%M:%S", time.localtime(kayit["ilk"]))
+        not_ = f"olay: {olay}"
+        if kayit["tekrar"]:
+            not_ += f", kesintide {kayit['tekrar'] + 1} kez tekrarlandı, son: {time.strftime('%H:%M:%S', time.localtime(kayit['t']))}"
+        mesaj = f"{kayit['mesaj']}\n\n⏳ Bağlantı kesintisi nedeniyle gecikmeli gönderildi ({not_})"
+        gonderim = {"alicilar": list(kayit["alicilar"]), "oncelik": kayit["oncelik"],
+                    "file_id": kayit["file_id"] or (None if foto else "")}
+        kamerali = kayit["kamera"] is not None
+        if kayit["sessiz"]:
+            gonder = lambda chat_id, f: _sessiz_gonder(chat_id, mesaj, f, kamerali)
         else:
-            mesaj = f"⚠️ DİKKAT: Sistem beklenmedik bir kesinti sonrası yeniden başlatıldı!\n\n🔒 Mazot Tankı 1 alarm durumu: {alarm_durum1}\n🚪 Mazot Tankı 1 kapı durumu: {kapi_durum1}\n🔒 Mazot Tankı 2 alarm durumu: {alarm_durum2}\n🚪 Mazot Tankı 2 kapı durumu: {kapi_durum2}"
-            send_telegram_notification(mesaj)
-            send_heartbeat()
+            gonder = lambda chat_id, f: _fotografli_gonder(chat_id, mesaj, f, 1, None, kamerali)
+        try:
+            fotografi_dagit(gonderim, kayit["kamera"], gonder, goruntu=foto)
+        except TelegramHizSiniri as e:
+            return gonderim, e.retry_after
+        return gonderim, None
 
-        print("Telegram Bot dinleyicisi başlatılıyor...")
-        application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
-        application.add_handler(CommandHandler("aktifet1", aktifet1_command))
-        application.add_handler(CommandHandler("deaktifet1", deaktifet1_command))
-        application.add_handler(CommandHandler("aktifet2", aktifet2_command))
-        application.add_handler(CommandHandler("deaktifet2", deaktifet2_command))
-        application.add_handler(CommandHandler("otomatikalarmkapat", otomatikalarmkapat_command))
-
-        # Otomatik alarm reset görevini başlat
-        otomatik_alarm_thread = threading.Thread(target=otomatik_alarm_reset_gorevi)
-        otomatik_alarm_thread.daemon = True
-        otomatik_alarm_thread.start()
-
-        sensor_thread = threading.Thread(target=sensor_polling_loop, args=(stop_event,))
-        heartbeat_thread = threading.Thread(target=heartbeat_loop, args=(stop_event,))
-        sensor_thread.start()
-        heartbeat_thread.start()
-
-        mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, "SecurityControllerPi5")
-        mqtt_client.on_connect = on_connect
-        mqtt_client.connect(MQTT_BROKER_IP, MQTT_PORT, 60)
-        mqtt_client.loop_start()
-        print("MQTT istemcisi arka planda başlatıldı.")
-
-        application.run_polling()
+    def _dongu(self):
+        bekleme = GIDEN_KUTUSU_ILK_BEKLEME
+        while not self._durdu.is_set():
+            with self._kosul:
+                while not self._ozetler and not self._durdu.is_set():
+                    self._kosul.wait()
+                if self._durdu.is_set():
+                    return
+                sira = min(self._ozetler, key=lambda s: (self._ozetler[s]["ilk"], s))
+            try:
+                kayit, foto = self._oku(sira)
+            except (OSError, ValueError) as e:
+                print(f"Giden kutusundaki bildirim okunamadı, siliniyor: {e}")
+                with self._kosul:
+                    self._cikar(sira)
+                continue
+            self._uyandir.clear()
+            with self._kosul:
+                self.metrikler["deneme"] += 1
+            gonderim, hiz_siniri = self._tekrar_gonder(kayit, foto)
+            if not gonderim["alicilar"]:
+                with self._kosul:
+                    self._cikar(sira)
+                    self.metrikler["gonderilen"] += 1
+                    self._kesinti = False
+                bekleme = GIDEN_KUTUSU_ILK_BEKLEME
+                continue
+            if gonderim["alicilar"] != kayit["alicilar"] or (gonderim["file_id"] or None) != kayit["file_id"]:
+                # Kısmen gönderildi: yeniden başlatmada tamamlanan alıcılara tekrar gitmesin
+                kayit["alicilar"], kayit["file_id"] = gonderim["alicilar"], gonderim["file_id"] or None
+                with self._kosul:
+                    guncel = sira in self._ozetler
+                if guncel:
+                    with contextlib.suppress(OSError):
+                        boyut = self._yaz(sira, kayit, None if kayit["file_id"] else foto)
+                        with self._kosul:
+                            if sira in self._ozetler:
+                                self._boyut += boyut - self._ozetler[sira]["boyut"]
+                                self._ozetler[sira]["boyut"] = boyut
+            if hiz_siniri is not None:
+                self._durdu.wait(hiz_siniri)
+                continue
+            with self._kosul:
+                self._kesinti = True
+                bekleyen = len(self._ozetler)
+            print(f"Giden kutusu: Telegram'a ulaşılamadı, {bekleme} sn sonra tekrar denenecek "
+                  f"({bekleyen} bildirim bekliyor).")
+            self._uyandir.wait(bekleme)
+            bekleme = min(bekleme * 2, GIDEN_KUTUSU_MAKS_BEKLEME)
 
-    finally:
-        print("\nProgram sonlandırılıyor...")
-        save_system_state()
-        with open(CLEAN_SHUTDOWN_FLAG, "w") as f:
-            f.write("shutdown")
-        stop_event.set()
-        if sensor_thread: sensor_thread.join()
-        if heartbeat_thread: heartbeat_thread.join()
-        if mqtt_client: mqtt_client.loop_stop()
-        if gpio_handle:
-            lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_KAPALI)
+    def bekleyen(self):
+        with self._kosul:
+            return {"adet": len(self._ozetler), "bayt": self._boyut}
+
+    def ozet(self):
+        with self._kosul:
+            m = dict(self.metrikler)
+            adet, boyut = len(self._ozetler), self._boyut
+        return (f"Giden kutusu | Bekleyen: {adet} ({boyut // 1024} KB) | Eklenen: {m['eklenen']} | "
+                f"Birleştirilen: {m['birlestirilen']} | Gönderilen: {m['gonderilen']} | Düşürülen: {m['dusurulen']}")
+
+
+giden_kutusu = GidenKutusu(GIDEN_KUTUSU_DIZINI)
+metrik_kaydi.ekle("giden_kutusu", Gosterge(
+    "guvenlik_giden_kutusu_bekleyen", "Giden kutusunda (diskte) bekleyen bildirimler.", lambda: giden_kutusu.bekleyen(), "birim"))
+metrik_kaydi.ekle("giden_kutusu_sayac", Gosterge(
+    "guvenlik_giden_kutusu_toplam", "Giden kutusu sayaçları.", lambda: dict(giden_kutusu.metrikler), "durum", "counter"))
+
+# --- ALARM KLİBİ (FRIGATE OLAY KAYDI) ---
+class AkisliCokParcali:
+    """multipart/form-data gövdesi; dosya kısmı kaynaktan (Frigate yanıtı) okundukça parça parça üretilir.
+
+    Dosya boyutu biliniyorsa `len` özniteliği requests'e Content-Length verir, bilinmiyorsa gövde chunked
+    gönderilir ve ALARM_KLIBI_MAKS_BOYUT aşılınca yükleme kesilir. Klibin tamamı hiçbir zaman bellekte
+    tutulmaz; en fazla bir kaynak parçası (ALARM_KLIBI_PARCA_BOYUTU) kadar tampon kullanılır.
+    """
+
+    def __init__(self, alanlar, dosya_alani, dosya_adi, icerik_turu, kaynak, dosya_boyutu=None):
+        sinir = secrets.token_hex(16)
+        self.icerik_turu = f"multipart/form-data; boundary={sinir}"
+        on = "".join(f'--{sinir}\r\nContent-Disposition: form-data; name="{ad}"\r\n\r\n{deger}\r\n'
+                     for ad, deger in alanlar.items())
+        on += (f'--{sinir}\r\nContent-Disposition: form-data; name="{dosya_alani}"; filename="{dosya_adi}"\r\n'
+               f"Content-Type: {icerik_turu}\r\n\r\n")
+        self._son = f"\r\n--{sinir}--\r\n".encode()
+        self._tampon = bytearray(on.encode("utf-8"))
+        self._kaynak = iter(kaynak)
+        self._beklenen = dosya_boyutu
+        self._bitti = False
+        self.aktarilan = 0
+        if dosya_boyutu is not None:
+            self.len = len(self._tampon) + dosya_boyutu + len(self._son)
+
+    def _doldur(self):
+        parca = next(self._kaynak, b"")
+        if parca:
+            self.aktarilan += len(parca)
+            sinir = self._beklenen if self._beklenen is not None else ALARM_KLIBI_MAKS_BOYUT
+            if self.aktarilan > sinir:
+                raise ValueError(f"Klip {sinir} baytı aştı, yükleme kesildi.")
+            self._tampon += parca
+            return
+        if self._beklenen is not None and self.aktarilan != self._beklenen:
+            raise ValueError(f"Klip beklenenden kısa bitti ({self.aktarilan}/{self._beklenen} bayt).")
+        self._tampon += self._son
+        self._bitti = True
+
+    def read(self, n=-1):
+        while not self._bitti and (n < 0 or len(self._tampon) < n):
+            self._doldur()
+        if n < 0 or n > len(self._tampon):
+            n = len(self._tampon)
+        parca = bytes(self._tampon[:n])
+        del self._tampon[:n]
+        return parca
+
+    def __iter__(self):
+        while True:
+            parca = self.read(ALARM_KLIBI_PARCA_BOYUTU)
+            if not parca:
+                return
+            yield parca
+
+
+def frigate_adresi(yol):
+    """Frigate API adresi; FRIGATE_IP/PORT her çağrıda okunur (ayar yeniden yüklemesi)."""
+    return f"http://{FRIGATE_IP}:{FRIGATE_PORT}{yol}"
+
+def alarm_olayini_bul(kamera, alarm_zamani):
+    """Frigate'te alarm anına denk gelen, klibi olan olayı döndürür; yoksa ya da Frigate'e ulaşılamazsa None."""
+    parametreler = {"camera": kamera, "has_clip": 1, "after": int(alarm_zamani - 300), "limit": 20}
+    try:
+        yanit = bildirim_dagitici.frigate_oturumu().get(frigate_adresi("/api/events"), params=parametreler, timeout=5)
+        olaylar = yanit.json() if yanit.status_code == 200 else []
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Frigate olayları sorgulanamadı: {e}")
+        return None
+    uygun = [olay for olay in olaylar
+             if olay.get("start_time") is not None and olay["start_time"] <= alarm_zamani + ALARM_KLIBI_MAKS_SURE
+             and (olay.get("end_time") is None or olay["end_time"] >= alarm_zamani - ALARM_KLIBI_ON_SURE)]
+    return min(uygun, key=lambda olay: abs(olay["start_time"] - alarm_zamani), default=None)
+
+def alarm_klibi_adresi(kamera, olay, alarm_zamani, simdi):
+    """Gönderilecek klibin adresini ve süresini döndürür; olay sürüyor ve pencere henüz kaydedilmediyse None.
+
+    ALARM_KLIBI_MAKS_SURE'den kısa biten olayın kendi klibi, daha uzun ya da süren olaylarda ise alarmdan
+    ALARM_KLIBI_ON_SURE önce başlayan pencere Frigate'in kayıtlarından kesilir.
+    """
+    bitis = olay.get("end_time")
+    if bitis is not None and bitis - olay["start_time"] <= ALARM_KLIBI_MAKS_SURE:
+        return frigate_adresi(f"/api/events/{olay['id']}/clip.mp4"), bitis - olay["start_time"]
+    baslangic = max(olay["start_time"], alarm_zamani - ALARM_KLIBI_ON_SURE)
+    son = baslangic + ALARM_KLIBI_MAKS_SURE if bitis is None else min(baslangic + ALARM_KLIBI_MAKS_SURE, bitis)
+    if bitis is None and simdi < son + 10:
+        return None  # Frigate kayıtları ~10 sn'lik parçalar halinde yazar; pencerenin sonu henüz diskte değil
+    return frigate_adresi(f"/api/{kamera}/start/{int(baslangic)}/end/{int(son)}/clip.mp4"), son - baslangic
+
+def video_kimligi(yanit):
+    """sendVideo yanıtından file_id okur (Telegram kısa klipleri animation/document olarak da döndürebilir)."""
+    try:
+        sonuc = yanit.json()["result"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    for alan in ("video", "animation", "document"):
+        if isinstance(sonuc.get(alan), dict):
+            return sonuc[alan].get("file_id")
+    return None
+
+def klibi_yukle(chat_id, adres, caption):
+    """Klibi Frigate'ten okurken sendVideo ile Telegram'a aktarır; file_id döndürür."""
+    with bildirim_dagitici.frigate_oturumu().get(adres, stream=True, timeout=(5, 60)) as kaynak:
+        if kaynak.status_code != 200:
+            raise ValueError(f"Frigate klibi vermedi: HTTP {kaynak.status_code}")
+        boyut = int(kaynak.headers.get("Content-Length") or 0) or None
+        if boyut is not None and boyut > ALARM_KLIBI_MAKS_BOYUT:
+            raise ValueError(f"Klip çok büyük ({boyut // 1024} KB > {ALARM_KLIBI_MAKS_BOYUT // 1024} KB).")
+        govde = AkisliCokParcali({"chat_id": chat_id, "caption": caption, "supports_streaming": "true"},
+                                 "video", "alarm.mp4", "video/mp4", kaynak.iter_content(ALARM_KLIBI_PARCA_BOYUTU), boyut)
+        yanit = telegram_istegi("sendVideo", {"chat_id": chat_id}, timeout=(10, 300), govde=govde)
+    if yanit.status_code != 200:
+        raise ValueError(f"Telegram klibi reddetti: {yanit.status_code}")
+    bildirim_dagitici.metrik_artir("klip")
+    print(f"Alarm klibi gönderildi ({govde.aktarilan // 1024} KB, {chat_id}).")
+    return video_kimligi(yanit)
+
+def klibi_dagit(klip):
+    """Klibi ilk alıcıya akışla yükler, diğerlerine file_id ile gönderir; olmazsa olay küçük resmine düşer.
+
+    `klip` 429 sonrası kuyruğa geri konan işte de aynı sözlüktür: tekrar denemede klip yeniden yüklenmez,
+    sadece kalan alıcılara gider. TelegramHizSiniri dağıtıcıya bırakılır (gönderimler duraklatılır).
+    """
+    alicilar = klip["alicilar"]
+    if klip["yedek"] is None:
+        try:
+            if klip["file_id"] is None:
+                klip["file_id"] = klibi_yukle(alicilar[0], klip["adres"], klip["caption"]) or ""
+                del alicilar[0]
+            if klip["file_id"] and alicilar:
+                bildirim_dagitici.alicilara_gonder(alicilar, lambda chat_id: telegram_istegi(
+                    "sendVideo", {"chat_id": chat_id, "video": klip["file_id"], "caption": klip["caption"]}, timeout=15))
+            return
+        except (ValueError, OSError, requests.exceptions.RequestException) as e:
+            print(f"Alarm klibi gönderilemedi, olayın küçük resmi gönderiliyor: {e}")
+        olay = klip["olay"]
+        try:
+            yanit = bildirim_dagitici.frigate_oturumu().get(frigate_adresi(f"/api/events/{olay['id']}/thumbnail.jpg"), timeout=5)
+            klip["kucuk_resim"] = yanit.content if yanit.status_code == 200 else None
+        except requests.exceptions.RequestException:
+            klip["kucuk_resim"] = None
+        klip["yedek"] = {"alicilar": list(alicilar), "file_id": None if klip["kucuk_resim"] else "",
+                         "oncelik": ONCELIK_KRITIK, "t": olay["start_time"]}
+    mesaj = f"{klip['caption']}\n(Klip gönderilemedi; olayın küçük resmi.)"
+    kamera = klip["bolge"].kamera
+    kucuk_resim = fotografi_dagit(klip["yedek"], kamera, lambda chat_id, foto: _fotografli_gonder(chat_id, mesaj, foto, 1, None),
+                                  goruntu=klip["kucuk_resim"])
+    if klip["yedek"]["alicilar"]:
+        giden_kutusu.ekle(mesaj, kamera, klip["yedek"], kucuk_resim)
+
+alarm_klibi_kilidi = threading.Lock()
+bekleyen_klipler = {}  # bölge no -> klibi beklenen alarmın zamanı
+
+def _alarm_klibi_gorevi(klip):
+    """Dağıtıcı işi: Frigate'te olayı bir kez yoklar; klip hazırsa gönderir, değilse yoklamayı yeniden planlar."""
+    bolge = klip["bolge"]
+    bitti = True
+    try:
+        if klip["alicilar"] is None:
+            klip["olay"] = alarm_olayini_bul(bolge.kamera, klip["alarm"]) or klip["olay"]
+            simdi = time.time()
+            hedef = None
+            if klip["olay"]:
+                hedef = alarm_klibi_adresi(bolge.kamera, klip["olay"], klip["alarm"],
+                                           simdi if simdi < klip["bitis"] else math.inf)
+            if not hedef:
+                if simdi < klip["bitis"]:
+                    bitti = False
+                    zamanlayici.sonra(ALARM_KLIBI_YOKLAMA_ARALIGI, _alarm_klibini_kuyruga_al, klip)
+                else:
+                    print(f"ALARM{bolge.no} için Frigate'te klipli olay bulunamadı ({bolge.kamera}).")
+                return
+            klip["adres"], sure = hedef
+            saat = time.strftime("%H:%M:%S", time.localtime(klip["alarm"]))
+            klip["caption"] = f"🎬 ALARM{bolge.no} kaydı: {bolge.ad} ({saat}, {sure:.0f} sn)"
+            klip["alicilar"] = bildirim_alicilari(ONCELIK_KRITIK)
+        klibi_dagit(klip)
+    except TelegramHizSiniri:
+        bitti = False  # Dağıtıcı işi aynı `klip` ile kuyruğa geri koyar
+        raise
+    finally:
+        if bitti:
+            with alarm_klibi_kilidi:
+                bekleyen_klipler.pop(bolge.no, None)
+
+def _alarm_klibini_kuyruga_al(klip):
+    """Zamanlayıcıdan çağrılır: Frigate yoklaması ve yükleme sınırlı dağıtıcıda kritik iş olarak çalışır."""
+    bildirim_dagitici.ekle(_alarm_klibi_gorevi, klip, oncelik=ONCELIK_KRITIK, anahtar=f"klip{klip['bolge'].no}")
+
+def alarm_klibini_planla(bolge, alarm_zamani):
+    """ALARM_KLIBI_AKTIF ise klibin Frigate'te aranmasını zamanlayıcıya ekler; sensör döngüsünü bekletmez.
+
+    Bölgenin klibi zaten bekliyorsa (örn. kapı art arda açılıp kapanıyor) yeni istek ona katılır: ilk alarmın
+    olayı ALARM_KLIBI_MAKS_SURE'lik pencereyle sonrakileri de kapsar, aynı anda birden fazla yükleme başlamaz.
+    """
+    if not ALARM_KLIBI_AKTIF or not TELEGRAM_BOT_TOKEN:
+        return
+    with alarm_klibi_kilidi:
+        if bolge.no in bekleyen_klipler:
+            print(f"ALARM{bolge.no} klibi zaten bekliyor; yeni alarm onunla birleştirildi.")
+            return
+        bekleyen_klipler[bolge.no] = alarm_zamani
+    klip = {"bolge": bolge, "alarm": alarm_zamani, "bitis": alarm_zamani + ALARM_KLIBI_EN_GEC, "olay": None,
+            "adres": None, "caption": None, "alicilar": None, "file_id": None, "yedek": None, "kucuk_resim": None}
+    zamanlayici.sonra(ALARM_KLIBI_YOKLAMA_ARALIGI, _alarm_klibini_kuyruga_al, klip)
+
+
+# --- ALARM ÖNCESİ KARE TAMPONU ---
+class KareHalkasi:
+    """Sabit sayıda (zaman, jpeg) yuvası olan halka tampon; dolunca en eski karenin üzerine yazılır."""
+
+    def __init__(self, boyut):
+        self._yuvalar = [None] * boyut
+        self._yazilan = 0
+        self._kilit = threading.Lock()
+
+    def ekle(self, zaman, jpeg):
+        with self._kilit:
+            self._yuvalar[self._yazilan % len(self._yuvalar)] = (zaman, jpeg)
+            self._yazilan += 1
+
+    def aralik(self, baslangic, bitis):
+        """[baslangic, bitis] aralığındaki kareler, zamana göre sıralı."""
+        with self._kilit:
+            return sorted(kare for kare in self._yuvalar if kare and baslangic <= kare[0] <= bitis)
+
+
+class KareTamponu:
+    """Kurulu bölgelerin kameralarından son kareleri kamera başına halka tamponda tutar.
+
+    Bir bölge kuruluyken her KARE_TAMPONU_ARALIGI'nda kameranın latest.jpg'si bir işçi havuzunda indirilir.
+    Pillow kuruluysa kare havuzda KARE_YUKSEKLIGI'ne küçültülüp yeniden JPEG'e kodlanır; değilse Frigate'e
+    ?h= ile küçültülmüş kare istetilir. Alarm anında sensör döngüsü sadece zamanlayıcıya bir iş ekler;
+    KARE_SONRASI saniye sonra T-KARE_ONCESI..T+KARE_SONRASI arasındaki kareler (en fazla 10) medya grubu
+    olarak kritik alıcılara gönderilir. Aynı kamera için önceki indirme bitmediyse o tur atlanır.
+    """
+
+    def __init__(self):
+        self._halkalar = {}   # kamera -> KareHalkasi
+        self._suren = set()   # İndirmesi süren kameralar
+        self._kilit = threading.Lock()
+        self._havuz = None
+        self._thread = None
+        self._durdu = threading.Event()
+        self._pillow = None   # PIL.Image modülü; yoksa False (Frigate ?h= kullanılır)
+        self.metrikler = {"kare": 0, "basarisiz": 0, "atlanan": 0, "grup": 0}
+
+    def baslat(self):
+        if not KARE_TAMPONU_AKTIF or self._thread is not None:
+            return
+        self._durdu.clear()
+        self._havuz = concurrent.futures.ThreadPoolExecutor(KARE_ISCI_SAYISI, "kare")
+        self._thread = threading.Thread(target=self._dongu, name="KareTamponu", daemon=True)
+        self._thread.start()
+        print(f"Alarm öncesi kare tamponu başlatıldı ({KARE_TAMPONU_BOYUTU} kare, {KARE_TAMPONU_ARALIGI} sn aralık).")
+
+    def durdur(self):
+        if self._thread is None:
+            return
+        self._durdu.set()
+        self._thread.join(timeout=2)
+        self._thread = None
+        self._havuz.shutdown(wait=False, cancel_futures=True)
+        self._havuz = None
+
+    def _dongu(self):
+        while not self._durdu.wait(KARE_TAMPONU_ARALIGI):
+            zaman = time.time()
+            for kamera in {bolge.kamera for bolge in bolgeler if bolge.kurulu}:
+                with self._kilit:
+                    if kamera in self._suren:
+                        self.metrikler["atlanan"] += 1
+                        continue
+                    self._suren.add(kamera)
+                self._havuz.submit(self._kare_al, kamera, zaman)
+
+    def _pillow_modulu(self):
+        if self._pillow is None:
+            try:
+                with acilis_olcumu.adim("import:PIL.Image"):
+                    self._pillow = importlib.import_module("PIL.Image")
+            except ImportError:
+                print("Pillow kurulu değil; kareler Frigate'te küçültülecek (?h=).")
+                self._pillow = False
+        return self._pillow
+
+    def _kucult(self, pillow, jpeg):
+        with pillow.open(io.BytesIO(jpeg)) as resim:
+            resim.draft("RGB", (resim.width * KARE_YUKSEKLIGI // resim.height, KARE_YUKSEKLIGI))
+            resim = resim.convert("RGB")
+            resim.thumbnail((resim.width * KARE_YUKSEKLIGI // resim.height, KARE_YUKSEKLIGI))
+            cikti = io.BytesIO()
+            resim.save(cikti, "JPEG", quality=KARE_JPEG_KALITESI)
+        return cikti.getvalue()
+
+    def _kare_al(self, kamera, zaman):
+        try:
+            pillow = self._pillow_modulu()
+            adres = frigate_adresi(f"/api/{kamera}/latest.jpg" + ("" if pillow else f"?h={KARE_YUKSEKLIGI}"))
+            yanit = bildirim_dagitici.frigate_oturumu().get(adres, timeout=max(KARE_TAMPONU_ARALIGI * 2, 1))
+            if yanit.status_code != 200:
+                raise ValueError(f"HTTP {yanit.status_code}")
+            jpeg = self._kucult(pillow, yanit.content) if pillow else yanit.content
+            with self._kilit:
+                halka = self._halkalar.get(kamera)
+                if halka is None:
+                    halka = self._halkalar[kamera] = KareHalkasi(KARE_TAMPONU_BOYUTU)
+                self.metrikler["kare"] += 1
+            halka.ekle(zaman, jpeg)
+        except (requests.exceptions.RequestException, OSError, ValueError):
+            with self._kilit:
+                self.metrikler["basarisiz"] += 1
+        finally:
+            with self._kilit:
+                self._suren.discard(kamera)
+
+    def kareler(self, kamera, baslangic, bitis, en_fazla=10):
+        """Aralıktaki kareler; fazlaysa aralığa eşit yayılan en fazla `en_fazla` tanesi."""
+        with self._kilit:
+            halka = self._halkalar.get(kamera)
+        kareler = halka.aralik(baslangic, bitis) if halka else []
+        if len(kareler) <= en_fazla:
+            return kareler
+        return [kareler[round(i * (len(kareler) - 1) / (en_fazla - 1))] for i in range(en_fazla)]
+
+    def alarm(self, bolge, alarm_zamani):
+        """Sensör döngüsünden çağrılır: kare grubunu alarmdan KARE_SONRASI sonra gönderilmek üzere planlar."""
+        if self._thread is None or not TELEGRAM_BOT_TOKEN:
+            return
+        zamanlayici.sonra(KARE_SONRASI + KARE_TAMPONU_ARALIGI, self._grubu_kuyruga_al, bolge, alarm_zamani)
+
+    def _grubu_kuyruga_al(self, bolge, alarm_zamani):
+        saat = time.strftime("%H:%M:%S", time.localtime(alarm_zamani))
+        mesaj = f"📸 ALARM{bolge.no} anı: {bolge.ad} ({saat}, -{KARE_ONCESI:g}/+{KARE_SONRASI:g} sn)"
+        gonderim = {"alicilar": bildirim_alicilari(ONCELIK_KRITIK), "file_id": None, "oncelik": ONCELIK_KRITIK,
+                    "t": alarm_zamani}
+        bildirim_dagitici.ekle(_kare_grubu_gorevi, bolge.kamera, mesaj, alarm_zamani, gonderim, oncelik=ONCELIK_KRITIK)
+
+    def grup_gonderildi(self):
+        with self._kilit:
+            self.metrikler["grup"] += 1
+
+    def ozet(self):
+        with self._kilit:
+            m = dict(self.metrikler)
+        return (f"Kare tamponu | Kare: {m['kare']} | Başarısız: {m['basarisiz']} | Atlanan tur: {m['atlanan']} | "
+                f"Gönderilen grup: {m['grup']}")
+
+
+kare_tamponu = KareTamponu()
+metrik_kaydi.ekle("kare_tamponu", Gosterge(
+    "guvenlik_kare_tamponu_toplam", "Alarm öncesi kare tamponu sayaçları.", lambda: dict(kare_tamponu.metrikler), "durum", "counter"))
+
+def _medya_grubu_gonder(chat_id, ogeler):
+    """Kareleri tek sendMediaGroup ile gönderir; `ogeler` (altyazı, bayt ya da file_id) listesidir.
+
+    Baytlar attach:// ile yüklenir, file_id'ler yeniden yüklenmez. Fotoğrafların file_id listesini döndürür.
+    """
+    medya, dosyalar = [], {}
+    for sira, (altyazi, foto) in enumerate(ogeler):
+        if isinstance(foto, bytes):
+            dosyalar[f"kare{sira}"] = (f"kare{sira}.jpg", foto, "image/jpeg")
+            foto = f"attach://kare{sira}"
+        medya.append({"type": "photo", "media": foto, "caption": altyazi})
+    try:
+        yanit = telegram_istegi("sendMediaGroup", {"chat_id": chat_id, "media": json.dumps(medya, ensure_ascii=False)},
+                                files=dosyalar or None, timeout=30)
+    except requests.exceptions.RequestException as e:
+        raise BildirimGonderilemedi(f"Kare grubu {chat_id} sohbetine gönderilemedi: {e}") from e
+    if yanit.status_code >= 500:
+        raise BildirimGonderilemedi(f"Kare grubu {chat_id} sohbetine gönderilemedi: HTTP {yanit.status_code}")
+    if yanit.status_code != 200:
+        print(f"Telegram kare grubunu reddetti: {yanit.status_code}")
+        return None
+    bildirim_dagitici.metrik_artir("foto_yukleme" if dosyalar else "foto_yeniden", len(ogeler))
+    try:
+        return [mesaj["photo"][-1]["file_id"] for mesaj in yanit.json()["result"]]
+    except (ValueError, KeyError, TypeError, IndexError):
+        return None
+
+def _kare_grubu_gorevi(kamera, mesaj, alarm_zamani, gonderim):
+    kareler = kare_tamponu.kareler(kamera, alarm_zamani - KARE_ONCESI, alarm_zamani + KARE_SONRASI)
+    if len(kareler) < 2:
+        # Medya grubu en az iki öğe ister; tek kare (ya da hiç) varsa normal fotoğraf yolu kullanılır
+        goruntu = fotografi_dagit(gonderim, kamera, lambda chat_id, foto: _fotografli_gonder(chat_id, mesaj, foto, 1, None),
+                                  goruntu=kareler[0][1] if kareler else None)
+    else:
+        altyazilar = [f"T{zaman - alarm_zamani:+.1f} sn" for zaman, _ in kareler]
+        altyazilar[0] = f"{mesaj}\n{altyazilar[0]}"
+        alicilar = gonderim["alicilar"]
+        if gonderim["file_id"] is None and alicilar:
+            ilk = alicilar[0]
+            sonuc = bildirim_dagitici.alicilara_gonder(
+                [ilk], lambda chat_id: _medya_grubu_gonder(chat_id, list(zip(altyazilar, [jpeg for _, jpeg in kareler]))))
+            if ilk in sonuc:
+                alicilar.remove(ilk)
+                gonderim["file_id"] = sonuc[ilk] or ""
+        if alicilar and gonderim["file_id"] is not None:
+            ogeler = list(zip(altyazilar, gonderim["file_id"] or [jpeg for _, jpeg in kareler]))
+            bildirim_dagitici.alicilara_gonder(alicilar, lambda chat_id: _medya_grubu_gonder(chat_id, ogeler))
+        # Giden kutusu tek fotoğraf saklar: alarm anına en yakın kare
+        goruntu = min(kareler, key=lambda kare: abs(kare[0] - alarm_zamani))[1]
+    kare_tamponu.grup_gonderildi()
+    if gonderim["alicilar"]:
+        giden_kutusu.ekle(mesaj, kamera, {**gonderim, "file_id": None}, goruntu)
+
+
+# --- OLAY GÜNLÜĞÜ (DURUM KAYDI) ---
+class OlayGunlugu:
+    """Durum değişikliklerini, kapı hareketlerini ve alarmları ekleme-yalnız (append-only) günlüğe yazar.
+
+    Her kayıt 4 bayt uzunluk + 4 bayt CRC32 + JSON gövdeden oluşur. Kayıtlar ayrı bir thread'de
+    toplanıp tek write + fsync ile diske yazılır (group commit); böylece her kurma/devre dışı bırakmada
+    dosyanın tamamı yeniden yazılmaz ve SD kart daha az yıpranır. Belirli sayıda kayıttan sonra durumun
+    anlık görüntüsü alınır; açılışta sadece anlık görüntüden sonraki kayıtlar yeniden oynatılır.
+    Günlük GUNLUK_SEGMENT_BOYUTU'nu aşınca yeni bir segmente geçilir, eski segmentlerin sadece son
+    GUNLUK_SAKLANAN_SEGMENT kadarı tutulur. Her segment tam durumu içeren bir "anlik" kaydıyla başlar:
+    anlık görüntü okunamazsa (bir önceki anlık görüntü .bak dosyasında saklanır, o da yoksa) saklanan
+    en eski segment tek başına tam durumu verir.
+    """
+
+    BASLIK = struct.Struct("<II")  # uzunluk, crc32
+
+    def __init__(self, onek, anlik_dosyasi):
+        self.onek = onek
+        self.anlik_dosyasi = anlik_dosyasi
+        self.durum = {"kurulu": {}, "otomatik_kapali": False}
+        self._kosul = threading.Condition()
+        self._bekleyen = []
+        self._kapaniyor = False
+        self._dosya = None
+        self._segment = 0
+        self._anliktan_beri = 0
+        self._yazici = None
+
+    def _segment_yolu(self, segment):
+        return f"{self.onek}-{segment:06d}.log"
+
+    @property
+    def _yedek_dosyasi(self):
+        return self.anlik_dosyasi + ".bak"
+
+    def _en_eski_segment(self):
+        """Diskte kalan en eski segmentin numarası; hiç segment yoksa 0."""
+        dizin, ad = os.path.split(self.onek)
+        numaralar = []
+        for dosya in os.listdir(dizin or "."):
+            numara = dosya[len(ad) + 1:-len(".log")]
+            if dosya.startswith(ad + "-") and dosya.endswith(".log") and numara.isdigit():
+                numaralar.append(int(numara))
+        return min(numaralar, default=0)
+
+    @staticmethod
+    def _uygula(durum, kayit):
+        """Tek bir kaydın durum üzerindeki etkisini uygular (yeniden oynatma ve canlı yazma ortak)."""
+        if kayit.get("tip") == "anlik":
+            durum["kurulu"] = dict(kayit["durum"]["kurulu"])
+            durum["otomatik_kapali"] = bool(kayit["durum"]["otomatik_kapali"])
+            return
+        if kayit.get("tip") != "durum":
+            return
+        if "bolge" in kayit:
+            durum["kurulu"][str(kayit["bolge"])] = kayit["kurulu"]
+        if "otomatik_kapali" in kayit:
+            durum["otomatik_kapali"] = kayit["otomatik_kapali"]
+
+    def _anlik_goruntuyu_oku(self, yol):
+        """Anlık görüntü dosyasından (durum, segment, ofset) okur; dosya bozuksa ValueError/KeyError/TypeError."""
+        with open(yol, "r") as f:
+            anlik = json.load(f)
+        durum, segment, ofset = anlik["durum"], int(anlik["segment"]), int(anlik["ofset"])
+        return {"kurulu": dict(durum["kurulu"]), "otomatik_kapali": bool(durum["otomatik_kapali"])}, segment, ofset
+
+    def _ilk_kayit(self, segment):
+        """Segmentin ilk sağlam kaydı; segment boşsa ya da ilk kayıt bozuksa None."""
+        with open(self._segment_yolu(segment), "rb") as f:
+            baslik = f.read(self.BASLIK.size)
+            if len(baslik) < self.BASLIK.size:
+                return None
+            uzunluk, crc = self.BASLIK.unpack(baslik)
+            govde = f.read(uzunluk)
+        if len(govde) < uzunluk or zlib.crc32(govde) != crc:
+            return None
+        return json.loads(govde)
+
+    def ac(self):
+        """Anlık görüntüyü yükler, sonrasındaki kayıtları oynatır ve yazıcı thread'ini başlatır."""
+        ofset = 0
+        anlik_var = os.path.exists(self.anlik_dosyasi) or os.path.exists(self._yedek_dosyasi)
+        if anlik_var:
+            hata = None
+            for yol in (self.anlik_dosyasi, self._yedek_dosyasi):
+                if not os.path.exists(yol):
+                    continue
+                try:
+                    self.durum, self._segment, ofset = self._anlik_goruntuyu_oku(yol)
+                except (ValueError, KeyError, TypeError) as e:
+                    hata = e
+                    continue
+                if yol != self.anlik_dosyasi:
+                    print(f"Olay günlüğü anlık görüntüsü okunamadı ({hata}); bir önceki anlık görüntüden devam ediliyor.")
+                break
+            else:
+                # İki anlık görüntü de bozuk: saklanan en eski segmentten baştan oynatılır (kayıtlar CRC'li, güvenli)
+                self._segment, ofset = self._en_eski_segment(), 0
+                print(f"Olay günlüğü anlık görüntüsü okunamadı ({hata}); en eski segmentten ({self._segment}) yeniden oynatılıyor.")
+                ilk = self._ilk_kayit(self._segment) if os.path.exists(self._segment_yolu(self._segment)) else None
+                if ilk is None or ilk.get("tip") != "anlik":
+                    # Segment tam durumla başlamıyor (eski sürüm günlüğü): daha önceki bir kurma kaydı silinmiş
+                    # olabilir. Bilinmeyen bölgeler devre dışı değil kurulu kabul edilir (alarm açık kalsın).
+                    self.durum = {"kurulu": {str(bolge.no): True for bolge in bolgeler}, "otomatik_kapali": False}
+                    print("UYARI: Günlükte tam durum kaydı yok; durumu bilinmeyen bölgeler KURULU kabul ediliyor.")
+            if not os.path.exists(self._segment_yolu(self._segment)) and self._en_eski_segment() > self._segment:
+                # Anlık görüntünün gösterdiği segment silinmiş: sonraki segmentler tam durum kaydıyla başlar
+                self._segment, ofset = self._en_eski_segment(), 0
+        elif os.path.exists(SYSTEM_STATE_FILE) and not os.path.exists(self._segment_yolu(0)):
+            # Eski sürümün durum dosyasından bir kereye mahsus geçiş
+            with open(SYSTEM_STATE_FILE, "r") as f:
+                eski = f.read().strip().split(",")
+            for bolge in bolgeler:
+                self.durum["kurulu"][str(bolge.no)] = f"AKTIF{bolge.no}" in eski
+            self.durum["otomatik_kapali"] = "OTOMATIK_KAPALI" in eski
+
+        oynatilan = 0
+        while os.path.exists(self._segment_yolu(self._segment)):
+            sonraki = self._segment_yolu(self._segment + 1)
+            sayi, ofset = self._segmenti_oynat(self._segment, ofset, son_segment=not os.path.exists(sonraki))
+            oynatilan += sayi
+            if not os.path.exists(sonraki):
+                break
+            self._segment += 1
+            ofset = 0
+
+        self._dosya = open(self._segment_yolu(self._segment), "ab")
+        if self._dosya.tell() == 0:
+            # Yeni günlük (ya da eski durum dosyasından geçiş): durum hemen diske yazılsın
+            self._tam_durum_yaz(json.loads(json.dumps(self.durum)))
+        self._anliktan_beri = oynatilan
+        self._yazici = threading.Thread(target=self._yazici_dongusu, name="olay-gunlugu", daemon=True)
+        self._yazici.start()
+        print(f"Olay günlüğü açıldı (segment {self._segment}, anlık görüntüden sonra {oynatilan} kayıt oynatıldı).")
+        return self.durum
+
+    def _segmenti_oynat(self, segment, ofset, son_segment):
+        yol = self._segment_yolu(segment)
+        sayi = 0
+        with open(yol, "rb") as f:
+            f.seek(ofset)
+            while True:
+                baslik = f.read(self.BASLIK.size)
+                if len(baslik) < self.BASLIK.size:
+                    break
+                uzunluk, crc = self.BASLIK.unpack(baslik)
+                govde = f.read(uzunluk)
+                if len(govde) < uzunluk or zlib.crc32(govde) != crc:
+                    break
+                self._uygula(self.durum, json.loads(govde))
+                ofset += self.BASLIK.size + uzunluk
+                sayi += 1
+        if son_segment and os.path.getsize(yol) > ofset:
+            # Elektrik kesintisinde yarım kalan son kaydı at, yeni kayıtlar sağlam bir sınırdan devam etsin
+            print(f"Olay günlüğünde yarım kayıt bulundu, {os.path.getsize(yol) - ofset} bayt kesiliyor.")
+            os.truncate(yol, ofset)
+        return sayi, ofset
+
+    def _tam_durum_yaz(self, durum):
+        """Segmentin başına tam durumu içeren "anlik" kaydını yazar (yazıcı thread'i ya da ac çağırır)."""
+        govde = json.dumps({"t": round(time.time(), 3), "tip": "anlik", "durum": durum},
+                           ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._dosya.write(self.BASLIK.pack(len(govde), zlib.crc32(govde)) + govde)
+        self._dosya.flush()
+        os.fsync(self._dosya.fileno())
+
+    def yaz(self, tip, **alanlar):
+        """Kaydı yazma kuyruğuna ekler; çağıranı diske yazma için bekletmez."""
+        kayit = {"t": round(time.time(), 3), "tip": tip, **alanlar}
+        govde = json.dumps(kayit, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._kosul:
+            self._uygula(self.durum, kayit)
+            self._bekleyen.append(self.BASLIK.pack(len(govde), zlib.crc32(govde)) + govde)
+            self._kosul.notify()
+
+    def _yazici_dongusu(self):
+        while True:
+            with self._kosul:
+                while not self._bekleyen and not self._kapaniyor:
+                    self._kosul.wait()
+                if not self._bekleyen and self._kapaniyor:
+                    return
+            # Aynı pencerede gelen kayıtları tek seferde yazmak için kısa bir süre bekle (group commit)
+            time.sleep(GUNLUK_GRUP_SURESI)
+            with self._kosul:
+                grup, self._bekleyen = self._bekleyen, []
+                durum = json.loads(json.dumps(self.durum))
+            try:
+                self._dosya.write(b"".join(grup))
+                self._dosya.flush()
+                os.fsync(self._dosya.fileno())
+                self._anliktan_beri += len(grup)
+                if self._anliktan_beri >= GUNLUK_ANLIK_ARALIGI or self._dosya.tell() >= GUNLUK_SEGMENT_BOYUTU:
+                    self._anlik_goruntu_al(durum)
+            except OSError as e:
+                print(f"Olay günlüğüne yazılamadı: {e}")
+
+    def _anlik_goruntu_al(self, durum):
+        """Durumu atomik olarak diske yazar; segment dolduysa tam durum kaydıyla başlayan yeni segmente geçer.
+
+        Bir önceki anlık görüntü .bak olarak saklanır.
+        """
+        segment, ofset = self._segment, self._dosya.tell()
+        yeni_segment = ofset >= GUNLUK_SEGMENT_BOYUTU
+        if yeni_segment:
+            segment, ofset = segment + 1, 0
+            self._dosya.close()
+            self._segment = segment
+            self._dosya = open(self._segment_yolu(segment), "ab")
+            self._tam_durum_yaz(durum)
+        gecici = self.anlik_dosyasi + ".tmp"
+        with open(gecici, "w") as f:
+            json.dump({"segment": segment, "ofset": ofset, "durum": durum}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(self.anlik_dosyasi):
+            os.replace(self.anlik_dosyasi, self._yedek_dosyasi)
+        os.replace(gecici, self.anlik_dosyasi)
+        self._anliktan_beri = 0
+        if yeni_segment:
+            eski = self._segment_yolu(segment - GUNLUK_SAKLANAN_SEGMENT - 1)
+            if os.path.exists(eski):
+                os.remove(eski)
+
+    def kapat(self):
+        """Bekleyen kayıtları yazar ve son durumun anlık görüntüsünü alır."""
+        if self._yazici is None:
+            return
+        with self._kosul:
+            self._kapaniyor = True
+            self._kosul.notify()
+        self._yazici.join(timeout=5)
+        self._yazici = None
+        try:
+            with self._kosul:
+                durum = json.loads(json.dumps(self.durum))
+            self._anlik_goruntu_al(durum)
+        finally:
+            self._dosya.close()
+
+
+olay_gunlugu = OlayGunlugu(GUNLUK_DOSYA_ONEKI, GUNLUK_ANLIK_DOSYASI)
+
+def save_system_state(**ayrinti):
+    """Değişen bölge ve otomatik kurulum durumlarını olay günlüğüne yazar.
+
+    `ayrinti` ile kaydın kaynağı (komut, otomatik...) ve kullanıcı bilgisi de günlüğe eklenir.
+    """
+    with bolge_kilidi:
+        for bolge in bolgeler:
+            if olay_gunlugu.durum["kurulu"].get(str(bolge.no)) != bolge.kurulu:
+                olay_gunlugu.yaz("durum", bolge=bolge.no, kurulu=bolge.kurulu, **ayrinti)
+        if olay_gunlugu.durum["otomatik_kapali"] != otomatik_alarm_kapali:
+            olay_gunlugu.yaz("durum", otomatik_kapali=otomatik_alarm_kapali, **ayrinti)
+
+def load_system_state():
+    global otomatik_alarm_kapali
+    durum = olay_gunlugu.ac()
+    with bolge_kilidi:
+        for bolge in bolgeler:
+            bolge.kurulu = durum["kurulu"].get(str(bolge.no), False)
+        otomatik_alarm_kapali = durum["otomatik_kapali"]
+
+def mqtt_dugum_oneki():
+    """Kontrolcünün topic öneki: federasyonda <önek>/<düğüm>, değilse <önek>."""
+    return f"{MQTT_KONU_ONEKI}/{DUGUM_ID}" if DUGUM_ID else MQTT_KONU_ONEKI
+
+def mqtt_topic(bolge, alt):
+    """Bölgenin yapılandırılmış topic'i (örn. guvenlik/bolge/1/durum, federasyonda guvenlik/depo1/bolge/1/durum)."""
+    return f"{mqtt_dugum_oneki()}/bolge/{bolge.no}/{alt}"
+
+class MqttCevrimdisiKuyrugu:
+    """Broker'a bağlantı yokken yapılan yayınları bağlantı gelene kadar bekletir.
+
+    Retained durumların sadece sonuncusu anlamlıdır; olaylar (retain=False) sırayla hepsi bekletilir.
+    En fazla MQTT_CEVRIMDISI_KUYRUK yayın tutulur, aşılınca en eskisi düşürülür.
+    """
+
+    def __init__(self):
+        self._kilit = threading.Lock()
+        self._yayinlar = OrderedDict()  # topic ya da (topic, sıra) -> (topic, mesaj, qos, retain), eklenme sırasıyla
+        self._sira = 0
+        self.dusurulen = 0
+
+    def ekle(self, topic, mesaj, qos, retain):
+        with self._kilit:
+            if retain:
+                anahtar = topic
+            else:
+                self._sira += 1
+                anahtar = (topic, self._sira)
+            self._yayinlar.pop(anahtar, None)
+            self._yayinlar[anahtar] = (topic, mesaj, qos, retain)
+            if len(self._yayinlar) > MQTT_CEVRIMDISI_KUYRUK:
+                self._yayinlar.popitem(last=False)
+                self.dusurulen += 1
+
+    def bosalt(self):
+        """Bekleyen (topic, mesaj, qos, retain) yayınlarını eklenme sırasıyla döndürür ve kuyruğu boşaltır."""
+        with self._kilit:
+            bekleyen = list(self._yayinlar.values())
+            self._yayinlar.clear()
+        return bekleyen
+
+    def __len__(self):
+        with self._kilit:
+            return len(self._yayinlar)
+
+
+mqtt_cevrimdisi = MqttCevrimdisiKuyrugu()
+
+def mqtt_yayinla(topic, mesaj, qos=None, retain=True):
+    """Mesajı yayınlar; bağlantı yoksa çevrimdışı kuyruğa alır (topic başına en son mesaj tutulur).
+
+    qos verilmezse MQTT_DURUM_QOS kullanılır (ayar dosyasından okunan değer).
+    """
+    if qos is None:
+        qos = MQTT_DURUM_QOS
+    client = mqtt_client
+    if client is not None and client.is_connected():
+        client.publish(topic, mesaj, qos=qos, retain=retain)
+        return
+    mqtt_cevrimdisi.ekle(topic, mesaj, qos, retain)
+
+def bolge_durum_metni(bolge):
+    return "ALARM" if bolge.alarm else "KURULU" if bolge.kurulu else "DEVRE_DISI"
+
+def bolge_durumunu_yayinla(bolge):
+    mqtt_yayinla(mqtt_topic(bolge, "durum"), bolge_durum_metni(bolge), MQTT_DURUM_QOS)
+
+def kapi_durumunu_yayinla(bolge, deger):
+    mqtt_yayinla(mqtt_topic(bolge, "kapi"), "ACIK" if deger == 1 else "KAPALI", MQTT_KAPI_QOS)
+
+def bolge_bilgisi(bolge):
+    return json.dumps({"ad": bolge.ad, "kamera": bolge.kamera}, ensure_ascii=False)
+
+def federasyon_olayini_yayinla(mesaj, kamera, oncelik, anahtar=None, sessiz=False):
+    """Federasyonda bildirimi <önek>/<düğüm>/olay topic'ine de yayınlar (retain yok, bağlantı yoksa sırayla bekler)."""
+    if not DUGUM_ID:
+        return
+    olay = {"t": round(time.time(), 3), "mesaj": mesaj, "kamera": kamera, "oncelik": oncelik,
+            "anahtar": anahtar, "sessiz": sessiz}
+    mqtt_yayinla(f"{mqtt_dugum_oneki()}/olay", json.dumps(olay, ensure_ascii=False), qos=1, retain=False)
+
+def sure_metni(saniye):
+    """Saniyeyi bildirimlerde kullanılacak okunur metne çevirir (örn. '1 saat', '55 dakika')."""
+    if saniye % 3600 == 0:
+        return f"{saniye // 3600} saat"
+    return f"{saniye // 60} dakika"
+
+class PinFiltresi:
+    """Tek kapı pini için N-of-M çoğunluk ve en kısa kararlı süre filtresi.
+
+    Son `pencere` örnek küçük bir halka tamponda tutulur. Örnek karardan farklıysa bir aday başlar;
+    adayın seviyesi pencerede en az `esik` kez görülmüş ve aday en az `min_sure` sürmüşse karar değişir.
+    Pencere tekrar tamamen karar seviyesine dönerse aday parazit sayılıp bastırılır.
+    """
+    __slots__ = ("tampon", "indeks", "karar", "aday_baslangic", "aday_tick", "esik", "min_sure")
+
+    def __init__(self, seviye, pencere, esik, min_sure):
+        self.tampon = [seviye] * pencere
+        self.indeks = 0
+        self.karar = seviye
+        self.aday_baslangic = None  # Yeni seviyenin ilk görüldüğü an (monotonic)
+        self.aday_tick = None       # Adayı başlatan kenarın lgpio zaman damgası (kesme modu)
+        self.esik = esik
+        self.min_sure = min_sure
+
+    def ekle(self, seviye, zaman, tick=None):
+        """Örneği tampona yazar; karar değiştiyse True döndürür."""
+        self.tampon[self.indeks] = seviye
+        self.indeks = (self.indeks + 1) % len(self.tampon)
+        farkli = len(self.tampon) - self.tampon.count(self.karar)
+        if farkli == 0:
+            if self.aday_baslangic is not None:
+                self.aday_baslangic = self.aday_tick = None
+                sensor_istatistik["bastirilan"] += 1
+            return False
+        if self.aday_baslangic is None:
+            self.aday_baslangic = zaman
+            self.aday_tick = tick
+        if farkli >= self.esik and zaman - self.aday_baslangic >= self.min_sure:
+            gecikme = zaman - self.aday_baslangic
+            sensor_istatistik["filtre_gecikme_ms"].append(gecikme * 1000)
+            metrik_kaydi["filtre_karar"].gozlemle(gecikme)
+            self.karar = 1 - self.karar
+            self.aday_baslangic = None
+            # Eski seviyenin örnekleri hemen ters yönde yeni bir aday başlatmasın
+            self.tampon[:] = [self.karar] * len(self.tampon)
+            return True
+        return False
+
+
+class KapiFiltresi:
+    """Tüm bölge pinlerinin filtreleri; `degerler` bölge sırasıyla filtrelenmiş kapı durumlarıdır."""
+
+    def __init__(self):
+        self.pinler = []
+        self.degerler = []
+        self.ayar = None            # PinFiltresi parametreleri (pencere, eşik, en kısa süre)
+        self.son_karar_tick = None  # Son kararı başlatan kenarın zaman damgası (kenar->röle gecikmesi için)
+
+    def baslat(self, degerler):
+        if FILTRE_AKTIF:
+            self.ayar = (FILTRE_PENCERE, FILTRE_ESIK, FILTRE_MIN_KARARLI_SURE)
+        else:
+            self.ayar = (1, 1, 0.0)  # Filtresiz: her örnek doğrudan karar olur
+        self.pinler = [PinFiltresi(deger, *self.ayar) for deger in degerler]
+        self.degerler = list(degerler)
+
+    def ekle(self, indeks, seviye, zaman, tick=None):
+        filtre = self.pinler[indeks]
+        if not filtre.ekle(seviye, zaman, tick):
+            return False
+        self.degerler[indeks] = filtre.karar
+        self.son_karar_tick = filtre.aday_tick
+        filtre.aday_tick = None
+        return True
+
+    def ornekle(self, degerler, zaman):
+        """Tüm pinlerin birer örneğini ekler; herhangi bir kapının kararı değiştiyse True döndürür."""
+        degisti = False
+        for indeks, deger in enumerate(degerler):
+            degisti |= self.ekle(indeks, deger, zaman)
+        return degisti
+
+    def bekleyenler(self):
+        """Kararı henüz verilmemiş (adayı süren) pinlerin bölge indeksleri."""
+        return [i for i, filtre in enumerate(self.pinler) if filtre.aday_baslangic is not None]
+
+
+kapi_filtresi = KapiFiltresi()
+
+def filtre_karar_siniri():
+    """Temiz bir kapı geçişinde filtrenin en geç karar vereceği süre (sn)."""
+    if not FILTRE_AKTIF:
+        return 0.0
+    adim = FILTRE_ORNEKLEME_ARALIGI
+    return max((FILTRE_ESIK - 1) * adim, math.ceil(FILTRE_MIN_KARARLI_SURE / adim - 1e-9) * adim) + adim
+
+def filtre_ayarlarini_dogrula():
+    """Filtre ayarlarını denetler ve karar süresi üst sınırını yazdırır."""
+    if not FILTRE_AKTIF:
+        print("Kapı filtresi kapalı; her okuma doğrudan değerlendirilir.")
+        return
+    if not 1 <= FILTRE_ESIK <= FILTRE_PENCERE:
+        raise ValueError(f"FILTRE_ESIK (N={FILTRE_ESIK}) 1 ile FILTRE_PENCERE (M={FILTRE_PENCERE}) arasında olmalı.")
+    sinir_ms = filtre_karar_siniri() * 1000
+    print(f"Kapı filtresi: {FILTRE_ESIK}/{FILTRE_PENCERE} örnek, en az {FILTRE_MIN_KARARLI_SURE * 1000:.0f} ms kararlı, "
+          f"{1 / FILTRE_ORNEKLEME_ARALIGI:.0f} Hz; karar süresi üst sınırı {sinir_ms:.0f} ms.")
+    if sinir_ms >= POLLING_ARALIGI * 1000:
+        print(f"UYARI: Filtre karar süresi ({sinir_ms:.0f} ms) eski {POLLING_ARALIGI * 1000:.0f} ms okuma aralığından uzun; "
+              "gerçek alarmlar gecikecek.")
+
+def sensor_pinlerini_oku():
+    """Tüm bölge pinlerini okur ve bölge sırasıyla değer listesi döndürür.
+
+    Polling modunda pinler GPIO_GRUP_BOYUTU'luk gruplar halinde tek çağrıyla (group_read) okunur.
+    """
+    baslangic = time.perf_counter()
+    if not sensor_gruplari:
+        degerler = [lgpio.gpio_read(gpio_handle, bolge.pin) for bolge in bolgeler]
+    else:
+        degerler = []
+        for grup in sensor_gruplari:
+            _, bitler = lgpio.group_read(gpio_handle, grup[0])
+            degerler.extend((bitler >> i) & 1 for i in range(len(grup)))
+    metrik_kaydi["gpio_okuma"].gozlemle(time.perf_counter() - baslangic)
+    return degerler
+
+def sensor_durumunu_baslat():
+    """İlk pin değerlerini okur, filtreyi bu değerlerle başlatır ve kapısı kapalı bölgelerin otomatik kurulumunu planlar."""
+    degerler = sensor_pinlerini_oku()
+    kapi_filtresi.baslat(degerler)
+    simdi = time.time()
+    for bolge, deger in zip(bolgeler, degerler):
+        bolge.son_deger = deger
+        kapi_serileri[bolge.no].baslat(deger == 1, simdi)
+        bolge.alarm_son_gonderim = 0
+        otomatik_kurulumu_planla(bolge)
+    sensor_polling_loop.kenar_tick = None
+    sensor_istatistik["baslangic"] = time.time()
+    acilis_olcumu.isaretle("koruma")
+    return degerler
+
+def kenar_gecikmesi_ms(tick):
+    """lgpio çekirdek zaman damgasından (ns) bu ana kadar geçen süreyi ms olarak verir.
+
+    Çekirdeğe göre damga Epoch'tan ya da açılıştan itibaren sayılabilir; hangisine yakınsa o saat kullanılır.
+    """
+    simdi_gercek = time.time_ns()
+    if abs(simdi_gercek - tick) < 10 * 1_000_000_000:
+        return (simdi_gercek - tick) / 1e6
+    return (time.monotonic_ns() - tick) / 1e6
+
+# --- ZAMANLAYICI (OTOMATİK KURULUM) ---
+class Zamanlayici:
+    """Kesin son tarihli işler için ikili yığın (heap) tabanlı zamanlayıcı.
+
+    Ekleme ve sıradaki işin alınması O(log n); iptal, kaydı yığında boş bırakır (O(1)) ve boş kayıtlar
+    yığının yarısını geçince yığın bir kez temizlenir. Son tarihler time.monotonic() saatindedir; takvim
+    işleri (duvar saati) için saat kayması ZAMANLAYICI_SAAT_KONTROLU aralığıyla denetlenip düzeltilir.
+    İşler thread modunda kendi thread'inde (calistir), asyncio modunda olay döngüsünde (acalistir) çalışır.
+    """
+
+    def __init__(self):
+        self._kosul = threading.Condition()
+        self._yigin = []          # [son tarih, sıra, iş]; iptal edilen işlerde iş = None
+        self._sira = 0
+        self._bos = 0             # Yığında kalan iptal edilmiş kayıt sayısı
+        self._saat_farki = time.time() - time.monotonic()
+        self._uyandir = None      # asyncio sürücüsünün uyandırma fonksiyonu
+        self.metrikler = {"eklenen": 0, "calisan": 0, "iptal": 0, "saat_duzeltme": 0}
+
+    def sonra(self, saniye, fonksiyon, *args):
+        """`saniye` sonra fonksiyon(*args) çalıştırır; iptal için kullanılacak kaydı döndürür."""
+        return self._ekle(time.monotonic() + saniye, (fonksiyon, args, None))
+
+    def saatinde(self, duvar_zamani, fonksiyon, *args):
+        """Duvar saatine göre (time.time()) belirli bir anda fonksiyon(*args) çalıştırır."""
+        return self._ekle(duvar_zamani - self._saat_farki, (fonksiyon, args, duvar_zamani))
+
+    def _ekle(self, zaman, is_):
+        with self._kosul:
+            self._sira += 1
+            kayit = [zaman, self._sira, is_]
+            heapq.heappush(self._yigin, kayit)
+            self.metrikler["eklenen"] += 1
+            if self._yigin[0] is kayit:
+                self._haber_ver()
+        return kayit
+
+    def iptal(self, kayit):
+        with self._kosul:
+            if kayit[2] is None:
+                return
+            kayit[2] = None
+            self._bos += 1
+            self.metrikler["iptal"] += 1
+            if self._bos > len(self._yigin) // 2:
+                self._yigin = [k for k in self._yigin if k[2] is not None]
+                heapq.heapify(self._yigin)
+                self._bos = 0
+
+    def bekleyen(self):
+        return len(self._yigin) - self._bos
+
+    def _haber_ver(self):
+        self._kosul.notify()
+        if self._uyandir:
+            self._uyandir()
+
+    def _saat_kaymasini_duzelt(self):
+        """Duvar saati monotonic saate göre kaydıysa (NTP, elle ayar) takvim işlerinin son tarihini düzeltir."""
+        fark = time.time() - time.monotonic()
+        if abs(fark - self._saat_farki) < 1.0:
+            return
+        self._saat_farki = fark
+        for kayit in self._yigin:
+            if kayit[2] is not None and kayit[2][2] is not None:
+                kayit[0] = kayit[2][2] - fark
+        heapq.heapify(self._yigin)
+        self.metrikler["saat_duzeltme"] += 1
+        print("Duvar saati değişti; takvim zamanlayıcıları yeniden hesaplandı.")
+
+    def _vadesi_gelenler(self):
+        """Son tarihi geçmiş işleri yığından alır ve bir sonraki işe kalan bekleme süresini döndürür."""
+        with self._kosul:
+            self._saat_kaymasini_duzelt()
+            simdi = time.monotonic()
+            hazir = []
+            while self._yigin and self._yigin[0][0] <= simdi:
+                kayit = heapq.heappop(self._yigin)
+                if kayit[2] is None:
+                    self._bos -= 1
+                else:
+                    hazir.append((kayit[0], kayit[2]))
+                    kayit[2] = None
+            bekleme = ZAMANLAYICI_SAAT_KONTROLU
+            if self._yigin:
+                bekleme = min(bekleme, self._yigin[0][0] - simdi)
+            return hazir, bekleme
+
+    def _isleri_calistir(self, hazir):
+        for zaman, (fonksiyon, args, _) in hazir:
+            metrik_kaydi["zamanlayici"].gozlemle(max(time.monotonic() - zaman, 0))
+            self.metrikler["calisan"] += 1
+            try:
+                fonksiyon(*args)
+            except Exception as e:
+                print(f"Zamanlayıcı işi ({fonksiyon.__name__}) hatası: {e}")
+
+    def calistir(self, stop_event):
+        """Thread sürücüsü: işleri son tarihlerinde çalıştırır, stop_event gelene kadar döner."""
+        bekci.kaydet("zamanlayici")
+        while not stop_event.is_set():
+            hazir, bekleme = self._vadesi_gelenler()
+            self._isleri_calistir(hazir)
+            bekci.ilerledi("zamanlayici")
+            if hazir:
+                continue
+            with self._kosul:
+                if not self._yigin or self._yigin[0][0] > time.monotonic():
+                    self._kosul.wait(bekleme)
+
+    def durdur(self):
+        with self._kosul:
+            self._kosul.notify_all()
+
+    async def acalistir(self):
+        """Asyncio sürücüsü: işleri olay döngüsünde son tarihlerinde çalıştırır."""
+        loop = asyncio.get_running_loop()
+        olay = asyncio.Event()
+        self._uyandir = lambda: loop.call_soon_threadsafe(olay.set)
+        bekci.kaydet("zamanlayici")
+        try:
+            while True:
+                olay.clear()
+                hazir, bekleme = self._vadesi_gelenler()
+                self._isleri_calistir(hazir)
+                bekci.ilerledi("zamanlayici")
+                if hazir:
+                    continue
+                try:
+                    await asyncio.wait_for(olay.wait(), max(bekleme, 0))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._uyandir = None
+
+
+zamanlayici = Zamanlayici()
+metrik_kaydi.ekle("zamanlayici_bekleyen", Gosterge(
+    "guvenlik_zamanlayici_bekleyen", "Zamanlayıcıda bekleyen iş sayısı.", lambda: zamanlayici.bekleyen()))
+
+TAKVIM_GUNLERI = {"pzt": 0, "sal": 1, "car": 2, "çar": 2, "per": 3, "cum": 4, "cmt": 5, "paz": 6}
+GUN_ADLARI = ("Pzt", "Sal", "Çar", "Per", "Cum", "Cmt", "Paz")
+
+def takvim_satirini_coz(satir):
+    """'pzt-cum 18:30' gibi bir satırı (gün kümesi, saat, dakika) olarak çözer."""
+    try:
+        gunler_metni, saat_metni = satir.split()
+        saat, dakika = (int(parca) for parca in saat_metni.split(":"))
+        if not (0 <= saat < 24 and 0 <= dakika < 60):
+            raise ValueError
+        gunler = set()
+        for parca in gunler_metni.lower().split(","):
+            if parca == "*":
+                gunler.update(range(7))
+            elif "-" in parca:
+                bas, son = (TAKVIM_GUNLERI[g] for g in parca.split("-"))
+                gunler.update(range(bas, son + 1) if bas <= son else [*range(bas, 7), *range(0, son + 1)])
+            else:
+                gunler.add(TAKVIM_GUNLERI[parca])
+    except (ValueError, KeyError):
+        raise ValueError(f"Geçersiz takvim satırı: '{satir}' (örn. 'pzt-cum 18:30', '* 18:30')") from None
+    return gunler, saat, dakika
+
+def sonraki_takvim_zamani(takvim, simdi=None):
+    """Takvim satırlarından `simdi`den sonraki ilk anı (duvar saati, sn) döndürür."""
+    simdi = time.time() if simdi is None else simdi
+    bugun = time.localtime(simdi)
+    en_yakin = None
+    for gunler, saat, dakika in map(takvim_satirini_coz, takvim):
+        for ileri in range(8):
+            # mktime gün taşmasını ve yaz saati geçişini kendisi düzeltir
+            aday = time.mktime((bugun.tm_year, bugun.tm_mon, bugun.tm_mday + ileri, saat, dakika, 0, 0, 0, -1))
+            if aday > simdi and time.localtime(aday).tm_wday in gunler:
+                en_yakin = aday if en_yakin is None else min(en_yakin, aday)
+                break
+    return en_yakin
+
+def takvim_zamani_metni(zaman):
+    yerel = time.localtime(zaman)
+    return f"{GUN_ADLARI[yerel.tm_wday]} {yerel.tm_hour:02d}:{yerel.tm_min:02d}"
+
+def otomatik_kurulumu_planla(bolge, baslangic=None):
+    """Kapısı kapalı ve kurulu olmayan bölge için uyarı ve otomatik kurulum zamanlayıcılarını (yeniden) kurar.
+
+    Kapı açıksa, bölge kuruluysa ya da otomatik kurulum askıdaysa sadece bekleyen zamanlayıcılar iptal edilir.
+    `baslangic` verilirse (ayarların yeniden yüklenmesi) süre o andan sayılır; zamanı geçmiş uyarı tekrar gönderilmez.
+    """
+    bolge.otomatik_kurulumu_iptal_et()
+    if bolge.kurulu or bolge.otomatik_askida or bolge.son_deger != 0:
+        return
+    simdi = time.monotonic()
+    bolge.otomatik_baslangic = simdi if baslangic is None else baslangic
+    kalan = bolge.otomatik_kurulum_suresi - (simdi - bolge.otomatik_baslangic)
+    uyari = kalan - OTOMATIK_KURULUM_UYARI_SURESI
+    if baslangic is None or uyari > 0:
+        bolge.otomatik_isler.append(zamanlayici.sonra(max(uyari, 0), otomatik_kurulum_uyarisi, bolge))
+    bolge.otomatik_isler.append(zamanlayici.sonra(max(kalan, 0), kapali_kapi_suresi_doldu, bolge))
+
+def otomatik_kurulum_uyarisi(bolge):
+    sure = bolge.otomatik_kurulum_suresi
+    send_telegram_notification(f"⏰ {bolge.ad} kapısı {sure_metni(sure - OTOMATIK_KURULUM_UYARI_SURESI)} süredir kapalı. {sure_metni(OTOMATIK_KURULUM_UYARI_SURESI)} sonra alarm otomatik olarak kurulacak!", camera_name=bolge.kamera)
+
+def kapali_kapi_suresi_doldu(bolge):
+    """Kapı otomatik_kurulum_suresi boyunca kapalı kaldı: bölgeyi kurar."""
+    with bolge_kilidi:
+        if bolge.kurulu or bolge.otomatik_askida or bolge.son_deger != 0:
+            return
+        bolge_kur(bolge, kaynak="otomatik")
+    sure = bolge.otomatik_kurulum_suresi
+    kapi_serileri[bolge.no].otomatik_kuruldu(time.time())
+    send_telegram_notification(f"ℹ️ {bolge.ad} kapısı {sure_metni(sure)} boyunca kapalı kaldı. Alarm otomatik olarak KURULDU.", camera_name=bolge.kamera)
+    print(f"{bolge.ad} kapısı {sure_metni(sure)} kapalı kaldı, alarm otomatik kuruldu.")
+
+# --- KAPI AKTİVİTE ZAMAN SERİSİ (/rapor) ---
+def yerel_saat_no(t):
+    """Epoch zamanını yerel saatte saat numarasına çevirir; gün numarası saat_no // 24'tür."""
+    return int((t + time.localtime(t).tm_gmtoff) // 3600)
+
+def gece_mi(t):
+    saat = time.localtime(t).tm_hour
+    if GECE_BASLANGIC_SAATI <= GECE_BITIS_SAATI:
+        return GECE_BASLANGIC_SAATI <= saat < GECE_BITIS_SAATI
+    return saat >= GECE_BASLANGIC_SAATI or saat < GECE_BITIS_SAATI
+
+class OzetKovalari:
+    """Sabit sayıda zaman kovası (saat ya da gün) için paralel diziler.
+
+    Kova numarası `no % kapasite` yuvasına yazılır; yuvada eski bir numara varsa yuva önce sıfırlanır.
+    Böylece sadece en son `kapasite` kova bellekte kalır.
+    """
+    __slots__ = ("kapasite", "no", "acilma", "gece", "otomatik", "acik_sure", "en_uzun", "yaklasma")
+
+    def __init__(self, kapasite):
+        self.kapasite = kapasite
+        self.no = array.array("q", [-1]) * kapasite
+        self.acilma = array.array("I", [0]) * kapasite       # Bu kovada başlayan açılışlar
+        self.gece = array.array("I", [0]) * kapasite         # Bunlardan gece başlayanlar
+        self.otomatik = array.array("I", [0]) * kapasite     # Gerçekleşen otomatik kurulumlar
+        self.acik_sure = array.array("d", [0.0]) * kapasite  # Kovaya düşen açık kalma süresi (sn)
+        self.en_uzun = array.array("f", [0.0]) * kapasite    # Bu kovada başlayan en uzun açık kalma (sn)
+        self.yaklasma = array.array("f", [0.0]) * kapasite   # Kapı açılınca kesilen otomatik kurulumun en çok dolan oranı
+
+    def yuva(self, no):
+        i = no % self.kapasite
+        if self.no[i] != no:
+            self.no[i] = no
+            self.acilma[i] = self.gece[i] = self.otomatik[i] = 0
+            self.acik_sure[i] = self.en_uzun[i] = self.yaklasma[i] = 0.0
+        return i
+
+    def topla(self, ilk, son):
+        """[ilk, son] numaralı kovaların özetini döndürür; bellekte kalmamış kovalar boş sayılır."""
+        ozet = {"acilma": 0, "gece": 0, "otomatik": 0, "acik_sure": 0.0, "en_uzun": 0.0, "yaklasma": 0.0}
+        for no in range(max(ilk, son - self.kapasite + 1), son + 1):
+            i = no % self.kapasite
+            if self.no[i] != no:
+                continue
+            ozet["acilma"] += self.acilma[i]
+            ozet["gece"] += self.gece[i]
+            ozet["otomatik"] += self.otomatik[i]
+            ozet["acik_sure"] += self.acik_sure[i]
+            ozet["en_uzun"] = max(ozet["en_uzun"], self.en_uzun[i])
+            ozet["yaklasma"] = max(ozet["yaklasma"], self.yaklasma[i])
+        return ozet
+
+
+class KapiSerisi:
+    """Bir bölgenin kapı açık kalma aralıkları ve saatlik/günlük özetleri.
+
+    Açılma sayısı açılış anında, açık kalma süresi kapanışta özetlere işlenir: süre saat ve gün sınırlarında
+    bölünüp kovalara dağıtılır, en uzun süre açılışın kovasına yazılır. Kapanan aralıklar ayrıca ham halka
+    tampona (başlangıç, süre) eklenir. Sensör döngüsü ve zamanlayıcı yazar, /rapor okur.
+    """
+
+    def __init__(self, ham_kapasite, saat, gun):
+        self._kilit = threading.Lock()
+        self.ham_baslangic = array.array("d", [0.0]) * ham_kapasite
+        self.ham_sure = array.array("f", [0.0]) * ham_kapasite
+        self.ham_sayi = 0      # Şimdiye kadar yazılan aralık sayısı; sıradaki yuva ham_sayi % kapasite
+        self.saatlik = OzetKovalari(saat)
+        self.gunluk = OzetKovalari(gun)
+        self.acilis = None     # Kapı açıksa açıldığı an (epoch)
+
+    def _kovalar(self, t):
+        saat = yerel_saat_no(t)
+        return ((self.saatlik, saat, 1), (self.gunluk, saat // 24, 24))
+
+    def baslat(self, acik, simdi):
+        """Sensör döngüsü başlarken kapı açıksa aralık bu andan sayılır (açılma olarak sayılmaz)."""
+        with self._kilit:
+            self.acilis = simdi if acik else None
+
+    def kapi_degisti(self, acik, simdi, yaklasma=None):
+        with self._kilit:
+            if acik:
+                self.acilis = simdi
+                gece = gece_mi(simdi)
+                for kovalar, no, _ in self._kovalar(simdi):
+                    i = kovalar.yuva(no)
+                    kovalar.acilma[i] += 1
+                    kovalar.gece[i] += gece
+                    if yaklasma is not None:
+                        kovalar.yaklasma[i] = max(kovalar.yaklasma[i], yaklasma)
+            elif self.acilis is not None:
+                self._araligi_kapat(self.acilis, simdi)
+                self.acilis = None
+
+    def otomatik_kuruldu(self, simdi):
+        with self._kilit:
+            for kovalar, no, _ in self._kovalar(simdi):
+                kovalar.otomatik[kovalar.yuva(no)] += 1
+
+    def _araligi_kapat(self, baslangic, bitis):
+        sure = max(bitis - baslangic, 0.0)
+        j = self.ham_sayi % len(self.ham_sure)
+        self.ham_baslangic[j] = baslangic
+        self.ham_sure[j] = sure
+        self.ham_sayi += 1
+        for kovalar, no, boy in self._kovalar(baslangic):
+            i = no % kovalar.kapasite
+            if kovalar.no[i] == no:
+                kovalar.en_uzun[i] = max(kovalar.en_uzun[i], sure)
+            # Halkadan çoktan düşmüş saatlere süre dağıtılmaz; döngü en fazla kapasite kadar döner
+            t = max(baslangic, bitis - kovalar.kapasite * boy * 3600)
+            while t < bitis:
+                kova_no = yerel_saat_no(t) // boy
+                sinir = (kova_no + 1) * boy * 3600 - time.localtime(t).tm_gmtoff
+                son = min(sinir if sinir > t else t + boy * 3600, bitis)
+                kovalar.acik_sure[kovalar.yuva(kova_no)] += son - t
+                t = son
+
+    def ozetler(self, simdi):
+        """(başlık, özet) listesi: son 24 saat saatlik kovalardan, son 7 ve 30 gün günlük kovalardan."""
+        saat = yerel_saat_no(simdi)
+        with self._kilit:
+            return [("Son 24 saat", self.saatlik.topla(saat - 23, saat)),
+                    ("Son 7 gün", self.gunluk.topla(saat // 24 - 6, saat // 24)),
+                    ("Son 30 gün", self.gunluk.topla(saat // 24 - 29, saat // 24))]
+
+    def saatlik_acilmalar(self, simdi, saat_sayisi=24):
+        """Son saatlerin (saat başı epoch, açılma sayısı) listesi; sadece açılma olan saatler."""
+        saat = yerel_saat_no(simdi)
+        sonuc = []
+        with self._kilit:
+            for no in range(saat - saat_sayisi + 1, saat + 1):
+                i = no % self.saatlik.kapasite
+                if self.saatlik.no[i] == no and self.saatlik.acilma[i]:
+                    sonuc.append((no, self.saatlik.acilma[i]))
+        return sonuc
+
+    def son_araliklar(self, adet):
+        """En son kapanan `adet` aralığın (başlangıç, süre) listesi, yeniden eskiye."""
+        with self._kilit:
+            kapasite = len(self.ham_sure)
+            return [(self.ham_baslangic[j % kapasite], self.ham_sure[j % kapasite])
+                    for j in range(self.ham_sayi - 1, max(self.ham_sayi - adet, self.ham_sayi - kapasite, 0) - 1, -1)]
+
+
+kapi_serileri = {}  # bölge no -> KapiSerisi
+
+def kapi_serilerini_olustur():
+    kapi_serileri.clear()
+    kapi_serileri.update((bolge.no, KapiSerisi(KAPI_SERISI_HAM_KAPASITE, KAPI_SERISI_SAAT, KAPI_SERISI_GUN))
+                         for bolge in bolgeler)
+
+kapi_serilerini_olustur()
+
+def kapi_hareketini_kaydet(bolge, deger, now):
+    """Kapı değişimini bölgenin zaman serisine işler; açılış bekleyen otomatik kurulumu kestiyse ne kadar dolduğunu da."""
+    yaklasma = None
+    if deger == 1 and bolge.otomatik_isler and bolge.otomatik_baslangic is not None and bolge.otomatik_kurulum_suresi > 0:
+        yaklasma = min((time.monotonic() - bolge.otomatik_baslangic) / bolge.otomatik_kurulum_suresi, 1.0)
+    kapi_serileri[bolge.no].kapi_degisti(deger == 1, now, yaklasma)
+
+def saat_no_zamani(no):
+    """yerel_saat_no'nun tersi: saat numarasının başladığı an (epoch)."""
+    return no * 3600 - time.localtime(no * 3600).tm_gmtoff
+
+def sure_ozeti(saniye):
+    """Ölçülen süreyi rapor için kısa metne çevirir (örn. '45 sn', '12 dk', '1 sa 20 dk')."""
+    saniye = int(saniye)
+    if saniye < 60:
+        return f"{saniye} sn"
+    if saniye < 3600:
+        return f"{saniye // 60} dk"
+    return f"{saniye // 3600} sa {saniye % 3600 // 60} dk"
+
+def kapi_raporu(bolge, ayrintili=False):
+    """Bölgenin /rapor metni; sadece önceden hesaplanmış özetler toplanır, ham olaylar taranmaz."""
+    seri = kapi_serileri[bolge.no]
+    simdi = time.time()
+    satirlar = [f"📊 {bolge.ad}"]
+    ozetler = seri.ozetler(simdi)
+    for baslik, ozet in ozetler:
+        satirlar.append(f"{baslik}: {ozet['acilma']} açılma (gece {ozet['gece']}), toplam açık "
+                        f"{sure_ozeti(ozet['acik_sure'])}, en uzun {sure_ozeti(ozet['en_uzun'])}")
+    _, hafta = ozetler[1]
+    satirlar.append(f"Otomatik kurulum (7 gün): {hafta['otomatik']} kez kuruldu; kapı açılarak kesilenlerin "
+                    f"en çok dolanı %{hafta['yaklasma'] * 100:.0f}")
+    acilis = seri.acilis
+    satirlar.append(f"Şu an: kapı açık ({sure_ozeti(simdi - acilis)})" if acilis is not None else "Şu an: kapı kapalı")
+    if ayrintili:
+        saatler = seri.saatlik_acilmalar(simdi)
+        satirlar.append("Saatlik açılma (son 24 saat): " + (", ".join(
+            f"{time.strftime('%H:00', time.localtime(saat_no_zamani(no)))} {adet}"
+            for no, adet in saatler) or "yok"))
+        araliklar = seri.son_araliklar(5)
+        satirlar.append("Son açılışlar: " + (", ".join(
+            f"{time.strftime('%d.%m %H:%M', time.localtime(bas))} ({sure_ozeti(sure)})" for bas, sure in araliklar) or "yok"))
+    return "\n".join(satirlar)
+
+# --- ALARM RÖLESİ DENETLEYİCİSİ ---
+class RoleIstegi:
+    """Bir bölgenin siren isteği: ne zaman başladığı ve hangi desenle çaldığı."""
+    __slots__ = ("baslangic", "desen", "periyot", "susturuldu")
+
+    def __init__(self, baslangic, desen):
+        self.baslangic = baslangic
+        self.desen = desen
+        self.periyot = sum(sure for _, sure in desen) if desen else 0
+        self.susturuldu = False   # SIREN_MAKS_ACIK_SURE doldu
+
+    def durum(self, simdi):
+        """(röle açık mı, bu durumun değişeceği an) döndürür; en uzun çalma süresi de hesaba katılır."""
+        sinir = math.inf if SIREN_MAKS_ACIK_SURE is None else self.baslangic + SIREN_MAKS_ACIK_SURE
+        if simdi >= sinir:
+            return False, math.inf
+        if not self.desen:
+            return True, sinir
+        faz = (simdi - self.baslangic) % self.periyot
+        for acik, sure in self.desen:
+            if faz < sure:
+                return acik, min(simdi + sure - faz, sinir)
+            faz -= sure
+        return self.desen[-1][0], simdi  # Kayan nokta yuvarlaması; hemen yeniden hesaplanır
+
+
+def siren_deseni_hatasi(ad, desenler):
+    """Desen adı `desenler`de yoksa ya da adım süreleri geçersizse hata metnini, değilse None döndürür."""
+    if ad not in desenler:
+        return f"bilinmeyen siren deseni '{ad}'."
+    desen = desenler[ad]
+    if desen and (sum(sure for _, sure in desen) <= 0 or any(sure < 0 for _, sure in desen)):
+        return f"siren deseni '{ad}' adım süreleri pozitif olmalı."
+    return None
+
+
+class RoleDenetleyici:
+    """Alarm rölesini tek başına süren yüksek öncelikli thread.
+
+    Bölgeler iste() ile sadece sirenin çalmasını isteyip geri çeker; röleye yazma, desen adımları ve en uzun
+    çalma süresi bu thread'de yürütülür. Röle yalnızca gerçekten değişeceği zaman yazılır. Her yazmanın
+    son tarihinden (istek ya da desen adımı anı) ne kadar geç kaldığı, bildirim ve sensör işlerinden ayrı ölçülür.
+    """
+
+    def __init__(self):
+        self._kosul = threading.Condition()
+        self._istekler = {}          # bölge no -> RoleIstegi
+        self._son_tarih = None       # Bekleyen isteklerin en erkeninin zamanı (monotonic)
+        self._kenar_tick = None      # Alarmı başlatan kapı kenarının çekirdek zaman damgası
+        self._thread = None
+        self._calisiyor = False
+        self.cikis = False           # Röleye son yazılan durum (True = açık)
+        self.gecikmeler_ms = deque(maxlen=1000)
+        self.yazma = 0
+        self.son_tarih_asimi = 0
+        self.susturulan = 0
+
+    def baslat(self):
+        for bolge in bolgeler:
+            hata = siren_deseni_hatasi(bolge.siren_deseni, SIREN_DESENLERI)
+            if hata:
+                raise ValueError(f"{bolge.ad}: {hata}")
+        self._calisiyor = True
+        self._thread = threading.Thread(target=self._dongu, name="RoleDenetleyici", daemon=True)
+        self._thread.start()
+
+    def durdur(self):
+        """Thread'i durdurur ve röleyi kapatır."""
+        with self._kosul:
+            self._istekler.clear()
+            self._calisiyor = False
+            self._kosul.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if gpio_handle is not None:
+            lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_KAPALI)
+        self.cikis = False
+
+    def iste(self, bolge, acik, kenar_tick=None):
+        """Bölgenin sireni çalmasını ister (acik=True) ya da isteğini geri çeker."""
+        simdi = time.monotonic()
+        with self._kosul:
+            if acik:
+                if bolge.no in self._istekler:
+                    return
+                self._istekler[bolge.no] = RoleIstegi(simdi, SIREN_DESENLERI[bolge.siren_deseni])
+                if kenar_tick is not None:
+                    self._kenar_tick = kenar_tick
+            elif self._istekler.pop(bolge.no, None) is None:
+                return
+            if self._son_tarih is None:
+                self._son_tarih = simdi
+            self._kosul.notify()
+
+    def tumunu_kapat(self):
+        simdi = time.monotonic()
+        with self._kosul:
+            if self._istekler:
+                self._istekler.clear()
+                self._son_tarih = self._son_tarih or simdi
+                self._kosul.notify()
+
+    def _oncelik_ayarla(self):
+        if ROLE_THREAD_ONCELIGI is None:
+            return
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(ROLE_THREAD_ONCELIGI))
+            print(f"Röle thread'i SCHED_FIFO {ROLE_THREAD_ONCELIGI} önceliğiyle çalışıyor.")
+        except (AttributeError, OSError) as e:
+            print(f"Röle thread'i gerçek zamanlı önceliğe alınamadı ({e}); normal öncelikle çalışıyor.")
+
+    def _hesapla(self, simdi):
+        """İsteklerin VEYA'sını ve çıkışın bir sonraki değişebileceği anı döndürür."""
+        cikis, sonraki, susturulan = False, math.inf, []
+        for no, istek in self._istekler.items():
+            acik, degisim = istek.durum(simdi)
+            if degisim == math.inf and not acik and not istek.susturuldu:
+                istek.susturuldu = True
+                susturulan.append(no)
+            cikis = cikis or acik
+            sonraki = min(sonraki, degisim)
+        return cikis, sonraki, susturulan
+
+    def _dongu(self):
+        self._oncelik_ayarla()
+        planli = None  # Desen adımı ya da süre sınırı için uyanılan an
+        with self._kosul:
+            while self._calisiyor:
+                simdi = time.monotonic()
+                cikis, sonraki, susturulan = self._hesapla(simdi)
+                if cikis != self.cikis:
+                    lgpio.gpio_write(gpio_handle, ALARM_ROLE_PIN, ROLE_ACIK if cikis else ROLE_KAPALI)
+                    self.cikis = cikis
+                    self._yazmayi_kaydet(self._son_tarih if self._son_tarih is not None else planli)
+                self._son_tarih = None
+                for no in susturulan:
+                    self.susturulan += 1
+                    print(f"Bölge {no} sireni {SIREN_MAKS_ACIK_SURE} sn çaldı ve susturuldu (alarm durumu sürüyor).")
+                planli = sonraki if sonraki != math.inf else None
+                self._kosul.wait(None if planli is None else max(planli - time.monotonic(), 0))
+
+    def _yazmayi_kaydet(self, son_tarih):
+        """Yazmanın son tarihe göre gecikmesini ve (varsa) kapı kenarı -> röle gecikmesini kaydeder."""
+        self.yazma += 1
+        if son_tarih is not None:
+            gecikme = (time.monotonic() - son_tarih) * 1000
+            self.gecikmeler_ms.append(gecikme)
+            metrik_kaydi["role_son_tarih"].gozlemle(gecikme / 1000)
+            if gecikme > ROLE_SON_TARIH_MS:
+                self.son_tarih_asimi += 1
+        if self.cikis and self._kenar_tick is not None:
+            gecikme = kenar_gecikmesi_ms(self._kenar_tick)
+            self._kenar_tick = None
+            sensor_istatistik["role_gecikme_ms"].append(gecikme)
+            metrik_kaydi["kenar_role"].gozlemle(gecikme / 1000)
+            print(f"Kapı kenarı -> alarm rölesi gecikmesi: {gecikme:.2f} ms")
+
+    def sayaclar(self):
+        return {"yazma": self.yazma, "son_tarih_asimi": self.son_tarih_asimi, "susturulan": self.susturulan}
+
+    def ozet(self):
+        gecikmeler = list(self.gecikmeler_ms)
+        ortalama = sum(gecikmeler) / len(gecikmeler) if gecikmeler else 0.0
+        return (f"Röle denetleyicisi | Yazma: {self.yazma} | Son tarih aşımı (>{ROLE_SON_TARIH_MS} ms): "
+                f"{self.son_tarih_asimi} | Susturulan siren: {self.susturulan} | "
+                f"Gecikme ms (ort/maks): {ortalama:.2f}/{max(gecikmeler, default=0.0):.2f}")
+
+
+role_denetleyici = RoleDenetleyici()
+metrik_kaydi.ekle("role", Gosterge(
+    "guvenlik_role_acik", "Alarm rölesi açık mı (1/0).", lambda: int(bool(role_denetleyici.cikis))))
+metrik_kaydi.ekle("role_sayac", Gosterge(
+    "guvenlik_role_toplam", "Röle denetleyicisi sayaçları.", lambda: role_denetleyici.sayaclar(), "olay", "counter"))
+
+def alarm_rolesini_ac(bolge):
+    """Bölgenin siren isteğini röle denetleyicisine iletir; kapı kenarı zaman damgası ölçüm için aktarılır."""
+    role_denetleyici.iste(bolge, True, sensor_polling_loop.kenar_tick)
+    sensor_polling_loop.kenar_tick = None
+
+def bolge_kur(bolge, **ayrinti):
+    """Bölgenin alarmını kurar ve durumu kaydedip yayınlar."""
+    with bolge_kilidi:
+        bolge.kurulu = True
+        bolge.alarm = False
+        bolge.otomatik_kurulumu_iptal_et()
+        save_system_state(**ayrinti)
+        mqtt_yayinla(bolge.mqtt_topic, f"KURULU{bolge.no}")
+        bolge_durumunu_yayinla(bolge)
+
+def bolge_devre_disi_birak(bolge, **ayrinti):
+    """Bölgenin alarmını kapatır, durumu kaydedip yayınlar; bölge zaten devre dışıysa False döndürür.
+
+    Her iki durumda da kapı kapalıysa otomatik kurulum süresi baştan başlar. Röle bölge kilidi altında
+    bırakılır: sensör döngüsü kurulu kontrolü ile siren isteği arasında bu geçişi göremez.
+    """
+    with bolge_kilidi:
+        if not bolge.kurulu:
+            otomatik_kurulumu_planla(bolge)
+            return False
+        bolge.kurulu = False
+        bolge.alarm = False
+        save_system_state(**ayrinti)
+        role_denetleyici.iste(bolge, False)
+        mqtt_yayinla(bolge.mqtt_topic, f"DEVRE_DISI{bolge.no}")
+        bolge_durumunu_yayinla(bolge)
+        otomatik_kurulumu_planla(bolge)
+    return True
+
+def bolgeyi_degerlendir(bolge, deger, now):
+    """Tek bir bölge için sessiz bildirim ve alarm mantığını çalıştırır.
+
+    Otomatik kurulum burada sayılmaz: kapı kapanınca zamanlayıcıya kurulur, açılınca iptal edilir.
+    """
+    # Kapı durumu değişimini algıla (sessiz bildirim, otomatik kurulum zamanlayıcıları)
+    if deger != bolge.son_deger:
+        bolge.son_hareket = now
+        if bolge.son_deger is not None:
+            olay_gunlugu.yaz("kapi", bolge=bolge.no, acik=deger == 1)
+            kapi_hareketini_kaydet(bolge, deger, now)
+        kapi_durumunu_yayinla(bolge, deger)
+        if not bolge.kurulu:
+            if deger == 1:
+                send_telegram_silent_photo(f"🚪 {bolge.ad} kapısı açıldı (alarm devre dışı).", camera_name=bolge.kamera)
+            else:
+                send_telegram_silent_photo(f"🚪 {bolge.ad} kapısı kapandı (alarm devre dışı).", camera_name=bolge.kamera)
+        bolge.son_deger = deger
+        otomatik_kurulumu_planla(bolge)
+
+    # --- Alarm tetikleme ve tekrar bildirimi ---
+    if bolge.kurulu and (deger == 1 or bolge.alarm):
+        if not bolge.alarm:
+            bolge.alarm = True
+            bolge.alarm_son_gonderim = now
+            print(f"ALARM{bolge.no}! Sistem kurulu iken {bolge.ad} kapısı açıldı!")
+            alarm_rolesini_ac(bolge)
+            olay_gunlugu.yaz("alarm", bolge=bolge.no)
+            mqtt_yayinla(bolge.mqtt_topic, f"ALARM{bolge.no}_CALIYOR")
+            bolge_durumunu_yayinla(bolge)
+            bildirim_dagitici.duzenlemeyi_birak(f"alarm{bolge.no}_devam")
+            send_telegram_notification(f"🚨🚨🚨 ALARM{bolge.no}! 🚨🚨🚨\n{bolge.ad.upper()} KAPISI ZORLA AÇILDI!\nLütfen hemen müdahale edin!", camera_name=bolge.kamera, oncelik=ONCELIK_KRITIK)
+            alarm_klibini_planla(bolge, now)
+            kare_tamponu.alarm(bolge, now)
+        elif now - bolge.alarm_son_gonderim > ALARM_TEKRAR_SURESI:
+            bolge.alarm_son_gonderim = now
+            if deger == 1:
+                send_telegram_notification(f"🚨🚨🚨 ALARM{bolge.no} DEVAM EDİYOR! 🚨🚨🚨\n{bolge.ad} kapısı HALA AÇIK! Lütfen hemen müdahale edin!", camera_name=bolge.kamera, oncelik=ONCELIK_KRITIK, anahtar=f"alarm{bolge.no}_devam")
+            else:
+                send_telegram_notification(f"🚨🚨🚨 ALARM{bolge.no} DEVAM EDİYOR! 🚨🚨🚨\nKapı kapandı ancak alarm durumu siz devre dışı bırakana kadar devam edecek!", camera_name=bolge.kamera, oncelik=ONCELIK_KRITIK, anahtar=f"alarm{bolge.no}_devam")
+
+def sensor_degerlendir(degerler, now):
+    """Bölge sırasıyla okunan kapı değerlerini tek döngüde, bölge kilidi altında değerlendirir."""
+    with bolge_kilidi:
+        for bolge, deger in zip(bolgeler, degerler):
+            bolgeyi_degerlendir(bolge, deger, now)
+
+        # Hiçbir bölge kurulu değilse alarmı ve röleyi kapat
+        if not any(bolge.kurulu for bolge in bolgeler) and any(bolge.alarm for bolge in bolgeler):
+            for bolge in bolgeler:
+                bolge.alarm = False
+                bolge_durumunu_yayinla(bolge)
+            role_denetleyici.tumunu_kapat()
+            mqtt_yayinla(MQTT_DURUM_TOPIC, "DEVRE_DISI")
+            send_telegram_notification("✅ Alarm devre dışı bırakıldı, sistem kapandı.")
+
+def sensor_turu():
+    """Sensör döngüsünün bir turu: filtrelenmiş kapı durumlarını değerlendirir ve süreyi ölçer."""
+    baslangic = time.perf_counter()
+    sensor_istatistik["uyanma"] += 1
+    sensor_degerlendir(kapi_filtresi.degerler, time.time())
+    metrik_kaydi["sensor_dongu"].gozlemle(time.perf_counter() - baslangic)
+
+def polling_ornekleme_araligi():
+    return FILTRE_ORNEKLEME_ARALIGI if FILTRE_AKTIF else POLLING_ARALIGI
+
+def polling_ornegi():
+    """Pinleri bir kez okuyup filtreye ekler; bir kapının kararı değiştiyse ya da POLLING_ARALIGI
+    dolduysa değerlendirme turunu çalıştırır (filtre örnekleri arasında değerlendirme yapılmaz)."""
+    global polling_son_tur
+    simdi = time.monotonic()
+    degisti = kapi_filtresi.ornekle(sensor_pinlerini_oku(), simdi)
+    if degisti or simdi - polling_son_tur >= POLLING_ARALIGI:
+        polling_son_tur = simdi
+        sensor_turu()
+
+def sensor_polling_loop(stop_event):
+    """Tüm kapı sensörlerini filtre örnekleme aralığında okur ve alarmı tetikler (yedek mod)."""
+    print("Sensör okuma döngüsü başlatıldı (polling).")
+    sensor_durumunu_baslat()
+    bekci.kaydet("sensor")
+
+    while not stop_event.is_set():
+        try:
+            sensor_ayarlarini_yenile()
+            polling_ornegi()
+            bekci.ilerledi("sensor")
+            time.sleep(polling_ornekleme_araligi())
+        except Exception as e:
+            print(f"Sensör okuma döngüsünde hata: {e}")
+            time.sleep(1)
+    sensor_istatistik["cpu_saniye"] = time.thread_time()
+
+def filtre_kararini_degerlendir():
+    """Filtre bir kapı için karar verdiğinde değerlendirir; kenar->röle gecikmesi adayı başlatan kenardan ölçülür."""
+    sensor_polling_loop.kenar_tick = kapi_filtresi.son_karar_tick
+    sensor_turu()
+    sensor_polling_loop.kenar_tick = None
+
+def kenari_degerlendir(gpio, level, tick):
+    """Callback'ten gelen tek bir kapı kenarını filtreye ekler (thread ve asyncio modları ortak kullanır)."""
+    sensor_istatistik["kenar"] += 1
+    indeks = bolge_pin_indeksi.get(gpio)
+    if indeks is None:  # Ayar yeniden yüklemesinde bırakılan eski pinden kuyrukta kalmış kenar
+        return
+    if kapi_filtresi.ekle(indeks, level, time.monotonic(), tick):
+        filtre_kararini_degerlendir()
+
+def bekleyen_pinleri_ornekle():
+    """Kesme modunda kenardan sonra kararı henüz verilmemiş pinleri okuyup filtreye ekler."""
+    simdi = time.monotonic()
+    degisti = False
+    for indeks in kapi_filtresi.bekleyenler():
+        degisti |= kapi_filtresi.ekle(indeks, lgpio.gpio_read(gpio_handle, bolgeler[indeks].pin), simdi)
+    if degisti:
+        filtre_kararini_degerlendir()
+
+def kesme_bekleme_suresi():
+    """Karar bekleyen pin varsa filtre örnekleme aralığı, yoksa zaman tabanlı kontrol aralığı."""
+    return FILTRE_ORNEKLEME_ARALIGI if kapi_filtresi.bekleyenler() else KESME_KONTROL_ARALIGI
+
+def kesme_zaman_asimi():
+    """Kesme modunda kenar gelmeden geçen bekleme sonunda yapılacak iş."""
+    if kapi_filtresi.bekleyenler():
+        bekleyen_pinleri_ornekle()
+    else:
+        sensor_turu()
+
+def sensor_kesme_dongusu(stop_event):
+    """Kapı sensörlerini lgpio callback'leri ile izler; sadece gerçek kapı hareketlerinde uyanır.
+
+    Her kenar sırayla filtreye eklenir, bu sayede iki kontrol arasında açılıp kapanan kapı da kaçırılmaz.
+    Kenardan sonra filtre karar verene kadar pin FILTRE_ORNEKLEME_ARALIGI ile okunur.
+    Kenar gelmediğinde KESME_KONTROL_ARALIGI saniyede bir zaman tabanlı kontroller çalıştırılır.
+    """
+    print("Sensör okuma döngüsü başlatıldı (kesme).")
+    kenar_kuyrugu = queue.Queue()
+
+    def kenar_geri_cagrisi(chip, gpio, level, tick):
+        # level 2 = watchdog zaman aşımı, kapı hareketi değil
+        if level in (0, 1):
+            kenar_kuyrugu.put((gpio, level, tick))
+
+    sensor_durumunu_baslat()
+    bekci.kaydet("sensor")
+    geri_cagrilar = {
+        bolge.pin: lgpio.callback(gpio_handle, bolge.pin, lgpio.BOTH_EDGES, kenar_geri_cagrisi)
+        for bolge in bolgeler
+    }
+
+    try:
+        while not stop_event.is_set():
+            try:
+                sensor_ayarlarini_yenile(geri_cagrilar, kenar_geri_cagrisi)
+                try:
+                    gpio, level, tick = kenar_kuyrugu.get(timeout=kesme_bekleme_suresi())
+                except queue.Empty:
+                    kesme_zaman_asimi()
+                    bekci.ilerledi("sensor")
+                    continue
+
+                kenari_degerlendir(gpio, level, tick)
+                bekci.ilerledi("sensor")
+            except Exception as e:
+                print(f"Sensör kesme döngüsünde hata: {e}")
+                time.sleep(1)
+    finally:
+        for geri_cagri in geri_cagrilar.values():
+            geri_cagri.cancel()
+        sensor_istatistik["cpu_saniye"] = time.thread_time()
+
+def gpio_arkaucunu_yukle(cip=None):
+    """GPIO_ARKAUCU ayarına göre gerçek lgpio modülünü ya da simüle çipi `lgpio` adına bağlar.
+
+    Programın geri kalanı iki arka uca da aynı lgpio çağrılarıyla erişir. `cip` verilirse (benchmark)
+    o simüle çip kullanılır.
+    """
+    global lgpio
+    if cip is None and GPIO_ARKAUCU == "simulasyon":
+        import simulasyon
+        cip = simulasyon.SimuleGpio()
+    if cip is not None:
+        lgpio = cip
+        print("GPIO arka ucu: simülasyon (donanım kullanılmıyor).")
+    elif lgpio is None:
+        raise RuntimeError('lgpio kütüphanesi bulunamadı; donanımsız çalıştırmak için GPIO_ARKAUCU = "simulasyon" kullanın.')
+
+def sensor_girislerini_kur():
+    """Kapı pinlerini seçilen moda göre ayırır ve gerçekten devreye giren modu döndürür."""
+    flags = lgpio.SET_PULL_UP
+    pinler = [bolge.pin for bolge in bolgeler]
+    if SENSOR_MODU == "kesme":
+        ayrilan = []
+        try:
+            for pin in pinler:
+                lgpio.gpio_claim_alert(gpio_handle, pin, lgpio.BOTH_EDGES, flags)
+                ayrilan.append(pin)
+            return "kesme"
+        except lgpio.error as e:
+            print(f"Kesme modu kurulamadı, polling moduna geçiliyor: {e}")
+            for pin in ayrilan:
+                lgpio.gpio_free(gpio_handle, pin)
+    sensor_gruplarini_ayir(pinler)
+    return "polling"
+
+def sensor_gruplarini_ayir(pinler, degisen=()):
+    """Polling modunda pinleri gruplar halinde ayırır, her döngüde tek group_read ile okunur.
+
+    `degisen` verilirse (ayar yeniden yüklemesi) sadece bu pinlerden birini içeren gruplar bırakılıp yeniden ayrılır.
+    """
+    yeni_gruplar = [pinler[i:i + GPIO_GRUP_BOYUTU] for i in range(0, len(pinler), GPIO_GRUP_BOYUTU)]
+    for indeks, grup in enumerate(yeni_gruplar):
+        eski = sensor_gruplari[indeks] if indeks < len(sensor_gruplari) else None
+        if eski == grup and not set(grup) & set(degisen):
+            continue
+        if eski:
+            lgpio.gpio_free(gpio_handle, eski[0])  # Grup liderini bırakmak tüm grubu bırakır
+        lgpio.group_claim_input(gpio_handle, grup, lgpio.SET_PULL_UP)
+    sensor_gruplari[:] = yeni_gruplar
+
+def sensor_ayarlarini_yenile(geri_cagrilar=None, kenar_geri_cagrisi=None):
+    """Yeniden yüklenen ayarlardaki pin ve filtre değişikliklerini sensör döngüsünün kendi thread'inde uygular.
+
+    Sadece pini değişen bölgenin eski hattı bırakılıp yenisi ayrılır (polling modunda o pini içeren grup);
+    diğer kapı hatları ve röle hattı hiç bırakılmaz. Yeni pinin ilk okuması o kapının filtre kararı olur.
+    Kesme modunda `geri_cagrilar` (pin -> callback) ve kenar callback'i verilir.
+    """
+    global filtre_ayari_degisti
+    if not (yeni_pinler or filtre_ayari_degisti):
+        return
+    with ayar_kilidi:
+        pinler, filtre = dict(yeni_pinler), filtre_ayari_degisti
+        yeni_pinler.clear()
+        filtre_ayari_degisti = False
+    if pinler:
+        eski_pinler = {bolge: bolge.pin for bolge in pinler}
+        if geri_cagrilar is not None:
+            for eski in eski_pinler.values():
+                geri_cagrilar.pop(eski).cancel()
+                lgpio.gpio_free(gpio_handle, eski)
+        for bolge, yeni in pinler.items():
+            bolge.pin = yeni
+        if geri_cagrilar is not None:
+            for bolge in pinler:
+                lgpio.gpio_claim_alert(gpio_handle, bolge.pin, lgpio.BOTH_EDGES, lgpio.SET_PULL_UP)
+                geri_cagrilar[bolge.pin] = lgpio.callback(gpio_handle, bolge.pin, lgpio.BOTH_EDGES, kenar_geri_cagrisi)
+        else:
+            sensor_gruplarini_ayir([bolge.pin for bolge in bolgeler], list(eski_pinler.values()))
+        bolge_pin_indeksi.clear()
+        bolge_pin_indeksi.update((bolge.pin, i) for i, bolge in enumerate(bolgeler))
+        for bolge, eski in eski_pinler.items():
+            print(f"{bolge.ad} kapı pini {eski} -> {bolge.pin} olarak değiştirildi.")
+    if pinler:
+        okunan = sensor_pinlerini_oku()
+        for bolge in pinler:
+            indeks = bolge_pin_indeksi[bolge.pin]
+            kapi_filtresi.pinler[indeks] = PinFiltresi(okunan[indeks], *kapi_filtresi.ayar)
+            kapi_filtresi.degerler[indeks] = okunan[indeks]
+    if filtre:
+        filtre_ayarlarini_dogrula()
+        kapi_filtresi.baslat(kapi_filtresi.degerler)
+        # Kararı beklenen kapılar yeni filtrede aday olarak yeniden başlasın
+        if kapi_filtresi.ornekle(sensor_pinlerini_oku(), time.monotonic()):
+            filtre_kararini_degerlendir()
+
+def gpio_kur():
+    """GPIO çipini açar, röleyi KAPALI konumda ayırır, kapı girişlerini kurar ve devreye giren sensör modunu döndürür."""
+    global gpio_handle
+    gpio_handle = lgpio.gpiochip_open(GPIO_CHIP)
+    lgpio.gpio_claim_output(gpio_handle, ALARM_ROLE_PIN, ROLE_KAPALI)  # Varsayılan seviye (0) ters rölede sireni açar
+    filtre_ayarlarini_dogrula()
+    return sensor_girislerini_kur()
+
+def sensor_istatistik_ozeti():
+    """Sensör modunun uyanma, CPU ve gecikme özetini yazdırır."""
+    if sensor_istatistik["baslangic"] is None:
+        return
+    sure = max(time.time() - sensor_istatistik["baslangic"], 1e-9)
+    ozet = (f"Sensör modu: {aktif_sensor_modu} | Süre: {sure:.0f} sn | "
+            f"Uyanma: {sensor_istatistik['uyanma']} ({sensor_istatistik['uyanma'] / sure:.2f}/sn) | "
+            f"Kenar: {sensor_istatistik['kenar']} | CPU: {sensor_istatistik['cpu_saniye']:.3f} sn")
+    gecikmeler = sorted(sensor_istatistik["role_gecikme_ms"])
+    if gecikmeler:
+        ozet += (f" | Kenar->röle gecikmesi ms (medyan/maks): "
+                 f"{gecikmeler[len(gecikmeler) // 2]:.2f}/{gecikmeler[-1]:.2f}")
+    filtre = sorted(sensor_istatistik["filtre_gecikme_ms"])
+    if filtre:
+        ozet += f" | Filtre kararı ms (medyan/maks): {filtre[len(filtre) // 2]:.2f}/{filtre[-1]:.2f}"
+    ozet += f" | Bastırılan parazit: {sensor_istatistik['bastirilan']}"
+    print(ozet)
+
+def eski_topic_durumlari():
+    """Eski tek-topic düzeni için her topic'in gerçek durumu; topic'i paylaşan bölgelerden en önemlisi seçilir."""
+    durumlar = {}
+    for bolge in bolgeler:
+        if bolge.alarm:
+            aday = (2, f"ALARM{bolge.no}_CALIYOR")
+        elif bolge.kurulu:
+            aday = (1, f"KURULU{bolge.no}")
+        else:
+            aday = (0, "DEVRE_DISI")
+        if bolge.mqtt_topic not in durumlar or aday[0] > durumlar[bolge.mqtt_topic][0]:
+            durumlar[bolge.mqtt_topic] = aday
+    return {topic: mesaj for topic, (_, mesaj) in durumlar.items()}
+
+def on_connect(client, userdata, flags, rc):
+    """MQTT broker'a bağlanınca çalışır: komutlara abone olur, bekleyen yayınları ve gerçek durumu gönderir."""
+    if rc != 0:
+        print(f"MQTT bağlantı hatası! Kod: {rc}")
+        return
+    print("MQTT Broker'a başarıyla bağlanıldı.")
+    # paho Nagle'ı kapatmaz; art arda gelen küçük yayınlar (kapı + alarm) gecikmeli ACK'i beklemesin
+    sock = client.socket()
+    if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if MQTT_KOMUTLARI_AKTIF:
+        client.subscribe([(mqtt_topic(bolge, "komut"), MQTT_KOMUT_QOS) for bolge in bolgeler])
+    client.publish(f"{mqtt_dugum_oneki()}/sistem/baglanti", "CEVRIMICI", qos=1, retain=True)
+    acilis_olcumu.isaretle("mqtt")
+
+    bekleyen = mqtt_cevrimdisi.bosalt()
+    for topic, mesaj, qos, retain in bekleyen:
+        client.publish(topic, mesaj, qos=qos, retain=retain)
+    if bekleyen:
+        print(f"Bağlantı yokken bekletilen {len(bekleyen)} MQTT yayını gönderildi.")
+
+    # Yeniden bağlantıda eski/yanlış bir durum kalmasın diye gerçek durum her seferinde yeniden yayınlanır
+    for topic, mesaj in eski_topic_durumlari().items():
+        client.publish(topic, mesaj, qos=MQTT_DURUM_QOS, retain=True)
+    for bolge in bolgeler:
+        if DUGUM_ID:
+            client.publish(mqtt_topic(bolge, "bilgi"), bolge_bilgisi(bolge), qos=1, retain=True)
+        client.publish(mqtt_topic(bolge, "durum"), bolge_durum_metni(bolge), qos=MQTT_DURUM_QOS, retain=True)
+        if bolge.son_deger is not None:
+            client.publish(mqtt_topic(bolge, "kapi"), "ACIK" if bolge.son_deger == 1 else "KAPALI",
+                           qos=MQTT_KAPI_QOS, retain=True)
+
+MQTT_KUR_KOMUTLARI = ("KUR", "AKTIFET", "ARM", "ON")
+MQTT_DEVRE_DISI_KOMUTLARI = ("DEVRE_DISI", "DEAKTIFET", "DISARM", "OFF")
+
+def on_message(client, userdata, msg):
+    """<önek>/bolge/<no>/komut topic'lerine gelen kurma/devre dışı bırakma komutlarını zamanlayıcıya aktarır.
+
+    Komut paho thread'inde uygulanmaz: bölge kilidini tutan sensör döngüsü yayın yaparken paho'nun callback
+    kilidini bekleyebilir, bu thread de o kilidi tutarken bölge kilidini beklerse ikisi kilitlenirdi.
+    """
+    bolge = next((b for b in bolgeler if mqtt_topic(b, "komut") == msg.topic), None)
+    komut = msg.payload.decode("utf-8", "replace").strip().upper()
+    if bolge is None:
+        return
+    zamanlayici.sonra(0, mqtt_komutunu_uygula, bolge, komut, msg.topic)
+
+def mqtt_komutunu_uygula(bolge, komut, topic):
+    """on_message ile gelen bölge komutunu zamanlayıcıda uygular."""
+    if komut in MQTT_KUR_KOMUTLARI:
+        with bolge_kilidi:
+            bolge.otomatik_kurulumu_iptal_et()
+            if bolge.kurulu:
+                bolge_durumunu_yayinla(bolge)
+                return
+            bolge_kur(bolge, kaynak="mqtt")
+        print(f"{bolge.ad} MQTT komutu ile kuruldu (ARMED).")
+        send_telegram_notification(f"✅ {bolge.ad} için sistem MQTT komutuyla kuruldu.", camera_name=bolge.kamera)
+    elif komut in MQTT_DEVRE_DISI_KOMUTLARI:
+        if bolge_devre_disi_birak(bolge, kaynak="mqtt"):
+            print(f"{bolge.ad} MQTT komutu ile devre dışı bırakıldı.")
+            send_telegram_notification(f"❌ {bolge.ad} için sistem MQTT komutuyla devre dışı bırakıldı.", camera_name=bolge.kamera)
+        else:
+            bolge_durumunu_yayinla(bolge)
+    else:
+        print(f"Bilinmeyen MQTT komutu ({topic}): {komut!r}")
+
+def mqtt_istemcisi_olustur():
+    """Thread ve asyncio modlarının ortak kullandığı MQTT istemcisini hazırlar (son arzu mesajı dahil)."""
+    # Ortak broker'da düğümler birbirinin bağlantısını düşürmesin diye istemci kimliği düğüme özeldir
+    istemci_kimligi = f"SecurityControllerPi5-{DUGUM_ID}" if DUGUM_ID else "SecurityControllerPi5"
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, istemci_kimligi)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    # paho her gönderilen/alınan pakette (keepalive PINGRESP dahil) on_log çağırır: ağ döngüsü ilerliyor demektir
+    client.on_log = lambda *_: bekci.ilerledi("mqtt")
+    bekci.kaydet("mqtt")
+    if MQTT_KULLANICI:
+        client.username_pw_set(MQTT_KULLANICI, MQTT_SIFRE)
+    client.will_set(f"{mqtt_dugum_oneki()}/sistem/baglanti", "CEVRIMDISI", qos=1, retain=True)
+    return client
+
+def mqtt_istemcisini_baslat():
+    """Thread modunda MQTT istemcisini oluşturur ve ağ döngüsünü arka plan thread'inde başlatır.
+
+    Broker o an erişilemese de program başlar; paho arka planda yeniden bağlanır, bu sürede yapılan
+    yayınlar çevrimdışı kuyrukta bekler.
+    """
+    global mqtt_client
+    mqtt_client = mqtt_istemcisi_olustur()
+    mqtt_client.connect_async(MQTT_BROKER_IP, MQTT_PORT, 60)
+    mqtt_client.loop_start()
+    print("MQTT istemcisi arka planda başlatıldı.")
+
+# --- TELEGRAM KOMUTLARI ---
+def aktifet_komutu_olustur(bolge):
+    """Bölge için /aktifet<no> komut işleyicisini oluşturur."""
+    async def aktifet_command(update: telegram.Update, context: telegram_ext.ContextTypes.DEFAULT_TYPE) -> None:
+        user = update.message.from_user
+        with bolge_kilidi:
+            bolge.otomatik_kurulumu_iptal_et()
+            kuruldu = not bolge.kurulu
+            if kuruldu:
+                bolge_kur(bolge, kaynak="komut", kullanici=user.full_name, kullanici_id=user.id)
+        if kuruldu:
+            print(f"{bolge.ad} '/aktifet{bolge.no}' komutu ile kuruldu (ARMED).")
+            await update.message.reply_text(f"✅ {bolge.ad} için sistem kuruldu.")
+        else:
+            await update.message.reply_text(f"ℹ️ {bolge.ad} zaten kurulu.")
+    aktifet_command.__doc__ = f"/aktifet{bolge.no} komutunu işler."
+    return aktifet_command
+
+def deaktifet_komutu_olustur(bolge):
+    """Bölge için /deaktifet<no> komut işleyicisini oluşturur (kimin yaptığını bildirir)."""
+    async def deaktifet_command(update: telegram.Update, context: telegram_ext.ContextTypes.DEFAULT_TYPE) -> None:
+        user = update.message.from_user
+        user_info = user.first_name
+        if user.last_name:
+            user_info += f" {user.last_name}"
+
+        if bolge_devre_disi_birak(bolge, kaynak="komut", kullanici=user_info, kullanici_id=user.id):
+            message = f"❌ {bolge.ad} için sistem, **{user_info}** tarafından devre dışı bırakıldı."
+            print(f"{bolge.ad}, kullanıcı '{user_info}' (ID: {user.id}) tarafından devre dışı bırakıldı.")
+            await update.message.reply_text(message, parse_mode='Markdown')
+        else:
+            await update.message.reply_text(f"ℹ️ {bolge.ad} zaten devre dışı.")
+    deaktifet_command.__doc__ = f"/deaktifet{bolge.no} komutunu işler."
+    return deaktifet_command
+
+async def otomatikalarmkapat_command(update: telegram.Update, context: telegram_ext.ContextTypes.DEFAULT_TYPE) -> None:
+    global otomatik_alarm_kapali
+    user = update.message.from_user
+    with bolge_kilidi:
+        otomatik_alarm_kapali = True
+        for bolge in bolgeler:
+            otomatik_kurulumu_askiya_al(bolge)
+        save_system_state(kaynak="komut", kullanici=user.full_name, kullanici_id=user.id)
+    zamanlar = ", ".join(f"{bolge.ad} {takvim_zamani_metni(sonraki_takvim_zamani(bolge.takvim))}" for bolge in bolgeler)
+    await update.message.reply_text(f"✅ Otomatik alarm kurulumları takvimdeki bir sonraki saate kadar devre dışı bırakıldı ({zamanlar}).")
+
+async def rapor_command(update: telegram.Update, context: telegram_ext.ContextTypes.DEFAULT_TYPE) -> None:
+    """/rapor [bölge no]: kapı aktivitesi özeti; bölge verilirse saatlik dağılım ve son açılışlar da eklenir."""
+    secilen = bolgeler
+    if context.args:
+        secilen = [bolge for bolge in bolgeler if str(bolge.no) == context.args[0]]
+        if not secilen:
+            await update.message.reply_text("Kullanım: /rapor [bölge no]")
+            return
+    await update.message.reply_text("\n\n".join(kapi_raporu(bolge, ayrintili=bool(context.args)) for bolge in secilen))
+
+def otomatik_kurulumu_askiya_al(bolge):
+    bolge.otomatik_askida = True
+    bolge.otomatik_kurulumu_iptal_et()
+    if bolge.takvim_isi is not None:
+        zamanlayici.iptal(bolge.takvim_isi)
+        bolge.takvim_isi = None
+
+def takvimi_planla(bolge):
+    """Bölgenin takvimdeki bir sonraki saatine zamanlayıcı kurar."""
+    bolge.takvim_kaydi = zamanlayici.saatinde(sonraki_takvim_zamani(bolge.takvim), takvim_saati_geldi, bolge)
+
+def otomatik_takvimini_kur():
+    """Takvimleri doğrular, askıdaki otomatik kurulumları işaretler ve her bölgenin takvim zamanlayıcısını kurar."""
+    for bolge in bolgeler:
+        for satir in bolge.takvim:
+            takvim_satirini_coz(satir)
+        bolge.otomatik_askida = otomatik_alarm_kapali
+        takvimi_planla(bolge)
+        if otomatik_alarm_kapali:
+            print(f"{bolge.ad} otomatik kurulumu askıda; {takvim_zamani_metni(sonraki_takvim_zamani(bolge.takvim))} saatinde açılacak.")
+
+def takvim_saati_geldi(bolge):
+    """Takvim saatinde askıdaki otomatik kurulumu açar; OTOMATIK_KURULUM_GECIKMESI sonra kapı kapalıysa bölgeyi kurar."""
+    global otomatik_alarm_kapali
+    takvimi_planla(bolge)
+    with bolge_kilidi:
+        if not bolge.otomatik_askida:
+            return
+        bolge.otomatik_askida = False
+        if not any(b.otomatik_askida for b in bolgeler):
+            otomatik_alarm_kapali = False
+            save_system_state(kaynak="zamanlayici")
+    send_telegram_notification(f"ℹ️ {bolge.ad} için otomatik alarm kurulumu tekrar aktif edildi. {sure_metni(OTOMATIK_KURULUM_GECIKMESI)} sonra kapı kapalıysa alarm otomatik kurulacak!", camera_name=bolge.kamera)
+    bolge.takvim_isi = zamanlayici.sonra(OTOMATIK_KURULUM_GECIKMESI, kapali_bolgeyi_kur, bolge)
+    otomatik_kurulumu_planla(bolge)
+
+def kapali_bolgeyi_kur(bolge):
+    """Takvim kurulumunda kapısı kapalı olan bölgenin alarmını kurar."""
+    bolge.takvim_isi = None
+    # Kapı değeri sensör döngüsünün son değerlendirmesinden alınır
+    with bolge_kilidi:
+        if bolge.kurulu or bolge.son_deger is None:
+            return
+        kapali = bolge.son_deger == 0
+        if kapali:
+            bolge_kur(bolge, kaynak="otomatik")
+    if kapali:  # Kapı kapalıysa
+        send_telegram_notification(f"🔒 {bolge.ad} otomatik alarm süresi doldu - Alarm KURULDU!", camera_name=bolge.kamera)
+        print(f"{bolge.ad} otomatik alarm süresi sonunda kuruldu.")
+    else:
+        send_telegram_notification(f"⚠️ {bolge.ad} kapısı açık olduğu için alarm kurulamadı.", camera_name=bolge.kamera)
+
+# --- AYAR DOSYASI VE CANLI YENİDEN YÜKLEME ---
+# Çalışırken yeniden yüklenebilen ayarlar. Bölge tablosunda ad, pin, kamera, topic, süre, siren deseni ve takvim
+# değiştirilebilir; bölge eklemek ya da çıkarmak (Telegram komutları değişir) yeniden başlatma gerektirir.
+CANLI_AYARLAR = (
+    "BOLGE_TABLOSU", "OTOMATIK_KURULUM_UYARI_SURESI", "OTOMATIK_KURULUM_GECIKMESI", "OTOMATIK_KURULUM_TAKVIMI",
+    "ALARM_TEKRAR_SURESI", "POLLING_ARALIGI", "KESME_KONTROL_ARALIGI",
+    "FILTRE_AKTIF", "FILTRE_ORNEKLEME_ARALIGI", "FILTRE_PENCERE", "FILTRE_ESIK", "FILTRE_MIN_KARARLI_SURE",
+    "TELEGRAM_CHAT_ID", "TELEGRAM_SOHBET_HIZI", "TELEGRAM_SOHBET_KAPASITESI", "TELEGRAM_GENEL_HIZ", "TELEGRAM_ALICILAR",
+    "FRIGATE_IP", "FRIGATE_PORT", "GORUNTU_YENILEME_ARALIGI", "GORUNTU_MAKS_YAS_MS", "GORUNTU_SAKLAMA_SURESI",
+    "KAPI_HAREKET_SURESI", "ALARM_KLIBI_AKTIF", "ALARM_KLIBI_ON_SURE", "ALARM_KLIBI_MAKS_SURE", "ALARM_KLIBI_MAKS_BOYUT",
+    "ALARM_KLIBI_EN_GEC", "ALARM_KLIBI_YOKLAMA_ARALIGI", "ALARM_KLIBI_PARCA_BOYUTU", "KARE_TAMPONU_ARALIGI",
+    "KARE_ONCESI", "KARE_SONRASI", "KARE_YUKSEKLIGI", "KARE_JPEG_KALITESI", "SIREN_DESENLERI", "SIREN_VARSAYILAN_DESEN", "SIREN_MAKS_ACIK_SURE", "ROLE_SON_TARIH_MS",
+    "MQTT_DURUM_QOS", "MQTT_KAPI_QOS", "MQTT_CEVRIMDISI_KUYRUK", "GECE_BASLANGIC_SAATI", "GECE_BITIS_SAATI",
+    "BEKCI_KONTROL_ARALIGI", "BEKCI_ESIKLERI",
+)
+# Sadece açılışta okunanlar: çalışırken değişirlerse bildirilir, yeni değer bir sonraki başlatmada geçerli olur
+YENIDEN_BASLATMA_AYARLARI = (
+    "GPIO_CHIP", "ALARM_ROLE_PIN", "GPIO_ARKAUCU", "GPIO_SIMULASYON_IZI", "GPIO_GRUP_BOYUTU", "ROLE_ACIK", "ROLE_KAPALI",
+    "ROLE_THREAD_ONCELIGI", "CALISMA_MODU", "SENSOR_MODU", "ZAMANLAYICI_SAAT_KONTROLU",
+    "MQTT_BROKER_IP", "MQTT_PORT", "MQTT_KULLANICI", "MQTT_SIFRE", "MQTT_DURUM_TOPIC", "MQTT_KONU_ONEKI",
+    "MQTT_KOMUTLARI_AKTIF", "MQTT_KOMUT_QOS", "DUGUM_ID", "TELEGRAM_BOT_TOKEN", "TELEGRAM_API_URL", "TELEGRAM_ALMA_MODU",
+    "TELEGRAM_WEBHOOK_URL", "TELEGRAM_WEBHOOK_ADRESI", "TELEGRAM_WEBHOOK_PORTU", "TELEGRAM_WEBHOOK_YOLU",
+    "TELEGRAM_WEBHOOK_GIZLI_ANAHTAR", "TELEGRAM_HIZLI_KOMUTLAR", "BILDIRIM_KUYRUK_BOYUTU", "BILDIRIM_ISCI_SAYISI",
+    "TELEGRAM_PARALEL_GONDERIM", "METRIK_ADRESI", "METRIK_PORTU", "HEALTHCHECKS_PING_URL",
+    "KAPI_SERISI_HAM_KAPASITE", "KAPI_SERISI_SAAT", "KAPI_SERISI_GUN",
+    "KARE_TAMPONU_AKTIF", "KARE_TAMPONU_BOYUTU", "KARE_ISCI_SAYISI",
+)
+AYAR_VARSAYILANLARI = {ad: globals()[ad] for ad in CANLI_AYARLAR + YENIDEN_BASLATMA_AYARLARI}
+BOS_OLABILIR_AYARLAR = ("GPIO_SIMULASYON_IZI", "MQTT_KULLANICI", "MQTT_SIFRE", "DUGUM_ID", "TELEGRAM_BOT_TOKEN",
+                        "TELEGRAM_WEBHOOK_GIZLI_ANAHTAR", "SIREN_MAKS_ACIK_SURE", "ROLE_THREAD_ONCELIGI", "METRIK_PORTU")
+SECENEKLI_AYARLAR = {
+    "GPIO_ARKAUCU": ("lgpio", "simulasyon"),
+    "CALISMA_MODU": ("thread", "asyncio"),
+    "SENSOR_MODU": ("kesme", "polling"),
+    "TELEGRAM_ALMA_MODU": ("polling", "webhook"),
+}
+POZITIF_AYARLAR = ("POLLING_ARALIGI", "KESME_KONTROL_ARALIGI", "FILTRE_ORNEKLEME_ARALIGI", "GORUNTU_YENILEME_ARALIGI",
+                   "TELEGRAM_SOHBET_HIZI", "TELEGRAM_SOHBET_KAPASITESI", "TELEGRAM_GENEL_HIZ", "ZAMANLAYICI_SAAT_KONTROLU",
+                   "GPIO_GRUP_BOYUTU", "BILDIRIM_KUYRUK_BOYUTU", "BILDIRIM_ISCI_SAYISI", "TELEGRAM_PARALEL_GONDERIM",
+                   "KAPI_SERISI_HAM_KAPASITE", "KAPI_SERISI_SAAT", "KAPI_SERISI_GUN", "ALARM_KLIBI_MAKS_SURE",
+                   "ALARM_KLIBI_MAKS_BOYUT", "ALARM_KLIBI_EN_GEC", "ALARM_KLIBI_YOKLAMA_ARALIGI", "ALARM_KLIBI_PARCA_BOYUTU",
+                   "KARE_TAMPONU_ARALIGI", "KARE_TAMPONU_BOYUTU", "KARE_ONCESI", "KARE_SONRASI", "KARE_YUKSEKLIGI",
+                   "KARE_ISCI_SAYISI", "BEKCI_KONTROL_ARALIGI")
+BOLGE_ALANLARI = {"no": int, "ad": str, "pin": int, "kamera": str, "mqtt_topic": str,
+                  "otomatik_kurulum_suresi": (int, float), "siren_deseni": str, "takvim": list}
+ZORUNLU_BOLGE_ALANLARI = ("no", "ad", "pin", "kamera", "otomatik_kurulum_suresi")
+ALICI_ALANLARI = ("chat_id", "en_dusuk")
+ayar_kilidi = threading.Lock()
+
+def _ayar_turu_uygun(ad, deger):
+    """Değerin türü main.py'deki varsayılanla uyumlu mu (ondalıklı ayarlara tam sayı da yazılabilir)."""
+    varsayilan = AYAR_VARSAYILANLARI[ad]
+    if deger is None:
+        return ad in BOS_OLABILIR_AYARLAR
+    if varsayilan is None:
+        return isinstance(deger, str)
+    if isinstance(varsayilan, bool) or isinstance(deger, bool):
+        return isinstance(varsayilan, bool) and isinstance(deger, bool)
+    if isinstance(varsayilan, float):
+        return isinstance(deger, (int, float))
+    return isinstance(deger, type(varsayilan))
+
+def _ayarlari_duzenle(aday):
+    """Dosya biçiminden gelen farkları giderir: sayı olarak yazılan sohbet ID'leri, TOML'da null olmadığı için
+    boş listeyle yazılan sürekli siren deseni, listeyle yazılan desen adımları, verilmeyen bölge topic'i ve
+    dosyada yazılmayan bekçi eşikleri."""
+    if isinstance(aday["TELEGRAM_CHAT_ID"], int) and not isinstance(aday["TELEGRAM_CHAT_ID"], bool):
+        aday["TELEGRAM_CHAT_ID"] = str(aday["TELEGRAM_CHAT_ID"])
+    if isinstance(aday["TELEGRAM_ALICILAR"], list):
+        aday["TELEGRAM_ALICILAR"] = [
+            {**alici, "chat_id": str(alici["chat_id"])}
+            if isinstance(alici, dict) and type(alici.get("chat_id")) is int else alici
+            for alici in aday["TELEGRAM_ALICILAR"]
+        ]
+    if isinstance(aday["SIREN_DESENLERI"], dict):
+        aday["SIREN_DESENLERI"] = {
+            ad: [tuple(adim) if isinstance(adim, list) else adim for adim in desen] or None if isinstance(desen, list) else desen
+            for ad, desen in aday["SIREN_DESENLERI"].items()
+        }
+    if isinstance(aday["BEKCI_ESIKLERI"], dict):
+        aday["BEKCI_ESIKLERI"] = {**AYAR_VARSAYILANLARI["BEKCI_ESIKLERI"], **aday["BEKCI_ESIKLERI"]}
+    if isinstance(aday["BOLGE_TABLOSU"], list):
+        aday["BOLGE_TABLOSU"] = [
+            {"mqtt_topic": aday["MQTT_DURUM_TOPIC"], **satir} if isinstance(satir, dict) else satir
+            for satir in aday["BOLGE_TABLOSU"]
+        ]
+
+def _takvim_hatalari(onek, takvim):
+    hatalar = []
+    for satir in takvim:
+        try:
+            takvim_satirini_coz(satir)
+        except (ValueError, AttributeError):
+            hatalar.append(f"{onek}: geçersiz takvim satırı {satir!r} (örn. 'pzt-cum 18:30', '* 18:30')")
+    return hatalar
+
+def _bolge_tablosu_hatalari(aday):
+    hatalar = []
+    nolar, pinler = set(), set()
+    if not aday["BOLGE_TABLOSU"]:
+        hatalar.append("BOLGE_TABLOSU: en az bir bölge tanımlanmalı.")
+    for sira, satir in enumerate(aday["BOLGE_TABLOSU"], 1):
+        onek = f"BOLGE_TABLOSU[{sira}]"
+        if not isinstance(satir, dict):
+            hatalar.append(f"{onek}: bölge satırı anahtar = değer tablosu olmalı.")
+            continue
+        hatalar += [f"{onek}: '{alan}' eksik." for alan in ZORUNLU_BOLGE_ALANLARI if alan not in satir]
+        hatalar += [f"{onek}: bilinmeyen alan '{alan}'." for alan in satir if alan not in BOLGE_ALANLARI]
+        turu_yanlis = [alan for alan, deger in satir.items()
+                       if alan in BOLGE_ALANLARI and (isinstance(deger, bool) or not isinstance(deger, BOLGE_ALANLARI[alan]))]
+        hatalar += [f"{onek}: '{alan}' için geçersiz değer {satir[alan]!r}." for alan in turu_yanlis]
+        if turu_yanlis or any(alan not in satir for alan in ZORUNLU_BOLGE_ALANLARI):
+            continue
+        if satir["no"] in nolar:
+            hatalar.append(f"{onek}: bölge numarası {satir['no']} tekrar ediyor.")
+        if satir["pin"] in pinler or satir["pin"] == aday["ALARM_ROLE_PIN"]:
+            hatalar.append(f"{onek}: pin {satir['pin']} başka bir bölgede ya da alarm rölesinde kullanılıyor.")
+        if not 0 <= satir["pin"] <= 53:
+            hatalar.append(f"{onek}: pin {satir['pin']} geçerli bir GPIO değil.")
+        if satir["otomatik_kurulum_suresi"] <= 0:
+            hatalar.append(f"{onek}: otomatik_kurulum_suresi pozitif olmalı.")
+        if "siren_deseni" in satir and satir["siren_deseni"] not in aday["SIREN_DESENLERI"]:
+            hatalar.append(f"{onek}: bilinmeyen siren deseni '{satir['siren_deseni']}'.")
+        hatalar += _takvim_hatalari(f"{onek} takvim", satir.get("takvim", []))
+        nolar.add(satir["no"])
+        pinler.add(satir["pin"])
+    return hatalar
+
+def _alici_hatalari(alicilar):
+    hatalar = []
+    for sira, alici in enumerate(alicilar, 1):
+        onek = f"TELEGRAM_ALICILAR[{sira}]"
+        if not isinstance(alici, dict):
+            hatalar.append(f"{onek}: alıcı anahtar = değer tablosu olmalı.")
+            continue
+        hatalar += [f"{onek}: bilinmeyen alan '{alan}'." for alan in alici if alan not in ALICI_ALANLARI]
+        if not isinstance(alici.get("chat_id"), str) or not alici["chat_id"]:
+            hatalar.append(f"{onek}: 'chat_id' eksik ya da geçersiz.")
+        if alici.get("en_dusuk", "bilgi") not in ONCELIK_ADLARI:
+            hatalar.append(f"{onek}: en_dusuk {alici['en_dusuk']!r} yerine {', '.join(ONCELIK_ADLARI)} olmalı.")
+    return hatalar
+
+def ayar_hatalari(aday):
+    """Tüm ayarların birlikte tutarlı olup olmadığını denetler; hata metinlerinin listesini döndürür."""
+    hatalar = [f"{ad}: {type(AYAR_VARSAYILANLARI[ad]).__name__} bekleniyordu, {deger!r} verildi."
+               for ad, deger in aday.items() if not _ayar_turu_uygun(ad, deger)]
+    if hatalar:
+        return hatalar  # Türler yanlışken değer denetimleri yanıltıcı olur
+    hatalar += [f"{ad}: {aday[ad]!r} yerine {', '.join(secenekler)} olmalı."
+                for ad, secenekler in SECENEKLI_AYARLAR.items() if aday[ad] not in secenekler]
+    hatalar += [f"{ad}: pozitif olmalı." for ad in POZITIF_AYARLAR if aday[ad] <= 0]
+    hatalar += [f"{ad}: 0 ile 23 arasında olmalı." for ad in ("GECE_BASLANGIC_SAATI", "GECE_BITIS_SAATI")
+                if not 0 <= aday[ad] <= 23]
+    if not 1 <= aday["KARE_JPEG_KALITESI"] <= 95:
+        hatalar.append("KARE_JPEG_KALITESI: 1 ile 95 arasında olmalı.")
+    for ad, esik in aday["BEKCI_ESIKLERI"].items():
+        if ad not in AYAR_VARSAYILANLARI["BEKCI_ESIKLERI"]:
+            hatalar.append(f"BEKCI_ESIKLERI: bilinmeyen işçi {ad!r} ({', '.join(AYAR_VARSAYILANLARI['BEKCI_ESIKLERI'])}).")
+        elif not isinstance(esik, (int, float)) or isinstance(esik, bool) or esik < 0:
+            hatalar.append(f"BEKCI_ESIKLERI.{ad}: 0 ya da pozitif sayı olmalı.")
+    if aday["FILTRE_AKTIF"] and not 1 <= aday["FILTRE_ESIK"] <= aday["FILTRE_PENCERE"]:
+        hatalar.append(f"FILTRE_ESIK ({aday['FILTRE_ESIK']}) 1 ile FILTRE_PENCERE ({aday['FILTRE_PENCERE']}) arasında olmalı.")
+    desenler = aday["SIREN_DESENLERI"]
+    for ad, desen in desenler.items():
+        gecerli = desen is None or isinstance(desen, list) and all(
+            isinstance(adim, tuple) and len(adim) == 2 and isinstance(adim[0], bool)
+            and isinstance(adim[1], (int, float)) and not isinstance(adim[1], bool) for adim in desen)
+        if not gecerli:
+            hatalar.append(f"SIREN_DESENLERI.{ad}: adımlar [açık (true/false), süre] biçiminde olmalı.")
+        elif siren_deseni_hatasi(ad, desenler):
+            hatalar.append(f"SIREN_DESENLERI.{ad}: {siren_deseni_hatasi(ad, desenler)}")
+    if aday["SIREN_VARSAYILAN_DESEN"] not in desenler:
+        hatalar.append(f"SIREN_VARSAYILAN_DESEN: bilinmeyen siren deseni '{aday['SIREN_VARSAYILAN_DESEN']}'.")
+    hatalar += _takvim_hatalari("OTOMATIK_KURULUM_TAKVIMI", aday["OTOMATIK_KURULUM_TAKVIMI"])
+    hatalar += _alici_hatalari(aday["TELEGRAM_ALICILAR"])
+    if aday["DUGUM_ID"] is not None and not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", aday["DUGUM_ID"]):
+        hatalar.append(f"DUGUM_ID: {aday['DUGUM_ID']!r} sadece harf, rakam, '-' ve '_' içerebilir (MQTT topic seviyesi).")
+    return hatalar + _bolge_tablosu_hatalari(aday)
+
+def ayar_dosyasini_oku(yol):
+    """Ayar dosyasını okur, main.py'deki varsayılanlarla birleştirip doğrular ve tüm ayarları içeren sözlük döndürür.
+
+    Dosyada olmayan ayarlar varsayılan değerine döner. Bütün hatalar toplanıp tek bir ValueError ile bildirilir;
+    böylece dosya ya tümüyle kabul edilir ya da hiç uygulanmaz.
+    """
+    with open(yol, "rb") as f:
+        if yol.endswith(".json"):
+            dosya = json.load(f)
+        elif tomllib is None:
+            raise ValueError("TOML okumak için Python 3.11 gerekir; ayar dosyasını .json olarak verin.")
+        else:
+            dosya = tomllib.load(f)
+    if not isinstance(dosya, dict):
+        raise ValueError("Ayar dosyası 'AYAR = değer' satırlarından oluşmalı.")
+    hatalar = [f"Bilinmeyen ayar: {ad}" for ad in dosya if ad not in AYAR_VARSAYILANLARI]
+    aday = dict(AYAR_VARSAYILANLARI)
+    aday.update((ad, deger) for ad, deger in dosya.items() if ad in AYAR_VARSAYILANLARI)
+    _ayarlari_duzenle(aday)
+    hatalar += ayar_hatalari(aday)
+    if hatalar:
+        raise ValueError("\n".join(hatalar))
+    return aday
+
+def hiz_sinirlarini_guncelle():
+    bildirim_dagitici.sohbet_siniri.oran = TELEGRAM_SOHBET_HIZI
+    bildirim_dagitici.sohbet_siniri.kapasite = TELEGRAM_SOHBET_KAPASITESI
+    bildirim_dagitici.genel_sinir.oran = bildirim_dagitici.genel_sinir.kapasite = TELEGRAM_GENEL_HIZ
+
+def bolgeleri_guncelle(degisenler):
+    """Bölge nesnelerini BOLGE_TABLOSU'na göre yerinde günceller; kurulu ve alarm durumları olduğu gibi kalır.
+
+    Süre değiştiyse bekleyen otomatik kurulum, kapının kapandığı andan yeni süreyle yeniden hesaplanır; takvim
+    değiştiyse bir sonraki takvim saati yeniden kurulur. Pin değişiklikleri sensör döngüsüne bırakılır, yeni
+    siren deseni bir sonraki alarmda geçerli olur.
+    """
+    satirlar = {satir["no"]: satir for satir in BOLGE_TABLOSU}
+    for bolge in bolgeler:
+        satir = satirlar[bolge.no]
+        onceki_sure, onceki_takvim, onceki_bilgi = bolge.otomatik_kurulum_suresi, bolge.takvim, bolge_bilgisi(bolge)
+        bolge.ad = satir["ad"]
+        bolge.kamera = satir["kamera"]
+        bolge.mqtt_topic = satir["mqtt_topic"]
+        bolge.otomatik_kurulum_suresi = satir["otomatik_kurulum_suresi"]
+        bolge.siren_deseni = satir.get("siren_deseni") or SIREN_VARSAYILAN_DESEN
+        bolge.takvim = satir.get("takvim") or OTOMATIK_KURULUM_TAKVIMI
+        if satir["pin"] != bolge.pin:
+            yeni_pinler[bolge] = satir["pin"]
+        else:
+            yeni_pinler.pop(bolge, None)
+        if bolge.otomatik_isler and (bolge.otomatik_kurulum_suresi != onceki_sure
+                                     or "OTOMATIK_KURULUM_UYARI_SURESI" in degisenler):
+            otomatik_kurulumu_planla(bolge, bolge.otomatik_baslangic)
+        if bolge.takvim != onceki_takvim and bolge.takvim_kaydi is not None:
+            zamanlayici.iptal(bolge.takvim_kaydi)
+            takvimi_planla(bolge)
+        if DUGUM_ID and bolge_bilgisi(bolge) != onceki_bilgi:
+            mqtt_yayinla(mqtt_topic(bolge, "bilgi"), bolge_bilgisi(bolge), qos=1)
+
+def ayarlari_uygula(yeni, ilk=False):
+    """Doğrulanmış ayarları uygular; (uygulanan, yeniden başlatma bekleyen) ayar adlarını döndürür.
+
+    İlk yüklemede (GPIO ve bağlantılar kurulmadan önce) tüm ayarlar uygulanır ve bölgeler tablodan yeniden
+    oluşturulur. Çalışırken sadece CANLI_AYARLAR değişir: bölge nesneleri, kurulu/alarm durumları, GPIO hatları
+    ve Telegram oturumu korunur.
+    """
+    global filtre_ayari_degisti
+    degisenler = [ad for ad, deger in yeni.items() if deger != globals()[ad]]
+    if ilk:
+        globals().update(yeni)
+        bolgeler[:] = [Bolge(**satir) for satir in BOLGE_TABLOSU]
+        bolge_pin_indeksi.clear()
+        bolge_pin_indeksi.update((bolge.pin, i) for i, bolge in enumerate(bolgeler))
+        hizli_komutlari_olustur()
+        kapi_serilerini_olustur()
+        bildirim_dagitici.kuyruk_boyutu = BILDIRIM_KUYRUK_BOYUTU
+        bildirim_dagitici.isci_sayisi = BILDIRIM_ISCI_SAYISI
+        hiz_sinirlarini_guncelle()
+        return degisenler, []
+    bekleyenler = [ad for ad in degisenler if ad in YENIDEN_BASLATMA_AYARLARI]
+    if "BOLGE_TABLOSU" in degisenler and {satir["no"] for satir in yeni["BOLGE_TABLOSU"]} != {bolge.no for bolge in bolgeler}:
+        bekleyenler.append("BOLGE_TABLOSU")
+    uygulananlar = [ad for ad in degisenler if ad not in bekleyenler]
+    with ayar_kilidi:
+        for ad in uygulananlar:
+            globals()[ad] = yeni[ad]
+        bolgeleri_guncelle(uygulananlar)
+        hiz_sinirlarini_guncelle()
+        if any(ad.startswith("FILTRE_") for ad in uygulananlar):
+            filtre_ayari_degisti = True
+    return uygulananlar, bekleyenler
+
+def ayarlari_yukle():
+    """Açılışta ayar dosyasını okuyup uygular; dosya yoksa main.py'deki değerlerle devam edilir."""
+    if not AYAR_DOSYASI or not os.path.exists(AYAR_DOSYASI):
+        print(f"Ayar dosyası bulunamadı ({AYAR_DOSYASI}); main.py'deki ayarlar kullanılıyor.")
+        return
+    degisenler, _ = ayarlari_uygula(ayar_dosyasini_oku(AYAR_DOSYASI), ilk=True)
+    print(f"Ayar dosyası yüklendi: {AYAR_DOSYASI} ({len(degisenler)} ayar main.py'dekinden farklı).")
+
+def _ayar_dosyasi_reddedildi(hata):
+    metrik_kaydi["ayar"].artir("reddedilen")
+    print(f"Ayar dosyası reddedildi, önceki ayarlar geçerli:\n{hata}")
+    send_telegram_notification(f"⚠️ Ayar dosyası reddedildi, önceki ayarlar geçerli:\n{hata}")
+    return False
+
+def ayarlari_yeniden_yukle(yeni=None):
+    """Ayar dosyasını yeniden okuyup çalışan programa uygular; dosya geçersizse hiçbir ayar değişmez.
+
+    `yeni` verilirse (asyncio modunda dosya olay döngüsünün dışında okunup doğrulanır) dosya tekrar okunmaz.
+    """
+    try:
+        uygulananlar, bekleyenler = ayarlari_uygula(yeni if yeni is not None else ayar_dosyasini_oku(AYAR_DOSYASI))
+    except (OSError, ValueError) as e:
+        return _ayar_dosyasi_reddedildi(e)
+    metrik_kaydi["ayar"].artir("uygulanan")
+    satirlar = []
+    if uygulananlar:
+        olay_gunlugu.yaz("ayar", ayarlar=uygulananlar)
+        satirlar.append(f"🔧 Ayarlar yeniden yüklendi: {', '.join(uygulananlar)}")
+    if bekleyenler:
+        satirlar.append(f"ℹ️ Yeniden başlatmada geçerli olacak: {', '.join(bekleyenler)}")
+    if satirlar:
+        print("\n".join(satirlar))
+        send_telegram_notification("\n".join(satirlar))
+    return True
+
+
+class AyarIzleyici:
+    """Ayar dosyası değişince ayarları yeniden yükler.
+
+    Linux'ta dosyanın bulunduğu dizin ctypes üzerinden inotify ile izlenir (IN_CLOSE_WRITE, IN_MOVED_TO); editörler
+    dosyayı çoğunlukla geçici bir dosyaya yazıp yeniden adlandırdığından dosyanın kendisi değil dizini izlenir.
+    inotify yoksa dosyanın değişiklik zamanı ve boyutu AYAR_KONTROL_ARALIGI ile yoklanır. Art arda gelen olaylar
+    AYAR_BIRLESTIRME_SURESI içinde tek yüklemede birleştirilir. tetikle() (SIGHUP) beklemeden yeniden yükletir.
+    """
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    _OLAY = struct.Struct("iIII")  # wd, mask, cookie, len; ardından len baytlık dosya adı
+
+    def __init__(self, yol):
+        self.yol = yol
+        self.dizin, self.ad = os.path.split(yol)
+        self.inotify = None
+        self._imza = self._dosya_imzasi()
+        self._tetik_okuma, self._tetik_yazma = os.pipe()
+        os.set_blocking(self._tetik_okuma, False)
+        os.set_blocking(self._tetik_yazma, False)
+
+    def ac(self):
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            if libc.inotify_add_watch(fd, os.fsencode(self.dizin), self.IN_CLOSE_WRITE | self.IN_MOVED_TO) < 0:
+                hata = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(hata, os.strerror(hata))
+            self.inotify = fd
+            print(f"Ayar dosyası inotify ile izleniyor: {self.yol}")
+        except (OSError, AttributeError) as e:
+            print(f"inotify kullanılamıyor ({e}); ayar dosyası {AYAR_KONTROL_ARALIGI} sn'de bir yoklanacak.")
+
+    def kapat(self):
+        for fd in (self.inotify, self._tetik_okuma, self._tetik_yazma):
+            if fd is not None:
+                os.close(fd)
+        self.inotify = self._tetik_okuma = self._tetik_yazma = None
+
+    def tetikle(self):
+        """Sinyal işleyicisinden de güvenle çağrılabilir: izleme döngüsünü uyandırır."""
+        try:
+            os.write(self._tetik_yazma, b"\0")
+        except (BlockingIOError, TypeError):
+            pass
+
+    def _tanimlayicilar(self):
+        return [fd for fd in (self.inotify, self._tetik_okuma) if fd is not None]
+
+    def _dosya_imzasi(self):
+        try:
+            bilgi = os.stat(self.yol)
+        except OSError:
+            return None
+        return bilgi.st_mtime_ns, bilgi.st_size, bilgi.st_ino
+
+    def _inotify_oku(self):
+        """Bekleyen inotify olaylarını boşaltır; izlenen dosya yazıldıysa ya da yerine taşındıysa True."""
+        ad = os.fsencode(self.ad)
+        ilgili = False
+        while True:
+            try:
+                veri = os.read(self.inotify, 4096)
+            except BlockingIOError:
+                return ilgili
+            ofset = 0
+            while ofset < len(veri):
+                _, _, _, uzunluk = self._OLAY.unpack_from(veri, ofset)
+                ofset += self._OLAY.size
+                ilgili |= veri[ofset:ofset + uzunluk].rstrip(b"\0") == ad
+                ofset += uzunluk
+
+    def _degisti_mi(self):
+        """Bekleyen olayları boşaltır; dosya değiştiyse ya da tetiklendiyse True döndürür."""
+        try:
+            tetik = bool(os.read(self._tetik_okuma, 64))
+        except BlockingIOError:
+            tetik = False
+        if self.inotify is not None:
+            return self._inotify_oku() or tetik
+        imza = self._dosya_imzasi()
+        degisti, self._imza = imza != self._imza, imza
+        return degisti or tetik
+
+    def calistir(self, stop_event):
+        """Thread sürücüsü: stop_event gelene kadar dosya olaylarını bekler."""
+        bekleme = 1.0 if self.inotify is not None else AYAR_KONTROL_ARALIGI
+        try:
+            while not stop_event.is_set():
+                select.select(self._tanimlayicilar(), [], [], bekleme)
+                if not self._degisti_mi():
+                    continue
+                time.sleep(AYAR_BIRLESTIRME_SURESI)  # Editör yazmayı bitirsin, art arda olaylar birleşsin
+                self._degisti_mi()
+                ayarlari_yeniden_yukle()
+        finally:
+            self.kapat()
+
+    async def acalistir(self):
+        """Asyncio sürücüsü: dosya olayları olay döngüsünde beklenir, ayarlar döngü içinde uygulanır.
+
+        Dosya imzası, okuma ve doğrulama bir thread'de yapılır; yavaş bir SD kart olay döngüsünü bekletmez.
+        """
+        loop = asyncio.get_running_loop()
+        olay = asyncio.Event()
+        tanimlayicilar = self._tanimlayicilar()
+        for fd in tanimlayicilar:
+            loop.add_reader(fd, olay.set)
+        bekleme = None if self.inotify is not None else AYAR_KONTROL_ARALIGI
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(olay.wait(), bekleme)
+                except asyncio.TimeoutError:
+                    pass
+                olay.clear()
+                if not await asyncio.to_thread(self._degisti_mi):
+                    continue
+                await asyncio.sleep(AYAR_BIRLESTIRME_SURESI)
+                await asyncio.to_thread(self._degisti_mi)
+                olay.clear()
+                try:
+                    yeni = await asyncio.to_thread(ayar_dosyasini_oku, self.yol)
+                except (OSError, ValueError) as e:
+                    _ayar_dosyasi_reddedildi(e)
+                    continue
+                ayarlari_yeniden_yukle(yeni)
+        finally:
+            for fd in tanimlayicilar:
+                loop.remove_reader(fd)
+            self.kapat()
+
+
+ayar_izleyici = None  # AYAR_DOSYASI verilmişse main() içinde oluşturulur
+
+# --- ASYNCIO ÇALIŞMA MODU ---
+# CALISMA_MODU = "asyncio" iken sensör okuma, heartbeat, otomatik kurulum, görüntü önbelleği ve MQTT
+# ayrı thread'ler yerine Telegram botunun olay döngüsünde görev olarak çalışır. Ortak durum tek bir
+# thread'den değiştirildiği için kilitlenme/yarış riski azalır ve uyku aralığı kaynaklı gecikmeler olmaz.
+
+class AsyncioMqttYardimcisi:
+    """paho MQTT istemcisini loop_start thread'i yerine asyncio olay döngüsünün soket izlemesiyle çalıştırır."""
+
+    def __init__(self, loop, client):
+        self.loop = loop
+        self.client = client
+        client.on_socket_open = self.on_socket_open
+        client.on_socket_close = self.on_socket_close
+        client.on_socket_register_write = self.on_socket_register_write
+        client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    def on_socket_open(self, client, userdata, sock):
+        self.loop.add_reader(sock, client.loop_read)
+
+    def on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    async def bakim_dongusu(self):
+        """paho'nun periyodik işlerini (keepalive, yeniden gönderim) yürütür; bağlantı koparsa yeniden bağlanır."""
+        while True:
+            if self.client.loop_misc() == mqtt.MQTT_ERR_NO_CONN:
+                try:
+                    self.client.reconnect()
+                except OSError as e:
+                    print(f"MQTT yeniden bağlantı hatası: {e}")
+                    await asyncio.sleep(5)
+            await asyncio.sleep(1)
+
+
+async def sensor_async_gorevi():
+    """Sensör değerlendirmesini olay döngüsünde çalıştırır (kesme modunda callback, yoksa polling)."""
+    loop = asyncio.get_running_loop()
+    sensor_durumunu_baslat()
+    bekci.kaydet("sensor")
+
+    if aktif_sensor_modu != "kesme":
+        print("Sensör okuma görevi başlatıldı (asyncio, polling).")
+        while True:
+            try:
+                sensor_ayarlarini_yenile()
+                polling_ornegi()
+                bekci.ilerledi("sensor")
+            except Exception as e:
+                print(f"Sensör okuma görevinde hata: {e}")
+            await asyncio.sleep(polling_ornekleme_araligi())
+
+    print("Sensör okuma görevi başlatıldı (asyncio, kesme).")
+    kenar_kuyrugu = asyncio.Queue()
+
+    def kenar_geri_cagrisi(chip, gpio, level, tick):
+        # lgpio bildirim thread'inden olay döngüsüne aktarılır
+        if level in (0, 1):
+            loop.call_soon_threadsafe(kenar_kuyrugu.put_nowait, (gpio, level, tick))
+
+    geri_cagrilar = {
+        bolge.pin: lgpio.callback(gpio_handle, bolge.pin, lgpio.BOTH_EDGES, kenar_geri_cagrisi)
+        for bolge in bolgeler
+    }
+    try:
+        while True:
+            sensor_ayarlarini_yenile(geri_cagrilar, kenar_geri_cagrisi)
+            try:
+                gpio, level, tick = await asyncio.wait_for(kenar_kuyrugu.get(), kesme_bekleme_suresi())
+            except asyncio.TimeoutError:
+                kesme_zaman_asimi()
+                bekci.ilerledi("sensor")
+                continue
+            try:
+                kenari_degerlendir(gpio, level, tick)
+                bekci.ilerledi("sensor")
+            except Exception as e:
+                print(f"Sensör kesme görevinde hata: {e}")
+    finally:
+        for geri_cagri in geri_cagrilar.values():
+            geri_cagri.cancel()
+
+async def heartbeat_async_gorevi():
+    """Her 1 dakikada (bekçi durum değiştirirse hemen) heartbeat sinyalini asenkron HTTP istemcisiyle gönderir."""
+    if not HEALTHCHECKS_PING_URL or "hc-ping.com" not in HEALTHCHECKS_PING_URL:
+        return
+    print("Heartbeat görevi başlatıldı (1 dakikada bir).")
+    await asyncio.to_thread(httpx.yukle)
+    async with httpx.AsyncClient(timeout=10) as istemci:
+        while True:
+            sebep = bekci.sebep()
+            try:
+                if sebep:
+                    await istemci.post(f"{HEALTHCHECKS_PING_URL.rstrip('/')}/fail", content=sebep.encode("utf-8"))
+                    heartbeat_sonucunu_kaydet(False, sebep)
+                    print(f"Heartbeat yerine hata sinyali gönderildi: {sebep}")
+                else:
+                    await istemci.get(HEALTHCHECKS_PING_URL)
+                    heartbeat_sonucunu_kaydet(True)
+                    print("Heartbeat sinyali başarıyla gönderildi.")
+            except httpx.HTTPError as e:
+                heartbeat_sonucunu_kaydet(False)
+                print(f"Heartbeat sinyali gönderilemedi: {e}")
+            await bekci.adegisim_bekle(60)
+
+async def goruntu_yenileme_async_gorevi():
+    """Sıcak kameraların görüntülerini asenkron HTTP istemcisiyle önbellekte yeniler."""
+    await asyncio.to_thread(httpx.yukle)
+    async with httpx.AsyncClient(timeout=5) as istemci:
+        while True:
+            for kamera in sicak_kameralar(time.time()):
+                await goruntu_onbellegi.ayenile(kamera, istemci)
+            goruntu_onbellegi.eskileri_sil()
+            await asyncio.sleep(GORUNTU_YENILEME_ARALIGI)
+
+async def mqtt_async_gorevi():
+    """MQTT istemcisini olay döngüsünde kurar ve bakım döngüsünü yürütür; paho ayrı thread'de içe aktarılır."""
+    global mqtt_client
+    await asyncio.to_thread(mqtt.yukle)
+    client = mqtt_istemcisi_olustur()
+    yardimci = AsyncioMqttYardimcisi(asyncio.get_running_loop(), client)
+    try:
+        client.connect(MQTT_BROKER_IP, MQTT_PORT, 60)
+    except OSError as e:
+        print(f"MQTT broker'a bağlanılamadı, arka planda tekrar denenecek: {e}")
+    mqtt_client = client
+    await yardimci.bakim_dongusu()
+
+async def asyncio_gorevlerini_baslat():
+    """Arka plan işlerini olay döngüsünde görev olarak başlatır; sensör ve zamanlayıcı ağ görevlerinden önce."""
+    asyncio_gorevleri.extend([
+        asyncio.create_task(sensor_async_gorevi(), name="sensor"),
+        asyncio.create_task(zamanlayici.acalistir(), name="zamanlayici"),
+        asyncio.create_task(bekci.acalistir(), name="bekci"),
+        asyncio.create_task(heartbeat_async_gorevi(), name="heartbeat"),
+        asyncio.create_task(goruntu_yenileme_async_gorevi(), name="goruntu"),
+        asyncio.create_task(mqtt_async_gorevi(), name="mqtt"),
+    ])
+    if ayar_izleyici:
+        asyncio_gorevleri.append(asyncio.create_task(ayar_izleyici.acalistir(), name="ayar"))
+    print(f"Asyncio görevleri başlatıldı. Aktif thread sayısı: {threading.active_count()}")
+
+async def asyncio_gorevlerini_durdur():
+    """Görevleri iptal eder ve bitmelerini bekler."""
+    for gorev in asyncio_gorevleri:
+        gorev.cancel()
+    await asyncio.gather(*asyncio_gorevleri, return_exceptions=True)
+    asyncio_gorevleri.clear()
+    if mqtt_client:
+        mqtt_client.disconnect()
+
+# --- TELEGRAM GÜNCELLEME ALMA (POLLING / WEBHOOK) ---
+hizli_komutlar = set()                  # Sıra beklemeden işlenen komut adları (aktifetN, deaktifetN)
+komut_oncelikli_isleyici_sinifi = None  # telegram.ext yüklenince ilk kullanımda tanımlanır
+webhook_anahtari = None                 # Bu çalışmanın webhook gizli anahtarı (ilk kullanımda belirlenir)
+
+def hizli_komutlari_olustur():
+    hizli_komutlar.clear()
+    hizli_komutlar.update(f"{ad}{bolge.no}" for bolge in bolgeler for ad in ("aktifet", "deaktifet"))
+
+hizli_komutlari_olustur()
+
+def hizli_komut_mu(update):
+    """Güncelleme bir /aktifetN ya da /deaktifetN komutu mu (sonunda @bot_adi olabilir)?"""
+    mesaj = getattr(update, "message", None)
+    if mesaj is None or not mesaj.text or not mesaj.text.startswith("/"):
+        return False
+    komut = mesaj.text.split(maxsplit=1)[0][1:].split("@", 1)[0].lower()
+    return komut in hizli_komutlar
+
+def komut_oncelikli_isleyici(en_fazla=64):
+    """Kurma/devre dışı bırakma komutlarını sıra beklemeden işleyen güncelleme işleyicisini oluşturur.
+
+    Diğer güncellemeler eskisi gibi geliş sırasıyla tek tek işlenir; /aktifetN ve /deaktifetN ise
+    uzun süren bir komutun ya da bekleyen bir mesaj gönderiminin arkasında kalmaz. telegram.ext ilk
+    kullanımda yüklendiği için sınıf da ilk çağrıda tanımlanır.
+    """
+    global komut_oncelikli_isleyici_sinifi
+    if komut_oncelikli_isleyici_sinifi is None:
+        class KomutOncelikliIsleyici(telegram_ext.BaseUpdateProcessor):
+            def __init__(self, en_fazla):
+                super().__init__(max_concurrent_updates=en_fazla)
+                self._sira = None
+
+            async def initialize(self):
+                self._sira = asyncio.Lock()
+
+            async def shutdown(self):
+                pass
+
+            async def do_process_update(self, update, coroutine):
+                if hizli_komut_mu(update):
+                    await coroutine
+                    return
+                async with self._sira:
+                    await coroutine
+
+        komut_oncelikli_isleyici_sinifi = KomutOncelikliIsleyici
+    return komut_oncelikli_isleyici_sinifi(en_fazla)
+
+def webhook_gizli_anahtari():
+    """Webhook gizli anahtarını döndürür; ayarlanmamışsa bu çalışma için bir kez rastgele üretir."""
+    global webhook_anahtari
+    if webhook_anahtari is None:
+        anahtar = TELEGRAM_WEBHOOK_GIZLI_ANAHTAR or secrets.token_urlsafe(32)
+        if not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", anahtar):
+            raise ValueError("TELEGRAM_WEBHOOK_GIZLI_ANAHTAR 1-256 karakter olmalı ve sadece A-Z, a-z, 0-9, _ ve - içermeli.")
+        webhook_anahtari = anahtar
+    return webhook_anahtari
+
+def application_olustur():
+    """Telegram botunu komut işleyicileriyle birlikte oluşturur."""
+    builder = telegram_ext.Application.builder().token(TELEGRAM_BOT_TOKEN).base_url(f"{TELEGRAM_API_URL}/bot")
+    if TELEGRAM_HIZLI_KOMUTLAR:
+        builder = builder.concurrent_updates(komut_oncelikli_isleyici())
+    application = builder.build()
+    for bolge in bolgeler:
+        application.add_handler(telegram_ext.CommandHandler(f"aktifet{bolge.no}", aktifet_komutu_olustur(bolge)))
+        application.add_handler(telegram_ext.CommandHandler(f"deaktifet{bolge.no}", deaktifet_komutu_olustur(bolge)))
+    application.add_handler(telegram_ext.CommandHandler("otomatikalarmkapat", otomatikalarmkapat_command))
+    application.add_handler(telegram_ext.CommandHandler("rapor", rapor_command))
+    return application
+
+async def telegram_botunu_baslat(application):
+    """Botu başlatır ve komutları TELEGRAM_ALMA_MODU'na göre uzun sorgu ya da webhook ile almaya başlar.
+
+    Açılışta internet yoksa program sonlanmaz (alarm denetimi zaten çalışıyor); Telegram'a ulaşılana kadar
+    artan aralıklarla yeniden denenir. Token geçersizse ya da webhook portu açılamazsa sistem botsuz devam eder.
+    """
+    bekleme = 1
+    while True:
+        try:
+            await application.initialize()
+            break
+        except telegram.error.NetworkError as e:
+            print(f"Telegram'a ulaşılamadı, {bekleme} sn sonra tekrar denenecek: {e}")
+            await asyncio.sleep(bekleme)
+            bekleme = min(bekleme * 2, 60)
+        except telegram.error.TelegramError as e:
+            print(f"Telegram botu başlatılamadı, komutlar sadece MQTT üzerinden alınacak: {e}")
+            return
+    try:
+        if TELEGRAM_ALMA_MODU == "webhook":
+            print(f"Telegram webhook dinleyicisi: http://{TELEGRAM_WEBHOOK_ADRESI}:{TELEGRAM_WEBHOOK_PORTU}/"
+                  f"{TELEGRAM_WEBHOOK_YOLU} (genel adres: {TELEGRAM_WEBHOOK_URL})")
+            await application.updater.start_webhook(
+                listen=TELEGRAM_WEBHOOK_ADRESI, port=TELEGRAM_WEBHOOK_PORTU, url_path=TELEGRAM_WEBHOOK_YOLU,
+                webhook_url=TELEGRAM_WEBHOOK_URL, secret_token=webhook_gizli_anahtari(),
+                allowed_updates=[telegram.Update.MESSAGE])
+        else:
+            await application.updater.start_polling(allowed_updates=[telegram.Update.MESSAGE])
+        await application.start()
+    except (OSError, telegram.error.TelegramError) as e:
+        print(f"Telegram dinleyicisi başlatılamadı, komutlar sadece MQTT üzerinden alınacak: {e}")
+        return
+    acilis_olcumu.isaretle("telegram")
+
+async def telegram_botunu_durdur(application):
+    if application.updater and application.updater.running:
+        await application.updater.stop()
+    if application.running:
+        await application.stop()
+    await application.shutdown()
+
+async def olay_dongusunu_calistir():
+    """Telegram botunu ve (asyncio modunda) arka plan görevlerini SIGINT/SIGTERM gelene kadar çalıştırır.
+
+    Asyncio modunda sensör ve zamanlayıcı görevleri bottan önce başlar. Bot ayrı bir thread'de oluşturulur
+    (telegram kütüphanesinin yüklenmesi olay döngüsünü durdurmaz) ve kendi görevinde ağa bağlanır.
+    TELEGRAM_BOT_TOKEN verilmemişse (federasyonda bildirimleri toplayıcı gönderir) bot hiç yüklenmez.
+    """
+    loop = asyncio.get_running_loop()
+    durdur = asyncio.Event()
+    for sinyal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sinyal, durdur.set)
+    if CALISMA_MODU == "asyncio":
+        await asyncio_gorevlerini_baslat()
+
+    application = None
+    bot_gorevi = None
+    if TELEGRAM_BOT_TOKEN:
+        print("Telegram Bot dinleyicisi başlatılıyor...")
+        with acilis_olcumu.adim("telegram_hazirlik"):
+            application = await asyncio.to_thread(application_olustur)
+        bot_gorevi = asyncio.create_task(telegram_botunu_baslat(application), name="telegram")
+    else:
+        print("Telegram botu kapalı (TELEGRAM_BOT_TOKEN yok); komutlar MQTT üzerinden alınır.")
+    try:
+        await durdur.wait()
+    finally:
+        if bot_gorevi:
+            bot_gorevi.cancel()
+            await asyncio.gather(bot_gorevi, return_exceptions=True)
+        if application:
+            await telegram_botunu_durdur(application)
+        if CALISMA_MODU == "asyncio":
+            await asyncio_gorevlerini_durdur()
+
+def telegram_dinleyicisini_calistir():
+    """Olay döngüsünü ana thread'de çalıştırır; program bitene kadar bloklar."""
+    if TELEGRAM_BOT_TOKEN and TELEGRAM_ALMA_MODU not in ("polling", "webhook"):
+        raise ValueError(f"Bilinmeyen TELEGRAM_ALMA_MODU: {TELEGRAM_ALMA_MODU}")
+    asyncio.run(olay_dongusunu_calistir())
+
+# --- ANA PROGRAM ---
+def main():
+    global aktif_sensor_modu, ayar_izleyici
+    stop_event = threading.Event()
+    sensor_thread = None
+    heartbeat_thread = None
+    metrik_sunucusu = None
+
+    # Ayarlar durum yüklenmeden önce okunur; geçersiz dosyada program durum dosyalarına dokunmadan çıkar
+    try:
+        with acilis_olcumu.adim("ayar"):
+            ayarlari_yukle()
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Ayar dosyası geçersiz, program başlatılmadı:\n{e}")
+
+    try:
+        # Önce alarm denetimi: kaydedilen kurulu durum, GPIO hatları, röle thread'i, sensör ve zamanlayıcı.
+        # Ağ istemcileri ve ağır kütüphaneler bunları beklemez.
+        with acilis_olcumu.adim("durum"):
+            load_system_state()
+            otomatik_takvimini_kur()
+        with acilis_olcumu.adim("gpio"):
+            gpio_arkaucunu_yukle()
+            aktif_sensor_modu = gpio_kur()
+            role_denetleyici.baslat()
+        print(f"GPIO kurulumu tamamlandı (sensör modu: {aktif_sensor_modu}).")
+
+        # Asyncio modunda arka plan işleri olay döngüsü başlar başlamaz görev olarak eklenir
+        if CALISMA_MODU != "asyncio":
+            # Otomatik kurulum ve takvim zamanlayıcısını başlat
+            zamanlayici_thread = threading.Thread(target=zamanlayici.calistir, args=(stop_event,), name="Zamanlayici")
+            zamanlayici_thread.daemon = True
+            zamanlayici_thread.start()
+
+            sensor_hedefi = sensor_kesme_dongusu if aktif_sensor_modu == "kesme" else sensor_polling_loop
+            sensor_thread = threading.Thread(target=sensor_hedefi, args=(stop_event,))
+            sensor_thread.start()
+
+        # Ağ tarafı: bildirimler kuyruğa alınır, MQTT/heartbeat/bot kendi thread'lerinde paralel başlar
+        if TELEGRAM_BOT_TOKEN:
+            giden_kutusu.ac()
+        bildirim_dagitici.baslat()
+        kare_tamponu.baslat()
+        metrik_sunucusu = metrik_sunucusunu_baslat()
+        if CALISMA_MODU != "asyncio":
+            threading.Thread(target=bekci.calistir, args=(stop_event,), name="Bekci", daemon=True).start()
+            heartbeat_thread = threading.Thread(target=heartbeat_loop, args=(stop_event,))
+            goruntu_thread = threading.Thread(target=goruntu_yenileme_dongusu, args=(stop_event,), daemon=True)
+            heartbeat_thread.start()
+            goruntu_thread.start()
+            threading.Thread(target=mqtt_istemcisini_baslat, name="MqttBaslat", daemon=True).start()
+
+        # Kapıların anlık durumu
+        try:
+            kapi_durumlari = ["Kapalı" if deger == 0 else "Açık" for deger in sensor_pinlerini_oku()]
+        except Exception:
+            kapi_durumlari = ["Bilinmiyor"] * len(bolgeler)
+
+        durum_satirlari = ""
+        for bolge, kapi_durum in zip(bolgeler, kapi_durumlari):
+            alarm_durum = "KURULU" if bolge.kurulu else "DEVRE DIŞI"
+            durum_satirlari += f"\n🔒 {bolge.ad} alarm durumu: {alarm_durum}\n🚪 {bolge.ad} kapı durumu: {kapi_durum}"
+
+        # Heartbeat döngüsü ilk sinyali hemen gönderir; kesinti sonrası ayrıca beklenmez
+        if os.path.exists(CLEAN_SHUTDOWN_FLAG):
+            send_telegram_notification(f"✅ Sistem normal şekilde başlatıldı.\n{durum_satirlari}")
+            os.remove(CLEAN_SHUTDOWN_FLAG)
+        else:
+            send_telegram_notification(
+                f"⚠️ DİKKAT: Sistem beklenmedik bir kesinti sonrası yeniden başlatıldı!\n{durum_satirlari}")
+
+        # Ayar dosyası izleyicisi; SIGHUP (systemctl reload) da yeniden yükletir, süreci sonlandırmaz
+        if AYAR_DOSYASI:
+            ayar_izleyici = AyarIzleyici(AYAR_DOSYASI)
+            ayar_izleyici.ac()
+            signal.signal(signal.SIGHUP, lambda *_: ayar_izleyici.tetikle())
+            if CALISMA_MODU != "asyncio":
+                threading.Thread(target=ayar_izleyici.calistir, args=(stop_event,), name="AyarIzleyici", daemon=True).start()
+
+        if GPIO_ARKAUCU == "simulasyon" and GPIO_SIMULASYON_IZI:
+            iz_yolu = os.path.join(BASE_DIR, GPIO_SIMULASYON_IZI)
+            threading.Thread(target=lgpio.izi_dosyasini_oynat, args=(iz_yolu, stop_event), daemon=True).start()
+
+        telegram_dinleyicisini_calistir()
+
+    finally:
+        print("\nProgram sonlandırılıyor...")
+        systemd_bildir("STOPPING=1")
+        save_system_state()
+        with open(CLEAN_SHUTDOWN_FLAG, "w") as f:
+            f.write("shutdown")
+        stop_event.set()
+        bekci.degisti.set()  # Heartbeat döngüsü 60 sn beklemesinden uyanıp çıksın
+        zamanlayici.durdur()
+        if sensor_thread: sensor_thread.join()
+        sensor_istatistik_ozeti()
+        if heartbeat_thread: heartbeat_thread.join()
+        bildirim_dagitici.durdur()
+        print(bildirim_dagitici.ozet())
+        giden_kutusu.kapat()
+        print(giden_kutusu.ozet())
+        kare_tamponu.durdur()
+        if KARE_TAMPONU_AKTIF:
+            print(kare_tamponu.ozet())
+        print(goruntu_onbellegi.ozet())
+        if mqtt_client and CALISMA_MODU != "asyncio": mqtt_client.loop_stop()
+        if metrik_sunucusu: metrik_sunucusu.shutdown()
+        role_denetleyici.durdur()
+        print(role_denetleyici.ozet())
+        print(acilis_olcumu.ozet())
+        if gpio_handle:
             lgpio.gpiochip_close(gpio_handle)
+        olay_gunlugu.kapat()
         print("Tüm kaynaklar temizlendi. Güvenli çıkış yapıldı.")
 
 if __name__ == "__main__":
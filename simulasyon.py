@@ -0,0 +1,833 @@
+# =================================================================
+# GÜVENLİK SİSTEMİ - DONANIMSIZ SİMÜLASYON ARKA UCU
+#
+# - SimuleGpio      : main.py'nin kullandığı lgpio çağrılarını taklit eden simüle GPIO çipi.
+#                     Kapı hareketleri kodla ya da iz dosyasından oynatılır, röle yazmaları zaman damgalı kaydedilir.
+# - TelegramTaklidi : Yerel Telegram Bot API taklidi (sendPhoto, sendMessage, düzenleme, getUpdates, webhook...).
+# - FrigateTaklidi  : Kamera görüntüsü (latest.jpg), olaylar, olay klipleri ve küçük resimleri sunan Frigate taklidi.
+# - MqttBrokerTaklidi: Süreç içinde çalışan küçük bir MQTT 3.1.1 broker'ı (QoS 0/1, retained, joker karakterler).
+#
+# Tüm taklitler gelen isteği time.monotonic_ns() ile damgalar; aynı süreçte çalıştıkları için
+# benchmark.py kapı kenarından röle, MQTT ve Telegram'a kadar geçen süreyi doğrudan ölçebilir.
+# =================================================================
+
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import Request, urlopen
+
+# Gerçek bir görüntü değil; sadece JPEG başlangıç/bitiş işaretleri ve yükleme süresini gerçekçi kılmak için dolgu
+ORNEK_JPEG_BOYUTU = 60 * 1024
+
+
+def ornek_jpeg(boyut=ORNEK_JPEG_BOYUTU):
+    return b"\xff\xd8\xff\xe0" + bytes(max(boyut - 6, 0)) + b"\xff\xd9"
+
+
+class _Kayitci:
+    """Zaman damgalı kayıt listesi; belirli bir kayıt gelene kadar beklemeyi sağlar."""
+
+    def __init__(self):
+        self._kayit_kosulu = threading.Condition()
+        self.kayitlar = []
+
+    def _kaydet(self, kayit):
+        with self._kayit_kosulu:
+            self.kayitlar.append(kayit)
+            self._kayit_kosulu.notify_all()
+
+    def kayit_sayisi(self):
+        with self._kayit_kosulu:
+            return len(self.kayitlar)
+
+    def bekle(self, kosul, zaman_asimi=10.0, baslangic=0):
+        """`baslangic` sırasından sonra `kosul`u sağlayan ilk kaydı döndürür; zaman aşımında None."""
+        bitis = time.monotonic() + zaman_asimi
+        with self._kayit_kosulu:
+            while True:
+                for kayit in self.kayitlar[baslangic:]:
+                    if kosul(kayit):
+                        return kayit
+                baslangic = len(self.kayitlar)
+                kalan = bitis - time.monotonic()
+                if kalan <= 0:
+                    return None
+                self._kayit_kosulu.wait(kalan)
+
+
+# --- SİMÜLE GPIO ---
+class SimuleGpioHatasi(Exception):
+    """lgpio.error karşılığı."""
+
+
+class _GeriCagri:
+    def __init__(self, cip, gpio, kenar, fonksiyon):
+        self._cip = cip
+        self.gpio = gpio
+        self.kenar = kenar
+        self.fonksiyon = fonksiyon
+
+    def cancel(self):
+        self._cip._geri_cagriyi_sil(self)
+
+
+class SimuleGpio(_Kayitci):
+    """lgpio modülünün main.py'de kullanılan kısmını taklit eden simüle GPIO çipi.
+
+    main.gpio_arkaucunu_yukle() bu nesneyi `lgpio` adına bağlar; programın geri kalanı değişmeden çalışır.
+    Kesme olarak ayrılmış pinlerde seviye değişince callback'ler, lgpio'daki gibi ayrı bir bildirim
+    thread'inden (chip, gpio, level, tick) ile çağrılır. tick, time.monotonic_ns() zaman damgasıdır.
+    Röle (çıkış) yazmaları `kayitlar` listesine (zaman_ns, pin, seviye) olarak eklenir.
+    """
+
+    SET_PULL_UP = 32
+    SET_PULL_DOWN = 64
+    SET_PULL_NONE = 128
+    RISING_EDGE = 1
+    FALLING_EDGE = 2
+    BOTH_EDGES = 3
+    error = SimuleGpioHatasi
+
+    def __init__(self, baslangic_seviyesi=0, kesme_destegi=True):
+        super().__init__()
+        self.baslangic_seviyesi = baslangic_seviyesi  # Ayarlanmamış pinin seviyesi (0 = kapı kapalı)
+        self.kesme_destegi = kesme_destegi            # False ise gpio_claim_alert hata verir (polling yedeğini denemek için)
+        self._kilit = threading.Lock()
+        self._seviyeler = {}
+        self._ayrilan = {}      # pin -> "cikis" / "giris" / "kesme"
+        self._gruplar = {}      # grup lideri -> pin listesi
+        self._geri_cagrilar = {}
+        self._bildirimler = queue.Queue()
+        self._bildirim_thread = None
+        self.okuma_sayisi = 0
+
+    # lgpio API'si
+    def gpiochip_open(self, gpiochip):
+        return 1
+
+    def gpiochip_close(self, handle):
+        with self._kilit:
+            self._ayrilan.clear()
+            self._gruplar.clear()
+        return 0
+
+    def _ayir(self, gpio, tip):
+        with self._kilit:
+            self._ayrilan[gpio] = tip
+            self._seviyeler.setdefault(gpio, self.baslangic_seviyesi)
+
+    def gpio_claim_output(self, handle, gpio, level=0, lFlags=0):
+        self._ayir(gpio, "cikis")
+        self.gpio_write(handle, gpio, level)
+        return 0
+
+    def gpio_claim_input(self, handle, gpio, lFlags=0):
+        self._ayir(gpio, "giris")
+        return 0
+
+    def gpio_claim_alert(self, handle, gpio, eFlags, lFlags=0, notify_handle=None):
+        if not self.kesme_destegi:
+            raise SimuleGpioHatasi("'GPIO not allocated' (simülasyonda kesme devre dışı)")
+        self._ayir(gpio, "kesme")
+        return 0
+
+    def group_claim_input(self, handle, gpio, lFlags=0):
+        for pin in gpio:
+            self._ayir(pin, "giris")
+        with self._kilit:
+            self._gruplar[gpio[0]] = list(gpio)
+        return 0
+
+    def gpio_free(self, handle, gpio):
+        with self._kilit:
+            # lgpio'daki gibi grup liderini bırakmak tüm grubu bırakır
+            for pin in self._gruplar.pop(gpio, [gpio]):
+                self._ayrilan.pop(pin, None)
+        return 0
+
+    def gpio_set_debounce_micros(self, handle, gpio, debounce_micros):
+        return 0
+
+    def gpio_read(self, handle, gpio):
+        with self._kilit:
+            self.okuma_sayisi += 1
+            if gpio not in self._ayrilan:
+                raise SimuleGpioHatasi("'GPIO not allocated'")
+            return self._seviyeler[gpio]
+
+    def group_read(self, handle, group_gpio):
+        with self._kilit:
+            self.okuma_sayisi += 1
+            grup = self._gruplar.get(group_gpio)
+            if grup is None:
+                raise SimuleGpioHatasi("'not a group leader'")
+            bitler = 0
+            for i, pin in enumerate(grup):
+                bitler |= (self._seviyeler[pin] & 1) << i
+            return len(grup), bitler
+
+    def gpio_write(self, handle, gpio, level):
+        zaman = time.monotonic_ns()
+        with self._kilit:
+            if self._ayrilan.get(gpio) != "cikis":
+                raise SimuleGpioHatasi("'GPIO not allocated for output'")
+            self._seviyeler[gpio] = level
+        self._kaydet((zaman, gpio, level))
+        return 0
+
+    def callback(self, handle, gpio, edge=BOTH_EDGES, func=None):
+        geri_cagri = _GeriCagri(self, gpio, edge, func)
+        with self._kilit:
+            self._geri_cagrilar.setdefault(gpio, []).append(geri_cagri)
+            if self._bildirim_thread is None:
+                self._bildirim_thread = threading.Thread(target=self._bildirim_dongusu, name="simule-gpio", daemon=True)
+                self._bildirim_thread.start()
+        return geri_cagri
+
+    def _geri_cagriyi_sil(self, geri_cagri):
+        with self._kilit:
+            liste = self._geri_cagrilar.get(geri_cagri.gpio, [])
+            if geri_cagri in liste:
+                liste.remove(geri_cagri)
+
+    def _bildirim_dongusu(self):
+        while True:
+            gpio, seviye, tick = self._bildirimler.get()
+            with self._kilit:
+                geri_cagrilar = list(self._geri_cagrilar.get(gpio, ()))
+            for geri_cagri in geri_cagrilar:
+                kenar = self.RISING_EDGE if seviye else self.FALLING_EDGE
+                if geri_cagri.kenar & kenar and geri_cagri.fonksiyon:
+                    geri_cagri.fonksiyon(0, gpio, seviye, tick)
+
+    # Simülasyon tarafı
+    def seviye(self, gpio):
+        with self._kilit:
+            return self._seviyeler.get(gpio, self.baslangic_seviyesi)
+
+    def seviye_ayarla(self, gpio, seviye):
+        """Pinin seviyesini değiştirir (kapı açıldı = 1, kapandı = 0) ve kenarın zaman damgasını döndürür."""
+        tick = time.monotonic_ns()
+        with self._kilit:
+            degisti = self._seviyeler.get(gpio, self.baslangic_seviyesi) != seviye
+            self._seviyeler[gpio] = seviye
+            kesme = self._ayrilan.get(gpio) == "kesme"
+        if degisti and kesme:
+            self._bildirimler.put((gpio, seviye, tick))
+        return tick
+
+    def izi_oynat(self, iz, durdurma=None):
+        """[(saniye, pin, seviye), ...] kapı izini zamanlamasına uyarak oynatır."""
+        baslangic = time.monotonic()
+        for saniye, gpio, seviye in sorted(iz):
+            bekle = baslangic + saniye - time.monotonic()
+            if durdurma is not None:
+                if durdurma.wait(max(bekle, 0)):
+                    return
+            elif bekle > 0:
+                time.sleep(bekle)
+            self.seviye_ayarla(gpio, seviye)
+
+    def izi_dosyasini_oynat(self, yol, durdurma=None):
+        print(f"Simüle kapı izi oynatılıyor: {yol}")
+        self.izi_oynat(izi_oku(yol), durdurma)
+        print("Simüle kapı izi tamamlandı.")
+
+
+def izi_oku(yol):
+    """Kapı izi dosyasını okur. Her satır: '<saniye> <pin> <seviye>'; '#' sonrası açıklamadır."""
+    iz = []
+    with open(yol, "r", encoding="utf-8") as f:
+        for satir_no, satir in enumerate(f, 1):
+            satir = satir.split("#", 1)[0].strip()
+            if not satir:
+                continue
+            try:
+                saniye, pin, seviye = satir.split()
+                iz.append((float(saniye), int(pin), int(seviye)))
+            except ValueError:
+                raise ValueError(f"{yol}:{satir_no}: geçersiz iz satırı: {satir!r}")
+    return iz
+
+
+# --- HTTP TAKLİTLERİ ---
+class _HttpTaklidi(_Kayitci):
+    """ThreadingHTTPServer üzerinde çalışan taklit sunucuların ortak kısmı."""
+
+    def __init__(self, gecikme=0.0, host="127.0.0.1", port=0):
+        super().__init__()
+        self.gecikme = gecikme  # Her yanıttan önce eklenen yapay ağ gecikmesi (sn)
+        taklit = self
+
+        class Isleyici(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # Başlık ve gövde ayrı yazılır; Nagle + gecikmeli ACK 40 ms ekliyordu
+
+            def do_GET(self):
+                taklit._istegi_isle(self, "GET")
+
+            def do_POST(self):
+                taklit._istegi_isle(self, "POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._sunucu = ThreadingHTTPServer((host, port), Isleyici)
+        self._sunucu.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._sunucu.server_address[1]
+
+    @property
+    def adres(self):
+        return f"http://{self._sunucu.server_address[0]}:{self.port}"
+
+    def baslat(self):
+        self._thread = threading.Thread(target=self._sunucu.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def kapat(self):
+        self._sunucu.shutdown()
+        self._sunucu.server_close()
+
+    @staticmethod
+    def _yanitla(isleyici, kod, govde, tip="application/json"):
+        if isinstance(govde, (dict, list)):
+            govde = json.dumps(govde).encode("utf-8")
+        isleyici.send_response(kod)
+        isleyici.send_header("Content-Type", tip)
+        isleyici.send_header("Content-Length", str(len(govde)))
+        isleyici.end_headers()
+        try:
+            isleyici.wfile.write(govde)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # İstemci (örn. kapanışta yarıda bırakılan uzun sorgu) bağlantıyı kapattı
+
+    def _istegi_isle(self, isleyici, metot):
+        raise NotImplementedError
+
+
+def istek_govdesi(isleyici):
+    """İstek gövdesini Content-Length'e göre ya da chunked aktarımda parçaları birleştirerek okur."""
+    if isleyici.headers.get("Transfer-Encoding", "").lower() == "chunked":
+        parcalar = []
+        while True:
+            satir = isleyici.rfile.readline()
+            uzunluk = int(satir.split(b";")[0], 16) if satir.strip() else 0
+            if not satir:
+                return b"".join(parcalar)  # İstemci aktarımı yarıda kesti
+            if uzunluk == 0:
+                isleyici.rfile.readline()
+                return b"".join(parcalar)
+            parcalar.append(isleyici.rfile.read(uzunluk))
+            isleyici.rfile.readline()
+    uzunluk = int(isleyici.headers.get("Content-Length") or 0)
+    return isleyici.rfile.read(uzunluk) if uzunluk else b""
+
+
+def form_coz(tip, govde):
+    """urlencoded, multipart/form-data ya da JSON istek gövdesini {alan: değer} ve {alan: bayt} olarak çözer."""
+    alanlar, dosyalar = {}, {}
+    if tip.startswith("multipart/form-data"):
+        mesaj = BytesParser(policy=policy.HTTP).parsebytes(
+            f"Content-Type: {tip}\r\n\r\n".encode("latin-1") + govde)
+        for parca in mesaj.iter_parts():
+            ad = parca.get_param("name", header="content-disposition")
+            icerik = parca.get_payload(decode=True) or b""
+            if parca.get_filename() is not None:
+                dosyalar[ad] = icerik
+            else:
+                alanlar[ad] = icerik.decode("utf-8")
+    elif tip.startswith("application/json"):
+        alanlar = {k: v if isinstance(v, str) else json.dumps(v) for k, v in json.loads(govde or b"{}").items()}
+    elif govde:
+        alanlar = {k: v[-1] for k, v in parse_qs(govde.decode("utf-8")).items()}
+    return alanlar, dosyalar
+
+
+class TelegramTaklidi(_HttpTaklidi):
+    """Yerel Telegram Bot API taklidi.
+
+    Gelen her mesaj isteği `kayitlar` listesine {zaman_ns, metot, chat_id, metin, message_id, dosya_boyutu}
+    olarak eklenir. hiz_siniri_ekle() ile sonraki isteklere 429 retry_after yanıtı verdirilebilir;
+    guncelleme_ekle() ile bota komut gönderilebilir: bot setWebhook çağırdıysa güncelleme gerçek Telegram
+    gibi gizli anahtar başlığıyla webhook adresine POST edilir, yoksa getUpdates ile teslim edilir.
+
+    `gecikme` tek yönlü ağ gecikmesidir. getUpdates'te hem isteğe hem yanıta eklenir (uzun sorgunun turu
+    bitip yenisi Telegram'a ulaşana kadar gelen güncellemeler bekler); webhook teslimine bir kez eklenir.
+    """
+
+    MESAJ_METOTLARI = ("sendMessage", "sendPhoto", "sendVideo", "sendMediaGroup",
+                       "editMessageText", "editMessageCaption")
+
+    def __init__(self, gecikme=0.0, host="127.0.0.1", port=0):
+        super().__init__(gecikme, host, port)
+        self._kilit = threading.Lock()
+        self._message_id = 0
+        self._update_id = 0
+        self._hiz_siniri = deque()  # Sıradaki isteklere verilecek retry_after değerleri
+        self._guncellemeler = queue.Queue()
+        self._webhook_kuyrugu = queue.Queue()
+        self._webhook_thread = None
+        self.webhook = None             # setWebhook ile verilen {"url", "secret_token"}
+        self.webhook_yanitlari = []     # Webhook teslimlerinde alınan HTTP durum kodları (bağlanılamazsa None)
+        self.istek_sayisi = {}
+
+    def hiz_siniri_ekle(self, adet=1, retry_after=1):
+        with self._kilit:
+            self._hiz_siniri.extend([retry_after] * adet)
+
+    def guncelleme_ekle(self, metin, chat_id=1000, kullanici_id=1, ad="Test"):
+        """Bota getUpdates ya da webhook ile teslim edilecek bir metin mesajı (örn. '/aktifet1') ekler."""
+        with self._kilit:
+            self._update_id += 1
+            self._message_id += 1
+            guncelleme = {
+                "update_id": self._update_id,
+                "message": {
+                    "message_id": self._message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": int(chat_id), "type": "private"},
+                    "from": {"id": kullanici_id, "is_bot": False, "first_name": ad},
+                    "text": metin,
+                    "entities": [{"type": "bot_command", "offset": 0, "length": len(metin.split()[0])}]
+                    if metin.startswith("/") else [],
+                },
+            }
+            webhook = self.webhook
+        if webhook:
+            self._webhook_kuyrugu.put((time.monotonic() + self.gecikme, webhook, guncelleme))
+        else:
+            self._guncellemeler.put(guncelleme)
+        return guncelleme
+
+    def _webhook_dongusu(self):
+        """Güncellemeleri sırayla, gecikme sonunda webhook adresine POST eder."""
+        while True:
+            zaman, webhook, guncelleme = self._webhook_kuyrugu.get()
+            time.sleep(max(zaman - time.monotonic(), 0))
+            istek = Request(webhook["url"], data=json.dumps(guncelleme).encode("utf-8"), method="POST",
+                            headers={"Content-Type": "application/json"})
+            if webhook.get("secret_token"):
+                istek.add_header("X-Telegram-Bot-Api-Secret-Token", webhook["secret_token"])
+            try:
+                with urlopen(istek, timeout=10) as yanit:
+                    kod = yanit.status
+            except HTTPError as e:
+                kod = e.code
+            except (URLError, OSError):
+                kod = None
+            with self._kilit:
+                self.webhook_yanitlari.append(kod)
+
+    def _istegi_isle(self, isleyici, metot):
+        zaman = time.monotonic_ns()
+        govde = istek_govdesi(isleyici)
+        yol = urlsplit(isleyici.path)
+        api_metodu = yol.path.rsplit("/", 1)[-1]
+        alanlar, dosyalar = form_coz(isleyici.headers.get("Content-Type", ""), govde)
+        if yol.query:
+            alanlar.update({k: v[-1] for k, v in parse_qs(yol.query).items()})
+        with self._kilit:
+            self.istek_sayisi[api_metodu] = self.istek_sayisi.get(api_metodu, 0) + 1
+            retry_after = self._hiz_siniri.popleft() if self._hiz_siniri and api_metodu in self.MESAJ_METOTLARI else None
+        if self.gecikme:
+            time.sleep(self.gecikme)
+        if retry_after is not None:
+            self._yanitla(isleyici, 429, {"ok": False, "error_code": 429,
+                                          "description": f"Too Many Requests: retry after {retry_after}",
+                                          "parameters": {"retry_after": retry_after}})
+            return
+        if api_metodu == "getUpdates" and self.webhook:
+            self._yanitla(isleyici, 409, {"ok": False, "error_code": 409,
+                                          "description": "Conflict: can't use getUpdates method while webhook is active"})
+            return
+        sonuc = self._metodu_isle(api_metodu, alanlar, dosyalar, zaman)
+        if api_metodu == "getUpdates" and self.gecikme:
+            time.sleep(self.gecikme)  # Yanıtın dönüş yolu
+        if sonuc is None:
+            self._yanitla(isleyici, 404, {"ok": False, "error_code": 404, "description": "Not Found"})
+        else:
+            self._yanitla(isleyici, 200, {"ok": True, "result": sonuc})
+
+    def _mesaj(self, chat_id, **ek):
+        with self._kilit:
+            self._message_id += 1
+            message_id = self._message_id
+        mesaj = {"message_id": message_id, "date": int(time.time()),
+                 "chat": {"id": int(chat_id or 0), "type": "private"}}
+        mesaj.update(ek)
+        return mesaj
+
+    def _metodu_isle(self, metot, alanlar, dosyalar, zaman):
+        chat_id = alanlar.get("chat_id")
+        if metot == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Taklit", "username": "taklit_bot",
+                    "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False}
+        if metot == "getUpdates":
+            try:
+                bekleme = min(float(alanlar.get("timeout") or 0), 1.0)
+                guncellemeler = [self._guncellemeler.get(timeout=bekleme) if bekleme else self._guncellemeler.get_nowait()]
+            except queue.Empty:
+                return []
+            while True:
+                try:
+                    guncellemeler.append(self._guncellemeler.get_nowait())
+                except queue.Empty:
+                    return guncellemeler
+        if metot == "setWebhook":
+            with self._kilit:
+                self.webhook = {"url": alanlar.get("url"), "secret_token": alanlar.get("secret_token")}
+                if self._webhook_thread is None:
+                    self._webhook_thread = threading.Thread(target=self._webhook_dongusu, name="WebhookTeslimi", daemon=True)
+                    self._webhook_thread.start()
+            return True
+        if metot == "deleteWebhook":
+            with self._kilit:
+                self.webhook = None
+            return True
+        if metot in ("sendChatAction", "answerCallbackQuery", "setMyCommands"):
+            return True
+        if metot not in self.MESAJ_METOTLARI:
+            return None
+
+        dosya_boyutu = sum(len(icerik) for icerik in dosyalar.values())
+        if metot == "sendMediaGroup":
+            ogeler = json.loads(alanlar.get("media") or "[]")
+            sonuc = []
+            for sira, oge in enumerate(ogeler):
+                file_id = oge.get("media", "")
+                if file_id.startswith("attach://"):
+                    file_id = f"grup{len(self.kayitlar) + 1}_{sira}"
+                sonuc.append(self._mesaj(chat_id, caption=oge.get("caption", ""),
+                                         photo=[{"file_id": file_id, "width": 640, "height": 360}]))
+            metin = next((oge.get("caption") for oge in ogeler if oge.get("caption")), "")
+            message_id = sonuc[0]["message_id"] if sonuc else None
+        elif metot.startswith("edit"):
+            metin = alanlar.get("text") or alanlar.get("caption") or ""
+            message_id = int(alanlar.get("message_id") or 0)
+            sonuc = {"message_id": message_id, "date": int(time.time()),
+                     "chat": {"id": int(chat_id or 0), "type": "private"}, "edit_date": int(time.time())}
+        else:
+            metin = alanlar.get("text") or alanlar.get("caption") or ""
+            ek = {"text": metin} if metot == "sendMessage" else {"caption": metin}
+            if metot == "sendPhoto":
+                ek["photo"] = [{"file_id": f"foto{len(self.kayitlar) + 1}", "file_unique_id": f"f{len(self.kayitlar) + 1}",
+                                "width": 640, "height": 480, "file_size": dosya_boyutu}]
+            elif metot == "sendVideo":
+                ek["video"] = {"file_id": f"video{len(self.kayitlar) + 1}", "file_unique_id": f"v{len(self.kayitlar) + 1}",
+                               "width": 1280, "height": 720, "duration": 10, "file_size": dosya_boyutu}
+            sonuc = self._mesaj(chat_id, **ek)
+            message_id = sonuc["message_id"]
+        self._kaydet({"zaman_ns": zaman, "metot": metot, "chat_id": chat_id, "metin": metin,
+                      "message_id": message_id, "dosya_boyutu": dosya_boyutu,
+                      "sessiz": alanlar.get("disable_notification") in ("True", "true", "1")})
+        return sonuc
+
+
+class FrigateTaklidi(_HttpTaklidi):
+    """Yerel Frigate taklidi.
+
+    /api/<kamera>/latest.jpg örnek JPEG döndürür. olay_ekle() ile eklenen olaylar /api/events ile
+    sorgulanır; /api/events/<id>/clip.mp4 ve /api/<kamera>/start/<a>/end/<b>/clip.mp4 `klip_boyutu`
+    baytlık klibi (bellekte tutmadan) parça parça yazar, /api/events/<id>/thumbnail.jpg küçük resim verir.
+    """
+
+    KLIP_PARCASI = 64 * 1024
+
+    def __init__(self, gecikme=0.0, goruntu_boyutu=ORNEK_JPEG_BOYUTU, host="127.0.0.1", port=0, klip_boyutu=2 * 1024 * 1024):
+        super().__init__(gecikme, host, port)
+        self.goruntu = ornek_jpeg(goruntu_boyutu)
+        self.kucuk_resim = ornek_jpeg(8 * 1024)
+        self.klip_boyutu = klip_boyutu
+        self.olaylar = []
+
+    def olay_ekle(self, kamera, baslangic, bitis=None, olay_id=None, klip=True):
+        olay = {"id": olay_id or f"{baslangic:.6f}-{len(self.olaylar)}", "camera": kamera, "label": "person",
+                "start_time": baslangic, "end_time": bitis, "has_clip": klip, "has_snapshot": True}
+        self.olaylar.append(olay)
+        return olay
+
+    def _olaylari_suz(self, sorgu):
+        kamera = sorgu.get("camera", ["all"])[-1]
+        sonra = float(sorgu.get("after", [0])[-1])
+        olaylar = [olay for olay in self.olaylar
+                   if kamera in ("all", olay["camera"]) and olay["start_time"] > sonra
+                   and (sorgu.get("has_clip", ["0"])[-1] != "1" or olay["has_clip"])]
+        olaylar.sort(key=lambda olay: olay["start_time"], reverse=True)
+        return olaylar[:int(sorgu.get("limit", [100])[-1])]
+
+    def _klibi_yaz(self, isleyici):
+        isleyici.send_response(200)
+        isleyici.send_header("Content-Type", "video/mp4")
+        isleyici.send_header("Content-Length", str(self.klip_boyutu))
+        isleyici.end_headers()
+        parca = bytes(self.KLIP_PARCASI)
+        kalan = self.klip_boyutu
+        try:
+            while kalan > 0:
+                isleyici.wfile.write(parca[:kalan])
+                kalan -= len(parca)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # İstemci (örn. boyut sınırında) aktarımı kesti
+
+    def _istegi_isle(self, isleyici, metot):
+        zaman = time.monotonic_ns()
+        yol = urlsplit(isleyici.path)
+        parcalar = yol.path.strip("/").split("/")
+        if self.gecikme:
+            time.sleep(self.gecikme)
+        olay_ids = {olay["id"] for olay in self.olaylar}
+        if metot != "GET" or parcalar[0] != "api":
+            self._yanitla(isleyici, 404, {"message": "Not found"})
+        elif len(parcalar) == 3 and parcalar[2] == "latest.jpg":
+            self._kaydet({"zaman_ns": zaman, "kamera": parcalar[1]})
+            self._yanitla(isleyici, 200, self.goruntu, "image/jpeg")
+        elif parcalar[1:] == ["events"]:
+            self._kaydet({"zaman_ns": zaman, "istek": "events"})
+            self._yanitla(isleyici, 200, self._olaylari_suz(parse_qs(yol.query)))
+        elif len(parcalar) == 4 and parcalar[1] == "events" and parcalar[2] in olay_ids and parcalar[3] == "thumbnail.jpg":
+            self._kaydet({"zaman_ns": zaman, "istek": "thumbnail", "olay": parcalar[2]})
+            self._yanitla(isleyici, 200, self.kucuk_resim, "image/jpeg")
+        elif len(parcalar) == 4 and parcalar[1] == "events" and parcalar[2] in olay_ids and parcalar[3] == "clip.mp4":
+            self._kaydet({"zaman_ns": zaman, "istek": "klip", "olay": parcalar[2]})
+            self._klibi_yaz(isleyici)
+        elif len(parcalar) == 7 and parcalar[2] == "start" and parcalar[4] == "end" and parcalar[6] == "clip.mp4":
+            self._kaydet({"zaman_ns": zaman, "istek": "kayit_klibi", "kamera": parcalar[1],
+                          "baslangic": float(parcalar[3]), "bitis": float(parcalar[5])})
+            self._klibi_yaz(isleyici)
+        else:
+            self._yanitla(isleyici, 404, {"message": "Not found"})
+
+
+# --- MQTT BROKER TAKLİDİ ---
+def topic_eslesir(filtre, topic):
+    """MQTT abonelik filtresinin ('+' ve '#' joker karakterleriyle) topic'e uyup uymadığını döndürür."""
+    filtre_parcalari = filtre.split("/")
+    topic_parcalari = topic.split("/")
+    for i, parca in enumerate(filtre_parcalari):
+        if parca == "#":
+            return True
+        if i >= len(topic_parcalari) or (parca != "+" and parca != topic_parcalari[i]):
+            return False
+    return len(filtre_parcalari) == len(topic_parcalari)
+
+
+class _MqttIstemcisi:
+    def __init__(self, soket):
+        self.soket = soket
+        self.kimlik = ""
+        self.abonelikler = {}  # filtre -> qos
+        self.yazma_kilidi = threading.Lock()
+        self.paket_no = 0
+
+    def gonder(self, paket):
+        with self.yazma_kilidi:
+            self.soket.sendall(paket)
+
+
+class MqttBrokerTaklidi(_Kayitci):
+    """Süreç içinde çalışan küçük MQTT 3.1.1 broker'ı.
+
+    CONNECT, PUBLISH (QoS 0/1/2), SUBSCRIBE, UNSUBSCRIBE, PINGREQ ve DISCONNECT desteklenir; retained
+    mesajlar saklanır ve yeni abonelere gönderilir. Abonelere en fazla QoS 1 ile iletilir. Gelen her
+    PUBLISH `kayitlar` listesine {zaman_ns, istemci, topic, payload, qos, retain} olarak eklenir.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__()
+        self._soket = socket.create_server((host, port))
+        self._kilit = threading.Lock()
+        self._istemciler = []
+        self.retained = {}
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._soket.getsockname()[1]
+
+    @property
+    def host(self):
+        return self._soket.getsockname()[0]
+
+    def baslat(self):
+        self._thread = threading.Thread(target=self._kabul_dongusu, name="mqtt-broker", daemon=True)
+        self._thread.start()
+        return self
+
+    def kapat(self):
+        self._soket.close()
+        with self._kilit:
+            istemciler = list(self._istemciler)
+        for istemci in istemciler:
+            try:
+                istemci.soket.close()
+            except OSError:
+                pass
+
+    def bagli_istemciler(self):
+        with self._kilit:
+            return [istemci.kimlik for istemci in self._istemciler]
+
+    def _kabul_dongusu(self):
+        while True:
+            try:
+                soket, _ = self._soket.accept()
+            except OSError:
+                return
+            soket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            istemci = _MqttIstemcisi(soket)
+            threading.Thread(target=self._istemci_dongusu, args=(istemci,), name="mqtt-broker-istemci", daemon=True).start()
+
+    @staticmethod
+    def _tam_oku(soket, n):
+        veri = b""
+        while len(veri) < n:
+            parca = soket.recv(n - len(veri))
+            if not parca:
+                raise ConnectionError("bağlantı kapandı")
+            veri += parca
+        return veri
+
+    def _paket_oku(self, soket):
+        ilk = self._tam_oku(soket, 1)[0]
+        uzunluk, carpan = 0, 1
+        while True:
+            bayt = self._tam_oku(soket, 1)[0]
+            uzunluk += (bayt & 0x7F) * carpan
+            if not bayt & 0x80:
+                break
+            carpan *= 128
+        return ilk, self._tam_oku(soket, uzunluk) if uzunluk else b""
+
+    @staticmethod
+    def _paket(ilk, govde):
+        uzunluk = len(govde)
+        baslik = bytearray([ilk])
+        while True:
+            bayt, uzunluk = uzunluk % 128, uzunluk // 128
+            baslik.append(bayt | (0x80 if uzunluk else 0))
+            if not uzunluk:
+                break
+        return bytes(baslik) + govde
+
+    @staticmethod
+    def _metin(veri, i):
+        n = struct.unpack_from("!H", veri, i)[0]
+        return veri[i + 2:i + 2 + n].decode("utf-8"), i + 2 + n
+
+    @staticmethod
+    def _metin_paketle(metin):
+        veri = metin.encode("utf-8")
+        return struct.pack("!H", len(veri)) + veri
+
+    def _publish_paketi(self, istemci, topic, payload, qos, retain):
+        govde = self._metin_paketle(topic)
+        if qos:
+            istemci.paket_no = istemci.paket_no % 65535 + 1
+            govde += struct.pack("!H", istemci.paket_no)
+        return self._paket(0x30 | (qos << 1) | int(retain), govde + payload)
+
+    def _istemci_dongusu(self, istemci):
+        try:
+            while True:
+                ilk, govde = self._paket_oku(istemci.soket)
+                tip = ilk >> 4
+                if tip == 1:  # CONNECT
+                    _, i = self._metin(govde, 0)
+                    i += 4  # protokol seviyesi, bayraklar, keepalive
+                    istemci.kimlik, _ = self._metin(govde, i)
+                    with self._kilit:
+                        self._istemciler.append(istemci)
+                    istemci.gonder(b"\x20\x02\x00\x00")
+                elif tip == 3:  # PUBLISH
+                    self._publish_isle(istemci, ilk, govde)
+                elif tip == 6:  # PUBREL
+                    istemci.gonder(b"\x70\x02" + govde[:2])
+                elif tip == 8:  # SUBSCRIBE
+                    self._subscribe_isle(istemci, govde)
+                elif tip == 10:  # UNSUBSCRIBE
+                    i = 2
+                    while i < len(govde):
+                        filtre, i = self._metin(govde, i)
+                        istemci.abonelikler.pop(filtre, None)
+                    istemci.gonder(b"\xb0\x02" + govde[:2])
+                elif tip == 12:  # PINGREQ
+                    istemci.gonder(b"\xd0\x00")
+                elif tip == 14:  # DISCONNECT
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self._kilit:
+                if istemci in self._istemciler:
+                    self._istemciler.remove(istemci)
+            try:
+                istemci.soket.close()
+            except OSError:
+                pass
+
+    def _publish_isle(self, istemci, ilk, govde):
+        zaman = time.monotonic_ns()
+        qos = (ilk >> 1) & 3
+        retain = bool(ilk & 1)
+        topic, i = self._metin(govde, 0)
+        paket_no = None
+        if qos:
+            paket_no = govde[i:i + 2]
+            i += 2
+        payload = govde[i:]
+        if qos == 1:
+            istemci.gonder(b"\x40\x02" + paket_no)
+        elif qos == 2:
+            istemci.gonder(b"\x50\x02" + paket_no)
+        if retain:
+            with self._kilit:
+                if payload:
+                    self.retained[topic] = (payload, qos)
+                else:
+                    self.retained.pop(topic, None)
+        self._kaydet({"zaman_ns": zaman, "istemci": istemci.kimlik, "topic": topic,
+                      "payload": payload, "qos": qos, "retain": retain})
+        with self._kilit:
+            aboneler = list(self._istemciler)
+        for abone in aboneler:
+            eslesen = [q for filtre, q in abone.abonelikler.items() if topic_eslesir(filtre, topic)]
+            if eslesen:
+                try:
+                    abone.gonder(self._publish_paketi(abone, topic, payload, min(max(eslesen), qos, 1), False))
+                except OSError:
+                    pass
+
+    def _subscribe_isle(self, istemci, govde):
+        paket_no = govde[:2]
+        i = 2
+        verilen = bytearray()
+        yeni_filtreler = []
+        while i < len(govde):
+            filtre, i = self._metin(govde, i)
+            qos = min(govde[i] & 3, 1)
+            i += 1
+            istemci.abonelikler[filtre] = qos
+            yeni_filtreler.append((filtre, qos))
+            verilen.append(qos)
+        istemci.gonder(self._paket(0x90, paket_no + bytes(verilen)))
+        with self._kilit:
+            retained = list(self.retained.items())
+        for topic, (payload, qos) in retained:
+            for filtre, abone_qos in yeni_filtreler:
+                if topic_eslesir(filtre, topic):
+                    istemci.gonder(self._publish_paketi(istemci, topic, payload, min(qos, abone_qos), True))
+                    break
@@ -0,0 +1,37 @@
+import os
+import socket
+import sys
+
+import pytest
+
+# main.py ve simulasyon.py depo kökünde; testler pytest hangi dizinden çalıştırılırsa çalıştırılsın onları bulsun
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+import simulasyon  # noqa: E402
+
+SOHBET = "1000"
+
+
+def kapali_port():
+    """Dinlenmeyen bir yerel port: bağlanılamayan Frigate ya da Telegram adresleri için."""
+    with socket.socket() as soket:
+        soket.bind(("127.0.0.1", 0))
+        return soket.getsockname()[1]
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    """main'i yerel Telegram taklidine yönlendirir; Frigate'e bağlanılamaz (sadece metin gönderilir)."""
+    tg = simulasyon.TelegramTaklidi().baslat()
+    monkeypatch.setattr(main, "TELEGRAM_API_URL", tg.adres)
+    monkeypatch.setattr(main, "TELEGRAM_BOT_TOKEN", "1:X")
+    monkeypatch.setattr(main, "TELEGRAM_CHAT_ID", SOHBET)
+    monkeypatch.setattr(main, "FRIGATE_IP", "127.0.0.1")
+    monkeypatch.setattr(main, "FRIGATE_PORT", kapali_port())
+    monkeypatch.setattr(main, "goruntu_onbellegi", main.GoruntuOnbellegi())
+    # Sohbet başına ~1 mesaj/sn sınırı testleri yavaşlatmasın (dağıtıcı oluşturulurken okunur)
+    monkeypatch.setattr(main, "TELEGRAM_SOHBET_HIZI", 1000.0)
+    monkeypatch.setattr(main, "TELEGRAM_SOHBET_KAPASITESI", 1000)
+    yield tg
+    tg.kapat()
@@ -0,0 +1,193 @@
+"""Ayar dosyası testleri: doğrulama (bozuk TOML/JSON, bilinmeyen anahtar, yanlış tür) ve AyarIzleyici ile
+yeniden başlatmadan yeniden yükleme (thread ve asyncio sürücüleri)."""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def ayarlar(monkeypatch, tmp_path):
+    """Ayar dosyasını geçici dizine yönlendirir; yeniden yüklemenin değiştirdiği ayarlar test sonunda geri alınır."""
+    for ad in main.AYAR_VARSAYILANLARI:
+        monkeypatch.setattr(main, ad, getattr(main, ad))
+    for bolge in main.bolgeler:
+        monkeypatch.setattr(bolge, "ad", bolge.ad)
+    yol = tmp_path / "guvenlik_ayarlari.toml"
+    monkeypatch.setattr(main, "AYAR_DOSYASI", str(yol))
+    monkeypatch.setattr(main, "AYAR_KONTROL_ARALIGI", 0.05)
+    monkeypatch.setattr(main, "AYAR_BIRLESTIRME_SURESI", 0.01)
+    monkeypatch.setattr(main, "bildirim_dagitici", main.BildirimDagitici(main.BILDIRIM_KUYRUK_BOYUTU, 1))
+    bildirimler, gunluk = [], []
+    monkeypatch.setattr(main, "send_telegram_notification", lambda mesaj, *args, **kwargs: bildirimler.append(mesaj))
+    monkeypatch.setattr(main.olay_gunlugu, "yaz", lambda tip, **alanlar: gunluk.append((tip, alanlar)))
+    dosya_yaz(yol, "")
+    return SimpleNamespace(yol=yol, bildirimler=bildirimler, gunluk=gunluk)
+
+
+def dosya_yaz(yol, metin):
+    """Editörler gibi geçici dosyaya yazıp yerine taşır."""
+    with open(f"{yol}.tmp", "w", encoding="utf-8") as f:
+        f.write(metin)
+    os.replace(f"{yol}.tmp", yol)
+
+
+def bekle(kosul, zaman_asimi=5):
+    bitis = time.monotonic() + zaman_asimi
+    while not kosul():
+        assert time.monotonic() < bitis, "koşul zaman aşımına uğradı"
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("ad, metin, beklenen", [
+    ("a.toml", "ALARM_TEKRAR_SURESI = \n", "Invalid value"),
+    ("a.json", "{\"ALARM_TEKRAR_SURESI\": 42,", "Expecting"),
+    ("a.json", "[1, 2]", "'AYAR = değer' satırlarından oluşmalı"),
+    ("a.toml", "ALARM_TEKRAR_SURESII = 42\n", "Bilinmeyen ayar: ALARM_TEKRAR_SURESII"),
+    ("a.toml", "ALARM_TEKRAR_SURESI = \"10\"\n", "ALARM_TEKRAR_SURESI: int bekleniyordu, '10' verildi."),
+    ("a.toml", "FILTRE_AKTIF = 1\n", "FILTRE_AKTIF: bool bekleniyordu"),
+    ("a.toml", "POLLING_ARALIGI = 0\n", "POLLING_ARALIGI: pozitif olmalı."),
+    ("a.toml", "SENSOR_MODU = \"kesmeli\"\n", "SENSOR_MODU: 'kesmeli' yerine kesme, polling olmalı."),
+    ("a.toml", "OTOMATIK_KURULUM_TAKVIMI = [\"pzr 18:30\"]\n", "geçersiz takvim satırı 'pzr 18:30'"),
+    ("a.toml", "[[BOLGE_TABLOSU]]\nno = 1\nad = \"A\"\npin = 23\nkamera = \"k\"\notomatik_kurulum_suresi = 60\n"
+               "[[BOLGE_TABLOSU]]\nno = 2\nad = \"B\"\npin = 23\nkamera = \"k\"\notomatik_kurulum_suresi = 60\n",
+     "BOLGE_TABLOSU[2]: pin 23 başka bir bölgede"),
+])
+def test_gecersiz_dosya_reddedilir(tmp_path, ad, metin, beklenen):
+    yol = tmp_path / ad
+    dosya_yaz(yol, metin)
+    with pytest.raises(ValueError) as hata:
+        main.ayar_dosyasini_oku(str(yol))
+    assert beklenen in str(hata.value)
+
+
+def test_butun_hatalar_birlikte_bildirilir(tmp_path):
+    yol = tmp_path / "a.toml"
+    dosya_yaz(yol, "BILINMEYEN = 1\nALARM_TEKRAR_SURESI = \"on\"\nPOLLING_ARALIGI = 0.5\n")
+    with pytest.raises(ValueError) as hata:
+        main.ayar_dosyasini_oku(str(yol))
+    assert str(hata.value).splitlines() == [
+        "Bilinmeyen ayar: BILINMEYEN", "ALARM_TEKRAR_SURESI: int bekleniyordu, 'on' verildi."]
+
+
+def test_sayi_olarak_yazilan_sohbet_idsi_ve_ondalikli_ayara_tam_sayi_kabul_edilir(tmp_path):
+    yol = tmp_path / "a.toml"
+    dosya_yaz(yol, "TELEGRAM_CHAT_ID = 12345\nPOLLING_ARALIGI = 1\n")
+    yeni = main.ayar_dosyasini_oku(str(yol))
+    assert yeni["TELEGRAM_CHAT_ID"] == "12345"
+    assert yeni["POLLING_ARALIGI"] == 1
+    # Dosyada olmayan ayarlar main.py'deki değerine döner
+    assert yeni["ALARM_TEKRAR_SURESI"] == main.AYAR_VARSAYILANLARI["ALARM_TEKRAR_SURESI"]
+
+
+@pytest.mark.parametrize("ad, metin", [
+    ("guvenlik_ayarlari.toml", "ALARM_TEKRAR_SURESI = 42\nPOLLING_ARALIGI = \n"),
+    ("guvenlik_ayarlari.json", "{\"ALARM_TEKRAR_SURESI\": 42, \"POLLING_ARALIGI\": }"),
+    ("guvenlik_ayarlari.toml", "ALARM_TEKRAR_SURESI = 42\nPOLLING_ARALIGI = \"hizli\"\n"),
+    ("guvenlik_ayarlari.toml", "ALARM_TEKRAR_SURESI = 42\nBILINMEYEN = 1\n"),
+])
+def test_reddedilen_dosyada_onceki_ayarlar_gecerli_kalir(monkeypatch, ayarlar, ad, metin):
+    yol = ayarlar.yol.with_name(ad)
+    monkeypatch.setattr(main, "AYAR_DOSYASI", str(yol))
+    dosya_yaz(yol, metin)
+    onceki = main.POLLING_ARALIGI
+
+    assert main.ayarlari_yeniden_yukle() is False
+    # Dosyanın geçerli kısmı da uygulanmaz: ya hepsi ya hiçbiri
+    assert main.ALARM_TEKRAR_SURESI == main.AYAR_VARSAYILANLARI["ALARM_TEKRAR_SURESI"]
+    assert main.POLLING_ARALIGI == onceki
+    assert ayarlar.bildirimler[-1].startswith("⚠️ Ayar dosyası reddedildi, önceki ayarlar geçerli:")
+    assert ayarlar.gunluk == []
+
+
+def test_gecerli_dosya_yeniden_baslatmadan_uygulanir(ayarlar):
+    bolge = main.bolgeler[0]
+    tablo = [dict(satir) for satir in main.BOLGE_TABLOSU]
+    tablo[0]["ad"] = "Benzin Tankı"
+    yol = ayarlar.yol.with_suffix(".json")
+    main.AYAR_DOSYASI = str(yol)
+    dosya_yaz(yol, json.dumps({"ALARM_TEKRAR_SURESI": 42, "GPIO_CHIP": 4, "BOLGE_TABLOSU": tablo}))
+
+    assert main.ayarlari_yeniden_yukle() is True
+    assert main.ALARM_TEKRAR_SURESI == 42
+    # Bölge nesnesi korunur, sadece alanları güncellenir
+    assert main.bolgeler[0] is bolge and bolge.ad == "Benzin Tankı"
+    # Açılışta okunan ayar çalışırken değişmez
+    assert main.GPIO_CHIP == main.AYAR_VARSAYILANLARI["GPIO_CHIP"]
+    assert ayarlar.bildirimler == ["🔧 Ayarlar yeniden yüklendi: BOLGE_TABLOSU, ALARM_TEKRAR_SURESI\n"
+                                   "ℹ️ Yeniden başlatmada geçerli olacak: GPIO_CHIP"]
+    assert ayarlar.gunluk == [("ayar", {"ayarlar": ["BOLGE_TABLOSU", "ALARM_TEKRAR_SURESI"]})]
+
+
+def test_bolge_eklemek_yeniden_baslatma_gerektirir(ayarlar):
+    tablo = [dict(satir) for satir in main.BOLGE_TABLOSU]
+    tablo.append({**tablo[0], "no": 3, "pin": 25})
+    yol = ayarlar.yol.with_suffix(".json")
+    main.AYAR_DOSYASI = str(yol)
+    dosya_yaz(yol, json.dumps({"BOLGE_TABLOSU": tablo}))
+
+    assert main.ayarlari_yeniden_yukle() is True
+    assert len(main.bolgeler) == len(main.AYAR_VARSAYILANLARI["BOLGE_TABLOSU"])
+    assert ayarlar.bildirimler == ["ℹ️ Yeniden başlatmada geçerli olacak: BOLGE_TABLOSU"]
+
+
+@pytest.mark.parametrize("inotify", [True, False], ids=["inotify", "yoklama"])
+def test_izleyici_degisen_dosyayi_yeniden_yukler(ayarlar, inotify):
+    izleyici = main.AyarIzleyici(str(ayarlar.yol))
+    if inotify:
+        izleyici.ac()
+        if izleyici.inotify is None:
+            pytest.skip("inotify kullanılamıyor")
+    durdur = threading.Event()
+    thread = threading.Thread(target=izleyici.calistir, args=(durdur,), daemon=True)
+    thread.start()
+    try:
+        dosya_yaz(ayarlar.yol, "ALARM_TEKRAR_SURESI = 42\n")
+        bekle(lambda: main.ALARM_TEKRAR_SURESI == 42)
+
+        dosya_yaz(ayarlar.yol, "ALARM_TEKRAR_SURESI = 7\nPOLLING_ARALIGI = -1\n")
+        bekle(lambda: any("reddedildi" in mesaj for mesaj in ayarlar.bildirimler))
+        assert main.ALARM_TEKRAR_SURESI == 42
+    finally:
+        durdur.set()
+        izleyici.tetikle()
+        thread.join(timeout=5)
+
+
+def test_asyncio_surucusu_dosyayi_olay_dongusu_disinda_okur(monkeypatch, ayarlar):
+    okuyanlar = []
+    oku = main.ayar_dosyasini_oku
+
+    def izlenen_oku(yol):
+        okuyanlar.append(threading.current_thread())
+        return oku(yol)
+
+    monkeypatch.setattr(main, "ayar_dosyasini_oku", izlenen_oku)
+
+    async def senaryo():
+        izleyici = main.AyarIzleyici(str(ayarlar.yol))
+        izleyici.ac()
+        gorev = asyncio.create_task(izleyici.acalistir())
+        await asyncio.sleep(0.05)
+        try:
+            dosya_yaz(ayarlar.yol, "ALARM_TEKRAR_SURESI = 42\n")
+            while main.ALARM_TEKRAR_SURESI != 42:
+                await asyncio.sleep(0.01)
+            dosya_yaz(ayarlar.yol, "ALARM_TEKRAR_SURESI = \n")
+            while not any("reddedildi" in mesaj for mesaj in ayarlar.bildirimler):
+                await asyncio.sleep(0.01)
+        finally:
+            gorev.cancel()
+            await asyncio.gather(gorev, return_exceptions=True)
+
+    asyncio.run(asyncio.wait_for(senaryo(), 5))
+    assert main.ALARM_TEKRAR_SURESI == 42
+    assert len(okuyanlar) == 2
+    assert threading.current_thread() not in okuyanlar
@@ -0,0 +1,182 @@
+"""BildirimDagitici testleri: 429 duraklatması, öncelik şeritleri, birleştirme ve yerinde düzenleme.
+
+Telegram ve Frigate, simulasyon.py'deki yerel taklitlerle çalıştırılır; gerçek ağa çıkılmaz.
+"""
+
+import threading
+import time
+
+import pytest
+
+import main
+import simulasyon
+
+
+@pytest.fixture
+def dagitici(monkeypatch, telegram):
+    """Her test için yeni bir dağıtıcı kurar; işçiler test istediğinde baslat() ile başlatılır."""
+    olusturulan = []
+
+    def olustur(isci_sayisi=1):
+        d = main.BildirimDagitici(main.BILDIRIM_KUYRUK_BOYUTU, isci_sayisi)
+        monkeypatch.setattr(main, "bildirim_dagitici", d)
+        olusturulan.append(d)
+        return d
+
+    yield olustur
+    for d in olusturulan:
+        d.durdur(zaman_asimi=5)
+
+
+def metinler(tg):
+    """Gönderilen mesajların ilk satırları (görüntü alınamadı notu gibi ekler hariç)."""
+    return [kayit["metin"].split("\n")[0] for kayit in tg.kayitlar]
+
+
+def hepsi_gitti(tg, adet, zaman_asimi=10):
+    bitis = time.monotonic() + zaman_asimi
+    while tg.kayit_sayisi() < adet and time.monotonic() < bitis:
+        tg.bekle(lambda kayit: True, bitis - time.monotonic(), tg.kayit_sayisi())
+    return tg.kayit_sayisi() >= adet
+
+
+def islenmesini_bekle(d, adet, zaman_asimi=5):
+    """Kayıt taklitte görünse de işçi işi henüz bitirmemiş olabilir; metrikler iş bitince güncellenir."""
+    bitis = time.monotonic() + zaman_asimi
+    while d.metrikler["islenen"] < adet and time.monotonic() < bitis:
+        time.sleep(0.01)
+    assert d.metrikler["islenen"] >= adet
+
+
+def test_429_duraklatir_ve_isi_eski_sirasina_geri_koyar(telegram, dagitici):
+    d = dagitici()
+    telegram.hiz_siniri_ekle(1, retry_after=1)
+    main.send_telegram_notification("birinci", camera_name=None)
+    main.send_telegram_notification("ikinci", camera_name=None)
+    baslangic = time.monotonic_ns()
+    d.baslat()
+
+    assert hepsi_gitti(telegram, 2)
+    # 429 alan iş sona değil, kendi sırasına geri kondu
+    assert metinler(telegram) == ["birinci", "ikinci"]
+    assert d.metrikler["hiz_siniri"] == 1
+    assert telegram.istek_sayisi["sendMessage"] == 3
+    # retry_after dolmadan hiçbir gönderim yapılmadı
+    assert telegram.kayitlar[0]["zaman_ns"] - baslangic >= 0.9e9
+
+
+def test_duraklama_sirasinda_gelen_kritik_is_one_gecer(telegram, dagitici):
+    d = dagitici()
+    telegram.hiz_siniri_ekle(1, retry_after=1)
+    main.send_telegram_notification("bilgi", camera_name=None)
+    d.baslat()
+    assert telegram.bekle(lambda kayit: True, 0.5) is None  # 429 beklemesinde
+    main.send_telegram_notification("alarm", camera_name=None, oncelik=main.ONCELIK_KRITIK)
+
+    assert hepsi_gitti(telegram, 2)
+    assert metinler(telegram) == ["alarm", "bilgi"]
+
+
+def test_kritik_is_bilgi_ve_sessizden_once_gonderilir(telegram, dagitici):
+    d = dagitici()
+    main.send_telegram_silent_photo("sessiz", camera_name=None)
+    main.send_telegram_notification("bilgi", camera_name=None)
+    main.send_telegram_notification("alarm", camera_name=None, oncelik=main.ONCELIK_KRITIK)
+    d.baslat()
+
+    assert hepsi_gitti(telegram, 3)
+    assert metinler(telegram) == ["alarm", "bilgi", "sessiz"]
+    assert [kayit["sessiz"] for kayit in telegram.kayitlar] == [False, False, True]
+
+
+def test_kritik_serit_bilgi_isi_surerken_bekletilmez(telegram, dagitici):
+    d = dagitici(isci_sayisi=2)
+    d.baslat()
+    surdu = threading.Event()
+    birak = threading.Event()
+
+    def yavas_is():
+        surdu.set()
+        birak.wait(5)
+
+    d.ekle(yavas_is)
+    assert surdu.wait(5)
+    main.send_telegram_notification("alarm", camera_name=None, oncelik=main.ONCELIK_KRITIK)
+    try:
+        # Genel işçi meşgulken alarm kritik şeritteki işçiden gider
+        assert telegram.bekle(lambda kayit: kayit["metin"] == "alarm", 5) is not None
+    finally:
+        birak.set()
+
+
+def test_ayni_anahtarli_isler_birlestirilir(telegram, dagitici):
+    d = dagitici()
+    main.send_telegram_notification("durum 1", camera_name=None, anahtar="durum")
+    main.send_telegram_notification("araya giren", camera_name=None)
+    main.send_telegram_notification("durum 2", camera_name=None, anahtar="durum")
+    main.send_telegram_notification("durum 3", camera_name=None, anahtar="durum")
+    d.baslat()
+
+    assert hepsi_gitti(telegram, 2)
+    islenmesini_bekle(d, 2)
+    # Birleştirilen iş ilk eklendiği sırayı korur, içeriği en yenisidir
+    assert metinler(telegram) == ["durum 3", "araya giren"]
+    assert d.metrikler["birlestirilen"] == 2
+    assert d.metrikler["eklenen"] == 4
+
+
+def test_alarm_devam_mesaji_metin_olarak_yerinde_duzenlenir(telegram, dagitici):
+    d = dagitici()
+    d.baslat()
+    anahtar = "alarm1_devam"
+    main.send_telegram_notification("ALARM1 DEVAM EDİYOR!", camera_name=None, oncelik=main.ONCELIK_KRITIK, anahtar=anahtar)
+    ilk = telegram.bekle(lambda kayit: kayit["metot"] == "sendMessage", 5)
+    assert ilk is not None
+    islenmesini_bekle(d, 1)  # message_id yanıt alındıktan sonra kaydedilir
+
+    main.send_telegram_notification("ALARM1 DEVAM EDİYOR! (kapı kapandı)", camera_name=None,
+                                    oncelik=main.ONCELIK_KRITIK, anahtar=anahtar)
+    duzenleme = telegram.bekle(lambda kayit: kayit["metot"].startswith("edit"), 5)
+    assert duzenleme is not None
+    assert duzenleme["metot"] == "editMessageText"
+    assert duzenleme["message_id"] == ilk["message_id"]
+    assert duzenleme["metin"].startswith("ALARM1 DEVAM EDİYOR! (kapı kapandı)\n\n🕒 Son güncelleme:")
+    islenmesini_bekle(d, 2)
+    assert d.metrikler["duzenlenen"] == 1
+    assert telegram.istek_sayisi["sendMessage"] == 1
+
+    # Yeni alarm başlayınca kayıt bırakılır: sonraki "devam" mesajı yeni mesaj olarak gider
+    d.duzenlemeyi_birak(anahtar)
+    sayi = telegram.kayit_sayisi()
+    main.send_telegram_notification("ALARM1 DEVAM EDİYOR!", camera_name=None, oncelik=main.ONCELIK_KRITIK, anahtar=anahtar)
+    yeni = telegram.bekle(lambda kayit: True, 5, sayi)
+    assert yeni["metot"] == "sendMessage"
+    assert yeni["message_id"] != ilk["message_id"]
+
+
+def test_alarm_devam_mesaji_fotograf_aciklamasi_olarak_yerinde_duzenlenir(monkeypatch, telegram, dagitici):
+    frigate = simulasyon.FrigateTaklidi().baslat()
+    monkeypatch.setattr(main, "FRIGATE_PORT", frigate.port)
+    try:
+        d = dagitici()
+        d.baslat()
+        anahtar = "alarm2_devam"
+        main.send_telegram_notification("ALARM2 DEVAM EDİYOR!", camera_name="arka_kapi",
+                                        oncelik=main.ONCELIK_KRITIK, anahtar=anahtar)
+        ilk = telegram.bekle(lambda kayit: kayit["metot"] == "sendPhoto", 5)
+        assert ilk is not None
+        islenmesini_bekle(d, 1)
+
+        main.send_telegram_notification("ALARM2 DEVAM EDİYOR! (hala açık)", camera_name="arka_kapi",
+                                        oncelik=main.ONCELIK_KRITIK, anahtar=anahtar)
+        duzenleme = telegram.bekle(lambda kayit: kayit["metot"].startswith("edit"), 5)
+        assert duzenleme is not None
+        assert duzenleme["metot"] == "editMessageCaption"
+        assert duzenleme["message_id"] == ilk["message_id"]
+        assert duzenleme["metin"].startswith("ALARM2 DEVAM EDİYOR! (hala açık)")
+        islenmesini_bekle(d, 2)
+        # Düzenlemede fotoğraf yeniden yüklenmez
+        assert telegram.istek_sayisi["sendPhoto"] == 1
+        assert d.metrikler["duzenlenen"] == 1
+    finally:
+        frigate.kapat()
@@ -0,0 +1,162 @@
+"""GidenKutusu testleri: yeniden başlatmada bekleyenlerin gönderilmesi, aynı bildirimlerin birleştirilmesi,
+artan bekleme ve bozuk kayıtların silinmesi.
+
+Telegram, simulasyon.py'deki yerel taklitle çalıştırılır; kesinti için adres dinlenmeyen bir porta çevrilir.
+"""
+
+import os
+import re
+import time
+
+import pytest
+
+import main
+from conftest import SOHBET, kapali_port
+
+
+@pytest.fixture
+def kutu(monkeypatch, telegram, tmp_path):
+    """Geçici dizinde giden kutusu açan fabrika; her açılan kutu main.giden_kutusu olur."""
+    dagitici = main.BildirimDagitici(main.BILDIRIM_KUYRUK_BOYUTU, 1)
+    monkeypatch.setattr(main, "bildirim_dagitici", dagitici)
+    monkeypatch.setattr(main, "GIDEN_KUTUSU_ILK_BEKLEME", 60)  # Başarısız denemeden sonra test bitene kadar bekler
+    acilan = []
+
+    def ac():
+        k = main.GidenKutusu(str(tmp_path / "giden"))
+        monkeypatch.setattr(main, "giden_kutusu", k)
+        k.ac()
+        acilan.append(k)
+        return k
+
+    yield ac
+    for k in acilan:
+        k.kapat()
+    dagitici.durdur(zaman_asimi=5)
+
+
+def kesinti(monkeypatch):
+    monkeypatch.setattr(main, "TELEGRAM_API_URL", f"http://127.0.0.1:{kapali_port()}")
+
+
+def baglanti(monkeypatch, tg):
+    monkeypatch.setattr(main, "TELEGRAM_API_URL", tg.adres)
+
+
+def gonderim(alicilar=(SOHBET,), t=None):
+    """Dağıtıcının ulaşamadığı alıcılarla kalan gönderim kaydı."""
+    return {"alicilar": list(alicilar), "file_id": None, "oncelik": main.ONCELIK_BILGI, "t": t or time.time()}
+
+
+def bekle(kosul, zaman_asimi=5):
+    bitis = time.monotonic() + zaman_asimi
+    while not kosul():
+        assert time.monotonic() < bitis, "koşul zaman aşımına uğradı"
+        time.sleep(0.01)
+
+
+def dosyalar(k):
+    return sorted(os.listdir(k.dizin))
+
+
+def ilk_satirlar(tg):
+    return [kayit["metin"].split("\n")[0] for kayit in tg.kayitlar]
+
+
+def test_yeniden_baslatmada_bekleyenler_olay_sirasiyla_gonderilir(monkeypatch, telegram, kutu):
+    kesinti(monkeypatch)
+    k = kutu()
+    k.ekle("ikinci", None, gonderim(t=2000.0), None)
+    k.ekle("birinci", None, gonderim(t=1000.0), None)
+    assert k.kesintide()
+    k.kapat()
+    assert len(dosyalar(k)) == 2
+
+    baglanti(monkeypatch, telegram)
+    k = kutu()
+    bekle(lambda: k.bekleyen()["adet"] == 0)
+    # Olay zamanı en eski olan önce gider; mesaja gecikme notu eklenir
+    assert ilk_satirlar(telegram) == ["birinci", "ikinci"]
+    assert all("Bağlantı kesintisi nedeniyle gecikmeli gönderildi" in kayit["metin"] for kayit in telegram.kayitlar)
+    assert dosyalar(k) == []
+    assert k.metrikler["gonderilen"] == 2
+    assert not k.kesintide()
+
+
+def test_ayni_anahtar_ya_da_metin_birlestirilir(monkeypatch, telegram, kutu):
+    kesinti(monkeypatch)
+    k = kutu()
+    k.ekle("Kapı açık (1)", None, gonderim(), None, anahtar="kapi")
+    k.ekle("Sistem çevrimdışı", None, gonderim(), None)
+    k.ekle("Kapı açık (2)", None, gonderim(alicilar=["2000"]), None, anahtar="kapi")
+    k.ekle("Sistem çevrimdışı", None, gonderim(), None)
+    assert k.bekleyen()["adet"] == 2
+    assert len(dosyalar(k)) == 2
+    assert k.metrikler["eklenen"] == 4
+    assert k.metrikler["birlestirilen"] == 2
+    k.kapat()
+
+    baglanti(monkeypatch, telegram)
+    k = kutu()
+    bekle(lambda: k.bekleyen()["adet"] == 0)
+    kapi = [kayit for kayit in telegram.kayitlar if kayit["metin"].startswith("Kapı")]
+    # En yeni içerik, birleştirilen bildirimlerin tüm alıcılarına tekrar sayısıyla gider
+    assert sorted(kayit["chat_id"] for kayit in kapi) == ["1000", "2000"]
+    assert all(kayit["metin"].startswith("Kapı açık (2)") for kayit in kapi)
+    assert all("kesintide 2 kez tekrarlandı" in kayit["metin"] for kayit in kapi)
+    assert ilk_satirlar(telegram).count("Sistem çevrimdışı") == 1
+
+
+def test_basarisiz_denemelerde_bekleme_ikiye_katlanir(monkeypatch, telegram, kutu, capsys):
+    monkeypatch.setattr(main, "GIDEN_KUTUSU_ILK_BEKLEME", 0.05)
+    monkeypatch.setattr(main, "GIDEN_KUTUSU_MAKS_BEKLEME", 0.2)
+    kesinti(monkeypatch)
+    k = kutu()
+    k.ekle("alarm", None, gonderim(), None)
+    bekle(lambda: k.metrikler["deneme"] >= 5)
+    k.kapat()
+
+    beklemeler = [float(sure) for sure in re.findall(r"([\d.]+) sn sonra tekrar denenecek", capsys.readouterr().out)]
+    assert beklemeler[:4] == [0.05, 0.1, 0.2, 0.2]
+    assert k.bekleyen()["adet"] == 1  # Gönderilemeyen bildirim silinmez
+
+
+def test_baglanti_gelince_bekleme_bitmeden_gonderilir(monkeypatch, telegram, kutu):
+    kesinti(monkeypatch)
+    k = kutu()
+    k.ekle("alarm", None, gonderim(), None)
+    bekle(lambda: k.metrikler["deneme"] >= 1)
+
+    # Başka bir Telegram isteğinin başarılı olması gibi: 60 sn'lik bekleme kesilir
+    baglanti(monkeypatch, telegram)
+    k.baglanti_geldi()
+    bekle(lambda: k.bekleyen()["adet"] == 0)
+    assert ilk_satirlar(telegram) == ["alarm"]
+
+
+def test_bozuk_kayit_silinir_bozuk_fotograf_metin_olarak_gider(monkeypatch, telegram, kutu, capsys):
+    kesinti(monkeypatch)
+    k = kutu()
+    k.ekle("sağlam", None, gonderim(t=1000.0), b"\xff\xd8jpeg\xff\xd9")
+    k.ekle("bozuk", None, gonderim(t=2000.0), None)
+    k.ekle("fotoğrafı bozuk", None, gonderim(t=3000.0), b"\xff\xd8jpeg\xff\xd9")
+    k.kapat()
+    saglam, bozuk, foto_bozuk = (os.path.join(k.dizin, ad) for ad in dosyalar(k))
+    with open(bozuk, "r+b") as f:
+        f.seek(main.GidenKutusu.BASLIK.size + 2)
+        f.write(b"#")
+    with open(foto_bozuk, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"#")
+    with open(os.path.join(k.dizin, "0000000009.bildirim.tmp"), "wb") as f:
+        f.write(b"yarim")  # Yazılırken elektrik kesilmiş
+
+    baglanti(monkeypatch, telegram)
+    capsys.readouterr()
+    k = kutu()
+    assert "Giden kutusunda bozuk dosya siliniyor" in capsys.readouterr().out
+    assert k.bekleyen()["adet"] == 2
+    bekle(lambda: k.bekleyen()["adet"] == 0)
+    assert ilk_satirlar(telegram) == ["sağlam", "fotoğrafı bozuk"]
+    assert [kayit["metot"] for kayit in telegram.kayitlar] == ["sendPhoto", "sendMessage"]
+    assert dosyalar(k) == []
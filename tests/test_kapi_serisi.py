@@ -0,0 +1,179 @@
+"""KapiSerisi / OzetKovalari testleri: saatlik ve günlük özetler, gece yarısı kova sınırları, saatler boyunca
+açık kalan kapı, halka kapasiteleri ve /rapor metni.
+
+Kova sınırları yerel saate bağlı olduğundan testler yaz saati uygulaması olmayan sabit bir saat diliminde çalışır.
+"""
+
+import time
+
+import pytest
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def saat_dilimi(monkeypatch):
+    monkeypatch.setenv("TZ", "<+03>-3")
+    time.tzset()
+    monkeypatch.setattr(main, "GECE_BASLANGIC_SAATI", 22)
+    monkeypatch.setattr(main, "GECE_BITIS_SAATI", 6)
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def yerel(gun, saat, dakika=0, ay=1):
+    return time.mktime((2024, ay, gun, saat, dakika, 0, 0, 0, -1))
+
+
+def saat_ozeti(seri, t):
+    """`t` anının bulunduğu saatin özeti."""
+    no = main.yerel_saat_no(t)
+    return seri.saatlik.topla(no, no)
+
+
+def gun_ozeti(seri, t):
+    no = main.yerel_saat_no(t) // 24
+    return seri.gunluk.topla(no, no)
+
+
+def ac_kapat(seri, acilis, kapanis):
+    seri.kapi_degisti(True, acilis)
+    seri.kapi_degisti(False, kapanis)
+
+
+def test_saat_ve_gun_numaralari_yerel_saate_gore():
+    assert main.yerel_saat_no(yerel(10, 0)) % 24 == 0
+    assert main.yerel_saat_no(yerel(10, 23, 59)) % 24 == 23
+    assert main.yerel_saat_no(yerel(11, 0)) // 24 == main.yerel_saat_no(yerel(10, 23, 59)) // 24 + 1
+    assert main.saat_no_zamani(main.yerel_saat_no(yerel(10, 14, 35))) == yerel(10, 14)
+
+
+def test_saatlik_ve_gunluk_ozet():
+    seri = main.KapiSerisi(16, 48, 35)
+    ac_kapat(seri, yerel(10, 10, 15), yerel(10, 10, 45))
+    ac_kapat(seri, yerel(10, 10, 50), yerel(10, 10, 55))
+    ac_kapat(seri, yerel(10, 14, 0), yerel(10, 14, 10))
+
+    assert saat_ozeti(seri, yerel(10, 10)) == {"acilma": 2, "gece": 0, "otomatik": 0, "acik_sure": 2100.0,
+                                               "en_uzun": 1800.0, "yaklasma": 0.0}
+    assert saat_ozeti(seri, yerel(10, 11))["acilma"] == 0
+    gun = gun_ozeti(seri, yerel(10, 12))
+    assert (gun["acilma"], gun["acik_sure"], gun["en_uzun"]) == (3, 2700.0, 1800.0)
+    son_24_saat, son_7_gun, son_30_gun = (ozet for _, ozet in seri.ozetler(yerel(10, 20)))
+    assert son_24_saat["acilma"] == son_7_gun["acilma"] == son_30_gun["acilma"] == 3
+    assert seri.saatlik_acilmalar(yerel(10, 20)) == [(main.yerel_saat_no(yerel(10, 10)), 2),
+                                                     (main.yerel_saat_no(yerel(10, 14)), 1)]
+
+
+def test_saatler_boyunca_acik_kalan_kapinin_suresi_saatlere_bolunur():
+    seri = main.KapiSerisi(16, 48, 35)
+    ac_kapat(seri, yerel(10, 10, 30), yerel(10, 13, 15))
+
+    assert [saat_ozeti(seri, yerel(10, saat))["acik_sure"] for saat in range(9, 15)] == [0, 1800, 3600, 3600, 900, 0]
+    # Açılma ve en uzun süre sadece açılışın saatine yazılır
+    assert [saat_ozeti(seri, yerel(10, saat))["acilma"] for saat in range(10, 14)] == [1, 0, 0, 0]
+    assert saat_ozeti(seri, yerel(10, 10))["en_uzun"] == 9900.0
+    assert saat_ozeti(seri, yerel(10, 12))["en_uzun"] == 0.0
+    assert gun_ozeti(seri, yerel(10, 0))["acik_sure"] == 9900.0
+
+
+def test_gece_yarisini_asan_aralik_iki_gune_bolunur():
+    seri = main.KapiSerisi(16, 48, 35)
+    ac_kapat(seri, yerel(10, 23, 50), yerel(11, 0, 20))
+
+    assert saat_ozeti(seri, yerel(10, 23))["acik_sure"] == 600.0
+    assert saat_ozeti(seri, yerel(11, 0))["acik_sure"] == 1200.0
+    dun, bugun = gun_ozeti(seri, yerel(10, 12)), gun_ozeti(seri, yerel(11, 12))
+    assert (dun["acilma"], dun["gece"], dun["acik_sure"], dun["en_uzun"]) == (1, 1, 600.0, 1800.0)
+    assert (bugun["acilma"], bugun["gece"], bugun["acik_sure"], bugun["en_uzun"]) == (0, 0, 1200.0, 0.0)
+    # Ay sınırında da gün numarası ardışıktır
+    seri = main.KapiSerisi(16, 48, 35)
+    ac_kapat(seri, yerel(31, 23, 0), yerel(1, 1, 0, ay=2))
+    assert gun_ozeti(seri, yerel(31, 12))["acik_sure"] == 3600.0
+    assert gun_ozeti(seri, yerel(1, 12, ay=2))["acik_sure"] == 3600.0
+
+
+def test_gece_acilislari_sayilir():
+    seri = main.KapiSerisi(16, 48, 35)
+    for saat in (5, 6, 21, 22):
+        ac_kapat(seri, yerel(10, saat, 30), yerel(10, saat, 31))
+    assert gun_ozeti(seri, yerel(10, 0))["gece"] == 2  # 05:30 ve 22:30
+
+
+def test_halka_kapasitesinden_eski_kovalar_dusurulur():
+    seri = main.KapiSerisi(4, 6, 3)
+    ac_kapat(seri, yerel(10, 1, 0), yerel(10, 1, 10))
+    # Halkayı aşan uzun açık kalma: sadece son 6 saate süre dağıtılır, eski yuvalar sıfırlanır
+    ac_kapat(seri, yerel(10, 10, 0), yerel(10, 20, 0))
+    assert saat_ozeti(seri, yerel(10, 1))["acilma"] == 0
+    assert [saat_ozeti(seri, yerel(10, saat))["acik_sure"] for saat in range(13, 20)] == [0] + [3600] * 6
+    assert gun_ozeti(seri, yerel(10, 0))["acik_sure"] == 600.0 + 36000.0
+    assert seri.ozetler(yerel(14, 12))[1][1]["acik_sure"] == 0.0  # Günlük halkadan çıktı (3 gün)
+
+
+def test_son_araliklar_halka_tampondan_yeniden_eskiye():
+    seri = main.KapiSerisi(3, 48, 35)
+    for dakika in range(5):
+        ac_kapat(seri, yerel(10, 12, dakika * 10), yerel(10, 12, dakika * 10 + dakika + 1))
+    assert seri.son_araliklar(2) == [(yerel(10, 12, 40), 300.0), (yerel(10, 12, 30), 240.0)]
+    assert len(seri.son_araliklar(10)) == 3  # Kapasite kadar
+
+
+def test_acik_baslayan_kapi_acilma_sayilmaz_ve_kapaninca_suresi_islenir():
+    seri = main.KapiSerisi(16, 48, 35)
+    seri.baslat(True, yerel(10, 9, 45))
+    assert seri.acilis == yerel(10, 9, 45)
+    seri.kapi_degisti(False, yerel(10, 10, 15))
+    assert saat_ozeti(seri, yerel(10, 9)) == {"acilma": 0, "gece": 0, "otomatik": 0, "acik_sure": 900.0,
+                                              "en_uzun": 0.0, "yaklasma": 0.0}
+    assert saat_ozeti(seri, yerel(10, 10))["acik_sure"] == 900.0
+    seri.kapi_degisti(False, yerel(10, 10, 20))  # Kapalıyken gelen kapanma yok sayılır
+    assert seri.son_araliklar(5) == [(yerel(10, 9, 45), 1800.0)]
+
+
+def test_otomatik_kurulum_ve_kesilen_kurulumun_dolma_orani():
+    seri = main.KapiSerisi(16, 48, 35)
+    seri.otomatik_kuruldu(yerel(10, 8))
+    seri.kapi_degisti(True, yerel(10, 9), yaklasma=0.4)
+    seri.kapi_degisti(False, yerel(10, 9, 5))
+    seri.kapi_degisti(True, yerel(11, 9), yaklasma=0.75)
+    _, hafta = seri.ozetler(yerel(11, 12))[1]
+    assert hafta["otomatik"] == 1
+    assert hafta["yaklasma"] == 0.75
+    assert gun_ozeti(seri, yerel(10, 12))["yaklasma"] == pytest.approx(0.4)
+
+
+def test_rapor_metni(monkeypatch):
+    monkeypatch.setattr(main, "GECE_BASLANGIC_SAATI", 0)
+    monkeypatch.setattr(main, "GECE_BITIS_SAATI", 0)  # Hiçbir saat gece değil: sonuç çalıştırma saatine bağlı olmasın
+    bolge = main.bolgeler[0]
+    seri = main.KapiSerisi(16, 48, 35)
+    monkeypatch.setitem(main.kapi_serileri, bolge.no, seri)
+    simdi = int(time.time())
+    ac_kapat(seri, simdi - 7200, simdi - 3600)
+    seri.kapi_degisti(True, simdi - 600)
+
+    satirlar = main.kapi_raporu(bolge).split("\n")
+    assert satirlar == [
+        f"📊 {bolge.ad}",
+        "Son 24 saat: 2 açılma (gece 0), toplam açık 1 sa 0 dk, en uzun 1 sa 0 dk",
+        "Son 7 gün: 2 açılma (gece 0), toplam açık 1 sa 0 dk, en uzun 1 sa 0 dk",
+        "Son 30 gün: 2 açılma (gece 0), toplam açık 1 sa 0 dk, en uzun 1 sa 0 dk",
+        "Otomatik kurulum (7 gün): 0 kez kuruldu; kapı açılarak kesilenlerin en çok dolanı %0",
+        "Şu an: kapı açık (10 dk)",
+    ]
+
+    ayrintili = main.kapi_raporu(bolge, ayrintili=True).split("\n")
+    assert ayrintili[:-2] == satirlar
+    saatler = ", ".join(f"{time.strftime('%H:00', time.localtime(t))} 1" for t in (simdi - 7200, simdi - 600))
+    assert ayrintili[-2] == f"Saatlik açılma (son 24 saat): {saatler}"
+    assert ayrintili[-1] == f"Son açılışlar: {time.strftime('%d.%m %H:%M', time.localtime(simdi - 7200))} (1 sa 0 dk)"
+
+
+def test_bos_rapor(monkeypatch):
+    bolge = main.bolgeler[0]
+    monkeypatch.setitem(main.kapi_serileri, bolge.no, main.KapiSerisi(16, 48, 35))
+    satirlar = main.kapi_raporu(bolge, ayrintili=True).split("\n")
+    assert satirlar[1] == "Son 24 saat: 0 açılma (gece 0), toplam açık 0 sn, en uzun 0 sn"
+    assert satirlar[-3:] == ["Şu an: kapı kapalı", "Saatlik açılma (son 24 saat): yok", "Son açılışlar: yok"]
@@ -0,0 +1,12 @@
+"""Metrik kaydı testleri: içe aktarmadan hemen sonraki okumada her metrik kendi nesnesinden değer verir."""
+
+import main
+
+
+def test_ice_aktarmadan_sonra_butun_metrikler_okunur():
+    metin = main.metrik_kaydi.metin()
+    assert "okunamadı" not in metin
+    for ad in ("guvenlik_isci_son_ilerleme_saniye", "guvenlik_bildirim_kuyruk_derinligi",
+               "guvenlik_giden_kutusu_bekleyen", "guvenlik_kare_tamponu_toplam", "guvenlik_zamanlayici_bekleyen",
+               "guvenlik_role_acik"):
+        assert f"# TYPE {ad} " in metin
@@ -0,0 +1,30 @@
+"""MQTT çevrimdışı kuyruğu testleri: retained topic başına son mesaj, olayların sırası ve kapasite sınırı."""
+
+import main
+
+
+def test_baglanti_yokken_yayinlar_bekletilir(monkeypatch):
+    monkeypatch.setattr(main, "mqtt_client", None)
+    kuyruk = main.MqttCevrimdisiKuyrugu()
+    monkeypatch.setattr(main, "mqtt_cevrimdisi", kuyruk)
+    main.mqtt_yayinla("guvenlik/bolge/1/durum", "KURULU")
+    main.mqtt_yayinla("guvenlik/olay", "{\"n\": 1}", qos=1, retain=False)
+    main.mqtt_yayinla("guvenlik/bolge/1/durum", "ALARM")
+    main.mqtt_yayinla("guvenlik/olay", "{\"n\": 2}", qos=1, retain=False)
+
+    # Retained durumun sadece sonuncusu, olayların hepsi eklenme sırasıyla
+    assert kuyruk.bosalt() == [
+        ("guvenlik/olay", "{\"n\": 1}", 1, False),
+        ("guvenlik/bolge/1/durum", "ALARM", main.MQTT_DURUM_QOS, True),
+        ("guvenlik/olay", "{\"n\": 2}", 1, False),
+    ]
+    assert len(kuyruk) == 0
+
+
+def test_kapasite_asilinca_en_eski_dusurulur(monkeypatch):
+    monkeypatch.setattr(main, "MQTT_CEVRIMDISI_KUYRUK", 3)
+    kuyruk = main.MqttCevrimdisiKuyrugu()
+    for n in range(5):
+        kuyruk.ekle(f"guvenlik/bolge/{n}/durum", "KURULU", 1, True)
+    assert [topic for topic, *_ in kuyruk.bosalt()] == [f"guvenlik/bolge/{n}/durum" for n in (2, 3, 4)]
+    assert kuyruk.dusurulen == 2
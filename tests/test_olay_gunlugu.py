@@ -0,0 +1,165 @@
+"""OlayGunlugu testleri: yarım kayıt kesme, anlık görüntüden sonra oynatma, bozuk anlık görüntüden
+kurtarma (silinmiş segmentler dahil) ve eski durum dosyasından bir kereye mahsus geçiş."""
+
+import os
+import time
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def gunluk(monkeypatch, tmp_path):
+    """Geçici dizinde günlük açan fabrika; testin sonunda açık kalan günlükler kapatılır."""
+    monkeypatch.setattr(main, "GUNLUK_GRUP_SURESI", 0.005)
+    monkeypatch.setattr(main, "SYSTEM_STATE_FILE", str(tmp_path / "security_system_state.flag"))
+    acilan = []
+
+    def ac():
+        g = main.OlayGunlugu(str(tmp_path / "gunluk"), str(tmp_path / "anlik.json"))
+        g.ac()
+        acilan.append(g)
+        return g
+
+    yield ac
+    for g in acilan:
+        if g._yazici is not None:
+            g.kapat()
+
+
+def bekle(kosul, zaman_asimi=5):
+    bitis = time.monotonic() + zaman_asimi
+    while not kosul():
+        assert time.monotonic() < bitis, "koşul zaman aşımına uğradı"
+        time.sleep(0.005)
+
+
+def cokert(g):
+    """Bekleyen kayıtlar diske yazıldıktan sonra anlık görüntü almadan kapatır (elektrik kesintisi gibi)."""
+    with g._kosul:
+        g._kapaniyor = True
+        g._kosul.notify()
+    g._yazici.join(timeout=5)
+    g._yazici = None
+    g._dosya.close()
+
+
+def kurulu(g):
+    return g.durum["kurulu"]
+
+
+def kayitlari_yaz(yol, *kayitlar):
+    """Kayıtları günlük biçiminde (uzunluk + CRC32 + JSON) doğrudan dosyaya ekler."""
+    with open(yol, "ab") as f:
+        for kayit in kayitlar:
+            govde = main.json.dumps(kayit).encode("utf-8")
+            f.write(main.OlayGunlugu.BASLIK.pack(len(govde), main.zlib.crc32(govde)) + govde)
+
+
+def test_crc_bozuk_son_kayit_kesilir(gunluk):
+    g = gunluk()
+    g.yaz("durum", bolge=1, kurulu=True)
+    g.yaz("durum", bolge=2, kurulu=True)
+    cokert(g)
+    yol = g._segment_yolu(0)
+    saglam = os.path.getsize(yol)
+    # Son kaydın gövdesindeki bir bayt bozulur ve yarım kalmış bir kayıt eklenir
+    with open(yol, "r+b") as f:
+        f.seek(saglam - 2)
+        f.write(b"#")
+    with open(yol, "ab") as f:
+        f.write(main.OlayGunlugu.BASLIK.pack(100, 0) + b"{\"tip\"")
+
+    g = gunluk()
+    assert kurulu(g) == {"1": True}
+    # Bozuk kayıttan itibaren dosya kesildi, yeni kayıtlar sağlam sınırdan devam eder
+    g.yaz("durum", bolge=2, kurulu=False)
+    cokert(g)
+    assert kurulu(gunluk()) == {"1": True, "2": False}
+
+
+def test_anlik_goruntuden_sonraki_kayitlar_oynatilir(gunluk, capsys):
+    g = gunluk()
+    g.yaz("durum", bolge=1, kurulu=True)
+    g.yaz("kapi", bolge=1, acik=True)
+    g.kapat()  # Anlık görüntü alınır
+
+    g = gunluk()
+    g.yaz("durum", bolge=2, kurulu=True)
+    g.yaz("durum", otomatik_kapali=True)
+    cokert(g)
+    capsys.readouterr()
+
+    g = gunluk()
+    assert kurulu(g) == {"1": True, "2": True}
+    assert g.durum["otomatik_kapali"] is True
+    # Sadece anlık görüntüden sonraki iki kayıt oynatıldı
+    assert "anlık görüntüden sonra 2 kayıt oynatıldı" in capsys.readouterr().out
+
+
+def test_bozuk_anlik_goruntude_onceki_anlik_goruntu_kullanilir(gunluk):
+    g = gunluk()
+    g.yaz("durum", bolge=1, kurulu=True)
+    g.kapat()
+    g = gunluk()
+    g.yaz("durum", bolge=2, kurulu=True)
+    g.kapat()
+    assert os.path.exists(g._yedek_dosyasi)
+    with open(g.anlik_dosyasi, "w") as f:
+        f.write("{bozuk")
+
+    # Bir önceki anlık görüntü ve ardından yazılan kayıtlar son durumu verir
+    assert kurulu(gunluk()) == {"1": True, "2": True}
+
+
+def test_bozuk_anlik_goruntu_silinmis_segmentten_sonra_tam_durumla_kurtarilir(gunluk, monkeypatch):
+    monkeypatch.setattr(main, "GUNLUK_SEGMENT_BOYUTU", 200)
+    monkeypatch.setattr(main, "GUNLUK_SAKLANAN_SEGMENT", 1)
+    g = gunluk()
+    g.yaz("durum", bolge=1, kurulu=True)  # Sadece segment 0'da
+    for i in range(40):
+        g.yaz("kapi", bolge=2, acik=i % 2 == 0)
+        time.sleep(0.01)
+    bekle(lambda: g._segment >= 3)
+    g.kapat()
+    assert not os.path.exists(g._segment_yolu(0))  # Kurma kaydının bulunduğu segment silindi
+    for yol in (g.anlik_dosyasi, g._yedek_dosyasi):
+        with open(yol, "w") as f:
+            f.write("[]")
+
+    g = gunluk()
+    # En eski saklanan segmentin başındaki tam durum kaydı sayesinde bölge 1 hala kurulu
+    assert kurulu(g) == {"1": True}
+
+
+def test_tam_durum_kaydi_yoksa_bilinmeyen_bolgeler_kurulu_kabul_edilir(gunluk):
+    g = gunluk()
+    cokert(g)
+    # Eski sürüm günlüğü gibi: segment tam durum kaydı olmadan, sadece değişikliklerle başlar
+    os.remove(g._segment_yolu(0))
+    kayitlari_yaz(g._segment_yolu(0), {"tip": "durum", "bolge": 2, "kurulu": False})
+    with open(g.anlik_dosyasi, "w") as f:
+        f.write("bozuk")
+
+    g = gunluk()
+    beklenen = {str(bolge.no): True for bolge in main.bolgeler}
+    beklenen["2"] = False  # Günlükte kaydı olan bölge bilinen durumuna döner
+    assert kurulu(g) == beklenen
+
+
+def test_eski_durum_dosyasindan_bir_kereye_mahsus_gecis(gunluk):
+    with open(main.SYSTEM_STATE_FILE, "w") as f:
+        f.write("AKTIF1,OTOMATIK_KAPALI")
+
+    g = gunluk()
+    assert kurulu(g) == {"1": True, "2": False}
+    assert g.durum["otomatik_kapali"] is True
+    cokert(g)  # Kapanışta anlık görüntü alınmasa da geçiş günlükte kalıcıdır
+
+    with open(main.SYSTEM_STATE_FILE, "w") as f:
+        f.write("AKTIF2")
+    g = gunluk()
+    # Günlük artık var: eski dosya yeniden okunmaz
+    assert kurulu(g) == {"1": True, "2": False}
+    assert g.durum["otomatik_kapali"] is True
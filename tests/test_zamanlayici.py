@@ -0,0 +1,173 @@
+"""Zamanlayici ve otomatik kurulum takvimi testleri: işlerin sırası, iptal, takvim satırlarının çözülmesi,
+haftanın dönüşü ve takvim saatinin kendini tam bir kez yeniden planlaması."""
+
+import threading
+import time
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def zamanlayici(monkeypatch):
+    """Kendi thread'inde çalışan yeni bir zamanlayıcı; main.zamanlayici olarak kullanılır."""
+    monkeypatch.setattr(main, "bekci", main.Bekci())
+    z = main.Zamanlayici()
+    monkeypatch.setattr(main, "zamanlayici", z)
+    durdur = threading.Event()
+    thread = threading.Thread(target=z.calistir, args=(durdur,), daemon=True)
+    thread.start()
+    yield z
+    durdur.set()
+    z.durdur()
+    thread.join(timeout=5)
+
+
+def bekle(kosul, zaman_asimi=5):
+    bitis = time.monotonic() + zaman_asimi
+    while not kosul():
+        assert time.monotonic() < bitis, "koşul zaman aşımına uğradı"
+        time.sleep(0.005)
+
+
+def bekleyen_isler(z):
+    """Yığında iptal edilmemiş işlerin (son tarih, fonksiyon adı) listesi, son tarih sırasıyla."""
+    with z._kosul:
+        return sorted((kayit[0], kayit[2][0].__name__) for kayit in z._yigin if kayit[2] is not None)
+
+
+def yerel(yil, ay, gun, saat, dakika):
+    return time.mktime((yil, ay, gun, saat, dakika, 0, 0, 0, -1))
+
+
+def test_isler_son_tarih_sirasiyla_calisir(zamanlayici):
+    calisan = []
+    zamanlayici.sonra(0.06, calisan.append, "üçüncü")
+    zamanlayici.sonra(0.02, calisan.append, "birinci")
+    zamanlayici.saatinde(time.time() + 0.04, calisan.append, "ikinci")
+    bekle(lambda: len(calisan) == 3)
+    assert calisan == ["birinci", "ikinci", "üçüncü"]
+    assert zamanlayici.bekleyen() == 0
+
+
+def test_iptal_edilen_is_hic_calismaz(zamanlayici):
+    calisan = []
+    iptal = zamanlayici.sonra(0.02, calisan.append, "iptal")
+    zamanlayici.sonra(0.05, calisan.append, "son")
+    zamanlayici.iptal(iptal)
+    zamanlayici.iptal(iptal)  # İkinci iptal etkisizdir
+    bekle(lambda: calisan == ["son"])
+    time.sleep(0.05)
+    assert calisan == ["son"]
+    assert zamanlayici.metrikler["iptal"] == 1
+
+
+def test_calismis_isin_iptali_etkisizdir(zamanlayici):
+    calisan = threading.Event()
+    kayit = zamanlayici.sonra(0, calisan.set)
+    assert calisan.wait(5)
+    zamanlayici.iptal(kayit)
+    assert zamanlayici.metrikler["iptal"] == 0
+    assert zamanlayici.bekleyen() == 0
+
+
+def test_iptal_edilen_kayitlar_yarisini_gecince_yigin_temizlenir():
+    z = main.Zamanlayici()  # Sürücüsüz: sadece yığın
+    kayitlar = [z.sonra(60 + i, print, i) for i in range(10)]
+    for kayit in kayitlar[:5]:
+        z.iptal(kayit)
+    assert len(z._yigin) == 10  # Yarısı kadar boş kayıt yığında kalabilir
+    z.iptal(kayitlar[5])
+    assert len(z._yigin) == 4
+    assert z.bekleyen() == 4
+    assert [kayit[2][1] for kayit in sorted(z._yigin)] == [(6,), (7,), (8,), (9,)]
+
+
+def test_hata_veren_is_zamanlayiciyi_durdurmaz(zamanlayici, capsys):
+    calisan = threading.Event()
+    zamanlayici.sonra(0, lambda: 1 / 0)
+    zamanlayici.sonra(0.01, calisan.set)
+    assert calisan.wait(5)
+    assert "Zamanlayıcı işi (<lambda>) hatası" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("satir, beklenen", [
+    ("* 18:30", (set(range(7)), 18, 30)),
+    ("pzt-cum 07:05", ({0, 1, 2, 3, 4}, 7, 5)),
+    ("cmt,paz 13:00", ({5, 6}, 13, 0)),
+    ("Çar 0:00", ({2}, 0, 0)),
+    ("cum-pzt 23:59", ({4, 5, 6, 0}, 23, 59)),  # Hafta sonunu aşan aralık
+    ("pzt,car-per 12:00", ({0, 2, 3}, 12, 0)),
+])
+def test_takvim_satiri_cozulur(satir, beklenen):
+    assert main.takvim_satirini_coz(satir) == beklenen
+
+
+@pytest.mark.parametrize("satir", [
+    "pzr 18:30", "pazartesi 18:30", "pzt- 18:30", "pzt-sal-car 18:30", "",  # Gün adı
+    "* 24:00", "* 18:60", "* -1:30", "* 18", "* 18:3a", "* 18:30:00",      # Saat
+    "pzt18:30", "pzt 18:30 fazla",
+])
+def test_gecersiz_takvim_satiri_reddedilir(satir):
+    with pytest.raises(ValueError, match="Geçersiz takvim satırı"):
+        main.takvim_satirini_coz(satir)
+
+
+def test_sonraki_takvim_zamani():
+    pazartesi = yerel(2024, 1, 1, 12, 0)  # 1 Ocak 2024 Pazartesi
+    assert time.localtime(pazartesi).tm_wday == 0
+    assert main.sonraki_takvim_zamani(["* 18:30"], pazartesi) == yerel(2024, 1, 1, 18, 30)
+    # Saati geçmişse ertesi güne, gün uymuyorsa takvimdeki ilk güne
+    assert main.sonraki_takvim_zamani(["* 08:00"], pazartesi) == yerel(2024, 1, 2, 8, 0)
+    assert main.sonraki_takvim_zamani(["cmt,paz 10:00"], pazartesi) == yerel(2024, 1, 6, 10, 0)
+    # Birden fazla satırdan en yakını
+    assert main.sonraki_takvim_zamani(["paz 09:00", "sal 07:00", "pzt 20:00"], pazartesi) == yerel(2024, 1, 1, 20, 0)
+    # Tam takvim saatinde bir sonraki seferi verir
+    assert main.sonraki_takvim_zamani(["* 18:30"], yerel(2024, 1, 1, 18, 30)) == yerel(2024, 1, 2, 18, 30)
+
+
+def test_sonraki_takvim_zamani_haftayi_ve_ayi_asar():
+    # Pazartesi saati geçti: bir sonraki pazartesi, ay ve yıl değişerek
+    assert main.sonraki_takvim_zamani(["pzt 08:00"], yerel(2024, 1, 1, 9, 0)) == yerel(2024, 1, 8, 8, 0)
+    assert main.sonraki_takvim_zamani(["pzt-cum 18:30"], yerel(2024, 1, 26, 19, 0)) == yerel(2024, 1, 29, 18, 30)
+    assert main.sonraki_takvim_zamani(["* 00:00"], yerel(2024, 12, 31, 23, 59)) == yerel(2025, 1, 1, 0, 0)
+
+
+@pytest.fixture
+def bildirimler(monkeypatch):
+    """Takvim saatinin gönderdiği bildirimleri yakalar; durum kaydı ve askı bayrağı test sonunda geri alınır."""
+    gonderilen = []
+    monkeypatch.setattr(main, "send_telegram_notification", lambda mesaj, *args, **kwargs: gonderilen.append(mesaj))
+    monkeypatch.setattr(main, "save_system_state", lambda *args, **kwargs: None)
+    monkeypatch.setattr(main, "otomatik_alarm_kapali", True)
+    return gonderilen
+
+
+def test_takvim_saati_kendini_tam_bir_kez_yeniden_planlar(monkeypatch, zamanlayici, bildirimler):
+    bolge = main.Bolge(**main.BOLGE_TABLOSU[0])  # Bölge listesinde olmayan ayrı bir nesne
+    bolge.otomatik_askida = True
+    simdi = time.time()
+    zamanlar = iter([simdi + 0.05, simdi + 3600, simdi + 7200])
+    monkeypatch.setattr(main, "sonraki_takvim_zamani", lambda takvim, simdi=None: next(zamanlar))
+    main.takvimi_planla(bolge)
+    bekle(lambda: bolge.takvim_isi is not None)
+
+    adlar = [ad for _, ad in bekleyen_isler(zamanlayici)]
+    assert adlar.count("takvim_saati_geldi") == 1
+    assert bolge.takvim_kaydi[2][2] == simdi + 3600  # Bir sonraki takvim saati
+    assert adlar.count("kapali_bolgeyi_kur") == 1
+    assert not bolge.otomatik_askida
+    assert main.otomatik_alarm_kapali is False
+    assert len(bildirimler) == 1 and "otomatik alarm kurulumu tekrar aktif edildi" in bildirimler[0]
+
+
+def test_askida_olmayan_bolgede_takvim_saati_sadece_yeniden_planlar(monkeypatch, zamanlayici, bildirimler):
+    bolge = main.Bolge(**main.BOLGE_TABLOSU[0])
+    sonraki = time.time() + 3600
+    monkeypatch.setattr(main, "sonraki_takvim_zamani", lambda takvim, simdi=None: sonraki)
+    main.takvim_saati_geldi(bolge)
+
+    assert [ad for _, ad in bekleyen_isler(zamanlayici)] == ["takvim_saati_geldi"]
+    assert bolge.takvim_isi is None
+    assert bildirimler == []